@@ -7,7 +7,7 @@ Falls back to LLM if parsing fails, then to Patchright if all else fails
 
 import logging
 import asyncio
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 from dataclasses import dataclass
 from datetime import datetime
 import sys
@@ -15,7 +15,11 @@ import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from Shared.logger_config import setup_logging
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../Shared"))
+from logger_config import setup_logging
+from tracing import traced
+from metrics_server import metrics
+from catalog_stream import CatalogChunk, page_chunks, prefetch_pages
 from Extraction.CommercialAPI.commercial_config import CommercialAPIConfig
 from Extraction.CommercialAPI.commercial_api_client import get_client
 from Extraction.CommercialAPI.html_cache_manager import HTMLCacheManager
@@ -53,6 +57,10 @@ class CommercialCatalogExtractor:
         extractor = CommercialCatalogExtractor()
         await extractor.initialize()
         result = await extractor.extract_catalog(url, 'nordstrom', 'dresses')
+        
+        # Or incrementally, one page at a time (next page prefetched)
+        async for chunk in extractor.stream_catalog(page_urls, 'nordstrom', 'dresses'):
+            ...
         await extractor.cleanup()
     """
     
@@ -77,6 +85,9 @@ class CommercialCatalogExtractor:
             if self.config.HTML_CACHING_ENABLED:
                 self.html_cache = HTMLCacheManager()
                 await self.html_cache.initialize()
+                metrics.register_collector(
+                    'html_cache_commercial_catalog', lambda: self.html_cache.collect_metrics('commercial_catalog')
+                )
             
             # Initialize HTML parser
             self.html_parser = HTMLParser()
@@ -92,6 +103,7 @@ class CommercialCatalogExtractor:
             logger.error(f"❌ Failed to initialize catalog extractor: {e}")
             raise
     
+    @traced('extract')
     async def extract_catalog(
         self,
         url: str,
@@ -241,6 +253,66 @@ class CommercialCatalogExtractor:
                 error=str(e)
             )
     
+    async def stream_catalog(
+        self,
+        page_urls: List[str],
+        retailer: str,
+        category: str,
+        max_products: int = 100,
+        chunk_size: Optional[int] = None
+    ) -> AsyncIterator[CatalogChunk]:
+        """
+        Extract catalog pages incrementally
+        
+        Each page goes through the same cache → fetch → BeautifulSoup → LLM →
+        Patchright chain as extract_catalog(). The next page is fetched while
+        the caller processes the current one. Stops after a page that adds no
+        products not already seen on earlier pages (end of the listing).
+        
+        Args:
+            page_urls: Catalog page URLs in order (single URL for infinite scroll)
+            retailer: Retailer name
+            category: Product category
+            max_products: Maximum products to extract per page
+            chunk_size: Products per yielded chunk (default STREAM_CHUNK_SIZE)
+        
+        Yields:
+            CatalogChunk per chunk of each page (error set on failed pages)
+        """
+        async def fetch_page(page: int, page_url: str):
+            return page, page_url, await self.extract_catalog(page_url, retailer, category, max_products)
+        
+        seen_urls = set()
+        pages = prefetch_pages(page_urls, fetch_page)
+        try:
+            async for page, page_url, result in pages:
+                stats = {
+                    'processing_time': result.processing_time,
+                    'cache_hit': result.cache_hit,
+                    'brightdata_cost': result.brightdata_cost,
+                    'llm_cost': result.llm_cost
+                }
+                
+                if not result.success:
+                    for chunk in page_chunks([], page, page_url, result.method_used,
+                                             error=result.error or 'Unknown error', stats=stats):
+                        yield chunk
+                    continue
+                
+                page_urls_found = {p.get('url') for p in result.products if p.get('url')}
+                new_on_page = page_urls_found - seen_urls
+                seen_urls |= page_urls_found
+                
+                for chunk in page_chunks(result.products, page, page_url, result.method_used,
+                                         chunk_size=chunk_size, stats=stats):
+                    yield chunk
+                
+                if page > 1 and page_urls_found and not new_on_page:
+                    logger.info(f"⏹️ Page {page} repeated earlier products, stopping catalog stream")
+                    break
+        finally:
+            await pages.aclose()
+    
     async def _fallback_to_patchright(
         self,
         url: str,
@@ -329,6 +401,7 @@ class CommercialCatalogExtractor:
             # Log pattern learning stats
             if self.html_parser and self.html_parser.pattern_learner:
                 await self.html_parser.pattern_learner.log_pattern_stats()
+                await self.html_parser.pattern_learner.close()
             
             logger.info("✅ Commercial Catalog Extractor cleanup complete")
         
@@ -37,13 +37,14 @@ class CommercialAPIConfig:
     # ============================================
     
     ZENROWS_API_KEY = os.getenv('ZENROWS_API_KEY', '')
-    ZENROWS_API_ENDPOINT = 'https://api.zenrows.com/v1/'
+    ZENROWS_API_ENDPOINT = os.getenv('ZENROWS_API_ENDPOINT', 'https://api.zenrows.com/v1/')
     
     # ZenRows pricing: ~$0.01 per request with js_render + premium_proxy
     # Pricing: https://www.zenrows.com/pricing
     # 1,000 API credits = $9 = 100 requests with js_render+premium_proxy
     # ~$0.09 per request, or ~$0.01 with lower settings
     ZENROWS_COST_PER_REQUEST = 0.01  # Approximate cost per request
+    ZENROWS_CREDITS_PER_REQUEST = 10  # js_render + premium_proxy (1,000 credits = 100 requests)
     
     # ============================================
     # SCRAPERAPI CONFIGURATION
@@ -166,7 +167,18 @@ class CommercialAPIConfig:
     # LLM model selection
     GEMINI_MODEL = 'gemini-1.5-flash'  # Fast and cheap for fallback
     DEEPSEEK_MODEL = 'deepseek-chat'
-    
+
+    # Structure-aware HTML reduction before LLM fallback
+    # Strips styles/SVG/tracking scripts, keeps JSON-LD + state blobs and the
+    # most product-dense DOM blocks (html_reducer.py). Disable to send the
+    # first max_tokens*4 characters of raw HTML as before.
+    LLM_HTML_REDUCTION_ENABLED = True
+
+    # Token budgets for reduced HTML (1 token ≈ 4 characters), same limit as
+    # the raw truncation they replace
+    LLM_PRODUCT_TOKEN_BUDGET = 100000
+    LLM_CATALOG_TOKEN_BUDGET = 100000
+
     # ============================================
     # PATTERN LEARNING CONFIGURATION
     # ============================================
@@ -192,6 +204,17 @@ class CommercialAPIConfig:
         'pattern_learning.db'
     )
     
+    # Pattern outcomes are buffered in memory and written in batches
+    # Flush when this many outcomes are pending, or on the timer below
+    PATTERN_FLUSH_BATCH_SIZE = 50
+    PATTERN_FLUSH_INTERVAL_SECONDS = 30
+    
+    # Cap on buffered attempt log rows if the DB is unavailable (oldest dropped)
+    PATTERN_MAX_PENDING_ATTEMPTS = 5000
+    
+    # Read-through cache for get_failing_patterns (invalidated on flush)
+    PATTERN_FAILING_CACHE_TTL_SECONDS = 300
+    
     # ============================================
     # ERROR HANDLING & FALLBACK
     # ============================================
@@ -16,7 +16,10 @@ import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from Shared.logger_config import setup_logging
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../Shared"))
+from logger_config import setup_logging
+from tracing import traced
+from metrics_server import metrics
 from Shared.image_processor import ImageProcessor
 from Extraction.CommercialAPI.commercial_config import CommercialAPIConfig
 from Extraction.CommercialAPI.commercial_api_client import get_client
@@ -82,6 +85,9 @@ class CommercialProductExtractor:
             if self.config.HTML_CACHING_ENABLED:
                 self.html_cache = HTMLCacheManager()
                 await self.html_cache.initialize()
+                metrics.register_collector(
+                    'html_cache_commercial_product', lambda: self.html_cache.collect_metrics('commercial_product')
+                )
             
             # Initialize HTML parser
             self.html_parser = HTMLParser()
@@ -97,6 +103,7 @@ class CommercialProductExtractor:
             logger.error(f"❌ Failed to initialize product extractor: {e}")
             raise
     
+    @traced('extract')
     async def extract_product(
         self,
         url: str,
@@ -504,6 +511,7 @@ class CommercialProductExtractor:
             # Log pattern learning stats
             if self.html_parser and self.html_parser.pattern_learner:
                 await self.html_parser.pattern_learner.log_pattern_stats()
+                await self.html_parser.pattern_learner.close()
             
             logger.info("✅ Commercial Product Extractor cleanup complete")
         
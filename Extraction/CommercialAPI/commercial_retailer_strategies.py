@@ -19,7 +19,8 @@ import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from Shared.logger_config import setup_logging
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../Shared"))
+from logger_config import setup_logging
 
 logger = setup_logging(__name__)
 
@@ -14,7 +14,8 @@ import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from Shared.logger_config import setup_logging
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../Shared"))
+from logger_config import setup_logging
 from Extraction.CommercialAPI.commercial_config import CommercialAPIConfig
 
 logger = setup_logging(__name__)
@@ -276,6 +277,18 @@ class HTMLCacheManager:
             logger.warning(f"⚠️ Failed to get cache stats: {e}")
             return {}
     
+    async def collect_metrics(self, tower: str):
+        """Metrics-endpoint samples from get_stats()"""
+        stats = await self.get_stats()
+        if not stats:
+            return []
+        return [
+            ('smf_cache_requests_total', {'cache': 'html', 'tower': tower, 'result': 'hit'}, stats['cache_hits']),
+            ('smf_cache_requests_total', {'cache': 'html', 'tower': tower, 'result': 'miss'}, stats['cache_misses']),
+            ('smf_html_cache_entries', {'tower': tower}, stats['total_entries']),
+            ('smf_html_cache_size_bytes', {'tower': tower}, int(stats['total_size_mb'] * 1024 * 1024)),
+        ]
+    
     async def log_stats(self):
         """Log cache statistics"""
         stats = await self.get_stats()
@@ -13,7 +13,9 @@ import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from Shared.logger_config import setup_logging
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../Shared"))
+from logger_config import setup_logging
+from tracing import traced
 from Extraction.CommercialAPI.commercial_config import CommercialAPIConfig
 from Extraction.CommercialAPI.commercial_retailer_strategies import CommercialRetailerStrategies
 from Extraction.CommercialAPI.javascript_parser import JavaScriptDataParser
@@ -54,6 +56,7 @@ class HTMLParser:
         
         logger.info("✅ HTML Parser initialized")
     
+    @traced('parse')
     async def parse_product(
         self,
         html: str,
@@ -88,11 +91,18 @@ class HTMLParser:
             
             # Try JavaScript extraction first (for Abercrombie, Urban Outfitters, Aritzia)
             product_data = self.js_parser.extract_product_data(html, soup, retailer)
+            selector = 'javascript'
             
             # If JavaScript extraction failed, fall back to CSS selectors
             if not product_data or not product_data.get('title'):
                 logger.debug("JavaScript extraction failed or incomplete, trying CSS selectors")
                 product_data = self.strategies.extract_product(soup, retailer)
+                selector = 'css'
+            
+            field_outcomes = {
+                field: bool(product_data.get(field))
+                for field in self.config.REQUIRED_PRODUCT_FIELDS
+            }
             
             # Validate extracted data
             is_valid, validation_errors = self._validate_product(product_data, retailer)
@@ -101,7 +111,8 @@ class HTMLParser:
                 # Success! Record pattern success
                 if self.pattern_learner:
                     await self._record_pattern_success(
-                        retailer, 'product', url, product_data
+                        retailer, 'product', url, product_data,
+                        selector, field_outcomes
                     )
                 
                 logger.info(
@@ -122,7 +133,8 @@ class HTMLParser:
                 # Record pattern failure
                 if self.pattern_learner:
                     await self._record_pattern_failure(
-                        retailer, 'product', url, validation_errors
+                        retailer, 'product', url, validation_errors,
+                        selector, field_outcomes
                     )
                 
                 return None, False
@@ -138,6 +150,7 @@ class HTMLParser:
             
             return None, False
     
+    @traced('parse')
     async def parse_catalog(
         self,
         html: str,
@@ -175,6 +188,12 @@ class HTMLParser:
             # Extract catalog data using strategies
             products = self.strategies.extract_catalog(soup, retailer, max_products)
             
+            # A catalog field counts as extracted when every listing has it
+            field_outcomes = {
+                field: bool(products) and all(p.get(field) for p in products)
+                for field in self.config.REQUIRED_CATALOG_FIELDS
+            }
+            
             # Validate extracted data
             is_valid, validation_errors = self._validate_catalog(products, retailer)
             
@@ -182,7 +201,8 @@ class HTMLParser:
                 # Success! Record pattern success
                 if self.pattern_learner:
                     await self._record_pattern_success(
-                        retailer, 'catalog', url, {'product_count': len(products)}
+                        retailer, 'catalog', url, {'product_count': len(products)},
+                        'css', field_outcomes
                     )
                 
                 logger.info(
@@ -200,7 +220,8 @@ class HTMLParser:
                 # Record pattern failure
                 if self.pattern_learner:
                     await self._record_pattern_failure(
-                        retailer, 'catalog', url, validation_errors
+                        retailer, 'catalog', url, validation_errors,
+                        'css', field_outcomes
                     )
                 
                 return None, False
@@ -321,9 +342,11 @@ class HTMLParser:
         retailer: str,
         page_type: str,
         url: str,
-        data: Dict
+        data: Dict,
+        selector: Optional[str] = None,
+        field_outcomes: Optional[Dict[str, bool]] = None
     ):
-        """Record successful pattern usage for learning"""
+        """Record successful pattern usage for learning (buffered, non-blocking)"""
         if not self.pattern_learner:
             return
         
@@ -332,7 +355,9 @@ class HTMLParser:
                 retailer=retailer,
                 page_type=page_type,
                 url=url,
-                extracted_data=data
+                extracted_data=data,
+                selector=selector,
+                field_outcomes=field_outcomes
             )
         except Exception as e:
             logger.warning(f"⚠️ Failed to record pattern success: {e}")
@@ -342,9 +367,11 @@ class HTMLParser:
         retailer: str,
         page_type: str,
         url: str,
-        errors: List[str]
+        errors: List[str],
+        selector: Optional[str] = None,
+        field_outcomes: Optional[Dict[str, bool]] = None
     ):
-        """Record failed pattern usage for learning"""
+        """Record failed pattern usage for learning (buffered, non-blocking)"""
         if not self.pattern_learner:
             return
         
@@ -353,7 +380,9 @@ class HTMLParser:
                 retailer=retailer,
                 page_type=page_type,
                 url=url,
-                errors=errors
+                errors=errors,
+                selector=selector,
+                field_outcomes=field_outcomes
             )
         except Exception as e:
             logger.warning(f"⚠️ Failed to record pattern failure: {e}")
@@ -0,0 +1,437 @@
+"""
+HTML Content Reducer
+
+Structure-aware HTML reduction before LLM fallback parsing
+Keeps structured data and product-dense DOM blocks within a token budget
+"""
+
+import json
+import re
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../Shared"))
+from logger_config import setup_logging
+from Extraction.CommercialAPI.commercial_retailer_strategies import CommercialRetailerStrategies
+
+logger = setup_logging(__name__)
+
+class HTMLContentReducer:
+    """
+    Reduces raw retailer HTML to compact, product-focused markup for the LLM
+
+    Process:
+    1. Keep <title> and product meta tags (og:*, product:*)
+    2. Keep JSON-LD and known JavaScript state blobs (STATE_BLOB_MARKERS)
+    3. Drop <style>, SVG, tracking <script>, iframes, comments and noise attributes
+    4. Score DOM subtrees by product-signal density (price patterns, itemprop,
+       retailer selectors from CommercialRetailerStrategies)
+    5. Emit the densest non-overlapping subtrees, in document order, within budget
+
+    Token estimate matches the rest of the tower: 1 token ≈ 4 characters
+
+    Usage:
+        reducer = HTMLContentReducer()
+        compact = reducer.reduce(html, 'nordstrom', 'product', max_tokens=100000)
+        stats = reducer.last_stats
+    """
+
+    CHARS_PER_TOKEN = 4
+
+    # Tags that never carry product data
+    STRIP_TAGS = [
+        'style', 'svg', 'noscript', 'iframe', 'link', 'template',
+        'canvas', 'video', 'audio', 'object', 'embed',
+    ]
+
+    # Attributes worth keeping in the reduced markup
+    KEEP_ATTRIBUTES = {
+        'href', 'src', 'data-src', 'srcset', 'alt', 'title',
+        'itemprop', 'itemtype', 'content', 'class', 'id',
+        'data-testid', 'aria-label', 'datetime',
+    }
+
+    # Wrapper tags that are unwrapped when they carry no kept attributes
+    UNWRAP_TAGS = {'div', 'span', 'section', 'article', 'main', 'header', 'footer', 'nav', 'aside'}
+
+    # Script markers for the embedded state blobs the retailer extractors
+    # (JavaScriptDataParser) read; these scripts are kept for the LLM
+    STATE_BLOB_MARKERS = (
+        'productCatalog',
+        'productPrices',
+        'productData',
+        'window.__INITIAL_STATE__',
+        '__NUXT__',
+        '__NEXT_DATA__',
+    )
+
+    # Meta tags with product signal
+    META_PREFIXES = ('og:', 'product:', 'twitter:title', 'twitter:image', 'description')
+
+    PRICE_PATTERN = re.compile(r'(?:[$£€]\s?\d[\d,]*(?:\.\d{2})?|\d[\d,]*\.\d{2}\s?(?:USD|CAD|EUR|GBP))')
+    ATTRIBUTE_IN_SELECTOR = re.compile(r'\[([a-zA-Z_:][-a-zA-Z0-9_:.]*)')
+    WHITESPACE = re.compile(r'\s+')
+
+    # Signal weights
+    SELECTOR_WEIGHT = 3
+    ITEMPROP_WEIGHT = 2
+    PRICE_WEIGHT = 2
+    TITLE_WEIGHT = 3
+    IMAGE_WEIGHT = 1
+
+    # Small elements are scored as if they were this large, so a lone price
+    # <span> does not outrank the product block that contains it
+    MIN_BLOCK_CHARS = 400
+
+    # Share of the budget available to JSON-LD / state blobs
+    STRUCTURED_DATA_SHARE = 0.4
+
+    def __init__(self, strategies: Optional[CommercialRetailerStrategies] = None):
+        self.strategies = strategies or CommercialRetailerStrategies()
+        self.last_stats: Dict = {}
+
+    def reduce(
+        self,
+        html: str,
+        retailer: str,
+        page_type: str = 'product',
+        max_tokens: int = 100000
+    ) -> str:
+        """
+        Reduce HTML to compact, product-focused markup
+
+        Args:
+            html: Raw HTML content
+            retailer: Retailer name (selects retailer CSS selectors)
+            page_type: 'product' or 'catalog'
+            max_tokens: Token budget for the returned markup
+
+        Returns:
+            Reduced markup (never longer than max_tokens * 4 characters)
+        """
+        start = time.perf_counter()
+        max_chars = max_tokens * self.CHARS_PER_TOKEN
+
+        soup = BeautifulSoup(html, 'html.parser')
+
+        header = self._extract_header(soup)
+        structured = self._extract_structured_data(
+            soup, int(max_chars * self.STRUCTURED_DATA_SHARE)
+        )
+
+        self._strip_noise(soup)
+        selectors = self._get_retailer_selectors(retailer, page_type)
+        self._strip_attributes(soup, selectors)
+
+        root = soup.body or soup
+        remaining = max_chars - len(header) - len(structured)
+        blocks, signal_total = self._select_blocks(root, selectors, page_type, remaining)
+
+        if blocks:
+            content = '\n'.join(self._serialize(block) for block in blocks)
+        else:
+            # No product signals at all - keep the page text in document order
+            content = self._serialize(root)
+
+        reduced = '\n'.join(part for part in (header, structured, content) if part)
+        if len(reduced) > max_chars:
+            reduced = reduced[:max_chars]
+
+        self.last_stats = {
+            'retailer': retailer,
+            'page_type': page_type,
+            'original_chars': len(html),
+            'reduced_chars': len(reduced),
+            'original_tokens': len(html) // self.CHARS_PER_TOKEN,
+            'reduced_tokens': len(reduced) // self.CHARS_PER_TOKEN,
+            'structured_chars': len(structured),
+            'blocks_selected': len(blocks),
+            'signal_score': signal_total,
+            'reduction_ms': (time.perf_counter() - start) * 1000,
+        }
+
+        logger.info(
+            f"✂️ Reduced HTML for LLM: {len(html):,} → {len(reduced):,} chars "
+            f"(~{self.last_stats['reduced_tokens']:,} tokens, {len(blocks)} blocks, "
+            f"{self.last_stats['reduction_ms']:.0f}ms)"
+        )
+
+        return reduced
+
+    # ============================================
+    # STRUCTURED DATA
+    # ============================================
+
+    def _extract_header(self, soup: BeautifulSoup) -> str:
+        """Keep <title> and product meta tags"""
+        parts = []
+
+        if soup.title and soup.title.string:
+            parts.append(f"<title>{self._collapse(soup.title.string)}</title>")
+
+        for meta in soup.find_all('meta'):
+            name = meta.get('property') or meta.get('name') or ''
+            content = meta.get('content')
+            if content and name.lower().startswith(self.META_PREFIXES):
+                parts.append(f'<meta property="{name}" content="{self._collapse(content)}">')
+
+        return '\n'.join(parts)
+
+    def _extract_structured_data(self, soup: BeautifulSoup, max_chars: int) -> str:
+        """
+        Keep JSON-LD and known JavaScript state blobs (minified)
+
+        JSON-LD comes first since it is small and usually complete;
+        state blobs share whatever budget is left. Blobs are kept whole or
+        not at all so the LLM never sees cut-off JSON.
+        """
+        json_ld = []
+        state_blobs = []
+
+        for script in soup.find_all('script'):
+            text = script.string or ''
+            if not text.strip():
+                continue
+
+            script_type = (script.get('type') or '').lower()
+            if script_type == 'application/ld+json':
+                json_ld.append(
+                    f'<script type="application/ld+json">{self._minify_json(text)}</script>'
+                )
+            elif script.get('id') == '__NEXT_DATA__' or any(
+                marker in text for marker in self.STATE_BLOB_MARKERS
+            ):
+                state_blobs.append(f'<script>{self._minify_json(text)}</script>')
+
+        kept = []
+        used = 0
+        for blob in json_ld + state_blobs:
+            # A truncated blob is invalid JSON: drop it, a smaller one may still fit
+            if used + len(blob) > max_chars:
+                continue
+            kept.append(blob)
+            used += len(blob) + 1
+
+        return '\n'.join(kept)
+
+    def _minify_json(self, text: str) -> str:
+        """Minify JSON text; fall back to whitespace collapsing for JS assignments"""
+        try:
+            return json.dumps(json.loads(text), separators=(',', ':'), ensure_ascii=False)
+        except (ValueError, TypeError):
+            return self._collapse(text)
+
+    # ============================================
+    # NOISE REMOVAL
+    # ============================================
+
+    def _strip_noise(self, soup: BeautifulSoup):
+        """Remove scripts, styles, SVG, comments and other non-product markup"""
+        for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+            comment.extract()
+
+        for tag in soup.find_all(['script', 'head'] + self.STRIP_TAGS):
+            if not tag.decomposed:
+                tag.decompose()
+
+    def _get_retailer_selectors(self, retailer: str, page_type: str) -> List[str]:
+        """Retailer CSS selectors for the page type (flattened)"""
+        retailer_lower = retailer.lower()
+
+        if page_type == 'catalog':
+            selector_map = self.strategies.CATALOG_SELECTORS.get(retailer_lower, {})
+        else:
+            selector_map = self.strategies.PRODUCT_SELECTORS.get(retailer_lower, {})
+
+        selectors = []
+        for field_selectors in selector_map.values():
+            for selector in field_selectors:
+                # Bare tag selectors ('h1') match too broadly to be a signal
+                if selector not in selectors and not selector.isalnum():
+                    selectors.append(selector)
+        return selectors
+
+    def _strip_attributes(self, soup: BeautifulSoup, selectors: List[str]):
+        """
+        Drop attributes that carry no product data
+
+        Attributes referenced by retailer selectors (data-price, data-zoom-image, ...)
+        are kept so the LLM sees the same hooks the CSS selectors rely on.
+        """
+        keep = set(self.KEEP_ATTRIBUTES)
+        for selector in selectors:
+            keep.update(self.ATTRIBUTE_IN_SELECTOR.findall(selector))
+
+        for tag in soup.find_all(True):
+            if not tag.attrs:
+                continue
+
+            attrs = {}
+            for name, value in tag.attrs.items():
+                if name not in keep:
+                    continue
+                if isinstance(value, list):
+                    value = ' '.join(value)
+                if name == 'srcset':
+                    # Largest candidate is listed last
+                    value = value.split(',')[-1].strip().split(' ')[0]
+                if value and not str(value).startswith('data:'):
+                    attrs[name] = value
+            tag.attrs = attrs
+
+    # ============================================
+    # SUBTREE RANKING
+    # ============================================
+
+    def _select_blocks(
+        self,
+        root: Tag,
+        selectors: List[str],
+        page_type: str,
+        max_chars: int
+    ) -> Tuple[List[Tag], int]:
+        """
+        Pick the densest non-overlapping subtrees that fit the budget
+
+        Returns:
+            Tuple of (blocks in document order, total signal score)
+        """
+        signals = self._score_signals(root, selectors, page_type)
+        if not signals:
+            return [], 0
+
+        order, sizes = self._measure(root)
+
+        candidates = [
+            (score / max(sizes.get(node_id, 0), self.MIN_BLOCK_CHARS), node_id)
+            for node_id, score in signals.items()
+            if node_id in sizes
+        ]
+        candidates.sort(reverse=True)
+
+        nodes = {id(node): node for node in order}
+        selected: Set[int] = set()
+        has_selected_descendant: Set[int] = set()
+        used = 0
+
+        for _, node_id in candidates:
+            size = sizes[node_id]
+            if size == 0 or used + size > max_chars:
+                continue
+            if node_id in selected or node_id in has_selected_descendant:
+                continue
+
+            node = nodes[node_id]
+            ancestors = [id(parent) for parent in node.parents]
+            if any(ancestor in selected for ancestor in ancestors):
+                continue
+
+            selected.add(node_id)
+            has_selected_descendant.update(ancestors)
+            used += size + 1
+
+        position = {id(node): index for index, node in enumerate(order)}
+        blocks = sorted((nodes[node_id] for node_id in selected), key=lambda n: position[id(n)])
+
+        return blocks, sum(signals[node_id] for node_id in selected)
+
+    def _score_signals(self, root: Tag, selectors: List[str], page_type: str) -> Dict[int, int]:
+        """Add each product signal's weight to its element and every ancestor"""
+        scores: Dict[int, int] = {}
+
+        def add(element: Tag, weight: int):
+            for node in [element] + list(element.parents):
+                scores[id(node)] = scores.get(id(node), 0) + weight
+                if node is root:
+                    break
+
+        for selector in selectors:
+            try:
+                for element in root.select(selector):
+                    add(element, self.SELECTOR_WEIGHT)
+            except Exception as e:
+                logger.debug(f"⚠️ Signal selector {selector} failed: {e}")
+
+        for element in root.find_all(attrs={'itemprop': True}):
+            add(element, self.ITEMPROP_WEIGHT)
+
+        for text in root.find_all(string=self.PRICE_PATTERN):
+            if text.parent is not None:
+                add(text.parent, self.PRICE_WEIGHT)
+
+        if page_type == 'product':
+            for element in root.find_all('h1'):
+                add(element, self.TITLE_WEIGHT)
+
+        for element in root.find_all('img', src=True):
+            add(element, self.IMAGE_WEIGHT)
+
+        return scores
+
+    def _measure(self, root: Tag) -> Tuple[List[Tag], Dict[int, int]]:
+        """
+        Estimate serialized size of every subtree in one bottom-up pass
+
+        Returns:
+            Tuple of (tags in document order, {id(tag): estimated chars})
+        """
+        nodes = [root] + list(root.descendants)
+        sizes: Dict[int, int] = {}
+
+        for node in reversed(nodes):
+            if isinstance(node, NavigableString):
+                size = len(self._collapse(str(node)))
+            elif isinstance(node, Tag):
+                size = sizes.get(id(node), 0) + self._tag_overhead(node)
+                sizes[id(node)] = size
+            else:
+                continue
+
+            if node is not root and node.parent is not None:
+                sizes[id(node.parent)] = sizes.get(id(node.parent), 0) + size
+
+        tags = [node for node in nodes if isinstance(node, Tag)]
+        return tags, sizes
+
+    def _tag_overhead(self, tag: Tag) -> int:
+        """Characters added by a tag's own markup when serialized"""
+        if not tag.attrs and tag.name in self.UNWRAP_TAGS:
+            return 1
+        attrs_length = sum(len(k) + len(str(v)) + 4 for k, v in tag.attrs.items())
+        return 2 * len(tag.name) + 5 + attrs_length
+
+    # ============================================
+    # SERIALIZATION
+    # ============================================
+
+    def _serialize(self, node) -> str:
+        """Compact markup: collapsed whitespace, empty wrappers dropped"""
+        if isinstance(node, NavigableString):
+            return self._collapse(str(node))
+
+        if not isinstance(node, Tag):
+            return ''
+
+        inner = ''.join(self._serialize(child) for child in node.children)
+
+        if not node.attrs:
+            if node.name in self.UNWRAP_TAGS or node.name in ('body', '[document]', 'html'):
+                return inner if inner.strip() else ''
+            if not inner.strip() and node.name not in ('br', 'img'):
+                return ''
+
+        attrs = ''.join(f' {name}="{value}"' for name, value in node.attrs.items())
+
+        if node.name in ('img', 'br', 'meta', 'source'):
+            return f'<{node.name}{attrs}>'
+
+        return f'<{node.name}{attrs}>{inner}</{node.name}>'
+
+    def _collapse(self, text: str) -> str:
+        """Collapse runs of whitespace to a single space"""
+        return self.WHITESPACE.sub(' ', text)
@@ -14,8 +14,11 @@ import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from Shared.logger_config import setup_logging
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../Shared"))
+from logger_config import setup_logging
+from tracing import traced
 from Extraction.CommercialAPI.commercial_config import CommercialAPIConfig
+from Extraction.CommercialAPI.html_reducer import HTMLContentReducer
 
 logger = setup_logging(__name__)
 
@@ -25,6 +28,7 @@ class LLMFallbackParser:
     
     Features:
     - Parse HTML using LLM (Gemini Flash or DeepSeek)
+    - Structure-aware HTML reduction within a token budget
     - Structured output with schema validation
     - Cost tracking
     - Caching of LLM responses
@@ -54,12 +58,19 @@ class LLMFallbackParser:
             # DeepSeek initialization would go here
             logger.warning("⚠️ DeepSeek not yet implemented")
         
+        # HTML reduction (strip boilerplate, keep product-dense blocks)
+        self.html_reducer = None
+        if self.config.LLM_HTML_REDUCTION_ENABLED:
+            self.html_reducer = HTMLContentReducer()
+        
         # Statistics
         self.total_llm_calls = 0
         self.successful_llm_calls = 0
         self.failed_llm_calls = 0
         self.total_llm_cost = 0.0
+        self.total_html_tokens_sent = 0
     
+    @traced('llm')
     async def parse_product(
         self,
         html: str,
@@ -84,11 +95,13 @@ class LLMFallbackParser:
             return None
         
         try:
-            # Truncate HTML if too large (LLMs have token limits)
-            html_truncated = self._truncate_html(html, max_tokens=100000)
+            # Reduce HTML to the product-relevant content (LLMs have token limits)
+            html_reduced = self._prepare_html(
+                html, retailer, 'product', self.config.LLM_PRODUCT_TOKEN_BUDGET
+            )
             
             # Create prompt
-            prompt = self._create_product_prompt(html_truncated, retailer, url)
+            prompt = self._create_product_prompt(html_reduced, retailer, url)
             
             # Call LLM
             self.total_llm_calls += 1
@@ -117,6 +130,7 @@ class LLMFallbackParser:
             self.failed_llm_calls += 1
             return None
     
+    @traced('llm')
     async def parse_catalog(
         self,
         html: str,
@@ -143,11 +157,13 @@ class LLMFallbackParser:
             return None
         
         try:
-            # Truncate HTML if too large
-            html_truncated = self._truncate_html(html, max_tokens=100000)
+            # Reduce HTML to the product-relevant content
+            html_reduced = self._prepare_html(
+                html, retailer, 'catalog', self.config.LLM_CATALOG_TOKEN_BUDGET
+            )
             
             # Create prompt
-            prompt = self._create_catalog_prompt(html_truncated, retailer, url, max_products)
+            prompt = self._create_catalog_prompt(html_reduced, retailer, url, max_products)
             
             # Call LLM
             self.total_llm_calls += 1
@@ -173,6 +189,33 @@ class LLMFallbackParser:
             self.failed_llm_calls += 1
             return None
     
+    def _prepare_html(
+        self,
+        html: str,
+        retailer: str,
+        page_type: str,
+        max_tokens: int
+    ) -> str:
+        """
+        Reduce HTML for the LLM prompt
+        
+        Uses HTMLContentReducer when enabled, plain truncation otherwise
+        (or if reduction fails)
+        """
+        prepared = None
+        
+        if self.html_reducer:
+            try:
+                prepared = self.html_reducer.reduce(html, retailer, page_type, max_tokens)
+            except Exception as e:
+                logger.warning(f"⚠️ HTML reduction failed, truncating instead: {e}")
+        
+        if not prepared:
+            prepared = self._truncate_html(html, max_tokens=max_tokens)
+        
+        self.total_html_tokens_sent += len(prepared) // 4
+        return prepared
+    
     def _truncate_html(self, html: str, max_tokens: int = 100000) -> str:
         """
         Truncate HTML to fit within LLM token limits
@@ -359,6 +402,7 @@ JSON Response:"""
                 self.successful_llm_calls / max(self.total_llm_calls, 1)
             ) * 100,
             'total_cost': self.total_llm_cost,
+            'html_tokens_sent': self.total_html_tokens_sent,
             'avg_cost_per_call': (
                 self.total_llm_cost / max(self.total_llm_calls, 1)
             ),
@@ -375,6 +419,7 @@ JSON Response:"""
         logger.info(f"Successful: {stats['successful_calls']}")
         logger.info(f"Failed: {stats['failed_calls']}")
         logger.info(f"Success Rate: {stats['success_rate']:.1f}%")
+        logger.info(f"HTML Tokens Sent: ~{stats['html_tokens_sent']:,}")
         logger.info(f"Total LLM Cost: ${stats['total_cost']:.4f}")
         logger.info(f"Avg Cost/Call: ${stats['avg_cost_per_call']:.4f}")
         logger.info("=" * 60)
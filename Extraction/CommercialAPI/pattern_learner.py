@@ -3,10 +3,15 @@ Pattern Learner
 
 Learns which CSS selectors work best for each retailer
 Tracks success/failure rates, auto-improves over time
+
+Outcomes are aggregated in memory and written in batches through one
+persistent connection, so recording never waits on database I/O.
 """
 
 import aiosqlite
+import asyncio
 import logging
+import time
 from typing import Dict, List, Optional
 from datetime import datetime
 import json
@@ -15,208 +20,405 @@ import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from Shared.logger_config import setup_logging
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../Shared"))
+from logger_config import setup_logging
 from Extraction.CommercialAPI.commercial_config import CommercialAPIConfig
 
 logger = setup_logging(__name__)
 
+# Buffer key for page-level outcomes (stored in commercial_patterns)
+PAGE_FIELD = ''
+
+
 class PatternLearner:
     """
     Pattern Learning for HTML Selectors
     
     Features:
     - Track which CSS selectors work for each retailer
-    - Record success/failure rates per selector
+    - Record success/failure rates per selector and per field
     - Auto-improve selector order based on success rate
     - Identify failing selectors
     - Provide recommendations for selector updates
     
+    Process:
+    1. record_success()/record_failure() aggregate outcomes in memory, keyed by
+       (retailer, page_type, selector, field), and queue the attempt log row
+    2. A background flush runs every PATTERN_FLUSH_INTERVAL_SECONDS, or as
+       soon as PATTERN_FLUSH_BATCH_SIZE outcomes are pending
+    3. flush() writes everything with executemany upserts on one persistent
+       connection and invalidates the failing-patterns cache
+    4. Reads (get_stats, get_failing_patterns, ...) flush first so they see
+       every recorded outcome
+    
     Usage:
         learner = PatternLearner()
         await learner.record_success(retailer, 'product', url, data)
         await learner.record_failure(retailer, 'product', url, errors)
         stats = await learner.get_stats()
+        await learner.close()
     """
     
     def __init__(self):
         self.config = CommercialAPIConfig()
         self.db_path = self.config.PATTERN_DB_PATH
         
+        # (retailer, page_type, selector, field) -> [successes, failures, last_used]
+        self._pending_counts: Dict[tuple, list] = {}
+        self._pending_attempts: List[tuple] = []
+        self._pending_events = 0
+        
+        self._db: Optional[aiosqlite.Connection] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._timer_task: Optional[asyncio.Task] = None
+        
+        # (min_attempts, max_success_rate) -> (cached_at, patterns)
+        self._failing_cache: Dict[tuple, tuple] = {}
+        
+        self.flush_stats = {'flushes': 0, 'attempts_written': 0, 'dropped_attempts': 0}
+        
         logger.info(f"✅ Pattern Learner initialized")
         logger.info(f"📂 Pattern DB: {self.db_path}")
     
     async def initialize(self):
         """Initialize pattern learning database"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                # Create patterns table
-                await db.execute('''
-                    CREATE TABLE IF NOT EXISTS commercial_patterns (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        retailer TEXT NOT NULL,
-                        page_type TEXT NOT NULL,
-                        pattern_name TEXT NOT NULL,
-                        pattern_data TEXT,
-                        success_count INTEGER DEFAULT 0,
-                        failure_count INTEGER DEFAULT 0,
-                        total_attempts INTEGER DEFAULT 0,
-                        success_rate REAL DEFAULT 0.0,
-                        last_used TIMESTAMP,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        UNIQUE(retailer, page_type, pattern_name)
-                    )
-                ''')
-                
-                # Create attempts log table
-                await db.execute('''
-                    CREATE TABLE IF NOT EXISTS commercial_pattern_attempts (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        retailer TEXT NOT NULL,
-                        page_type TEXT NOT NULL,
-                        url TEXT NOT NULL,
-                        success BOOLEAN NOT NULL,
-                        errors TEXT,
-                        extracted_data TEXT,
-                        attempted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                # Create indices
-                await db.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_retailer_type 
-                    ON commercial_patterns(retailer, page_type)
-                ''')
-                
-                await db.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_attempted_at 
-                    ON commercial_pattern_attempts(attempted_at)
-                ''')
-                
-                await db.commit()
-            
+            await self._get_connection()
             logger.debug("✅ Pattern learning database initialized")
         
         except Exception as e:
             logger.error(f"❌ Failed to initialize pattern learning: {e}")
     
+    async def _get_connection(self) -> aiosqlite.Connection:
+        """Persistent connection, created with the schema on first use"""
+        if self._db is not None:
+            return self._db
+        
+        db = await aiosqlite.connect(self.db_path)
+        try:
+            # Create patterns table
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS commercial_patterns (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    retailer TEXT NOT NULL,
+                    page_type TEXT NOT NULL,
+                    pattern_name TEXT NOT NULL,
+                    pattern_data TEXT,
+                    success_count INTEGER DEFAULT 0,
+                    failure_count INTEGER DEFAULT 0,
+                    total_attempts INTEGER DEFAULT 0,
+                    success_rate REAL DEFAULT 0.0,
+                    last_used TIMESTAMP,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(retailer, page_type, pattern_name)
+                )
+            ''')
+            
+            # Per-field outcomes for each selector source
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS commercial_field_patterns (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    retailer TEXT NOT NULL,
+                    page_type TEXT NOT NULL,
+                    selector TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    success_count INTEGER DEFAULT 0,
+                    failure_count INTEGER DEFAULT 0,
+                    total_attempts INTEGER DEFAULT 0,
+                    success_rate REAL DEFAULT 0.0,
+                    last_used TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(retailer, page_type, selector, field)
+                )
+            ''')
+            
+            # Create attempts log table
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS commercial_pattern_attempts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    retailer TEXT NOT NULL,
+                    page_type TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    success BOOLEAN NOT NULL,
+                    errors TEXT,
+                    extracted_data TEXT,
+                    attempted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Create indices
+            await db.execute('''
+                CREATE INDEX IF NOT EXISTS idx_retailer_type
+                ON commercial_patterns(retailer, page_type)
+            ''')
+            
+            await db.execute('''
+                CREATE INDEX IF NOT EXISTS idx_attempted_at
+                ON commercial_pattern_attempts(attempted_at)
+            ''')
+            
+            await db.commit()
+        except Exception:
+            await db.close()
+            raise
+        
+        self._db = db
+        return db
+    
     async def record_success(
         self,
         retailer: str,
         page_type: str,
         url: str,
-        extracted_data: Dict
+        extracted_data: Dict,
+        selector: Optional[str] = None,
+        field_outcomes: Optional[Dict[str, bool]] = None
     ):
         """
-        Record successful extraction
+        Record successful extraction (buffered, no database I/O)
         
         Args:
             retailer: Retailer name
             page_type: 'product' or 'catalog'
             url: Source URL
             extracted_data: Data that was successfully extracted
+            selector: Selector source that produced the data (optional)
+            field_outcomes: field -> extracted? for per-field learning (optional)
         """
-        try:
-            async with aiosqlite.connect(self.db_path) as db:
-                # Log attempt
-                await db.execute(
-                    '''
-                    INSERT INTO commercial_pattern_attempts 
-                    (retailer, page_type, url, success, extracted_data)
-                    VALUES (?, ?, ?, ?, ?)
-                    ''',
-                    (
-                        retailer,
-                        page_type,
-                        url,
-                        True,
-                        json.dumps(extracted_data)
-                    )
-                )
-                
-                # Update pattern stats
-                pattern_name = f"{retailer}_{page_type}"
-                
-                await db.execute(
-                    '''
-                    INSERT INTO commercial_patterns 
-                    (retailer, page_type, pattern_name, success_count, total_attempts, last_used, updated_at)
-                    VALUES (?, ?, ?, 1, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-                    ON CONFLICT(retailer, page_type, pattern_name) DO UPDATE SET
-                        success_count = success_count + 1,
-                        total_attempts = total_attempts + 1,
-                        success_rate = CAST(success_count + 1 AS REAL) / (total_attempts + 1),
-                        last_used = CURRENT_TIMESTAMP,
-                        updated_at = CURRENT_TIMESTAMP
-                    ''',
-                    (retailer, page_type, pattern_name)
-                )
-                
-                await db.commit()
-            
-            logger.debug(f"✅ Recorded success: {retailer} {page_type}")
-        
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to record pattern success: {e}")
+        self._buffer(
+            retailer, page_type, url, True, None, extracted_data,
+            selector, field_outcomes
+        )
+        logger.debug(f"✅ Recorded success: {retailer} {page_type}")
     
     async def record_failure(
         self,
         retailer: str,
         page_type: str,
         url: str,
-        errors: List[str]
+        errors: List[str],
+        selector: Optional[str] = None,
+        field_outcomes: Optional[Dict[str, bool]] = None
     ):
         """
-        Record failed extraction
+        Record failed extraction (buffered, no database I/O)
         
         Args:
             retailer: Retailer name
             page_type: 'product' or 'catalog'
             url: Source URL
             errors: List of error messages
+            selector: Selector source that was tried (optional)
+            field_outcomes: field -> extracted? for per-field learning (optional)
         """
+        self._buffer(
+            retailer, page_type, url, False, errors, None,
+            selector, field_outcomes
+        )
+        logger.debug(f"❌ Recorded failure: {retailer} {page_type} - {errors}")
+    
+    def _buffer(
+        self,
+        retailer: str,
+        page_type: str,
+        url: str,
+        success: bool,
+        errors: Optional[List[str]],
+        extracted_data: Optional[Dict],
+        selector: Optional[str],
+        field_outcomes: Optional[Dict[str, bool]]
+    ):
+        """Aggregate one outcome and schedule a flush"""
+        # Same format as SQLite CURRENT_TIMESTAMP so age queries keep working
+        now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        
+        self._count((retailer, page_type, f"{retailer}_{page_type}", PAGE_FIELD), success, now)
+        for field, found in (field_outcomes or {}).items():
+            self._count((retailer, page_type, selector or 'default', field), found, now)
+        
+        try:
+            self._pending_attempts.append((
+                retailer,
+                page_type,
+                url,
+                success,
+                json.dumps(errors) if errors is not None else None,
+                json.dumps(extracted_data, default=str) if extracted_data is not None else None,
+                now
+            ))
+        except Exception as e:
+            logger.debug(f"Pattern attempt not logged: {e}")
+        
+        overflow = len(self._pending_attempts) - self.config.PATTERN_MAX_PENDING_ATTEMPTS
+        if overflow > 0:
+            del self._pending_attempts[:overflow]
+            self.flush_stats['dropped_attempts'] += overflow
+        
+        self._pending_events += 1
+        self._schedule_flush()
+    
+    def _count(self, key: tuple, success: bool, now: str):
+        counts = self._pending_counts.setdefault(key, [0, 0, now])
+        counts[0 if success else 1] += 1
+        counts[2] = now
+    
+    def _schedule_flush(self):
+        """Start the flush timer, or flush now once the batch is full"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop: outcomes stay buffered until the next flush()
+            return
+        
+        if self._timer_task is None or self._timer_task.done():
+            self._timer_task = loop.create_task(self._flush_periodically())
+        
+        if self._pending_events >= self.config.PATTERN_FLUSH_BATCH_SIZE:
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = loop.create_task(self.flush())
+    
+    async def _flush_periodically(self):
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                # Log attempt
-                await db.execute(
+            while True:
+                await asyncio.sleep(self.config.PATTERN_FLUSH_INTERVAL_SECONDS)
+                # Shielded: stopping the timer must not abandon a batch mid-write
+                await asyncio.shield(self.flush())
+        except asyncio.CancelledError:
+            pass
+    
+    async def flush(self) -> int:
+        """
+        Write buffered outcomes in one transaction
+        
+        Returns:
+            Number of attempts written
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        
+        async with self._flush_lock:
+            if not self._pending_counts and not self._pending_attempts:
+                return 0
+            
+            counts, self._pending_counts = self._pending_counts, {}
+            attempts, self._pending_attempts = self._pending_attempts, []
+            self._pending_events = 0
+            
+            page_rows = []
+            field_rows = []
+            for (retailer, page_type, selector, field), (successes, failures, last_used) in counts.items():
+                row = (
+                    retailer, page_type, selector, successes, failures,
+                    successes + failures, successes / (successes + failures), last_used
+                )
+                if field == PAGE_FIELD:
+                    page_rows.append(row)
+                else:
+                    field_rows.append(row[:3] + (field,) + row[3:])
+            
+            try:
+                db = await self._get_connection()
+                
+                await db.executemany(
                     '''
-                    INSERT INTO commercial_pattern_attempts 
-                    (retailer, page_type, url, success, errors)
-                    VALUES (?, ?, ?, ?, ?)
+                    INSERT INTO commercial_pattern_attempts
+                    (retailer, page_type, url, success, errors, extracted_data, attempted_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
                     ''',
-                    (
-                        retailer,
-                        page_type,
-                        url,
-                        False,
-                        json.dumps(errors)
-                    )
+                    attempts
                 )
                 
-                # Update pattern stats
-                pattern_name = f"{retailer}_{page_type}"
-                
-                await db.execute(
+                await db.executemany(
                     '''
-                    INSERT INTO commercial_patterns 
-                    (retailer, page_type, pattern_name, failure_count, total_attempts, last_used, updated_at)
-                    VALUES (?, ?, ?, 1, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                    INSERT INTO commercial_patterns
+                    (retailer, page_type, pattern_name, success_count, failure_count,
+                     total_attempts, success_rate, last_used, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
                     ON CONFLICT(retailer, page_type, pattern_name) DO UPDATE SET
-                        failure_count = failure_count + 1,
-                        total_attempts = total_attempts + 1,
-                        success_rate = CAST(success_count AS REAL) / (total_attempts + 1),
-                        last_used = CURRENT_TIMESTAMP,
+                        success_count = success_count + excluded.success_count,
+                        failure_count = failure_count + excluded.failure_count,
+                        total_attempts = total_attempts + excluded.total_attempts,
+                        success_rate = CAST(success_count + excluded.success_count AS REAL)
+                                       / (total_attempts + excluded.total_attempts),
+                        last_used = excluded.last_used,
+                        updated_at = CURRENT_TIMESTAMP
+                    ''',
+                    page_rows
+                )
+                
+                await db.executemany(
+                    '''
+                    INSERT INTO commercial_field_patterns
+                    (retailer, page_type, selector, field, success_count, failure_count,
+                     total_attempts, success_rate, last_used, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(retailer, page_type, selector, field) DO UPDATE SET
+                        success_count = success_count + excluded.success_count,
+                        failure_count = failure_count + excluded.failure_count,
+                        total_attempts = total_attempts + excluded.total_attempts,
+                        success_rate = CAST(success_count + excluded.success_count AS REAL)
+                                       / (total_attempts + excluded.total_attempts),
+                        last_used = excluded.last_used,
                         updated_at = CURRENT_TIMESTAMP
                     ''',
-                    (retailer, page_type, pattern_name)
+                    field_rows
                 )
                 
                 await db.commit()
             
-            logger.debug(f"❌ Recorded failure: {retailer} {page_type} - {errors}")
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to flush pattern outcomes: {e}")
+                self._requeue(counts, attempts)
+                await self._reset_connection()
+                return 0
+            
+            self._failing_cache.clear()
+            self.flush_stats['flushes'] += 1
+            self.flush_stats['attempts_written'] += len(attempts)
+            logger.debug(
+                f"💾 Flushed {len(attempts)} pattern attempts "
+                f"({len(page_rows)} patterns, {len(field_rows)} field patterns)"
+            )
+            return len(attempts)
+    
+    def _requeue(self, counts: Dict[tuple, list], attempts: List[tuple]):
+        """Put a failed batch back in front of anything recorded since"""
+        for key, (successes, failures, last_used) in counts.items():
+            pending = self._pending_counts.setdefault(key, [0, 0, last_used])
+            pending[0] += successes
+            pending[1] += failures
+            pending[2] = max(pending[2], last_used)
         
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to record pattern failure: {e}")
+        self._pending_attempts = attempts + self._pending_attempts
+        overflow = len(self._pending_attempts) - self.config.PATTERN_MAX_PENDING_ATTEMPTS
+        if overflow > 0:
+            del self._pending_attempts[:overflow]
+            self.flush_stats['dropped_attempts'] += overflow
+    
+    async def _reset_connection(self):
+        if self._db is not None:
+            try:
+                await self._db.close()
+            except Exception:
+                pass
+            self._db = None
+    
+    async def _flushed_connection(self) -> aiosqlite.Connection:
+        """Connection for reads, after writing pending outcomes"""
+        await self.flush()
+        return await self._get_connection()
+    
+    async def close(self):
+        """Stop the flush timer, write pending outcomes and close the connection"""
+        if self._timer_task and not self._timer_task.done():
+            self._timer_task.cancel()
+        self._timer_task = None
+        self._flush_task = None
+        
+        await self.flush()
+        await self._reset_connection()
     
     async def get_stats(self) -> Dict:
         """
@@ -226,77 +428,77 @@ class PatternLearner:
             Dict with overall and per-retailer stats
         """
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                # Overall stats
-                cursor = await db.execute('''
-                    SELECT 
-                        COUNT(*) as total_patterns,
-                        SUM(success_count) as total_successes,
-                        SUM(failure_count) as total_failures,
-                        AVG(success_rate) as avg_success_rate
-                    FROM commercial_patterns
-                ''')
-                overall = await cursor.fetchone()
-                
-                # Per-retailer stats
-                cursor = await db.execute('''
-                    SELECT 
-                        retailer,
-                        page_type,
-                        success_count,
-                        failure_count,
-                        total_attempts,
-                        success_rate,
-                        last_used
-                    FROM commercial_patterns
-                    ORDER BY retailer, page_type
-                ''')
-                per_retailer = await cursor.fetchall()
-                
-                # Recent attempts
-                cursor = await db.execute('''
-                    SELECT 
-                        retailer,
-                        page_type,
-                        url,
-                        success,
-                        attempted_at
-                    FROM commercial_pattern_attempts
-                    ORDER BY attempted_at DESC
-                    LIMIT 10
-                ''')
-                recent_attempts = await cursor.fetchall()
-                
-                return {
-                    'overall': {
-                        'total_patterns': overall[0] or 0,
-                        'total_successes': overall[1] or 0,
-                        'total_failures': overall[2] or 0,
-                        'avg_success_rate': overall[3] or 0.0,
-                    },
-                    'per_retailer': [
-                        {
-                            'retailer': row[0],
-                            'page_type': row[1],
-                            'success_count': row[2],
-                            'failure_count': row[3],
-                            'total_attempts': row[4],
-                            'success_rate': row[5],
-                            'last_used': row[6],
-                        }
-                        for row in per_retailer
-                    ],
-                    'recent_attempts': [
-                        {
-                            'retailer': row[0],
-                            'page_type': row[1],
-                            'url': row[2],
-                            'success': bool(row[3]),
-                            'attempted_at': row[4],
-                        }
-                        for row in recent_attempts
-                    ],
-                }
+            db = await self._flushed_connection()
+            # Overall stats
+            cursor = await db.execute('''
+                SELECT 
+                    COUNT(*) as total_patterns,
+                    SUM(success_count) as total_successes,
+                    SUM(failure_count) as total_failures,
+                    AVG(success_rate) as avg_success_rate
+                FROM commercial_patterns
+            ''')
+            overall = await cursor.fetchone()
+            
+            # Per-retailer stats
+            cursor = await db.execute('''
+                SELECT 
+                    retailer,
+                    page_type,
+                    success_count,
+                    failure_count,
+                    total_attempts,
+                    success_rate,
+                    last_used
+                FROM commercial_patterns
+                ORDER BY retailer, page_type
+            ''')
+            per_retailer = await cursor.fetchall()
+            
+            # Recent attempts
+            cursor = await db.execute('''
+                SELECT 
+                    retailer,
+                    page_type,
+                    url,
+                    success,
+                    attempted_at
+                FROM commercial_pattern_attempts
+                ORDER BY attempted_at DESC
+                LIMIT 10
+            ''')
+            recent_attempts = await cursor.fetchall()
+            
+            return {
+                'overall': {
+                    'total_patterns': overall[0] or 0,
+                    'total_successes': overall[1] or 0,
+                    'total_failures': overall[2] or 0,
+                    'avg_success_rate': overall[3] or 0.0,
+                },
+                'per_retailer': [
+                    {
+                        'retailer': row[0],
+                        'page_type': row[1],
+                        'success_count': row[2],
+                        'failure_count': row[3],
+                        'total_attempts': row[4],
+                        'success_rate': row[5],
+                        'last_used': row[6],
+                    }
+                    for row in per_retailer
+                ],
+                'recent_attempts': [
+                    {
+                        'retailer': row[0],
+                        'page_type': row[1],
+                        'url': row[2],
+                        'success': bool(row[3]),
+                        'attempted_at': row[4],
+                    }
+                    for row in recent_attempts
+                ],
+            }
         
         except Exception as e:
             logger.warning(f"⚠️ Failed to get pattern stats: {e}")
@@ -316,42 +518,53 @@ class PatternLearner:
         
         Returns:
             List of failing patterns with details
+        
+        Served from a read-through cache until the next flush writes new
+        outcomes or PATTERN_FAILING_CACHE_TTL_SECONDS passes.
         """
+        cache_key = (min_attempts, max_success_rate)
+        cached = self._failing_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < self.config.PATTERN_FAILING_CACHE_TTL_SECONDS:
+            return list(cached[1])
+        
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                cursor = await db.execute(
-                    '''
-                    SELECT 
-                        retailer,
-                        page_type,
-                        pattern_name,
-                        success_count,
-                        failure_count,
-                        total_attempts,
-                        success_rate,
-                        last_used
-                    FROM commercial_patterns
-                    WHERE total_attempts >= ? AND success_rate <= ?
-                    ORDER BY success_rate ASC, total_attempts DESC
-                    ''',
-                    (min_attempts, max_success_rate)
-                )
-                
-                failing = await cursor.fetchall()
-                
-                return [
-                    {
-                        'retailer': row[0],
-                        'page_type': row[1],
-                        'pattern_name': row[2],
-                        'success_count': row[3],
-                        'failure_count': row[4],
-                        'total_attempts': row[5],
-                        'success_rate': row[6],
-                        'last_used': row[7],
-                    }
-                    for row in failing
-                ]
+            db = await self._flushed_connection()
+            cursor = await db.execute(
+                '''
+                SELECT 
+                    retailer,
+                    page_type,
+                    pattern_name,
+                    success_count,
+                    failure_count,
+                    total_attempts,
+                    success_rate,
+                    last_used
+                FROM commercial_patterns
+                WHERE total_attempts >= ? AND success_rate <= ?
+                ORDER BY success_rate ASC, total_attempts DESC
+                ''',
+                (min_attempts, max_success_rate)
+            )
+            
+            failing = await cursor.fetchall()
+            
+            patterns = [
+                {
+                    'retailer': row[0],
+                    'page_type': row[1],
+                    'pattern_name': row[2],
+                    'success_count': row[3],
+                    'failure_count': row[4],
+                    'total_attempts': row[5],
+                    'success_rate': row[6],
+                    'last_used': row[7],
+                }
+                for row in failing
+            ]
+            
+            self._failing_cache[cache_key] = (time.monotonic(), patterns)
+            return list(patterns)
         
         except Exception as e:
             logger.warning(f"⚠️ Failed to get failing patterns: {e}")
@@ -375,42 +588,42 @@ class PatternLearner:
             List of common errors with counts
         """
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                # Build query
-                where_clauses = ["success = FALSE"]
-                params = []
-                
-                if retailer:
-                    where_clauses.append("retailer = ?")
-                    params.append(retailer)
-                
-                if page_type:
-                    where_clauses.append("page_type = ?")
-                    params.append(page_type)
-                
-                where_sql = " AND ".join(where_clauses)
-                
-                cursor = await db.execute(
-                    f'''
-                    SELECT errors, COUNT(*) as count
-                    FROM commercial_pattern_attempts
-                    WHERE {where_sql}
-                    GROUP BY errors
-                    ORDER BY count DESC
-                    LIMIT ?
-                    ''',
-                    params + [limit]
-                )
-                
-                errors = await cursor.fetchall()
-                
-                return [
-                    {
-                        'errors': json.loads(row[0]) if row[0] else [],
-                        'count': row[1],
-                    }
-                    for row in errors
-                ]
+            db = await self._flushed_connection()
+            # Build query
+            where_clauses = ["success = FALSE"]
+            params = []
+            
+            if retailer:
+                where_clauses.append("retailer = ?")
+                params.append(retailer)
+            
+            if page_type:
+                where_clauses.append("page_type = ?")
+                params.append(page_type)
+            
+            where_sql = " AND ".join(where_clauses)
+            
+            cursor = await db.execute(
+                f'''
+                SELECT errors, COUNT(*) as count
+                FROM commercial_pattern_attempts
+                WHERE {where_sql}
+                GROUP BY errors
+                ORDER BY count DESC
+                LIMIT ?
+                ''',
+                params + [limit]
+            )
+            
+            errors = await cursor.fetchall()
+            
+            return [
+                {
+                    'errors': json.loads(row[0]) if row[0] else [],
+                    'count': row[1],
+                }
+                for row in errors
+            ]
         
         except Exception as e:
             logger.warning(f"⚠️ Failed to get common errors: {e}")
@@ -424,19 +637,19 @@ class PatternLearner:
             days: Remove attempts older than this many days
         """
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                cursor = await db.execute(
-                    '''
-                    DELETE FROM commercial_pattern_attempts
-                    WHERE attempted_at < datetime('now', '-' || ? || ' days')
-                    ''',
-                    (days,)
-                )
-                deleted = cursor.rowcount
-                await db.commit()
-                
-                if deleted > 0:
-                    logger.info(f"🗑️ Cleaned up {deleted} old pattern attempts")
+            db = await self._flushed_connection()
+            cursor = await db.execute(
+                '''
+                DELETE FROM commercial_pattern_attempts
+                WHERE attempted_at < datetime('now', '-' || ? || ' days')
+                ''',
+                (days,)
+            )
+            deleted = cursor.rowcount
+            await db.commit()
+            
+            if deleted > 0:
+                logger.info(f"🗑️ Cleaned up {deleted} old pattern attempts")
         
         except Exception as e:
             logger.warning(f"⚠️ Failed to cleanup old attempts: {e}")
@@ -12,10 +12,14 @@ import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
-from Shared.logger_config import setup_logging
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../../Shared"))
+from logger_config import setup_logging, SampledLogger
+from tracing import traced
+from metrics_server import metrics
 from Extraction.CommercialAPI.commercial_api_client import CommercialAPIClient
 
 logger = setup_logging(__name__)
+sampled_logger = SampledLogger(logger)
 
 
 class ZenRowsClient(CommercialAPIClient):
@@ -62,6 +66,7 @@ class ZenRowsClient(CommercialAPIClient):
             self.session = aiohttp.ClientSession(timeout=timeout)
             logger.debug("🔌 Created new aiohttp session")
     
+    @traced('fetch')
     async def fetch_html(
         self,
         url: str,
@@ -114,6 +119,8 @@ class ZenRowsClient(CommercialAPIClient):
                 request_cost = self.config.COST_PER_REQUEST
                 self.total_cost += request_cost
                 self.retailer_stats[retailer]['cost'] += request_cost
+                metrics.inc('smf_fetch_requests_total', service='zenrows', retailer=retailer, outcome='success')
+                metrics.inc('smf_zenrows_cost_dollars_total', request_cost, retailer=retailer)
                 
                 # Track bytes
                 html_size = len(html.encode('utf-8'))
@@ -145,6 +152,7 @@ class ZenRowsClient(CommercialAPIClient):
         self.failed_requests += 1
         self.retailer_stats[retailer]['requests'] += 1
         self.retailer_stats[retailer]['failures'] += 1
+        metrics.inc('smf_fetch_requests_total', service='zenrows', retailer=retailer, outcome='failure')
         
         logger.error(
             f"❌ ZenRows FAILED after {self.config.MAX_RETRIES} attempts: "
@@ -191,13 +199,13 @@ class ZenRowsClient(CommercialAPIClient):
             wait_selector = self._get_wait_selector(retailer)
             if wait_selector:
                 params['wait_for'] = wait_selector
-                logger.info(f"🎯 wait_for (catalog): {wait_selector}")
+                sampled_logger.debug(f"🎯 wait_for (catalog): {wait_selector}")
             
             # Add fixed wait for stability
             wait_time = self._get_wait_time(retailer)
             if wait_time:
                 params['wait'] = wait_time
-                logger.info(f"⏱️  wait (catalog): {wait_time}ms")
+                sampled_logger.debug(f"⏱️  wait (catalog): {wait_time}ms")
         
         elif page_type == 'product':
             # PRODUCT: Wait for product detail elements to load
@@ -206,13 +214,13 @@ class ZenRowsClient(CommercialAPIClient):
             wait_time = self._get_wait_time(retailer)
             if wait_time:
                 params['wait'] = wait_time
-                logger.info(f"⏱️  wait (product): {wait_time}ms")
+                sampled_logger.debug(f"⏱️  wait (product): {wait_time}ms")
         
         try:
-            logger.debug(f"📡 Sending request to ZenRows API (attempt {attempt})")
-            logger.debug(f"   URL: {url[:70]}...")
-            logger.debug(f"   JS Render: {params['js_render']}")
-            logger.debug(f"   Premium Proxy: {params['premium_proxy']}")
+            sampled_logger.debug(
+                f"📡 Sending request to ZenRows API (attempt {attempt}): {url[:70]}... "
+                f"js_render={params['js_render']} premium_proxy={params['premium_proxy']}"
+            )
             
             async with self.session.get(
                 self.config.ZENROWS_API_ENDPOINT,
@@ -220,7 +228,7 @@ class ZenRowsClient(CommercialAPIClient):
                 ssl=True,
             ) as response:
                 # Log response status
-                logger.debug(f"📥 ZenRows API response: HTTP {response.status}")
+                sampled_logger.debug(f"📥 ZenRows API response: HTTP {response.status}")
                 
                 # Check status code
                 if response.status != 200:
@@ -232,7 +240,7 @@ class ZenRowsClient(CommercialAPIClient):
                 
                 # Get HTML
                 html = await response.text()
-                logger.debug(f"📥 Received {len(html):,} bytes from ZenRows API")
+                sampled_logger.debug(f"📥 Received {len(html):,} bytes from ZenRows API")
                 
                 # Check if response is empty
                 if not html or len(html) == 0:
@@ -430,7 +438,7 @@ class ZenRowsClient(CommercialAPIClient):
                 )
                 # Don't fail, just warn (might be legitimate page)
         
-        logger.debug(f"✅ HTML validation passed ({html_size:,} bytes)")
+        sampled_logger.debug(f"✅ HTML validation passed ({html_size:,} bytes)")
     
     def get_usage_stats(self) -> Dict:
         """Get usage statistics"""
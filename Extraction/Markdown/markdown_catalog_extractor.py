@@ -17,19 +17,22 @@ import random
 import pickle
 import requests
 import re
-from typing import List, Dict, Optional, Tuple, Any
+from typing import List, Dict, Optional, Tuple, Any, AsyncIterator
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import logging
 
 from logger_config import setup_logging
+from tracing import traced, span
+from metrics_server import metrics
+from catalog_stream import CatalogChunk, page_chunks, prefetch_pages
 from cost_tracker import cost_tracker
 from markdown_retailer_logic import MarkdownRetailerLogic
 
 logger = setup_logging(__name__)
 
 # Configuration
-JINA_ENDPOINT = "https://r.jina.ai/"
+JINA_ENDPOINT = os.getenv("JINA_ENDPOINT", "https://r.jina.ai/")
 CACHE_EXPIRY_DAYS = 2  # Cache for 2 days
 MARKDOWN_CACHE_FILE = "markdown_cache.pkl"
 
@@ -95,7 +98,7 @@ class MarkdownCatalogExtractor:
                     if deepseek_api_key:
                         self.deepseek_client = OpenAI(
                             api_key=deepseek_api_key,
-                            base_url="https://api.deepseek.com"
+                            base_url=os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
                         )
                         self.deepseek_enabled = True
                         logger.info("✅ DeepSeek V3 client initialized")
@@ -144,6 +147,7 @@ class MarkdownCatalogExtractor:
             logger.error(f"Failed to setup LLM clients: {e}")
             raise
     
+    @traced('extract')
     async def extract_catalog(
         self,
         catalog_url: str,
@@ -200,6 +204,45 @@ CRITICAL INSTRUCTIONS:
             catalog_prompt=catalog_prompt
         )
     
+    async def stream_catalog(
+        self,
+        page_urls: List[str],
+        retailer: str,
+        chunk_size: Optional[int] = None
+    ) -> AsyncIterator[CatalogChunk]:
+        """
+        Extract catalog pages incrementally, yielding each page's products
+        in chunks as soon as its LLM response is parsed
+        
+        The next page's markdown fetch and LLM call run while the caller
+        processes the current page.
+        
+        Args:
+            page_urls: Catalog page URLs in order (single URL for infinite scroll)
+            retailer: Retailer identifier
+            chunk_size: Products per yielded chunk (default STREAM_CHUNK_SIZE)
+        """
+        async def fetch_page(page: int, page_url: str):
+            return page, page_url, await self.extract_catalog(page_url, retailer)
+        
+        pages = prefetch_pages(page_urls, fetch_page)
+        try:
+            async for page, page_url, result in pages:
+                stats = {'processing_time': result.get('processing_time', 0)}
+                if not result.get('success'):
+                    errors = result.get('errors') or ['Unknown error']
+                    for chunk in page_chunks([], page, page_url, result.get('method_used') or 'markdown',
+                                             error='; '.join(errors), stats=stats):
+                        yield chunk
+                    continue
+                
+                for chunk in page_chunks(result.get('products', []), page, page_url,
+                                         result.get('method_used') or 'markdown',
+                                         chunk_size=chunk_size, stats=stats):
+                    yield chunk
+        finally:
+            await pages.aclose()
+    
     async def extract_catalog_products(self, catalog_url: str, retailer: str, 
                                       catalog_prompt: str) -> Dict[str, Any]:
         """
@@ -287,18 +330,19 @@ Remember: Extract ALL products as a JSON array in the format specified above."""
                     logger.info(f"🔄 Attempting catalog extraction with DeepSeek V3 (no timeout, matching old architecture)")
                     
                     # No timeout - let DeepSeek take as long as needed (like old architecture)
-                    response = await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        lambda: self.deepseek_client.chat.completions.create(
-                            model="deepseek-chat",
-                            messages=[
-                                {"role": "system", "content": "You are a specialized AI designed to extract structured product information from catalog pages. Extract ALL products visible and return them as a JSON array."},
-                                {"role": "user", "content": full_prompt}
-                            ],
-                            temperature=0.1,
-                            max_tokens=8000  # Increased for large catalog arrays with 50+ products
+                    with span('deepseek_catalog', 'llm', retailer):
+                        response = await asyncio.get_event_loop().run_in_executor(
+                            None,
+                            lambda: self.deepseek_client.chat.completions.create(
+                                model="deepseek-chat",
+                                messages=[
+                                    {"role": "system", "content": "You are a specialized AI designed to extract structured product information from catalog pages. Extract ALL products visible and return them as a JSON array."},
+                                    {"role": "user", "content": full_prompt}
+                                ],
+                                temperature=0.1,
+                                max_tokens=8000  # Increased for large catalog arrays with 50+ products
+                            )
                         )
-                    )
                     
                     if response and response.choices:
                         content = response.choices[0].message.content
@@ -317,10 +361,11 @@ Remember: Extract ALL products as a JSON array in the format specified above."""
                     logger.info(f"🔄 Attempting catalog extraction with Gemini Flash 2.0 (no timeout, matching old architecture)")
                     
                     # No timeout - let Gemini take as long as needed (like old architecture)
-                    response = await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        lambda: self.gemini_client.invoke(full_prompt)
-                    )
+                    with span('gemini_catalog', 'llm', retailer):
+                        response = await asyncio.get_event_loop().run_in_executor(
+                            None,
+                            lambda: self.gemini_client.invoke(full_prompt)
+                        )
                     
                     if response and hasattr(response, 'content'):
                         # Parse simple text format instead of JSON
@@ -393,6 +438,7 @@ Remember: Extract ALL products as a JSON array in the format specified above."""
                 'errors': [str(e)]
             }
 
+    @traced('fetch')
     async def _fetch_markdown(self, url: str, retailer: str, max_retries: int = 3) -> Tuple[Optional[str], Optional[str]]:
         """Fetch markdown content using Jina AI with caching"""
         
@@ -407,8 +453,11 @@ Remember: Extract ALL products as a JSON array in the format specified above."""
                 self._remove_url_from_cache(url)
             else:
                 logger.debug(f"Using cached markdown for {url}")
+                metrics.inc('smf_cache_requests_total', cache='markdown', tower='markdown', result='hit')
                 return cached_markdown, cached_final_url
         
+        metrics.inc('smf_cache_requests_total', cache='markdown', tower='markdown', result='miss')
+        
         # Fetch fresh content
         for retry in range(max_retries + 1):
             try:
@@ -450,12 +499,14 @@ Remember: Extract ALL products as a JSON array in the format specified above."""
                     # VALIDATION: Check if we got homepage redirect instead of product page
                     if self._is_homepage_redirect(fresh_content, url):
                         logger.warning(f"⚠️ Jina AI returned homepage redirect for {url}, NOT caching bad content")
+                        metrics.inc('smf_fetch_requests_total', service='jina', retailer=retailer, outcome='redirect')
                         # Return None to trigger Patchright fallback (don't poison cache)
                         return None, url
                     
                     # Only cache if validation passes
                     self._save_markdown_cache(url, fresh_content, clean_url)
                     logger.debug(f"Successfully fetched markdown ({fresh_token_estimate} tokens)")
+                    metrics.inc('smf_fetch_requests_total', service='jina', retailer=retailer, outcome='success')
                     return fresh_content, clean_url
                 else:
                     logger.warning(f"Jina AI returned status {response.status_code}")
@@ -472,6 +523,7 @@ Remember: Extract ALL products as a JSON array in the format specified above."""
                 else:
                     logger.error(f"Jina AI failed after all retries: {e}")
         
+        metrics.inc('smf_fetch_requests_total', service='jina', retailer=retailer, outcome='failure')
         return None, url
     
     def _is_homepage_redirect(self, content: str, requested_url: str) -> bool:
@@ -539,6 +591,7 @@ Remember: Extract ALL products as a JSON array in the format specified above."""
         
         return headers
     
+    @traced('parse')
     def _parse_catalog_text_response(self, content: str) -> Optional[Dict[str, Any]]:
         """Parse pipe-separated text format - NO JSON parsing!"""
         try:
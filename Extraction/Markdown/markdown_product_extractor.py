@@ -19,9 +19,11 @@ from dotenv import load_dotenv
 import logging
 
 from logger_config import setup_logging
+from tracing import traced
 from cost_tracker import cost_tracker
 from markdown_retailer_logic import MarkdownRetailerLogic
 from markdown_catalog_extractor import MarkdownCatalogExtractor
+from markdown_section_extractor import MarkdownSectionExtractor
 
 logger = setup_logging(__name__)
 
@@ -65,7 +67,7 @@ class MarkdownProductExtractor:
     
     Process:
     1. Convert product HTML to markdown (via Jina AI)
-    2. Optional smart chunking for large pages
+    2. Optional smart chunking for large pages (local section scorer, LLM fallback)
     3. LLM extraction with EARLY VALIDATION (DeepSeek V3 → Gemini Flash 2.0)
     4. Parse JSON response
     5. Validate completeness (price, images, title required)
@@ -86,6 +88,10 @@ class MarkdownProductExtractor:
         
         self.config = config
         self.retailer_logic = MarkdownRetailerLogic(config)
+        self.section_extractor = MarkdownSectionExtractor(self.retailer_logic)
+        
+        # Section extraction path counts per retailer: local / llm / keyword
+        self.section_stats: Dict[str, Dict[str, int]] = {}
         
         # Reuse catalog extractor for LLM clients and markdown fetching
         self.catalog_extractor = MarkdownCatalogExtractor(config)
@@ -99,6 +105,7 @@ class MarkdownProductExtractor:
         """
         return await self.extract_product_data(url, retailer)
     
+    @traced('extract')
     async def extract_product_data(self, url: str, retailer: str) -> MarkdownExtractionResult:
         """Main extraction method for single product pages"""
         start_time = asyncio.get_event_loop().time()
@@ -150,7 +157,7 @@ class MarkdownProductExtractor:
             # Step 2: Handle oversized content
             if self._is_too_large(markdown_content):
                 logger.info(f"Large markdown detected for {retailer}, extracting product section")
-                product_section = await self._extract_product_section(markdown_content, retailer)
+                product_section = await self._extract_product_section(markdown_content, retailer, url)
                 if product_section:
                     markdown_content = product_section
                 else:
@@ -261,6 +268,7 @@ class MarkdownProductExtractor:
         logger.warning(f"Both DeepSeek V3 and Gemini Flash 2.0 failed for {retailer}")
         return None
     
+    @traced('llm')
     async def _extract_with_deepseek(self, markdown_content: str, retailer: str) -> Optional[Dict[str, Any]]:
         """Extract using DeepSeek V3"""
         
@@ -297,6 +305,7 @@ class MarkdownProductExtractor:
         
         return None
     
+    @traced('llm')
     async def _extract_with_gemini(self, markdown_content: str, retailer: str) -> Optional[Dict[str, Any]]:
         """Extract using Gemini Flash 2.0"""
         
@@ -452,12 +461,35 @@ Return ONLY the JSON object, no additional text or markdown formatting."""
         token_estimate = len(markdown_content) // 4
         return token_estimate > 15000
     
-    async def _extract_product_section(self, markdown_content: str, retailer: str) -> Optional[str]:
+    # Token budget for the product section handed to the extraction LLM
+    SECTION_TOKEN_BUDGET = 4000
+    
+    async def _extract_product_section(self, markdown_content: str, retailer: str, url: Optional[str] = None) -> Optional[str]:
         """
-        Extract product section from large markdown using LLM
-        Ported from old architecture (621349b:Shared/markdown_extractor.py)
+        Extract product section from large markdown
+        
+        Cheap path first: local sliding-window scorer (no LLM call).
+        LLM section extraction (ported from old architecture,
+        621349b:Shared/markdown_extractor.py) is only used as a fallback.
         """
         
+        # Step 0: Deterministic local extraction (retailer heuristics)
+        try:
+            local_section = self.section_extractor.extract(
+                markdown_content, retailer, url, max_tokens=self.SECTION_TOKEN_BUDGET
+            )
+            if local_section:
+                self._record_section_path(retailer, 'local')
+                return local_section
+        except Exception as e:
+            logger.warning(f"Local section extraction failed: {e}, falling back to LLM")
+        
+        section = await self._extract_product_section_fallback(markdown_content, retailer)
+        return section
+    
+    async def _extract_product_section_fallback(self, markdown_content: str, retailer: str) -> Optional[str]:
+        """Regex (H&M) → LLM → keyword section extraction"""
+        
         # Special regex handling for H&M (proven to work)
         if retailer == "hm":
             try:
@@ -473,6 +505,7 @@ Return ONLY the JSON object, no additional text or markdown formatting."""
                 extracted_section = f"# {title}\n\n{price_section}{image_section}"
                 if len(extracted_section) > 200:
                     logger.info(f"✅ H&M regex extraction: {len(extracted_section)} chars")
+                    self._record_section_path(retailer, 'local')
                     return extracted_section
             except Exception as e:
                 logger.warning(f"H&M regex extraction failed: {e}, falling back to LLM")
@@ -484,6 +517,7 @@ Return ONLY the JSON object, no additional text or markdown formatting."""
             deepseek_section = await self._extract_section_with_deepseek(markdown_content, retailer)
             if deepseek_section and len(deepseek_section) > 200:
                 logger.info(f"✅ DeepSeek section extraction: {len(deepseek_section)} chars")
+                self._record_section_path(retailer, 'llm')
                 return deepseek_section
             else:
                 logger.debug(f"DeepSeek section extraction returned insufficient content, trying Gemini")
@@ -512,6 +546,7 @@ Markdown Content (first 15000 chars):
                 extracted_content = response.content
                 if len(extracted_content) > 200:  # Ensure we got meaningful content
                     logger.info(f"✅ Gemini section extraction: {len(extracted_content)} chars")
+                    self._record_section_path(retailer, 'llm')
                     return extracted_content
                     
         except Exception as e:
@@ -529,12 +564,36 @@ Markdown Content (first 15000 chars):
             start_idx = max(0, start_idx - 1000)
             extracted = markdown_content[start_idx:start_idx + 12000]
             logger.info(f"✅ Keyword-based extraction: {len(extracted)} chars")
+            self._record_section_path(retailer, 'keyword')
             return extracted
         
         # Last resort: return first 12K
         logger.warning(f"Using first 12K chars as last resort")
+        self._record_section_path(retailer, 'keyword')
         return markdown_content[:12000]
     
+    def _record_section_path(self, retailer: str, path: str):
+        """Count which section extraction path succeeded ('local', 'llm', 'keyword')"""
+        stats = self.section_stats.setdefault(retailer, {'local': 0, 'llm': 0, 'keyword': 0})
+        stats[path] += 1
+        
+        total = sum(stats.values())
+        logger.info(
+            f"📊 Section extraction ({retailer}): local {stats['local']}/{total} "
+            f"({stats['local'] / total * 100:.0f}%), llm {stats['llm']}, keyword {stats['keyword']}"
+        )
+    
+    def get_section_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-retailer section extraction counts and local (no-LLM) success rate"""
+        return {
+            retailer: {
+                **stats,
+                'local_rate': stats['local'] / max(sum(stats.values()), 1)
+            }
+            for retailer, stats in self.section_stats.items()
+        }
+    
+    @traced('llm')
     async def _extract_section_with_deepseek(self, markdown_content: str, retailer: str) -> Optional[str]:
         """Extract product section using DeepSeek V3"""
         try:
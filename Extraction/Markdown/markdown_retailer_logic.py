@@ -43,7 +43,40 @@ class MarkdownRetailerLogic:
         'nordstrom': r'-(\d+)\.html',
         'mango': r'/([A-Z0-9\-]+)\.html'
     }
-    
+
+    # Product image CDN hosts per retailer (image link clusters in markdown)
+    IMAGE_CDN_PATTERNS = {
+        'revolve': r'revolveassets',
+        'asos': r'asos-media',
+        'aritzia': r'aritzia',
+        'anthropologie': r'urbndata|anthropologie',
+        'abercrombie': r'scene7|abercrombie',
+        'hm': r'hmgoepprod|image\.hm\.com',
+        'uniqlo': r'uniqlo',
+        'urban_outfitters': r'urbndata|urbanoutfitters',
+        'nordstrom': r'nordstrommedia',
+        'mango': r'mango|mngbcn'
+    }
+
+    # Price patterns per retailer currency (default: USD)
+    PRICE_PATTERNS = {
+        'aritzia': r'(?:CA\$|C\$|\$)\s?\d[\d,]*(?:\.\d{2})?',
+        'mango': r'(?:€\s?\d[\d,.]*|\d[\d,.]*\s?€|\$\s?\d[\d,]*(?:\.\d{2})?)',
+        'asos': r'(?:£|\$)\s?\d[\d,]*(?:\.\d{2})?',
+    }
+    DEFAULT_PRICE_PATTERN = r'\$\s?\d[\d,]*(?:\.\d{2})?'
+
+    # Size / colour selector blocks on product pages
+    SIZE_BLOCK_PATTERN = r'^\s*(?:[-*]\s*)?(?:size\b|select (?:a )?size|(?:XXS|XS|S|M|L|XL|XXL|\d{1,2})\s*$)'
+    COLOR_BLOCK_PATTERN = r'\b(?:colou?r|select colou?r)\b'
+
+    # Words that appear inside the main product block
+    PRODUCT_BLOCK_KEYWORDS = [
+        'add to bag', 'add to cart', 'add to basket', 'description', 'details',
+        'fabric', 'material', 'care', 'fit', 'style no', 'item no', 'in stock',
+        'sold out', 'out of stock'
+    ]
+
     def __init__(self, config: Dict = None):
         self.config = config or {}
     
@@ -65,7 +98,15 @@ class MarkdownRetailerLogic:
         except Exception as e:
             logger.debug(f"Could not parse price '{price_str}': {e}")
         return None
-    
+
+    def get_price_pattern(self, retailer: str) -> str:
+        """Price regex for the retailer's currency"""
+        return self.PRICE_PATTERNS.get(retailer, self.DEFAULT_PRICE_PATTERN)
+
+    def get_image_cdn_pattern(self, retailer: str) -> Optional[str]:
+        """Product image CDN regex for the retailer (None if unknown)"""
+        return self.IMAGE_CDN_PATTERNS.get(retailer)
+
     def clean_title(self, title: str, retailer: str) -> str:
         """
         Clean product title
@@ -0,0 +1,294 @@
+"""
+Markdown Tower - Local Product Section Extractor
+Cut the main product section out of oversized markdown without an LLM call
+
+Uses retailer heuristics from MarkdownRetailerLogic (price regexes, title
+anchors, size/colour blocks, image link clusters) and a sliding-window scorer
+to pick the best window within the token budget.
+"""
+
+# Add shared path for imports
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../Shared"))
+
+import re
+from collections import deque
+from typing import List, Optional, Tuple
+
+from logger_config import setup_logging
+from markdown_retailer_logic import MarkdownRetailerLogic
+
+logger = setup_logging(__name__)
+
+
+class MarkdownSectionExtractor:
+    """
+    Deterministic product section extraction for large markdown pages
+
+    Process:
+    1. Score every line (price, title anchor, size/colour block, product
+       keywords, retailer image links; link-only navigation lines penalised)
+    2. Slide a window of at most max_tokens over the lines, keep the best total
+    3. Grow the window over neutral lines (description text) up to the budget
+    4. Accept the window only if it has a price and at least one product image
+    5. Append retailer CDN image links found outside the window (max 10)
+
+    Returns None when the page does not look like a product page, so the
+    caller can fall back to LLM section extraction.
+    """
+
+    CHARS_PER_TOKEN = 4
+
+    # Line score weights
+    PRICE_WEIGHT = 3.0
+    TITLE_ANCHOR_WEIGHT = 6.0
+    HEADING_WEIGHT = 1.5
+    SIZE_WEIGHT = 1.0
+    COLOR_WEIGHT = 1.0
+    KEYWORD_WEIGHT = 1.0
+    CDN_IMAGE_WEIGHT = 2.0
+    IMAGE_WEIGHT = 0.5
+    NAV_LINK_PENALTY = -0.5
+
+    # Minimum window score to trust the local result
+    MIN_WINDOW_SCORE = 8.0
+
+    MAX_EXTRA_IMAGES = 10
+
+    IMAGE_LINK = re.compile(r'!\[[^\]]*\]\((https?://[^\s\)]+)\)')
+    NAV_LINK_LINE = re.compile(r'^\s*(?:[-*]\s*)?\[[^\]]*\]\([^\)]*\)\s*$')
+    HEADING = re.compile(r'^\s*#{1,3}\s+(.+)$')
+    SLUG_STOPWORDS = {'the', 'and', 'with', 'in', 'of', 'a', 'shop', 'us', 'p', 'dp', 'prd', 'html', 'product', 'productpage'}
+
+    def __init__(self, retailer_logic: Optional[MarkdownRetailerLogic] = None):
+        self.retailer_logic = retailer_logic or MarkdownRetailerLogic()
+
+    def extract(
+        self,
+        markdown_content: str,
+        retailer: str,
+        url: Optional[str] = None,
+        max_tokens: int = 6000
+    ) -> Optional[str]:
+        """
+        Extract the product section
+
+        Args:
+            markdown_content: Full page markdown
+            retailer: Retailer name
+            url: Product URL (slug words anchor the title heading)
+            max_tokens: Token budget for the section
+
+        Returns:
+            Product section markdown, or None if no confident window was found
+        """
+        lines = markdown_content.split('\n')
+        if not lines:
+            return None
+
+        price_re = re.compile(self.retailer_logic.get_price_pattern(retailer))
+        cdn_pattern = self.retailer_logic.get_image_cdn_pattern(retailer)
+        cdn_re = re.compile(cdn_pattern, re.IGNORECASE) if cdn_pattern else None
+        slug_words = self._slug_words(url)
+
+        scores, has_price, has_image = self._score_lines(lines, price_re, cdn_re, slug_words)
+
+        window = self._best_window(lines, scores, max_tokens * self.CHARS_PER_TOKEN)
+        if not window:
+            return None
+
+        start, end, total = window
+        start, end = self._extend_window(lines, scores, start, end, max_tokens * self.CHARS_PER_TOKEN)
+        window_has_price = any(has_price[start:end])
+        window_has_image = any(has_image[start:end])
+
+        if total < self.MIN_WINDOW_SCORE or not window_has_price:
+            logger.debug(
+                f"Local section rejected for {retailer}: score {total:.1f}, "
+                f"price {'yes' if window_has_price else 'no'}"
+            )
+            return None
+
+        section = '\n'.join(lines[start:end])
+
+        # Image clusters often sit above the title (gallery) - pull them in
+        extra_images = self._images_outside_window(lines, start, end, cdn_re, section)
+        if not window_has_image and not extra_images:
+            logger.debug(f"Local section rejected for {retailer}: no product images")
+            return None
+
+        if extra_images:
+            budget_left = max_tokens * self.CHARS_PER_TOKEN - len(section)
+            image_block = "\n\nImages:\n" + "\n".join(f"![]({u})" for u in extra_images)
+            if len(image_block) <= budget_left:
+                section += image_block
+
+        logger.info(
+            f"✅ Local section extraction ({retailer}): lines {start}-{end}, "
+            f"{len(section)} chars, score {total:.1f}"
+        )
+        return section
+
+    def _slug_words(self, url: Optional[str]) -> List[str]:
+        """Title anchor words from the URL path (e.g. /shop/ruched-midi-dress)"""
+        if not url:
+            return []
+        path = url.split('?')[0].split('#')[0]
+        words = re.split(r'[^a-z]+', path.lower().split('/', 3)[-1])
+        return [w for w in words if len(w) > 2 and w not in self.SLUG_STOPWORDS]
+
+    def _score_lines(
+        self,
+        lines: List[str],
+        price_re,
+        cdn_re,
+        slug_words: List[str]
+    ) -> Tuple[List[float], List[bool], List[bool]]:
+        """Score each line for product signal"""
+        size_re = re.compile(self.retailer_logic.SIZE_BLOCK_PATTERN, re.IGNORECASE)
+        color_re = re.compile(self.retailer_logic.COLOR_BLOCK_PATTERN, re.IGNORECASE)
+        keywords = self.retailer_logic.PRODUCT_BLOCK_KEYWORDS
+
+        scores = []
+        has_price = []
+        has_image = []
+
+        for line in lines:
+            score = 0.0
+            lower = line.lower()
+
+            price_found = bool(price_re.search(line))
+            if price_found:
+                score += self.PRICE_WEIGHT
+
+            heading = self.HEADING.match(line)
+            if heading:
+                score += self.HEADING_WEIGHT
+                if slug_words:
+                    heading_text = heading.group(1).lower()
+                    matched = sum(1 for w in slug_words if w in heading_text)
+                    if matched >= max(1, len(slug_words) // 2):
+                        score += self.TITLE_ANCHOR_WEIGHT
+
+            if size_re.search(line):
+                score += self.SIZE_WEIGHT
+            if color_re.search(line):
+                score += self.COLOR_WEIGHT
+            if any(k in lower for k in keywords):
+                score += self.KEYWORD_WEIGHT
+
+            image_found = False
+            for image_url in self.IMAGE_LINK.findall(line):
+                if cdn_re and cdn_re.search(image_url):
+                    score += self.CDN_IMAGE_WEIGHT
+                    image_found = True
+                else:
+                    score += self.IMAGE_WEIGHT
+                    image_found = image_found or cdn_re is None
+
+            if not image_found and not price_found and self.NAV_LINK_LINE.match(line):
+                score += self.NAV_LINK_PENALTY
+
+            scores.append(score)
+            has_price.append(price_found)
+            has_image.append(image_found)
+
+        return scores, has_price, has_image
+
+    def _best_window(
+        self,
+        lines: List[str],
+        scores: List[float],
+        max_chars: int
+    ) -> Optional[Tuple[int, int, float]]:
+        """
+        Highest-scoring contiguous run of lines within max_chars
+
+        Window score is prefix[end] - prefix[start]; for each end the best
+        start is the minimum prefix sum among starts that keep the window in
+        budget, tracked with a monotonic deque (O(n), exact with negative
+        scores). Ties go to the later start, so leading zero/negative lines
+        are trimmed.
+
+        Returns:
+            Tuple of (start, end, score) with end exclusive, or None
+        """
+        prefix = [0.0]
+        for score in scores:
+            prefix.append(prefix[-1] + score)
+
+        best = None
+        candidates = deque()
+        low = 0
+        chars = 0
+
+        for end, line in enumerate(lines):
+            chars += len(line) + 1
+
+            while candidates and prefix[candidates[-1]] >= prefix[end]:
+                candidates.pop()
+            candidates.append(end)
+
+            while chars > max_chars and low <= end:
+                chars -= len(lines[low]) + 1
+                low += 1
+            while candidates and candidates[0] < low:
+                candidates.popleft()
+
+            if not candidates:
+                continue
+
+            start = candidates[0]
+            total = prefix[end + 1] - prefix[start]
+            if best is None or total > best[2]:
+                best = (start, end + 1, total)
+
+        return best
+
+    def _extend_window(
+        self,
+        lines: List[str],
+        scores: List[float],
+        start: int,
+        end: int,
+        max_chars: int
+    ) -> Tuple[int, int]:
+        """
+        Grow the window over neutral lines (descriptions, specs) until a
+        navigation line or the budget is reached - forward first, then back
+        """
+        chars = sum(len(line) + 1 for line in lines[start:end])
+
+        while end < len(lines) and scores[end] >= 0 and chars + len(lines[end]) + 1 <= max_chars:
+            chars += len(lines[end]) + 1
+            end += 1
+
+        while start > 0 and scores[start - 1] >= 0 and chars + len(lines[start - 1]) + 1 <= max_chars:
+            chars += len(lines[start - 1]) + 1
+            start -= 1
+
+        return start, end
+
+    def _images_outside_window(
+        self,
+        lines: List[str],
+        start: int,
+        end: int,
+        cdn_re,
+        section: str
+    ) -> List[str]:
+        """Retailer CDN image links outside the chosen window"""
+        if cdn_re is None:
+            return []
+
+        images = []
+        for index, line in enumerate(lines):
+            if start <= index < end:
+                continue
+            for image_url in self.IMAGE_LINK.findall(line):
+                if cdn_re.search(image_url) and image_url not in section and image_url not in images:
+                    images.append(image_url)
+                    if len(images) >= self.MAX_EXTRA_IMAGES:
+                        return images
+        return images
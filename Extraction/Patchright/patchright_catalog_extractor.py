@@ -16,7 +16,7 @@ import time
 import json
 import re
 import io
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple, AsyncIterator
 from urllib.parse import urlparse
 from PIL import Image
 from patchright.async_api import async_playwright
@@ -26,8 +26,13 @@ from difflib import SequenceMatcher
 import logging
 
 from logger_config import setup_logging
+from tracing import traced
+from catalog_stream import CatalogChunk, page_chunks
 from patchright_verification import PatchrightVerificationHandler
 from patchright_retailer_strategies import PatchrightRetailerStrategies
+from patchright_request_router import PatchrightRequestRouter
+from patchright_dom_harvester import PatchrightDOMHarvester
+from patchright_readiness import PatchrightReadinessEngine
 
 logger = setup_logging(__name__)
 
@@ -37,6 +42,15 @@ ENABLE_ANTI_SCRAPING_ENHANCEMENTS = True
 # If disabled, system falls back to original behavior
 # Use this for emergency rollback if enhancements cause issues
 
+# Per-retailer resource blocking via context.route (False = load everything)
+ENABLE_REQUEST_ROUTING = True
+
+# Harvest catalog DOM data in a single page.evaluate (False = per-element handles)
+ENABLE_BULK_DOM_HARVEST = True
+
+# Event-driven readiness detection (False = original fixed sleeps + polling)
+ENABLE_READINESS_ENGINE = True
+
 
 class PatchrightCatalogExtractor:
     """
@@ -52,6 +66,7 @@ class PatchrightCatalogExtractor:
     - Verification handling (PerimeterX, Cloudflare)
     - DOM validation of Gemini data
     - Pattern learning integration
+    - stream_catalog(): per-page extraction yielding DOM tiles in chunks
     """
     
     def __init__(self, config: Dict = None):
@@ -76,6 +91,7 @@ class PatchrightCatalogExtractor:
         self.browser = None
         self.context = None
         self.page = None
+        self.request_router = None
         
         # Setup Gemini
         self._setup_gemini()
@@ -97,6 +113,7 @@ class PatchrightCatalogExtractor:
             logger.error(f"Failed to setup Gemini: {e}")
             raise
     
+    @traced('extract')
     async def extract_catalog(
         self,
         catalog_url: str,
@@ -128,128 +145,258 @@ class PatchrightCatalogExtractor:
         try:
             logger.info(f"🎭 Starting Patchright catalog extraction for {retailer}: {catalog_url}")
             
-            # Step 1: Setup browser (with retailer-specific headless setting)
-            await self._setup_stealth_browser(retailer)
-            
-            # Step 2: Navigate with retailer-specific wait strategy
+            # Steps 1-6.5: Browser, navigation, verification, readiness, popups
             strategy = self.strategies.get_strategy(retailer)
-            wait_until = strategy.get('wait_strategy', 'domcontentloaded')
+            readiness_result, routing_stats = await self._open_catalog_page(catalog_url, retailer, strategy)
             
-            logger.debug(f"Navigating with wait_until='{wait_until}'")
-            await self.page.goto(catalog_url, wait_until=wait_until, timeout=60000)
-            await asyncio.sleep(self._safe_delay(3.0, 0.25, 2.0))
-            logger.debug("⏱️ Post-navigation delay: varied timing")
+            # Step 7: Take full-page screenshot
+            screenshots, screenshot_descriptions = await self._capture_catalog_screenshots()
             
-            # Step 3: Handle verification
-            verification_handler = PatchrightVerificationHandler(self.page, self.config)
-            verification_strategy = {
-                'domain': self._extract_domain(catalog_url),
-                'retailer': retailer,
-                'special_notes': 'cloudflare_verification' if retailer.lower() == 'aritzia' else ''
-            }
-            await verification_handler.handle_verification_challenges(verification_strategy)
+            # Steps 8-9: Gemini extracts visual data
+            products, gemini_failure = self._gemini_extract_catalog(screenshots, screenshot_descriptions, retailer)
             
-            # Step 4: Wait for page to fully render
-            logger.info("⏱️ Waiting for page to fully render...")
+            processing_time = time.time() - start_time
             
-            try:
-                await self.page.wait_for_load_state('networkidle', timeout=15000)
-                logger.info("✅ Page network idle")
-            except:
-                logger.info("⏱️ Network still active, continuing...")
+            if gemini_failure:
+                return {
+                    'success': False,
+                    'products': [],
+                    'total_found': 0,
+                    'method_used': 'patchright_gemini',
+                    'processing_time': processing_time,
+                    **gemini_failure
+                }
             
-            await asyncio.sleep(self._safe_delay(10.0, 0.2, 8.0))
-            logger.debug("⏱️ Pre-detection delay: varied timing")
+            logger.info(f"✅ Gemini extracted {len(products)} products visually")
             
-            # Step 5: Retailer-specific extended waits
-            # For Aritzia specifically
-            if retailer.lower() == 'aritzia':
-                logger.info("⏱️ Starting Aritzia product detection (polling mode)")
-                
-                max_attempts = 30
-                attempt = 0
-                products_found = False
-                
-                selectors_to_try = [
-                    'a[href*="/product/"]',
-                    'a[class*="ProductCard"]',
-                    '[data-product-id]'
-                ]
-                
-                while attempt < max_attempts and not products_found:
-                    attempt += 1
-                    
-                    for selector in selectors_to_try:
-                        try:
-                            elements = await self.page.query_selector_all(selector)
-                            if len(elements) > 0:
-                                logger.info(f"✅ Found {len(elements)} products with selector '{selector}' after {attempt} seconds")
-                                products_found = True
-                                break
-                        except:
-                            continue
-                    
-                    if not products_found:
-                        # DO NOT CHANGE - Aritzia polling interval (detection logic)
-                        await asyncio.sleep(1)
-                
-                if not products_found:
-                    logger.warning(f"⚠️ No products detected after {max_attempts} seconds")
-            elif 'cloudflare' in verification_strategy.get('special_notes', '').lower():
-                logger.info("🔍 Cloudflare detected - extended wait...")
-                await asyncio.sleep(15)
-                
-                # Scroll to trigger lazy loading
-                logger.info("📜 Scrolling to trigger product loading...")
-                await self.page.evaluate("window.scrollTo(0, 1000)")
-                await asyncio.sleep(2)
-                await self.page.evaluate("window.scrollTo(0, 0)")
-                await asyncio.sleep(2)
-                
-                # Wait for product elements
-                product_selectors = strategy.get('product_selectors', [])
-                if product_selectors:
-                    selector_str = ', '.join(product_selectors)
-                    try:
-                        await self.page.wait_for_selector(
-                            selector_str,
-                            timeout=30000,
-                            state='attached'
-                        )
-                        logger.info("✅ Product elements found")
-                        await asyncio.sleep(3)
-                    except Exception as e:
-                        logger.warning(f"⚠️ Products not found: {e}")
+            # Step 10: DOM extracts URLs + validates (screenshot taken, images no longer needed)
+            logger.info("🔗 Step 2: DOM extracting URLs and validating...")
+            if self.request_router:
+                self.request_router.hold_images()
+            dom_product_links = await self._extract_catalog_product_links_from_dom(retailer, strategy)
+            logger.info(f"✅ DOM found {len(dom_product_links)} product URLs")
             
-            # Step 6: Try to detect products with learned patterns
-            await self._wait_for_products(retailer, strategy)
+            # Steps 11-12: DOM-first override or DOM + Gemini merge
+            products, validation_stats = self._combine_catalog_products(
+                products, dom_product_links, retailer, strategy
+            )
             
-            await asyncio.sleep(2)
+            logger.info(f"✅ Patchright catalog extraction successful: {len(products)} products")
             
-            # Step 6.5: Dismiss popups again (they may appear after page loads)
-            logger.info("🧹 Dismissing any late-appearing popups...")
-            await verification_handler._dismiss_popups()
-            await asyncio.sleep(self._safe_delay(1.5, 0.33, 1.0))
-            logger.debug("⏱️ Post-popup delay: varied timing")
+            return {
+                'success': True,
+                'products': products,
+                'total_found': len(products),
+                'method_used': 'patchright_catalog_gemini_dom_hybrid',
+                'processing_time': processing_time,
+                'validation_stats': validation_stats,
+                'readiness': readiness_result,
+                'routing': routing_stats,
+                'warnings': [],
+                'errors': []
+            }
             
-            # Step 7: Take full-page screenshot
-            logger.debug("📸 Taking full-page screenshot...")
-            await self.page.evaluate("window.scrollTo(0, 0)")
-            await asyncio.sleep(self._safe_delay(1.2, 0.25, 1.0))
-            logger.debug("⏱️ Pre-screenshot delay: varied timing")
+        except Exception as e:
+            processing_time = time.time() - start_time
+            logger.error(f"Patchright catalog extraction error: {e}")
+            return {
+                'success': False,
+                'products': [],
+                'total_found': 0,
+                'method_used': 'patchright_error',
+                'processing_time': processing_time,
+                'warnings': [],
+                'errors': [str(e)]
+            }
             
-            full_page_screenshot = await self.page.screenshot(full_page=True, type='png')
-            screenshots = [full_page_screenshot]
-            screenshot_descriptions = ["Full catalog page showing all products"]
+        finally:
+            await self._cleanup()
+    
+    async def stream_catalog(
+        self,
+        page_urls: List[str],
+        retailer: str,
+        chunk_size: Optional[int] = None
+    ) -> AsyncIterator[CatalogChunk]:
+        """
+        Extract catalog pages incrementally, yielding DOM tiles in chunks
+        
+        Pages are loaded one at a time (one browser per page, closed before
+        the page's chunks are yielded). Retailers configured for DOM-first
+        catalogs skip the screenshot and Gemini call entirely (and load the page
+        with images held back); for the others Gemini runs in a worker thread
+        while the DOM harvest runs, then the results are merged exactly as in
+        extract_catalog(). Images are held once the screenshot is taken.
+        
+        Args:
+            page_urls: Catalog page URLs in order (single URL for infinite scroll)
+            retailer: Retailer name
+            chunk_size: Products per yielded chunk (default STREAM_CHUNK_SIZE)
+        """
+        strategy = self.strategies.get_strategy(retailer)
+        dom_first = strategy.get('catalog_mode') == 'dom_first'
+        
+        for page, page_url in enumerate(page_urls, 1):
+            start_time = time.time()
+            products = []
+            error = None
+            stats = {}
+            method_used = 'patchright_dom_first' if dom_first else 'patchright_catalog_gemini_dom_hybrid'
+            
+            try:
+                logger.info(f"🎭 Streaming Patchright catalog page {page}/{len(page_urls)} for {retailer}: {page_url}")
+                readiness_result, routing_stats = await self._open_catalog_page(
+                    page_url, retailer, strategy, hold_images=dom_first
+                )
+                stats = {'readiness': readiness_result, 'routing': routing_stats}
+                
+                if dom_first:
+                    dom_product_links = await self._extract_catalog_product_links_from_dom(retailer, strategy)
+                    products = self._dom_only_catalog_products(dom_product_links)
+                    stats['validation_stats'] = {'dom_only_mode': True, 'reason': 'retailer_configured_dom_first'}
+                else:
+                    screenshots, screenshot_descriptions = await self._capture_catalog_screenshots()
+                    # DOM harvest only reads attributes: skip lazy-loaded images while scrolling
+                    if self.request_router:
+                        self.request_router.hold_images()
+                    gemini_task = asyncio.get_running_loop().run_in_executor(
+                        None, self._gemini_extract_catalog, screenshots, screenshot_descriptions, retailer
+                    )
+                    try:
+                        dom_product_links = await self._extract_catalog_product_links_from_dom(retailer, strategy)
+                    finally:
+                        gemini_products, gemini_failure = await gemini_task
+                    
+                    if gemini_failure:
+                        method_used = 'patchright_gemini'
+                        error = '; '.join(gemini_failure['errors'])
+                    else:
+                        products, stats['validation_stats'] = self._combine_catalog_products(
+                            gemini_products, dom_product_links, retailer, strategy
+                        )
             
-            logger.info("✅ Captured full-page screenshot")
+            except Exception as e:
+                logger.error(f"Patchright catalog stream error on page {page}: {e}")
+                method_used = 'patchright_error'
+                error = str(e)
             
-            # Step 8: Gemini extracts visual data
-            logger.info("🔍 Step 1: Gemini Vision extracting product data...")
+            finally:
+                await self._cleanup()
             
-            screenshot_list = "\n".join([f"{i+1}. {desc}" for i, desc in enumerate(screenshot_descriptions)])
+            stats['processing_time'] = time.time() - start_time
+            logger.info(f"✅ Page {page}: {len(products)} products ({stats['processing_time']:.1f}s)")
+            
+            for chunk in page_chunks(products, page, page_url, method_used,
+                                     chunk_size=chunk_size, error=error, stats=stats):
+                yield chunk
+    
+    async def _open_catalog_page(
+        self,
+        catalog_url: str,
+        retailer: str,
+        strategy: Dict,
+        hold_images: bool = False
+    ) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """
+        Launch the browser, navigate, clear verification and wait for products
+        
+        Args:
+            hold_images: Abort image requests from navigation on (DOM-only pages,
+                no screenshot); anti-bot resources are still allowed
+        
+        Returns:
+            (readiness_result, routing_stats)
+        """
+        # Step 1: Setup browser (with retailer-specific headless setting)
+        await self._setup_stealth_browser(retailer)
+        if hold_images and self.request_router:
+            self.request_router.hold_images()
+        
+        # Step 2: Navigate with retailer-specific wait strategy
+        wait_until = strategy.get('wait_strategy', 'domcontentloaded')
+        
+        # Readiness engine tracks product API requests from navigation on
+        readiness = None
+        if ENABLE_READINESS_ENGINE:
+            readiness = PatchrightReadinessEngine(self.page, retailer, self.strategies)
+            readiness.attach()
+        
+        try:
+            logger.debug(f"Navigating with wait_until='{wait_until}'")
+            await self.page.goto(catalog_url, wait_until=wait_until, timeout=60000)
+            if readiness is None or self.strategies.requires_verification(retailer):
+                # Give verification challenges time to render
+                await asyncio.sleep(self._safe_delay(3.0, 0.25, 2.0))
+            else:
+                await asyncio.sleep(self._safe_delay(0.8, 0.25, 0.5))
+            logger.debug("⏱️ Post-navigation delay: varied timing")
             
-            full_prompt = f"""CATALOG EXTRACTION - CRITICAL INSTRUCTIONS
+            # Step 3: Handle verification
+            verification_handler = PatchrightVerificationHandler(self.page, self.config)
+            verification_strategy = {
+                'domain': self._extract_domain(catalog_url),
+                'retailer': retailer,
+                'special_notes': 'cloudflare_verification' if retailer.lower() == 'aritzia' else ''
+            }
+            await verification_handler.handle_verification_challenges(verification_strategy)
+            
+            # Steps 4-6: Wait until products have rendered
+            readiness_result = None
+            if readiness:
+                logger.info("⏱️ Waiting for products to render (readiness engine)...")
+                readiness_result = await readiness.wait_until_ready('catalog')
+                # Learned-selector wait, as in the original flow (returns as soon as one matches)
+                await self._wait_for_products(retailer, strategy)
+            else:
+                await self._legacy_wait_for_page_ready(retailer, strategy, verification_strategy)
+        finally:
+            if readiness:
+                readiness.detach()
+        
+        routing_stats = None
+        if self.request_router:
+            routing_stats = await self.request_router.record_page_load(self.page, 'catalog')
+        
+        # Step 6.5: Dismiss popups again (they may appear after page loads)
+        logger.info("🧹 Dismissing any late-appearing popups...")
+        await verification_handler._dismiss_popups()
+        await asyncio.sleep(self._safe_delay(1.5, 0.33, 1.0))
+        logger.debug("⏱️ Post-popup delay: varied timing")
+        
+        return readiness_result, routing_stats
+    
+    async def _capture_catalog_screenshots(self) -> Tuple[List[bytes], List[str]]:
+        """Full-page screenshot of the loaded catalog (screenshots, descriptions)"""
+        logger.debug("📸 Taking full-page screenshot...")
+        await self.page.evaluate("window.scrollTo(0, 0)")
+        await asyncio.sleep(self._safe_delay(1.2, 0.25, 1.0))
+        logger.debug("⏱️ Pre-screenshot delay: varied timing")
+        
+        full_page_screenshot = await self.page.screenshot(full_page=True, type='png')
+        screenshots = [full_page_screenshot]
+        screenshot_descriptions = ["Full catalog page showing all products"]
+        
+        logger.info("✅ Captured full-page screenshot")
+        return screenshots, screenshot_descriptions
+    
+    def _gemini_extract_catalog(
+        self,
+        screenshots: List[bytes],
+        screenshot_descriptions: List[str],
+        retailer: str
+    ) -> Tuple[Optional[List[Dict]], Optional[Dict[str, List[str]]]]:
+        """
+        Gemini Vision pass over the catalog screenshots (blocking call)
+        
+        Returns:
+            (products, None) on success, or (None, {'warnings', 'errors'}) when
+            the response could not be parsed into a product array
+        """
+        logger.info("🔍 Step 1: Gemini Vision extracting product data...")
+        
+        screenshot_list = "\n".join([f"{i+1}. {desc}" for i, desc in enumerate(screenshot_descriptions)])
+        
+        full_prompt = f"""CATALOG EXTRACTION - CRITICAL INSTRUCTIONS
 
 You are analyzing a {retailer} catalog page with a product grid.
 
@@ -301,192 +448,165 @@ Return a JSON array with ALL products found across all screenshots.
 Each product should be a JSON object with title and price at minimum.
 
 DO NOT include products where you cannot read the title or price - skip them instead of making up data."""
-            
-            # Step 9: Call Gemini Vision
-            image_parts = []
-            for screenshot_bytes in screenshots:
-                image = Image.open(io.BytesIO(screenshot_bytes))
-                
-                # Resize if exceeds Gemini's WebP limit
-                max_height = 16000
-                if image.height > max_height:
-                    scale_factor = max_height / image.height
-                    new_width = int(image.width * scale_factor)
-                    logger.info(f"📐 Resizing from {image.width}x{image.height} to {new_width}x{max_height}")
-                    image = image.resize((new_width, max_height), Image.Resampling.LANCZOS)
-                
-                image_parts.append(image)
-            
-            model = genai.GenerativeModel('gemini-2.0-flash-exp')
-            response = model.generate_content([full_prompt] + image_parts)
-            
-            # Parse Gemini response (robust JSON extraction - matches old system)
-            extraction_result = None
-            if response and hasattr(response, 'text'):
-                content = response.text
-                
-                # Strategy 1: Try to find JSON using regex (old system approach)
-                json_pattern = r"```json\s*([\s\S]*?)\s*```|```\s*([\s\S]*?)\s*```|(\{[\s\S]*\}|\[[\s\S]*\])"
-                json_match = re.search(json_pattern, content)
-                
-                if json_match:
-                    # Get the first non-None group
-                    json_str = next((g for g in json_match.groups() if g is not None), None)
-                    
-                    if json_str:
-                        try:
-                            extraction_result = json.loads(json_str)
-                        except json.JSONDecodeError as e:
-                            # Strategy 2: Try to find just the first valid JSON structure
-                            logger.debug(f"Initial parse failed: {e}, trying to find valid JSON")
-                            
-                            # Find start of JSON ([ or {)
-                            for start_char in ['[', '{']:
-                                idx = json_str.find(start_char)
-                                if idx != -1:
-                                    try:
-                                        # Use JSONDecoder to parse and find where valid JSON ends
-                                        decoder = json.JSONDecoder()
-                                        result, end_idx = decoder.raw_decode(json_str, idx)
-                                        extraction_result = result
-                                        break
-                                    except json.JSONDecodeError:
-                                        continue
-            
-            processing_time = time.time() - start_time
-            
-            if not extraction_result:
-                logger.warning("⚠️ Failed to extract catalog products")
-                return {
-                    'success': False,
-                    'products': [],
-                    'total_found': 0,
-                    'method_used': 'patchright_gemini',
-                    'processing_time': processing_time,
-                    'warnings': ['Failed to parse Gemini response'],
-                    'errors': ['Could not extract product array']
-                }
-            
-            # Extract products array
-            products = []
-            if isinstance(extraction_result, dict):
-                if 'products' in extraction_result:
-                    products = extraction_result['products']
-                elif 'data' in extraction_result and isinstance(extraction_result['data'], list):
-                    products = extraction_result['data']
-            elif isinstance(extraction_result, list):
-                products = extraction_result
-            
-            if not isinstance(products, list):
-                return {
-                    'success': False,
-                    'products': [],
-                    'total_found': 0,
-                    'method_used': 'patchright_gemini',
-                    'processing_time': processing_time,
-                    'warnings': [f'Expected array, got {type(products)}'],
-                    'errors': ['Not in array format']
-                }
-            
-            logger.info(f"✅ Gemini extracted {len(products)} products visually")
-            
-            # Step 10: DOM extracts URLs + validates
-            logger.info("🔗 Step 2: DOM extracting URLs and validating...")
-            dom_product_links = await self._extract_catalog_product_links_from_dom(retailer, strategy)
-            logger.info(f"✅ DOM found {len(dom_product_links)} product URLs")
-            
-            # NEW: Validate extraction quality BEFORE merge
-            validation_result = self._validate_extraction_quality(
-                gemini_products=products,
-                dom_product_links=dom_product_links,
-                retailer=retailer
-            )
-            
-            # Log validation results
-            logger.info(f"📊 Extraction Ratio: {validation_result['extraction_ratio']:.1%} "
-                       f"(Gemini: {validation_result['gemini_count']}, DOM: {validation_result['dom_count']})")
-            
-            # If extraction is critically bad, trigger DOM-first mode
-            if not validation_result['valid']:
-                logger.warning("⚠️ Extraction validation failed, considering DOM-first fallback...")
-                # The existing DOM-first logic will handle this below
-            
-            # Step 11: DOM-first override for tall pages or when Gemini extraction is poor
-            use_dom_first = False
-            dom_first_reason = None
-            
-            # Check if retailer is configured for DOM-first mode
-            if strategy.get('catalog_mode') == 'dom_first':
-                use_dom_first = True
-                dom_first_reason = 'retailer_configured_dom_first'
-            
-            # Anthropologie: Screenshot too tall/compressed
-            elif retailer.lower() == 'anthropologie' and len(dom_product_links) > len(products) * 2:
-                use_dom_first = True
-                dom_first_reason = 'screenshot_too_tall'
-            
-            # Nordstrom: Gemini fails to extract prices (ads mixed in)
-            elif retailer.lower() == 'nordstrom':
-                products_with_price = sum(1 for p in products if p.get('price') and p.get('price') != 0)
-                if products_with_price < len(products) * 0.5:  # Less than 50% have prices
-                    use_dom_first = True
-                    dom_first_reason = 'gemini_price_extraction_failed'
-            
-            if use_dom_first:
-                logger.info(f"🔄 DOM-FIRST MODE: Using DOM URLs (Gemini only found {len(products)}/{len(dom_product_links)})")
-                logger.info(f"   Reason: {dom_first_reason}")
+        
+        # Step 9: Call Gemini Vision
+        image_parts = []
+        for screenshot_bytes in screenshots:
+            image = Image.open(io.BytesIO(screenshot_bytes))
+            
+            # Resize if exceeds Gemini's WebP limit
+            max_height = 16000
+            if image.height > max_height:
+                scale_factor = max_height / image.height
+                new_width = int(image.width * scale_factor)
+                logger.info(f"📐 Resizing from {image.width}x{image.height} to {new_width}x{max_height}")
+                image = image.resize((new_width, max_height), Image.Resampling.LANCZOS)
+            
+            image_parts.append(image)
+        
+        model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        response = model.generate_content([full_prompt] + image_parts)
+        
+        # Parse Gemini response (robust JSON extraction - matches old system)
+        extraction_result = None
+        if response and hasattr(response, 'text'):
+            content = response.text
+            
+            # Strategy 1: Try to find JSON using regex (old system approach)
+            json_pattern = r"```json\s*([\s\S]*?)\s*```|```\s*([\s\S]*?)\s*```|(\{[\s\S]*\}|\[[\s\S]*\])"
+            json_match = re.search(json_pattern, content)
+            
+            if json_match:
+                # Get the first non-None group
+                json_str = next((g for g in json_match.groups() if g is not None), None)
                 
-                merged_products = []
-                for link_data in dom_product_links:
-                    merged_products.append({
-                        'url': link_data['url'],
-                        'product_code': link_data.get('product_code', ''),
-                        'title': link_data.get('dom_title', 'Unknown Product'),
-                        'price': self._parse_price_from_text(link_data.get('dom_price', '')) if link_data.get('dom_price') else 0,
-                        'image_url': link_data.get('image_url'),
-                        'sale_status': 'unknown',
-                        'extraction_source': 'dom_only'
-                    })
-                validation_stats = {'dom_only_mode': True, 'reason': dom_first_reason}
-                logger.info(f"✅ Using all {len(merged_products)} DOM-extracted products")
-            else:
-                # Step 12: Normal merge - DOM URLs + Gemini visual data
-                logger.info("🔗 Step 3: Merging DOM URLs with Gemini visual data...")
-                merged_products, validation_stats = self._merge_catalog_dom_with_gemini(
-                    dom_product_links, products, retailer
-                )
-                logger.info(f"✅ Merged: {len(merged_products)} products with complete data")
-            
-            products = merged_products
-            
-            logger.info(f"✅ Patchright catalog extraction successful: {len(products)} products")
-            
-            return {
-                'success': True,
-                'products': products,
-                'total_found': len(products),
-                'method_used': 'patchright_catalog_gemini_dom_hybrid',
-                'processing_time': processing_time,
-                'validation_stats': validation_stats,
-                'warnings': [],
-                'errors': []
+                if json_str:
+                    try:
+                        extraction_result = json.loads(json_str)
+                    except json.JSONDecodeError as e:
+                        # Strategy 2: Try to find just the first valid JSON structure
+                        logger.debug(f"Initial parse failed: {e}, trying to find valid JSON")
+                        
+                        # Find start of JSON ([ or {)
+                        for start_char in ['[', '{']:
+                            idx = json_str.find(start_char)
+                            if idx != -1:
+                                try:
+                                    # Use JSONDecoder to parse and find where valid JSON ends
+                                    decoder = json.JSONDecoder()
+                                    result, end_idx = decoder.raw_decode(json_str, idx)
+                                    extraction_result = result
+                                    break
+                                except json.JSONDecodeError:
+                                    continue
+        
+        if not extraction_result:
+            logger.warning("⚠️ Failed to extract catalog products")
+            return None, {
+                'warnings': ['Failed to parse Gemini response'],
+                'errors': ['Could not extract product array']
             }
-            
-        except Exception as e:
-            processing_time = time.time() - start_time
-            logger.error(f"Patchright catalog extraction error: {e}")
-            return {
-                'success': False,
-                'products': [],
-                'total_found': 0,
-                'method_used': 'patchright_error',
-                'processing_time': processing_time,
-                'warnings': [],
-                'errors': [str(e)]
+        
+        # Extract products array
+        products = []
+        if isinstance(extraction_result, dict):
+            if 'products' in extraction_result:
+                products = extraction_result['products']
+            elif 'data' in extraction_result and isinstance(extraction_result['data'], list):
+                products = extraction_result['data']
+        elif isinstance(extraction_result, list):
+            products = extraction_result
+        
+        if not isinstance(products, list):
+            return None, {
+                'warnings': [f'Expected array, got {type(products)}'],
+                'errors': ['Not in array format']
             }
+        
+        return products, None
+    
+    def _dom_only_catalog_products(self, dom_product_links: List[Dict]) -> List[Dict]:
+        """Catalog products built from DOM data alone (DOM-first mode)"""
+        return [
+            {
+                'url': link_data['url'],
+                'product_code': link_data.get('product_code', ''),
+                'title': link_data.get('dom_title', 'Unknown Product'),
+                'price': self._parse_price_from_text(link_data.get('dom_price', '')) if link_data.get('dom_price') else 0,
+                'image_url': link_data.get('image_url'),
+                'sale_status': 'unknown',
+                'extraction_source': 'dom_only'
+            }
+            for link_data in dom_product_links
+        ]
+    
+    def _combine_catalog_products(
+        self,
+        products: List[Dict],
+        dom_product_links: List[Dict],
+        retailer: str,
+        strategy: Dict
+    ) -> Tuple[List[Dict], Dict]:
+        """
+        Validate Gemini output against the DOM, then either use DOM products
+        alone (DOM-first) or merge DOM URLs with Gemini visual data
+        
+        Returns:
+            (products, validation_stats)
+        """
+        # NEW: Validate extraction quality BEFORE merge
+        validation_result = self._validate_extraction_quality(
+            gemini_products=products,
+            dom_product_links=dom_product_links,
+            retailer=retailer
+        )
+        
+        # Log validation results
+        logger.info(f"📊 Extraction Ratio: {validation_result['extraction_ratio']:.1%} "
+                   f"(Gemini: {validation_result['gemini_count']}, DOM: {validation_result['dom_count']})")
+        
+        # If extraction is critically bad, trigger DOM-first mode
+        if not validation_result['valid']:
+            logger.warning("⚠️ Extraction validation failed, considering DOM-first fallback...")
+            # The existing DOM-first logic will handle this below
+        
+        # Step 11: DOM-first override for tall pages or when Gemini extraction is poor
+        use_dom_first = False
+        dom_first_reason = None
+        
+        # Check if retailer is configured for DOM-first mode
+        if strategy.get('catalog_mode') == 'dom_first':
+            use_dom_first = True
+            dom_first_reason = 'retailer_configured_dom_first'
+        
+        # Anthropologie: Screenshot too tall/compressed
+        elif retailer.lower() == 'anthropologie' and len(dom_product_links) > len(products) * 2:
+            use_dom_first = True
+            dom_first_reason = 'screenshot_too_tall'
+        
+        # Nordstrom: Gemini fails to extract prices (ads mixed in)
+        elif retailer.lower() == 'nordstrom':
+            products_with_price = sum(1 for p in products if p.get('price') and p.get('price') != 0)
+            if products_with_price < len(products) * 0.5:  # Less than 50% have prices
+                use_dom_first = True
+                dom_first_reason = 'gemini_price_extraction_failed'
+        
+        if use_dom_first:
+            logger.info(f"🔄 DOM-FIRST MODE: Using DOM URLs (Gemini only found {len(products)}/{len(dom_product_links)})")
+            logger.info(f"   Reason: {dom_first_reason}")
             
-        finally:
-            await self._cleanup()
+            merged_products = self._dom_only_catalog_products(dom_product_links)
+            validation_stats = {'dom_only_mode': True, 'reason': dom_first_reason}
+            logger.info(f"✅ Using all {len(merged_products)} DOM-extracted products")
+        else:
+            # Step 12: Normal merge - DOM URLs + Gemini visual data
+            logger.info("🔗 Step 3: Merging DOM URLs with Gemini visual data...")
+            merged_products, validation_stats = self._merge_catalog_dom_with_gemini(
+                dom_product_links, products, retailer
+            )
+            logger.info(f"✅ Merged: {len(merged_products)} products with complete data")
+        
+        return merged_products, validation_stats
     
     async def _setup_stealth_browser(self, retailer: str = None):
         """Setup Patchright stealth browser with retailer-specific settings"""
@@ -550,6 +670,14 @@ DO NOT include products where you cannot read the title or price - skip them ins
             
             self.page = self.context.pages[0] if self.context.pages else await self.context.new_page()
             
+            # Block media/fonts/trackers per retailer profile (anti-bot resources always allowed)
+            self.request_router = None
+            if ENABLE_REQUEST_ROUTING and retailer:
+                self.request_router = PatchrightRequestRouter(
+                    retailer, self.strategies.get_routing_profile(retailer)
+                )
+                await self.request_router.install(self.context)
+            
             # Inject stealth scripts if enhancements enabled
             if ENABLE_ANTI_SCRAPING_ENHANCEMENTS:
                 await self._inject_stealth_scripts(self.page)
@@ -634,6 +762,85 @@ DO NOT include products where you cannot read the title or price - skip them ins
         
         return delay
     
+    async def _legacy_wait_for_page_ready(self, retailer: str, strategy: Dict, verification_strategy: Dict):
+        """Original fixed sleeps + polling (ENABLE_READINESS_ENGINE = False)"""
+        # Step 4: Wait for page to fully render
+        logger.info("⏱️ Waiting for page to fully render...")
+        
+        try:
+            await self.page.wait_for_load_state('networkidle', timeout=15000)
+            logger.info("✅ Page network idle")
+        except:
+            logger.info("⏱️ Network still active, continuing...")
+        
+        await asyncio.sleep(self._safe_delay(10.0, 0.2, 8.0))
+        logger.debug("⏱️ Pre-detection delay: varied timing")
+        
+        # Step 5: Retailer-specific extended waits
+        # For Aritzia specifically
+        if retailer.lower() == 'aritzia':
+            logger.info("⏱️ Starting Aritzia product detection (polling mode)")
+            
+            max_attempts = 30
+            attempt = 0
+            products_found = False
+            
+            selectors_to_try = [
+                'a[href*="/product/"]',
+                'a[class*="ProductCard"]',
+                '[data-product-id]'
+            ]
+            
+            while attempt < max_attempts and not products_found:
+                attempt += 1
+                
+                for selector in selectors_to_try:
+                    try:
+                        elements = await self.page.query_selector_all(selector)
+                        if len(elements) > 0:
+                            logger.info(f"✅ Found {len(elements)} products with selector '{selector}' after {attempt} seconds")
+                            products_found = True
+                            break
+                    except:
+                        continue
+                
+                if not products_found:
+                    # DO NOT CHANGE - Aritzia polling interval (detection logic)
+                    await asyncio.sleep(1)
+            
+            if not products_found:
+                logger.warning(f"⚠️ No products detected after {max_attempts} seconds")
+        elif 'cloudflare' in verification_strategy.get('special_notes', '').lower():
+            logger.info("🔍 Cloudflare detected - extended wait...")
+            await asyncio.sleep(15)
+            
+            # Scroll to trigger lazy loading
+            logger.info("📜 Scrolling to trigger product loading...")
+            await self.page.evaluate("window.scrollTo(0, 1000)")
+            await asyncio.sleep(2)
+            await self.page.evaluate("window.scrollTo(0, 0)")
+            await asyncio.sleep(2)
+            
+            # Wait for product elements
+            product_selectors = strategy.get('product_selectors', [])
+            if product_selectors:
+                selector_str = ', '.join(product_selectors)
+                try:
+                    await self.page.wait_for_selector(
+                        selector_str,
+                        timeout=30000,
+                        state='attached'
+                    )
+                    logger.info("✅ Product elements found")
+                    await asyncio.sleep(3)
+                except Exception as e:
+                    logger.warning(f"⚠️ Products not found: {e}")
+        
+        # Step 6: Try to detect products with learned patterns
+        await self._wait_for_products(retailer, strategy)
+        
+        await asyncio.sleep(2)
+    
     async def _wait_for_products(self, retailer: str, strategy: Dict):
         """Wait for products to appear using learned patterns + common selectors"""
         selectors_to_try = []
@@ -687,6 +894,11 @@ DO NOT include products where you cannot read the title or price - skip them ins
             if retailer.lower() == 'anthropologie':
                 return await self._extract_anthropologie_from_containers(retailer, strategy)
             
+            if ENABLE_BULK_DOM_HARVEST:
+                harvested = await self._harvest_catalog_links_bulk(retailer, strategy)
+                if harvested:
+                    return harvested
+            
             # Get selectors from strategy
             selectors = strategy.get('product_selectors', [])
             
@@ -897,6 +1109,112 @@ DO NOT include products where you cannot read the title or price - skip them ins
             logger.error(f"DOM extraction failed: {e}")
             return []
     
+    # Generic link/container patterns (order matters - more specific first!)
+    COMMON_LINK_SELECTORS = [
+        'a[href*="/s/"]',  # Nordstrom-specific pattern
+        'a[data-testid="product-card-link"]',
+        'a[href*="/product"]', 'a[href*="/p/"]', 'a[href*="/dp/"]',
+        '.product-card a', '.product-item a', '[data-product-id]',
+        'a.product-link', 'a.product-tile', 'a[data-product-url]',
+        'a[href*="/shop/"]', 'a[href*="/item/"]'
+    ]
+    
+    COMMON_CONTAINER_SELECTORS = [
+        '#plp-prod-list',  # Revolve
+        '.products-grid',  # Revolve, Anthropologie
+        '#product-search-results',  # Common
+        '[data-testid="product-results"]',  # Common
+        'main',  # Fallback
+    ]
+    
+    async def _harvest_catalog_links_bulk(self, retailer: str, strategy: Dict) -> List[Dict]:
+        """
+        Link-first DOM extraction in one page.evaluate
+        
+        Ships the retailer's dom_extraction config (title/price selectors,
+        parent levels) into the page and gets every link back with its
+        title, price and image. Returns [] if the harvest fails or finds
+        nothing, so the per-element path can run instead.
+        """
+        harvester = PatchrightDOMHarvester(self.page)
+        link_selectors = list(strategy.get('product_selectors', [])) + self.COMMON_LINK_SELECTORS
+        
+        result = await harvester.harvest_catalog_links(
+            link_selectors=link_selectors,
+            container_selectors=self.COMMON_CONTAINER_SELECTORS,
+            dom_config=strategy.get('dom_extraction', {}),
+            limit=100
+        )
+        if not result or not result.get('items'):
+            return []
+        
+        logger.info(f"✅ Found {result['total']} links with: {result['selector']}")
+        
+        product_links = []
+        for idx, item in enumerate(result['items']):
+            product_links.append({
+                'url': item['url'].split('?')[0],
+                'product_code': self._extract_product_code_from_url(item['url'], retailer),
+                'position': idx + 1,
+                'dom_title': item.get('title'),
+                'dom_price': item.get('price'),
+                'image_url': item.get('image')
+            })
+        
+        deduped_links = self._dedupe_links(product_links)
+        logger.info(f"⚡ Bulk DOM harvest: {len(deduped_links)} URLs in {harvester.last_harvest_ms:.0f}ms")
+        return deduped_links
+    
+    async def _harvest_containers_bulk(
+        self,
+        retailer: str,
+        limit: int,
+        **container_config
+    ) -> List[Dict]:
+        """Container-first DOM extraction in one page.evaluate ([] on failure)"""
+        harvester = PatchrightDOMHarvester(self.page)
+        result = await harvester.harvest_containers(limit=limit, **container_config)
+        if not result or not result.get('items'):
+            return []
+        
+        logger.info(f"Found {result['total']} {retailer} product containers")
+        
+        product_links = []
+        for idx, item in enumerate(result['items'], 1):
+            url = item.get('url')
+            if not url or not url.startswith('http'):
+                continue
+            url = url.split('?')[0]
+            product_links.append({
+                'url': url,
+                'product_code': self._extract_product_code_from_url(url, retailer),
+                'position': idx,
+                'dom_title': item.get('title'),
+                'dom_price': item.get('price'),
+                'image_url': item.get('image')
+            })
+        
+        with_titles = sum(1 for p in product_links if p.get('dom_title'))
+        with_prices = sum(1 for p in product_links if p.get('dom_price'))
+        logger.info(f"⚡ Bulk DOM harvest: {len(product_links)} products in {harvester.last_harvest_ms:.0f}ms")
+        logger.info(f"   📊 {with_titles}/{len(product_links)} have titles, {with_prices}/{len(product_links)} have prices")
+        
+        return self._dedupe_links(product_links)
+    
+    def _dedupe_links(self, product_links: List[Dict]) -> List[Dict]:
+        """Deduplicate by URL (keep first occurrence)"""
+        seen_urls = set()
+        deduped_links = []
+        for link in product_links:
+            if link['url'] not in seen_urls:
+                seen_urls.add(link['url'])
+                deduped_links.append(link)
+        
+        if len(deduped_links) < len(product_links):
+            logger.info(f"🧹 Deduplicated: {len(product_links)} → {len(deduped_links)} unique URLs")
+        
+        return deduped_links
+    
     def _validate_extraction_quality(
         self,
         gemini_products: List[Dict],
@@ -1245,6 +1563,30 @@ DO NOT include products where you cannot read the title or price - skip them ins
         Specialized extraction for Anthropologie - extract from product containers directly
         Anthropologie uses PWA structure with .o-pwa-product-tile for each product
         """
+        if ENABLE_BULK_DOM_HARVEST:
+            harvested = await self._harvest_containers_bulk(
+                retailer,
+                limit=150,
+                container_selector='.o-pwa-product-tile',
+                link_selector='a[href*="/shop/"]',
+                title_selectors=['.o-pwa-product-tile__heading', 'img[alt]', 'a[aria-label]'],
+                price_selectors=[
+                    '.c-pwa-product-price__current',  # Anthropologie PWA
+                    '.s-pwa-product-price__current',  # Anthropologie PWA alternative
+                    'span[data-testid*="price"]',
+                    '[data-testid*="price"]',
+                    'span[class*="price"]',
+                    'span[class*="Price"]',
+                    'div[class*="price"]',
+                    '[aria-label*="price"]',
+                    'span[itemprop="price"]'
+                ],
+                price_range=(10, 5000),
+                title_min_length=5
+            )
+            if harvested:
+                return harvested
+        
         product_links = []
         
         try:
@@ -1375,6 +1717,20 @@ DO NOT include products where you cannot read the title or price - skip them ins
         Specialized extraction for Revolve - extract from product containers directly
         This avoids the parent traversal issue where we hit the entire page
         """
+        if ENABLE_BULK_DOM_HARVEST:
+            harvested = await self._harvest_containers_bulk(
+                retailer,
+                limit=100,
+                container_selector='li.plp__product',
+                link_selector='a[href*="/dp/"]',
+                title_selectors=['img[alt]'],
+                title_exclude='revolve',
+                price_from_text=True,
+                price_range=(15, 2000)
+            )
+            if harvested:
+                return harvested
+        
         product_links = []
         
         try:
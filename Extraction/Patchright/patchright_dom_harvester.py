@@ -0,0 +1,320 @@
+"""
+Patchright Tower - Bulk DOM Harvester
+Harvest catalog links, titles, prices and images in one page.evaluate call
+
+Per-handle extraction (query_selector → get_attribute → evaluate_handle for
+every link and parent level) costs thousands of CDP round trips per catalog
+page. The harvesters here ship the retailer's dom_extraction config into the
+page once and get every product back as a single JSON array.
+
+Callers keep the per-handle path as a fallback: every harvester returns None
+if the evaluate call fails.
+"""
+
+# Add shared path for imports
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../Shared"))
+
+import time
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Shared helpers injected into every harvest script
+_JS_HELPERS = r"""
+    const clean = (s) => (s || '').replace(/\s+/g, ' ').trim();
+
+    const absolute = (href) => {
+        if (!href) return null;
+        try { return new URL(href, location.href).href; } catch (e) { return null; }
+    };
+
+    const imageOf = (root) => {
+        const img = root.querySelector('img');
+        if (!img) return null;
+        return absolute(img.currentSrc || img.getAttribute('src') || img.dataset.src || img.dataset.original);
+    };
+
+    // Same rules as the per-handle path: $-prefixed amount in a short line,
+    // else a bare 2-4 digit number inside [minPrice, maxPrice]
+    const priceFromLines = (text, minPrice, maxPrice, allowBareNumbers) => {
+        const lines = (text || '').split('\n').map(l => l.trim()).filter(Boolean);
+        for (const line of lines) {
+            if (line.includes('$') && line.length < 30) {
+                const m = line.match(/\$\s*(\d+\.?\d*)/);
+                if (m) {
+                    const value = parseFloat(m[1]);
+                    if (value >= minPrice && value <= maxPrice) return '$' + m[1];
+                }
+            }
+        }
+        if (!allowBareNumbers) return null;
+        for (const line of lines) {
+            if (/^\$?\d{2,4}\.?\d{0,2}$/.test(line)) {
+                const m = line.match(/(\d+\.?\d*)/);
+                const value = m ? parseFloat(m[1]) : 0;
+                if (value >= 20 && value <= 9999) {
+                    return m[1].includes('.') ? '$' + value.toFixed(2) : '$' + Math.trunc(value);
+                }
+            }
+        }
+        return null;
+    };
+
+    const titleFrom = (root, selectors, minLength, exclude, useTextContent) => {
+        for (const sel of selectors) {
+            let el;
+            try { el = root.querySelector(sel); } catch (e) { continue; }
+            if (!el) continue;
+            let text;
+            if (sel === 'img[alt]') text = el.getAttribute('alt');
+            else if (sel === 'a[aria-label]') text = el.getAttribute('aria-label');
+            else text = useTextContent ? el.textContent : el.innerText;
+            text = clean(text);
+            if (text.length > minLength && !(exclude && text.toLowerCase().includes(exclude))) return text;
+        }
+        return null;
+    };
+"""
+
+
+# Link-first harvesting (generic catalog path)
+CATALOG_LINKS_JS = "(config) => {" + _JS_HELPERS + r"""
+    let scope = document;
+    for (const sel of config.container_selectors) {
+        let el;
+        try { el = document.querySelector(sel); } catch (e) { continue; }
+        if (el) { scope = el; break; }
+    }
+
+    for (const selector of config.link_selectors) {
+        let links;
+        try { links = scope.querySelectorAll(selector); } catch (e) { continue; }
+        if (!links.length) continue;
+
+        const results = [];
+        const slice = Array.prototype.slice.call(links, 0, config.limit);
+        for (const link of slice) {
+            const href = absolute(link.getAttribute('href') || link.href);
+            if (!href || !href.startsWith('http')) continue;
+
+            let title = null, price = null, image = null;
+            let parent = link;
+            for (let level = 0; level < config.max_parent_levels; level++) {
+                parent = parent.parentElement;
+                if (!parent) break;
+
+                // Nearest ancestor wins for each field
+                if (!title) title = titleFrom(parent, config.title_selectors, 5, 'revolve', false);
+                if (!image) image = imageOf(parent);
+
+                if (!price) {
+                    for (const sel of config.price_selectors) {
+                        let el;
+                        try { el = parent.querySelector(sel); } catch (e) { continue; }
+                        if (el) {
+                            const text = clean(el.innerText);
+                            if (text.includes('$')) { price = text; break; }
+                        }
+                    }
+                }
+                if (!price) price = priceFromLines(parent.innerText, 0, Infinity, true);
+                if (!price) {
+                    const candidates = Array.prototype.slice.call(parent.querySelectorAll('span, div, p'), 0, 10);
+                    for (const candidate of candidates) {
+                        const text = clean(candidate.innerText);
+                        if (text.startsWith('$') && text.length < 20) { price = text; break; }
+                    }
+                }
+
+                if (title && price) break;
+            }
+
+            results.push({url: href, title: title, price: price, image: image});
+        }
+        return {selector: selector, total: links.length, items: results};
+    }
+    return {selector: null, total: 0, items: []};
+}"""
+
+
+# Container-first harvesting (Revolve, Anthropologie)
+CONTAINER_JS = "(config) => {" + _JS_HELPERS + r"""
+    const containers = Array.prototype.slice.call(
+        document.querySelectorAll(config.container_selector), 0, config.limit);
+    const results = [];
+
+    for (const container of containers) {
+        const link = container.querySelector(config.link_selector);
+        const href = link ? absolute(link.href || link.getAttribute('href')) : null;
+
+        const title = titleFrom(container, config.title_selectors, config.title_min_length,
+                                config.title_exclude, true);
+
+        let price = null;
+        for (const sel of config.price_selectors) {
+            let el;
+            try { el = container.querySelector(sel); } catch (e) { continue; }
+            if (el && (el.textContent || '').includes('$')) {
+                const m = el.textContent.match(/\$\s*(\d+\.?\d*)/);
+                if (m) {
+                    const value = parseFloat(m[1]);
+                    if (value >= config.price_min && value <= config.price_max) { price = '$' + m[1]; break; }
+                }
+            }
+        }
+        if (!price && config.price_from_text) {
+            price = priceFromLines(container.textContent, config.price_min, config.price_max, false);
+        }
+
+        results.push({url: href, title: title, price: price, image: imageOf(container)});
+    }
+    return {total: document.querySelectorAll(config.container_selector).length, items: results};
+}"""
+
+
+# Image sources per selector, in selector order
+IMAGE_SOURCES_JS = r"""(config) => {
+    const groups = [];
+    for (const selector of config.selectors) {
+        let elements;
+        try { elements = document.querySelectorAll(selector); } catch (e) { groups.push([]); continue; }
+        const sources = [];
+        const slice = Array.prototype.slice.call(elements, 0, config.per_selector_limit);
+        for (const el of slice) {
+            const src = config.use_property
+                ? (el.src || el.dataset.src || el.dataset.original)
+                : (el.getAttribute('src') || el.getAttribute('data-src') || el.getAttribute('data-original'));
+            if (src) sources.push(src);
+        }
+        groups.push(sources);
+    }
+    return {origin: location.origin, groups: groups};
+}"""
+
+
+class PatchrightDOMHarvester:
+    """
+    Single round-trip DOM harvesting for Patchright pages
+
+    Provides:
+    - Link-first catalog harvesting driven by the retailer's dom_extraction config
+    - Container-first harvesting (one product card per container)
+    - Image source harvesting for a selector list
+
+    Every method returns None when page.evaluate fails so callers can fall
+    back to per-handle extraction.
+    """
+
+    DEFAULT_TITLE_SELECTORS = ['.title', '.product-title', 'img[alt]', 'h2', 'h3']
+    DEFAULT_PRICE_SELECTORS = ['.price', '.product-price', '[data-testid*="price"]']
+
+    def __init__(self, page):
+        """
+        Args:
+            page: Patchright Page object
+        """
+        self.page = page
+        self.last_harvest_ms = 0.0
+
+    async def harvest_catalog_links(
+        self,
+        link_selectors: List[str],
+        container_selectors: List[str],
+        dom_config: Dict,
+        limit: int = 100
+    ) -> Optional[Dict]:
+        """
+        Harvest product links with title/price/image from their ancestors
+
+        Args:
+            link_selectors: Link selectors in priority order (first match wins)
+            container_selectors: Grid containers to scope the search to
+            dom_config: Retailer dom_extraction config
+            limit: Max links from the matching selector
+
+        Returns:
+            {selector, total, items: [{url, title, price, image}]} or None
+        """
+        config = {
+            'link_selectors': link_selectors,
+            'container_selectors': container_selectors,
+            'title_selectors': dom_config.get('title_selectors', self.DEFAULT_TITLE_SELECTORS),
+            'price_selectors': dom_config.get('price_selectors', self.DEFAULT_PRICE_SELECTORS),
+            'max_parent_levels': dom_config.get('max_parent_levels', 3),
+            'limit': limit
+        }
+        return await self._evaluate(CATALOG_LINKS_JS, config)
+
+    async def harvest_containers(
+        self,
+        container_selector: str,
+        link_selector: str,
+        title_selectors: List[str],
+        price_selectors: List[str] = None,
+        price_from_text: bool = False,
+        price_range: tuple = (0, 99999),
+        title_min_length: int = 0,
+        title_exclude: str = None,
+        limit: int = 100
+    ) -> Optional[Dict]:
+        """
+        Harvest one product per container element
+
+        Returns:
+            {total, items: [{url, title, price, image}]} or None
+        """
+        config = {
+            'container_selector': container_selector,
+            'link_selector': link_selector,
+            'title_selectors': title_selectors,
+            'title_min_length': title_min_length,
+            'title_exclude': title_exclude,
+            'price_selectors': price_selectors or [],
+            'price_from_text': price_from_text,
+            'price_min': price_range[0],
+            'price_max': price_range[1],
+            'limit': limit
+        }
+        return await self._evaluate(CONTAINER_JS, config)
+
+    async def harvest_image_sources(
+        self,
+        selectors: List[str],
+        per_selector_limit: int = 50,
+        use_property: bool = False
+    ) -> Optional[Dict]:
+        """
+        Raw image sources for each selector
+
+        Args:
+            selectors: Image selectors in priority order
+            per_selector_limit: Max elements read per selector
+            use_property: Read el.src/dataset (resolved) instead of attributes
+
+        Returns:
+            {origin, groups: [[src, ...] per selector]} or None
+        """
+        config = {
+            'selectors': selectors,
+            'per_selector_limit': per_selector_limit,
+            'use_property': use_property
+        }
+        return await self._evaluate(IMAGE_SOURCES_JS, config)
+
+    async def _evaluate(self, script: str, config: Dict) -> Optional[Dict]:
+        start = time.perf_counter()
+        try:
+            result = await self.page.evaluate(script, config)
+        except Exception as e:
+            logger.debug(f"Bulk DOM harvest failed, falling back to per-element extraction: {e}")
+            return None
+        finally:
+            self.last_harvest_ms = (time.perf_counter() - start) * 1000
+
+        if not isinstance(result, dict):
+            return None
+        return result
@@ -16,6 +16,8 @@ from typing import List, Dict, Optional
 from difflib import SequenceMatcher
 import logging
 
+from patchright_dom_harvester import PatchrightDOMHarvester
+
 logger = logging.getLogger(__name__)
 
 
@@ -277,6 +279,23 @@ class PatchrightDOMValidator:
         
         images = []
         
+        # Single round trip: every selector's sources in one evaluate
+        harvested = await PatchrightDOMHarvester(self.page).harvest_image_sources(
+            image_selectors, per_selector_limit=20, use_property=True
+        )
+        if harvested is not None:
+            for sources in harvested['groups']:
+                for src in sources:
+                    src = self._absolute_image_url(src, harvested['origin'])
+                    if src and src not in images:
+                        images.append(src)
+                
+                # Continue searching if we have < 3 images (want multiple product images)
+                if len(images) >= 3:
+                    break
+            
+            image_selectors = []  # Harvested - skip per-element fallback
+        
         for selector in image_selectors:
             try:
                 elements = await self.page.query_selector_all(selector)
@@ -374,6 +393,21 @@ class PatchrightDOMValidator:
             selectors = image_selectors.get(self.retailer, []) + generic_selectors
             image_urls = []
             
+            # Single round trip: every selector's sources in one evaluate
+            harvested = await PatchrightDOMHarvester(self.page).harvest_image_sources(selectors)
+            if harvested is not None:
+                for sources in harvested['groups']:
+                    for src in sources:
+                        src = self._absolute_image_url(src, harvested['origin'])
+                        if src and src not in image_urls:
+                            image_urls.append(src)
+                    
+                    # Stop if we have enough
+                    if len(image_urls) >= 10:
+                        break
+                
+                selectors = []  # Harvested - skip per-element fallback
+            
             for selector in selectors:
                 try:
                     elements = await self.page.query_selector_all(selector)
@@ -415,6 +449,16 @@ class PatchrightDOMValidator:
             logger.error(f"Image extraction failed: {e}")
             return []
     
+    def _absolute_image_url(self, src: str, origin: str) -> Optional[str]:
+        """Validate and absolutize a harvested image source (None if rejected)"""
+        if not src or not self.is_valid_product_image_url(src):
+            return None
+        if src.startswith('//'):
+            return 'https:' + src
+        if src.startswith('/'):
+            return origin + src
+        return src
+    
     def is_valid_product_image_url(self, url: str) -> bool:
         """Check if URL is likely a valid product image"""
         if not url or len(url) < 10:
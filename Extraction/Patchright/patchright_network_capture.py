@@ -0,0 +1,377 @@
+"""
+Patchright Tower - Network Capture
+Capture product JSON from XHR/fetch responses during navigation
+
+Many retailers (Nordstrom, Aritzia, Abercrombie) render product pages from
+structured JSON APIs. Listening to page responses for the retailer's API URL
+patterns gives title, price, images, sizes and colors without a screenshot
+or a Gemini Vision call. Config comes from
+PatchrightRetailerStrategies.get_network_capture_config().
+"""
+
+# Add shared path for imports
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../Shared"))
+
+import asyncio
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PatchrightNetworkCapture:
+    """
+    Collect JSON API responses and parse the page's product out of them
+
+    Process:
+    1. attach() before goto: JSON responses whose URL matches api_patterns
+       are read in the background (size/count capped); detach() when done,
+       since pages are reused across extractions and retries
+    2. extract_product(): walk every captured body for product-like objects
+       (title + price) and keep only those matching the page URL (id/code or
+       slug words); the best-scoring match wins
+    3. Return the standard product dict, or None if nothing convincing was
+       captured (caller falls back to Gemini Vision)
+    """
+
+    TITLE_KEYS = ('name', 'title', 'productName', 'displayName', 'product_name', 'productTitle')
+    PRICE_KEYS = ('price', 'currentPrice', 'salePrice', 'sale_price', 'finalPrice', 'priceValue', 'prices', 'pricing')
+    ORIGINAL_PRICE_KEYS = ('listPrice', 'originalPrice', 'regularPrice', 'original_price', 'wasPrice', 'compareAtPrice')
+    IMAGE_KEYS = ('images', 'imageUrls', 'image_urls', 'media', 'imageGroups', 'gallery', 'image', 'imageUrl', 'assets')
+    SIZE_KEYS = ('sizes', 'size', 'availableSizes', 'sizeOptions')
+    COLOR_KEYS = ('colors', 'colours', 'color', 'colour', 'swatches', 'colorOptions')
+    ID_KEYS = ('id', 'productId', 'product_id', 'styleId', 'styleNumber', 'style_number', 'sku', 'masterId', 'productCode')
+    DESCRIPTION_KEYS = ('description', 'longDescription', 'shortDescription', 'productDescription')
+    AVAILABILITY_KEYS = ('availability', 'inStock', 'in_stock', 'available', 'isAvailable', 'orderable', 'isInStock')
+
+    # Nested price containers (e.g. {"price": {"sales": {"value": 128}, "list": {"value": 148}}})
+    CURRENT_PRICE_SUBKEYS = ('sales', 'sale', 'current', 'value', 'amount', 'min', 'minPrice', 'final', 'price')
+    ORIGINAL_PRICE_SUBKEYS = ('list', 'regular', 'original', 'was', 'max', 'maxPrice')
+
+    IMAGE_URL = re.compile(r'^(https?:)?//[^\s"]+', re.IGNORECASE)
+    IMAGE_HINT = re.compile(r'\.(jpe?g|png|webp|avif)(\?|$)|/image|/images/|/is/image/|/media/', re.IGNORECASE)
+    TAG = re.compile(r'<[^>]+>')
+
+    SLUG_STOPWORDS = {'product', 'products', 'shop', 'html', 'clothing', 'women', 'womens', 'prd', 'productpage'}
+
+    MAX_DEPTH = 10
+    MAX_IMAGES = 20
+
+    def __init__(self, page, retailer: str, config: Dict):
+        """
+        Args:
+            page: Patchright Page object
+            retailer: Retailer name
+            config: Network capture config (api_patterns, max_body_bytes, max_responses)
+        """
+        self.page = page
+        self.retailer = retailer
+        self.api_patterns = [p.lower() for p in config.get('api_patterns', [])]
+        self.max_body_bytes = config.get('max_body_bytes', 2_000_000)
+        self.max_responses = config.get('max_responses', 40)
+        self.drain_timeout = config.get('drain_timeout', 3.0)
+
+        self.bodies: List[Tuple[str, Any]] = []
+        self._pending = set()
+        self.responses_seen = 0
+        self._attached = False
+
+    # =================== CAPTURE ===================
+
+    def attach(self):
+        """Start capturing matching responses (call before goto)"""
+        if self._attached:
+            return
+        self._attached = True
+        self.page.on('response', self._on_response)
+
+    def detach(self):
+        """Stop capturing and cancel body reads still in flight (idempotent)"""
+        if not self._attached:
+            return
+        self._attached = False
+        try:
+            self.page.remove_listener('response', self._on_response)
+        except Exception as e:
+            logger.debug(f"Failed to remove response listener: {e}")
+        for task in list(self._pending):
+            task.cancel()
+        self._pending.clear()
+
+    def _on_response(self, response):
+        try:
+            if len(self.bodies) + len(self._pending) >= self.max_responses:
+                return
+            if response.request.resource_type not in ('xhr', 'fetch'):
+                return
+            url = response.url.lower()
+            if not any(p in url for p in self.api_patterns):
+                return
+            if 'json' not in response.headers.get('content-type', ''):
+                return
+            length = response.headers.get('content-length')
+            if length and length.isdigit() and int(length) > self.max_body_bytes:
+                return
+        except Exception:
+            return
+
+        self.responses_seen += 1
+        task = asyncio.ensure_future(self._read(response))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _read(self, response):
+        try:
+            body = await response.body()
+            if len(body) > self.max_body_bytes:
+                return
+            self.bodies.append((response.url, json.loads(body)))
+        except Exception as e:
+            logger.debug(f"Captured response unreadable ({response.url[:80]}): {e}")
+
+    async def drain(self):
+        """Wait briefly for in-flight body reads"""
+        if self._pending:
+            await asyncio.wait(list(self._pending), timeout=self.drain_timeout)
+
+    # =================== PARSE ===================
+
+    async def extract_product(self, page_url: str, product_code: str = '') -> Optional[Dict]:
+        """
+        Product dict from captured responses
+
+        Args:
+            page_url: Product page URL (slug/code used to pick the right object)
+            product_code: Product code parsed from the URL, if any
+
+        Returns:
+            Dict with ProductData fields, or None
+        """
+        await self.drain()
+        if not self.bodies:
+            return None
+
+        slug_words = self._slug_words(page_url)
+        candidates = []
+        for source_url, body in self.bodies:
+            for node in self._walk(body, 0):
+                product = self._parse_candidate(node)
+                if product:
+                    product['_matches_page'] = self._matches_page(node, product, product_code, slug_words)
+                    product['_source'] = source_url
+                    candidates.append(product)
+
+        if not candidates:
+            logger.debug(f"Network capture: {len(self.bodies)} responses, no product objects")
+            return None
+
+        # Only objects tied to this page (id/code or URL slug); a lone unrelated
+        # object is usually a recommendation or recently-viewed item
+        matching = [c for c in candidates if c['_matches_page']]
+        if not matching:
+            logger.debug(f"Network capture: {len(candidates)} product objects, none match {page_url}")
+            return None
+
+        best = max(matching, key=self._score)
+        logger.info(
+            f"📡 Network capture ({self.retailer}): '{best['title'][:50]}' ${best['price']} "
+            f"from {urlparse(best['_source']).path[:60]}"
+        )
+        best.pop('_matches_page', None)
+        best.pop('_source', None)
+        return best
+
+    def _walk(self, node, depth):
+        """Every dict in the JSON tree (depth-limited)"""
+        if depth > self.MAX_DEPTH:
+            return
+        if isinstance(node, dict):
+            yield node
+            for value in node.values():
+                if isinstance(value, (dict, list)):
+                    yield from self._walk(value, depth + 1)
+        elif isinstance(node, list):
+            for item in node:
+                if isinstance(item, (dict, list)):
+                    yield from self._walk(item, depth + 1)
+
+    def _parse_candidate(self, node: Dict) -> Optional[Dict]:
+        title = self._first_string(node, self.TITLE_KEYS)
+        if not title or not (3 <= len(title) <= 300):
+            return None
+
+        price = None
+        original_price = None
+        for key in self.PRICE_KEYS:
+            if key in node:
+                price, nested_original = self._price_from(node[key])
+                original_price = nested_original
+                if price:
+                    break
+        if not price:
+            return None
+
+        for key in self.ORIGINAL_PRICE_KEYS:
+            if key in node and not original_price:
+                original_price, _ = self._price_from(node[key])
+        if original_price is not None and original_price <= price:
+            original_price = None
+
+        images = []
+        for key in self.IMAGE_KEYS:
+            if key in node:
+                self._collect_images(node[key], images, 0)
+
+        brand = node.get('brand')
+        if isinstance(brand, dict):
+            brand = self._first_string(brand, ('name', 'displayName', 'title'))
+
+        description = self._first_string(node, self.DESCRIPTION_KEYS) or ''
+        description = self.TAG.sub(' ', description)
+        description = re.sub(r'\s+', ' ', description).strip()
+
+        return {
+            'title': title.strip(),
+            'brand': brand.strip() if isinstance(brand, str) else '',
+            'price': price,
+            'original_price': original_price,
+            'sale_status': 'on_sale' if original_price else 'regular',
+            'availability': self._availability(node),
+            'description': description,
+            'sizes': self._option_values(node, self.SIZE_KEYS),
+            'colors': self._option_values(node, self.COLOR_KEYS),
+            'materials': '',
+            'care_instructions': '',
+            'image_urls': images,
+            'product_code': self._first_string(node, self.ID_KEYS) or '',
+            'clothing_type': ''
+        }
+
+    def _first_string(self, node: Dict, keys) -> Optional[str]:
+        for key in keys:
+            value = node.get(key)
+            if isinstance(value, str) and value.strip():
+                return value
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and key in self.ID_KEYS:
+                return str(value)
+        return None
+
+    def _price_from(self, value, depth: int = 0) -> Tuple[Optional[float], Optional[float]]:
+        """(current, original) from a number, "$49.99" string, or nested price object"""
+        if depth > 3 or value is None or isinstance(value, bool):
+            return None, None
+        if isinstance(value, (int, float)):
+            return (float(value), None) if 0 < value < 100000 else (None, None)
+        if isinstance(value, str):
+            match = re.search(r'(\d[\d,]*\.?\d*)', value)
+            if match:
+                try:
+                    number = float(match.group(1).replace(',', ''))
+                    return (number, None) if 0 < number < 100000 else (None, None)
+                except ValueError:
+                    pass
+            return None, None
+        if isinstance(value, list):
+            for item in value:
+                current, original = self._price_from(item, depth + 1)
+                if current:
+                    return current, original
+            return None, None
+        if isinstance(value, dict):
+            current = None
+            original = None
+            for key in self.CURRENT_PRICE_SUBKEYS:
+                if key in value:
+                    current, _ = self._price_from(value[key], depth + 1)
+                    if current:
+                        break
+            for key in self.ORIGINAL_PRICE_SUBKEYS:
+                if key in value:
+                    original, _ = self._price_from(value[key], depth + 1)
+                    if original:
+                        break
+            return current, original
+        return None, None
+
+    def _collect_images(self, value, images: List[str], depth: int):
+        if depth > 4 or len(images) >= self.MAX_IMAGES:
+            return
+        if isinstance(value, str):
+            if self.IMAGE_URL.match(value) and self.IMAGE_HINT.search(value):
+                url = 'https:' + value if value.startswith('//') else value
+                if url not in images:
+                    images.append(url)
+        elif isinstance(value, list):
+            for item in value:
+                self._collect_images(item, images, depth + 1)
+        elif isinstance(value, dict):
+            for key in ('url', 'src', 'href', 'absURL', 'link', 'large', 'zoom', 'main', 'images'):
+                if key in value:
+                    self._collect_images(value[key], images, depth + 1)
+
+    def _option_values(self, node: Dict, keys) -> List[str]:
+        values = []
+        for key in keys:
+            options = node.get(key)
+            if isinstance(options, str):
+                options = [options]
+            if not isinstance(options, list):
+                continue
+            for option in options[:40]:
+                if isinstance(option, dict):
+                    option = self._first_string(option, ('displayValue', 'label', 'name', 'value', 'title'))
+                if isinstance(option, str) and option.strip() and option.strip() not in values:
+                    values.append(option.strip())
+            if values:
+                break
+        return values
+
+    def _availability(self, node: Dict) -> str:
+        for key in self.AVAILABILITY_KEYS:
+            if key not in node:
+                continue
+            value = node[key]
+            if isinstance(value, bool):
+                return 'in_stock' if value else 'out_of_stock'
+            if isinstance(value, str):
+                lower = value.lower()
+                if 'out' in lower or 'sold' in lower or 'unavailable' in lower:
+                    return 'out_of_stock'
+                return 'in_stock'
+            if isinstance(value, dict):
+                in_stock = value.get('inStock', value.get('available'))
+                if isinstance(in_stock, bool):
+                    return 'in_stock' if in_stock else 'out_of_stock'
+        return 'in_stock'
+
+    def _slug_words(self, url: str) -> List[str]:
+        path = urlparse(url).path.lower()
+        return [w for w in re.split(r'[^a-z]+', path) if len(w) > 3 and w not in self.SLUG_STOPWORDS]
+
+    def _matches_page(self, node: Dict, product: Dict, product_code: str, slug_words: List[str]) -> bool:
+        """Object's id or title corresponds to the page URL"""
+        if product_code:
+            code = product_code.lower()
+            for key in self.ID_KEYS:
+                value = node.get(key)
+                if value is not None and str(value).lower() == code:
+                    return True
+        if slug_words:
+            title = product['title'].lower()
+            hits = sum(1 for w in slug_words if w in title)
+            return hits >= max(2, len(slug_words) // 2)
+        return False
+
+    def _score(self, product: Dict) -> int:
+        score = 0
+        score += 3 if product['image_urls'] else 0
+        score += 1 if product['brand'] else 0
+        score += 1 if product['description'] else 0
+        score += 1 if product['sizes'] else 0
+        score += 1 if product['colors'] else 0
+        return score
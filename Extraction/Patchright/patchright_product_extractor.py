@@ -13,7 +13,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "../../Shared"))
 
 import asyncio
 import time
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, field
 from patchright.async_api import async_playwright
 import google.generativeai as genai
@@ -21,9 +21,12 @@ from dotenv import load_dotenv
 import logging
 
 from logger_config import setup_logging
+from tracing import traced
 from patchright_verification import PatchrightVerificationHandler
 from patchright_retailer_strategies import PatchrightRetailerStrategies
+from patchright_request_router import PatchrightRequestRouter
 from patchright_dom_validator import PatchrightDOMValidator
+from patchright_network_capture import PatchrightNetworkCapture
 
 logger = setup_logging(__name__)
 
@@ -33,6 +36,12 @@ ENABLE_ANTI_SCRAPING_ENHANCEMENTS = True
 # If disabled, system falls back to original behavior
 # Use this for emergency rollback if enhancements cause issues
 
+# Per-retailer resource blocking via context.route (False = load everything)
+ENABLE_REQUEST_ROUTING = True
+
+# Read product JSON from API responses; Gemini Vision only if capture yields nothing
+ENABLE_NETWORK_CAPTURE = True
+
 
 @dataclass
 class ProductData:
@@ -75,6 +84,10 @@ class PatchrightProductExtractor:
     4. Merge results (Gemini primary, DOM supplements)
     5. Learn from successful extraction (pattern recording)
     
+    Network capture: when the retailer's product API responses captured
+    during navigation contain title, price and images, they are used
+    directly and the Gemini steps are skipped.
+    
     Key Features:
     - Multi-region screenshots (header, mid, footer)
     - Gemini Vision for visual analysis
@@ -107,6 +120,7 @@ class PatchrightProductExtractor:
         self.browser = None
         self.context = None
         self.page = None
+        self.request_router = None
         
         # Setup Gemini
         self._setup_gemini()
@@ -128,6 +142,7 @@ class PatchrightProductExtractor:
             logger.error(f"Failed to setup Gemini: {e}")
             raise
     
+    @traced('extract')
     async def extract_product(self, url: str, retailer: str) -> ExtractionResult:
         """
         Main extraction method
@@ -147,7 +162,7 @@ class PatchrightProductExtractor:
             await self._setup_stealth_browser(retailer)
             
             # Extract with retry logic
-            result = await self._extract_with_retry(url, retailer)
+            result, method_used = await self._extract_with_retry(url, retailer)
             
             processing_time = time.time() - start_time
             logger.info(f"✅ Patchright extraction completed in {processing_time:.1f}s")
@@ -161,7 +176,7 @@ class PatchrightProductExtractor:
             return ExtractionResult(
                 success=True,
                 data=data_dict,
-                method_used="patchright_gemini_dom_hybrid",
+                method_used=method_used,
                 processing_time=processing_time,
                 warnings=[],
                 errors=[]
@@ -183,8 +198,8 @@ class PatchrightProductExtractor:
         finally:
             await self._cleanup()
     
-    async def _extract_with_retry(self, url: str, retailer: str) -> ProductData:
-        """Extract with retry logic for verification challenges"""
+    async def _extract_with_retry(self, url: str, retailer: str) -> Tuple[ProductData, str]:
+        """Extract with retry logic for verification challenges (returns data, method_used)"""
         last_error = None
         
         for attempt in range(self.max_retries):
@@ -192,11 +207,11 @@ class PatchrightProductExtractor:
                 logger.info(f"🔄 Attempt {attempt + 1}/{self.max_retries}")
                 
                 # Navigate and extract
-                result = await self._navigate_and_extract(url, retailer)
+                result, method_used = await self._navigate_and_extract(url, retailer)
                 
                 if result:
                     logger.info(f"✅ Success on attempt {attempt + 1}")
-                    return result
+                    return result, method_used
                     
             except Exception as e:
                 last_error = e
@@ -212,10 +227,13 @@ class PatchrightProductExtractor:
         
         raise Exception(f"All {self.max_retries} attempts failed. Last: {last_error}")
     
-    async def _navigate_and_extract(self, url: str, retailer: str) -> ProductData:
+    async def _navigate_and_extract(self, url: str, retailer: str) -> Tuple[ProductData, str]:
         """
         Navigate and extract using 5-step Gemini→DOM process
         
+        Returns:
+            (product_data, method_used)
+        
         Steps:
         1. Navigate + handle verification
         2. Take multi-region screenshots
@@ -225,10 +243,12 @@ class PatchrightProductExtractor:
         6. Merge results
         7. Learn from extraction
         """
+        capture = None
         try:
             # Store for URL-based product code extraction fallback
             self._current_url = url
             self._current_retailer = retailer
+            method_used = "patchright_gemini_dom_hybrid"
             
             logger.info(f"🌐 Navigating to: {url}")
             
@@ -236,6 +256,12 @@ class PatchrightProductExtractor:
             strategy = self.strategies.get_strategy(retailer)
             wait_until = strategy.get('wait_strategy', 'domcontentloaded')
             
+            # Capture product API responses from navigation on
+            capture_config = self.strategies.get_network_capture_config(retailer)
+            if ENABLE_NETWORK_CAPTURE and capture_config.get('enabled', True):
+                capture = PatchrightNetworkCapture(self.page, retailer, capture_config)
+                capture.attach()
+            
             try:
                 response = await self.page.goto(url, wait_until=wait_until, timeout=60000)
                 if response and response.status >= 400:
@@ -294,12 +320,37 @@ class PatchrightProductExtractor:
                 await asyncio.sleep(self._safe_delay(2.5, 0.3, 2.0))
                 logger.debug("⏱️ Post-verification delay: varied timing")
             
+            if self.request_router:
+                await self.request_router.record_page_load(self.page, 'product')
+            
             # Step 1.5: Dismiss any late-appearing popups (NEW: prevents popups from obscuring product content)
             logger.info("🧹 Dismissing any late-appearing popups...")
             await verification_handler._dismiss_popups()
             await asyncio.sleep(self._safe_delay(2.0, 0.25, 1.5))
             logger.debug("⏱️ Post-popup delay: varied timing")
             
+            # Step 1.6: Structured data from captured API responses (no vision needed if complete)
+            captured = None
+            if capture:
+                captured = await capture.extract_product(url, self._extract_product_code_from_url(url, retailer))
+                if captured and captured['title'] and captured['price'] and captured['image_urls']:
+                    # Same DOM cross-check the vision result gets
+                    captured_data = ProductData(**captured)
+                    dom_extraction_result = await self._guided_dom_extraction(
+                        retailer, product_data=captured_data, gemini_visual_hints={}
+                    )
+                    title_check = dom_extraction_result.get('validations', {}).get('title')
+                    if title_check and not title_check['validated']:
+                        logger.warning(
+                            f"⚠️ Network capture title does not match page ({title_check['similarity']:.0%}) "
+                            f"- discarding capture, using Gemini Vision"
+                        )
+                        captured = None
+                    else:
+                        logger.info(f"📡 Network capture complete ({len(captured['image_urls'])} images) - skipping Gemini Vision")
+                        product_data = self._merge_extraction_results(captured_data, dom_extraction_result, {})
+                        return product_data, "patchright_network_capture"
+            
             # Step 2: Take screenshots
             logger.info("📸 Taking multi-region screenshots...")
             screenshots = await self._take_multi_region_screenshots(retailer)
@@ -329,14 +380,22 @@ class PatchrightProductExtractor:
                 gemini_visual_analysis
             )
             
+            # Step 6.5: Partial capture still wins over vision for the fields it has
+            if captured and self._apply_captured_fields(product_data, captured):
+                method_used = "patchright_network_capture_gemini_hybrid"
+            
             # Step 7: Learn from successful extraction
             logger.debug("Recording extraction patterns for learning...")
             
-            return product_data
+            return product_data, method_used
             
         except Exception as e:
             logger.error(f"Navigation and extraction failed: {e}")
             raise
+        finally:
+            # Same page is retried by _extract_with_retry: never stack listeners
+            if capture:
+                capture.detach()
     
     async def _take_multi_region_screenshots(self, retailer: str) -> List[bytes]:
         """
@@ -370,6 +429,7 @@ class PatchrightProductExtractor:
             except:
                 return []
     
+    @traced('llm')
     async def _analyze_with_gemini(
         self,
         screenshots: List[bytes],
@@ -459,6 +519,7 @@ Return ONLY valid JSON with these fields. Extract every detail you can see."""
             logger.error(f"Gemini analysis failed: {e}")
             return ProductData()
     
+    @traced('llm')
     async def _gemini_analyze_page_structure(
         self,
         screenshots: List[bytes],
@@ -604,6 +665,21 @@ Return JSON:
         
         return product_data
     
+    def _apply_captured_fields(self, product_data: ProductData, captured: Dict) -> List[str]:
+        """Overlay non-empty network-captured fields on the vision result (returns fields set)"""
+        filled = []
+        for field_name, value in captured.items():
+            if value and hasattr(product_data, field_name) and field_name not in ('sale_status', 'availability'):
+                setattr(product_data, field_name, value)
+                filled.append(field_name)
+        
+        if captured.get('original_price'):
+            product_data.sale_status = 'on_sale'
+        
+        if filled:
+            logger.debug(f"Network capture supplied: {', '.join(filled)}")
+        return filled
+    
     async def _setup_stealth_browser(self, retailer: str = None):
         """Setup Patchright stealth browser with retailer-specific settings"""
         try:
@@ -666,6 +742,14 @@ Return JSON:
             
             self.page = self.context.pages[0] if self.context.pages else await self.context.new_page()
             
+            # Block media/fonts/trackers per retailer profile (anti-bot resources always allowed)
+            self.request_router = None
+            if ENABLE_REQUEST_ROUTING and retailer:
+                self.request_router = PatchrightRequestRouter(
+                    retailer, self.strategies.get_routing_profile(retailer)
+                )
+                await self.request_router.install(self.context)
+            
             # Inject stealth scripts if enhancements enabled
             if ENABLE_ANTI_SCRAPING_ENHANCEMENTS:
                 await self._inject_stealth_scripts(self.page)
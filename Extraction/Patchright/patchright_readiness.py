@@ -0,0 +1,402 @@
+"""
+Patchright Tower - Page Readiness Engine
+Event-driven "page is ready" detection replacing fixed sleeps
+
+Signals (config from PatchrightRetailerStrategies.get_readiness_config):
+- Product count stabilized: a MutationObserver recounts product elements and
+  wait_for_function resolves once the count is >= min_products and unchanged
+  for stable_ms
+- Product API XHR/fetch requests finished and quiet for network_quiet_ms
+- Learned minimum delay: never declare ready sooner than the retailer has
+  historically needed (10th percentile of recent time-to-ready)
+- Lazy-load scroll: scroll down and back once so below-the-fold tiles load,
+  then wait for the count to settle again
+
+Randomized jitter is kept after readiness for retailers with timing variance.
+Every run's time-to-ready is recorded per retailer so waits track what each
+site actually needs.
+"""
+
+# Add shared path for imports
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../Shared"))
+
+import asyncio
+import random
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Installs the observer on first call (and again after a navigation/reload)
+PRODUCT_COUNT_STABLE_JS = r"""(config) => {
+    const countProducts = () => {
+        let best = 0;
+        for (const sel of config.selectors) {
+            try { best = Math.max(best, document.querySelectorAll(sel).length); } catch (e) {}
+        }
+        return best;
+    };
+
+    let state = window.__smfReadiness;
+    if (!state) {
+        state = window.__smfReadiness = {count: countProducts(), lastChange: performance.now(), scheduled: false};
+        // Coalesce mutation bursts into one recount per frame
+        new MutationObserver(() => {
+            if (state.scheduled) return;
+            state.scheduled = true;
+            requestAnimationFrame(() => {
+                state.scheduled = false;
+                const n = countProducts();
+                if (n !== state.count) {
+                    state.count = n;
+                    state.lastChange = performance.now();
+                }
+            });
+        }).observe(document.documentElement, {childList: true, subtree: true});
+        return false;
+    }
+
+    return state.count >= config.min_products && performance.now() - state.lastChange >= config.stable_ms;
+}"""
+
+
+class ReadinessStore:
+    """
+    Per-retailer time-to-ready history (SQLite)
+
+    Used to learn each retailer's minimum delay and to report wait times.
+    """
+
+    HISTORY_SIZE = 20
+
+    def __init__(self, db_path: str = None):
+        if db_path is None:
+            db_path = os.path.join(os.path.dirname(__file__), '../../Shared/patchright_readiness.db')
+        self.db_path = db_path
+        self._init_db()
+
+    def _get_connection(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _init_db(self):
+        conn = self._get_connection()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS readiness_timings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    retailer TEXT NOT NULL,
+                    phase TEXT NOT NULL,
+                    time_to_ready REAL NOT NULL,
+                    waited REAL NOT NULL,
+                    product_count INTEGER,
+                    timed_out INTEGER DEFAULT 0,
+                    signals TEXT,
+                    recorded_at TEXT NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_readiness_retailer
+                ON readiness_timings(retailer, phase, id)
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def record(self, retailer: str, phase: str, result: Dict):
+        conn = self._get_connection()
+        try:
+            conn.execute('''
+                INSERT INTO readiness_timings
+                (retailer, phase, time_to_ready, waited, product_count, timed_out, signals, recorded_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                retailer.lower(), phase, result['time_to_ready'], result['waited'],
+                result.get('product_count'), 1 if result.get('timed_out') else 0,
+                ','.join(result.get('signals', [])), datetime.now().isoformat()
+            ))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def recent_times(self, retailer: str, phase: str) -> List[float]:
+        """Time-to-ready of the last successful runs (timeouts excluded)"""
+        conn = self._get_connection()
+        try:
+            rows = conn.execute('''
+                SELECT time_to_ready FROM readiness_timings
+                WHERE retailer = ? AND phase = ? AND timed_out = 0
+                ORDER BY id DESC LIMIT ?
+            ''', (retailer.lower(), phase, self.HISTORY_SIZE)).fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+
+    def learned_min_delay(self, retailer: str, phase: str) -> Optional[float]:
+        """10th percentile of recent time-to-ready (None until 3 samples)"""
+        times = sorted(self.recent_times(retailer, phase))
+        if len(times) < 3:
+            return None
+        return times[int(len(times) * 0.1)]
+
+    def get_report(self) -> Dict[str, Dict]:
+        """Per retailer/phase: runs, median/p90 time-to-ready, timeouts"""
+        conn = self._get_connection()
+        try:
+            rows = conn.execute('''
+                SELECT retailer, phase, time_to_ready, waited, timed_out
+                FROM readiness_timings ORDER BY id
+            ''').fetchall()
+        finally:
+            conn.close()
+
+        grouped: Dict[str, List[tuple]] = {}
+        for retailer, phase, ttr, waited, timed_out in rows:
+            grouped.setdefault(f"{retailer}:{phase}", []).append((ttr, waited, timed_out))
+
+        report = {}
+        for key, samples in grouped.items():
+            times = sorted(s[0] for s in samples)
+            report[key] = {
+                'runs': len(samples),
+                'median_time_to_ready': times[len(times) // 2],
+                'p90_time_to_ready': times[min(len(times) - 1, int(len(times) * 0.9))],
+                'avg_waited': sum(s[1] for s in samples) / len(samples),
+                'timeouts': sum(s[2] for s in samples)
+            }
+        return report
+
+
+class PatchrightReadinessEngine:
+    """
+    Decide when a Patchright page is ready instead of sleeping fixed amounts
+
+    Process:
+    1. attach() before goto: track in-flight product API XHR/fetch requests
+    2. wait_until_ready(): product count stable (MutationObserver +
+       wait_for_function), product API quiet, learned minimum delay reached
+    3. Scroll to trigger lazy loading, wait for the count to settle again
+    4. Randomized jitter (retailers with timing variance)
+    5. Record time-to-ready for the retailer; request listeners are detached
+
+    Usage:
+        readiness = PatchrightReadinessEngine(page, retailer, strategies)
+        readiness.attach()
+        await page.goto(url)
+        result = await readiness.wait_until_ready()
+    """
+
+    POLL_INTERVAL_MS = 200
+
+    def __init__(self, page, retailer: str, strategies, store: ReadinessStore = None):
+        """
+        Args:
+            page: Patchright Page object
+            retailer: Retailer name
+            strategies: PatchrightRetailerStrategies instance
+            store: Timing history (default: Shared/patchright_readiness.db)
+        """
+        self.page = page
+        self.retailer = retailer
+        self.config = strategies.get_readiness_config(retailer)
+
+        try:
+            self.store = store or ReadinessStore()
+        except Exception as e:
+            logger.debug(f"Readiness history unavailable: {e}")
+            self.store = None
+
+        self.navigation_started = time.monotonic()
+        self._attached = False
+        self._in_flight = set()
+        self._last_api_activity = 0.0
+        self._api_requests = 0
+
+    # =================== NETWORK SIGNALS ===================
+
+    def attach(self):
+        """Start tracking product API requests (call before goto)"""
+        self.page.on('request', self._on_request)
+        self.page.on('requestfinished', self._on_request_done)
+        self.page.on('requestfailed', self._on_request_done)
+        self._attached = True
+        self.navigation_started = time.monotonic()
+
+    def detach(self):
+        """Stop tracking requests (idempotent; pages are reused across extractions)"""
+        if not self._attached:
+            return
+        self._attached = False
+        for event, handler in (
+            ('request', self._on_request),
+            ('requestfinished', self._on_request_done),
+            ('requestfailed', self._on_request_done)
+        ):
+            try:
+                self.page.remove_listener(event, handler)
+            except Exception as e:
+                logger.debug(f"Failed to remove {event} listener: {e}")
+        self._in_flight.clear()
+
+    def _is_product_api(self, request) -> bool:
+        if request.resource_type not in ('xhr', 'fetch'):
+            return False
+        url = request.url.lower()
+        return any(pattern in url for pattern in self.config['api_patterns'])
+
+    def _on_request(self, request):
+        try:
+            if self._is_product_api(request):
+                self._in_flight.add(request)
+                self._api_requests += 1
+                self._last_api_activity = time.monotonic()
+        except Exception:
+            pass
+
+    def _on_request_done(self, request):
+        if request in self._in_flight:
+            self._in_flight.discard(request)
+            self._last_api_activity = time.monotonic()
+
+    # =================== READINESS ===================
+
+    async def wait_until_ready(self, phase: str = 'catalog') -> Dict:
+        """
+        Wait for the page to be ready (detaches the request listeners when done)
+
+        Returns:
+            Dict with time_to_ready, waited, product_count, timed_out, signals
+        """
+        try:
+            return await self._wait_until_ready(phase)
+        finally:
+            self.detach()
+
+    async def _wait_until_ready(self, phase: str) -> Dict:
+        wait_started = time.monotonic()
+        deadline = wait_started + self.config['max_wait']
+        signals = []
+        timed_out = False
+        product_count = 0
+
+        # Signal 1: product count stabilized
+        try:
+            await self._wait_for_stable_count(deadline - time.monotonic())
+            signals.append('products_stable')
+        except Exception as e:
+            timed_out = True
+            logger.debug(f"Product count did not stabilize for {self.retailer}: {e}")
+
+        product_count = await self._product_count()
+
+        # Signal 2: product API requests finished
+        if not timed_out:
+            if await self._wait_for_api_quiet(deadline):
+                if self._api_requests:
+                    signals.append('api_quiet')
+            else:
+                signals.append('api_still_active')
+
+        time_to_ready = time.monotonic() - self.navigation_started
+
+        # Floor: learned minimum delay (or configured minimum)
+        floor = self.config['min_delay']
+        learned = self.store.learned_min_delay(self.retailer, phase) if self.store else None
+        if learned is not None:
+            floor = max(floor, min(learned, self.config['max_wait']))
+        if time_to_ready < floor:
+            await asyncio.sleep(floor - time_to_ready)
+            signals.append('min_delay')
+
+        # Final step: scroll so lazy-loaded tiles below the fold render
+        if self.config.get('lazy_load_scroll'):
+            loaded = await self._trigger_lazy_load(product_count)
+            if loaded > product_count:
+                signals.append('lazy_loaded')
+                product_count = loaded
+
+        # Stealth jitter
+        if self.config.get('timing_variance'):
+            await asyncio.sleep(random.uniform(*self.config['jitter']))
+
+        result = {
+            'time_to_ready': round(time_to_ready, 3),
+            'waited': round(time.monotonic() - wait_started, 3),
+            'product_count': product_count,
+            'timed_out': timed_out,
+            'signals': signals,
+            'learned_min_delay': learned
+        }
+
+        if timed_out:
+            logger.warning(
+                f"⚠️ {self.retailer} not ready after {self.config['max_wait']:.0f}s "
+                f"({product_count} products), continuing"
+            )
+        else:
+            logger.info(
+                f"✅ Page ready in {time_to_ready:.1f}s: {product_count} products "
+                f"({', '.join(signals)})"
+            )
+
+        if self.store:
+            try:
+                self.store.record(self.retailer, phase, result)
+            except Exception as e:
+                logger.debug(f"Failed to record readiness timing: {e}")
+
+        return result
+
+    async def _wait_for_stable_count(self, timeout_seconds: float):
+        await self.page.wait_for_function(
+            PRODUCT_COUNT_STABLE_JS,
+            arg={
+                'selectors': self.config['product_selectors'],
+                'min_products': self.config['min_products'],
+                'stable_ms': self.config['stable_ms']
+            },
+            polling=self.POLL_INTERVAL_MS,
+            timeout=max(timeout_seconds, 0.1) * 1000
+        )
+
+    async def _product_count(self) -> int:
+        try:
+            return await self.page.evaluate(
+                '() => window.__smfReadiness ? window.__smfReadiness.count : 0'
+            )
+        except Exception:
+            return 0
+
+    async def _trigger_lazy_load(self, product_count: int) -> int:
+        """Scroll down and back up, then wait for the product count to settle"""
+        try:
+            await self.page.evaluate(f"window.scrollTo(0, {int(self.config['lazy_load_scroll'])})")
+            # Give the scroll time to trigger tile loads before checking stability
+            await asyncio.sleep(self.config['stable_ms'] / 1000)
+            try:
+                await self._wait_for_stable_count(self.config['lazy_load_wait'])
+            except Exception as e:
+                logger.debug(f"Product count still changing after lazy-load scroll for {self.retailer}: {e}")
+            await self.page.evaluate("window.scrollTo(0, 0)")
+        except Exception as e:
+            logger.debug(f"Lazy-load scroll failed for {self.retailer}: {e}")
+            return product_count
+
+        loaded = await self._product_count()
+        if loaded > product_count:
+            logger.debug(f"📜 Lazy-load scroll: {product_count} → {loaded} products")
+        return loaded
+
+    async def _wait_for_api_quiet(self, deadline: float) -> bool:
+        """True once no product API request is in flight for network_quiet_ms"""
+        quiet_seconds = self.config['network_quiet_ms'] / 1000
+        while time.monotonic() < deadline:
+            if not self._in_flight and time.monotonic() - self._last_api_activity >= quiet_seconds:
+                return True
+            await asyncio.sleep(self.POLL_INTERVAL_MS / 1000)
+        return False
@@ -0,0 +1,253 @@
+"""
+Patchright Tower - Request Router
+Per-retailer resource blocking through context.route
+
+Blocks media and fonts, stubs third-party trackers/ad scripts and can hold
+back images during DOM-only phases, while always letting anti-bot resources
+(PerimeterX, Cloudflare, Akamai, captchas) through. Profiles come from
+PatchrightRetailerStrategies.get_routing_profile().
+
+Page-load metrics (transfer bytes, DOMContentLoaded/load times, blocked
+requests) are recorded per retailer so blocking can be tuned against
+stealth. A profile's baseline_sample_rate leaves a fraction of loads
+unblocked to measure load-time deltas.
+
+Note: routing disables the browser HTTP cache for the context.
+"""
+
+# Add shared path for imports
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../Shared"))
+
+import random
+import sqlite3
+from datetime import datetime
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Rough transfer size of a blocked request, by resource type (bytes)
+ESTIMATED_BYTES = {
+    'media': 750_000,
+    'font': 40_000,
+    'image': 90_000,
+    'script': 60_000,
+    'stylesheet': 20_000,
+    'default': 2_000
+}
+
+PAGE_METRICS_JS = r"""() => {
+    const nav = performance.getEntriesByType('navigation')[0];
+    let transfer = nav ? nav.transferSize : 0;
+    const resources = performance.getEntriesByType('resource');
+    for (const entry of resources) transfer += entry.transferSize || 0;
+    return {
+        transfer_bytes: transfer,
+        resources: resources.length,
+        dom_content_loaded_ms: nav ? nav.domContentLoadedEventEnd : null,
+        load_ms: nav && nav.loadEventEnd ? nav.loadEventEnd : null
+    };
+}"""
+
+
+class RoutingStatsStore:
+    """Per-retailer page-load metrics with and without blocking (SQLite)"""
+
+    def __init__(self, db_path: str = None):
+        if db_path is None:
+            db_path = os.path.join(os.path.dirname(__file__), '../../Shared/patchright_routing.db')
+        self.db_path = db_path
+        self._init_db()
+
+    def _get_connection(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _init_db(self):
+        conn = self._get_connection()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS routing_stats (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    retailer TEXT NOT NULL,
+                    phase TEXT NOT NULL,
+                    blocking INTEGER NOT NULL,
+                    blocked_requests INTEGER DEFAULT 0,
+                    stubbed_requests INTEGER DEFAULT 0,
+                    estimated_bytes_saved INTEGER DEFAULT 0,
+                    transfer_bytes INTEGER,
+                    dom_content_loaded_ms REAL,
+                    load_ms REAL,
+                    recorded_at TEXT NOT NULL
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def record(self, retailer: str, phase: str, blocking: bool, stats: Dict, metrics: Dict):
+        conn = self._get_connection()
+        try:
+            conn.execute('''
+                INSERT INTO routing_stats
+                (retailer, phase, blocking, blocked_requests, stubbed_requests,
+                 estimated_bytes_saved, transfer_bytes, dom_content_loaded_ms, load_ms, recorded_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                retailer.lower(), phase, 1 if blocking else 0,
+                stats['blocked'], stats['stubbed'], stats['estimated_bytes_saved'],
+                metrics.get('transfer_bytes'), metrics.get('dom_content_loaded_ms'),
+                metrics.get('load_ms'), datetime.now().isoformat()
+            ))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_report(self) -> Dict[str, Dict]:
+        """
+        Per retailer/phase averages with blocking on vs off
+
+        Deltas are only present once both modes have samples.
+        """
+        conn = self._get_connection()
+        try:
+            rows = conn.execute('''
+                SELECT retailer, phase, blocking, COUNT(*),
+                       AVG(blocked_requests + stubbed_requests), AVG(estimated_bytes_saved),
+                       AVG(transfer_bytes), AVG(dom_content_loaded_ms), AVG(load_ms)
+                FROM routing_stats
+                GROUP BY retailer, phase, blocking
+            ''').fetchall()
+        finally:
+            conn.close()
+
+        report: Dict[str, Dict] = {}
+        for retailer, phase, blocking, runs, intercepted, saved, transfer, dcl, load in rows:
+            entry = report.setdefault(f"{retailer}:{phase}", {})
+            entry['blocked' if blocking else 'baseline'] = {
+                'runs': runs,
+                'avg_intercepted_requests': intercepted,
+                'avg_estimated_bytes_saved': saved,
+                'avg_transfer_bytes': transfer,
+                'avg_dom_content_loaded_ms': dcl,
+                'avg_load_ms': load
+            }
+
+        for entry in report.values():
+            blocked, baseline = entry.get('blocked'), entry.get('baseline')
+            if blocked and baseline:
+                for key in ('avg_transfer_bytes', 'avg_dom_content_loaded_ms', 'avg_load_ms'):
+                    if blocked[key] is not None and baseline[key] is not None:
+                        entry[key.replace('avg_', 'delta_')] = baseline[key] - blocked[key]
+        return report
+
+
+class PatchrightRequestRouter:
+    """
+    Route handler applying a retailer's blocking profile
+
+    Decision order per request:
+    1. Anti-bot allow patterns → continue
+    2. Blocked resource types (media, font) → abort
+    3. Tracker/ad URL patterns → stub (empty 200 script / 204)
+    4. Images while held (block_images or hold_images()) → abort
+    5. Everything else → continue
+
+    Usage:
+        router = PatchrightRequestRouter(retailer, strategies.get_routing_profile(retailer))
+        await router.install(context)
+        ...
+        await router.record_page_load(page, phase='catalog')
+    """
+
+    def __init__(self, retailer: str, profile: Dict, store: RoutingStatsStore = None):
+        self.retailer = retailer
+        self.profile = profile
+
+        # A sample of loads runs unblocked to measure the baseline
+        self.blocking = profile.get('enabled', True) and random.random() >= profile.get('baseline_sample_rate', 0.0)
+        self.images_held = profile.get('block_images', False)
+
+        self.allow_patterns = [p.lower() for p in profile.get('allow_patterns', [])]
+        self.tracker_patterns = [p.lower() for p in profile.get('tracker_patterns', [])]
+        self.block_types = set(profile.get('block_resource_types', []))
+
+        self.stats = {'blocked': 0, 'stubbed': 0, 'allowed': 0, 'estimated_bytes_saved': 0, 'by_type': {}}
+
+        try:
+            self.store = store or RoutingStatsStore()
+        except Exception as e:
+            logger.debug(f"Routing stats unavailable: {e}")
+            self.store = None
+
+    async def install(self, context):
+        """Register the route handler on the browser context"""
+        if not self.blocking:
+            logger.debug(f"Request blocking off for {self.retailer} (baseline sample)")
+            return
+        await context.route('**/*', self._handle)
+        logger.debug(
+            f"🚦 Request routing active for {self.retailer}: "
+            f"types={sorted(self.block_types)}, trackers={len(self.tracker_patterns)}, images_held={self.images_held}"
+        )
+
+    def hold_images(self, held: bool = True):
+        """Abort image requests until released (DOM-only phases)"""
+        self.images_held = held
+
+    async def _handle(self, route):
+        request = route.request
+        try:
+            url = request.url.lower()
+            resource_type = request.resource_type
+
+            if any(p in url for p in self.allow_patterns):
+                self.stats['allowed'] += 1
+                await route.continue_()
+            elif resource_type in self.block_types:
+                self._count('blocked', resource_type)
+                await route.abort('blockedbyclient')
+            elif any(p in url for p in self.tracker_patterns):
+                self._count('stubbed', resource_type)
+                if resource_type == 'script':
+                    await route.fulfill(status=200, content_type='application/javascript', body='')
+                else:
+                    await route.fulfill(status=204, body='')
+            elif self.images_held and resource_type == 'image':
+                self._count('blocked', resource_type)
+                await route.abort('blockedbyclient')
+            else:
+                await route.continue_()
+        except Exception as e:
+            # Page closed mid-request or route already handled
+            logger.debug(f"Route handling failed for {request.url[:80]}: {e}")
+
+    def _count(self, action: str, resource_type: str):
+        self.stats[action] += 1
+        self.stats['estimated_bytes_saved'] += ESTIMATED_BYTES.get(resource_type, ESTIMATED_BYTES['default'])
+        self.stats['by_type'][resource_type] = self.stats['by_type'].get(resource_type, 0) + 1
+
+    async def record_page_load(self, page, phase: str = 'catalog') -> Optional[Dict]:
+        """Record load metrics for this page against the blocking stats"""
+        try:
+            metrics = await page.evaluate(PAGE_METRICS_JS)
+        except Exception as e:
+            logger.debug(f"Page metrics unavailable: {e}")
+            return None
+
+        if self.blocking:
+            logger.info(
+                f"🚦 {self.retailer}: blocked {self.stats['blocked']}, stubbed {self.stats['stubbed']} "
+                f"(~{self.stats['estimated_bytes_saved'] / 1024:.0f} KB saved), "
+                f"transferred {metrics.get('transfer_bytes', 0) / 1024:.0f} KB"
+            )
+
+        if self.store:
+            try:
+                self.store.record(self.retailer, phase, self.blocking, self.stats, metrics)
+            except Exception as e:
+                logger.debug(f"Failed to record routing stats: {e}")
+
+        return {**metrics, 'blocking': self.blocking, **{k: v for k, v in self.stats.items() if k != 'by_type'}}
@@ -111,6 +111,10 @@ RETAILER_STRATEGIES = {
             'button[aria-label*="close"]',
             'button:has-text("No Thanks")'
         ],
+        'readiness': {
+            'min_delay': 2.0,  # PerimeterX re-renders the grid after verification
+            'api_patterns': ['/api/catalog', '/api/search', 'constructor.io']
+        },
         'anti_bot_complexity': 'high',  # PerimeterX is sophisticated
         'notes': 'Use keyboard (TAB 10x + SPACE 10s) for Press & Hold. Wait naturally after verification.'
     },
@@ -164,6 +168,16 @@ RETAILER_STRATEGIES = {
             'price_selectors': ['[class*="price"]', '[data-price]', 'span[class*="Price"]'],
             'product_container': '[class*="ProductCard"], [data-product-id]'
         },
+        'readiness': {
+            'min_delay': 2.0,
+            'max_wait': 30.0,  # Variable API delay (1-15s), same budget as the old polling loop
+            'min_products': 1,  # Same threshold as the old polling loop
+            'stable_ms': 2000,
+            'api_patterns': ['/api/', 'algolia', 'constructor.io']
+        },
+        'network_capture': {
+            'api_patterns': ['/on/demandware.store/', 'Product-Variation', 'Product-Show']  # Salesforce Commerce Cloud
+        },
         'anti_bot_complexity': 'very_high',
         'notes': 'Cloudflare + SPA with variable API delay (1-15s). Uses active polling instead of fixed waits for reliability. Polling detects products immediately when they appear.'
     },
@@ -192,6 +206,9 @@ RETAILER_STRATEGIES = {
         },
         'wait_for_selector': "a[class*='product-tile']",
         'wait_timeout': 10000,
+        'network_capture': {
+            'api_patterns': ['/api/search', '/api/ecomm/', 'ProductView']
+        },
         'anti_bot_complexity': 'low',
         'notes': 'SPA requires explicit wait_for_selector for dynamic JS rendering'
     },
@@ -241,6 +258,7 @@ RETAILER_STRATEGIES = {
             ],
             'product_container': '[data-auto-id="productList"], .products, [class*="product-list"]'
         },
+        'routing': {'baseline_sample_rate': 0.1},  # Low risk - measure load-time deltas
         'anti_bot_complexity': 'low',
         'notes': 'DOM-first for catalog URLs/titles/prices. Markdown extraction for single product pages.'
     },
@@ -269,6 +287,10 @@ RETAILER_STRATEGIES = {
             ],
             'product_container': 'article[class*="product"], div[class*="product"], [data-product-id]'
         },
+        'routing': {'block_resource_types': ['media']},  # Already flagged by anti-bot - minimal interference
+        'network_capture': {
+            'api_patterns': ['/api/ng-looks/', '/api/style/', 'product-page']
+        },
         'anti_bot_complexity': 'high',  # BLOCKED: "unusual activity" page
         'notes': 'BLOCKED by aggressive anti-bot protection (Nov 2024). Shows "unusual activity" warning and blocks automated traffic. Product URLs follow pattern: /s/{product-name}/{product-id}. May require residential proxies or manual session management.'
     },
@@ -313,6 +335,7 @@ RETAILER_STRATEGIES = {
             ],
             'product_container': '[class*="products"], [class*="product-list"], .product-grid'
         },
+        'routing': {'baseline_sample_rate': 0.1},  # Low risk - measure load-time deltas
         'anti_bot_complexity': 'low',
         'notes': 'DOM-first for catalog URLs/titles/prices. Markdown extraction for single product pages. Uses "What\'s New" section for monitoring workflow.'
     },
@@ -336,12 +359,74 @@ RETAILER_STRATEGIES = {
             ],
             'product_container': '[class*="product-grid"], [class*="product-list"], .products'
         },
+        'routing': {'baseline_sample_rate': 0.1},  # Low risk - measure load-time deltas
         'anti_bot_complexity': 'low',
         'notes': 'DOM-first for catalog URLs/titles/prices. Markdown extraction for single product pages.'
     }
 }
 
 
+# Page readiness defaults (overridden per retailer by strategy['readiness'])
+# Used by PatchrightReadinessEngine instead of fixed sleeps
+READINESS_DEFAULTS = {
+    'min_products': 4,          # Product count that counts as "rendered"
+    'stable_ms': 1500,          # Product count unchanged this long = stable
+    'network_quiet_ms': 800,    # No product API request in flight this long
+    'min_delay': 1.0,           # Floor (seconds since navigation) before ready
+    'max_wait': 20.0,           # Give up and continue (Gemini still runs)
+    'jitter': (0.3, 1.2),       # Randomized pause after ready (stealth)
+    'lazy_load_scroll': 1000,   # Pixels scrolled to trigger lazy-loaded tiles (0 = off)
+    'lazy_load_wait': 5.0,      # Max seconds for the count to settle after the scroll
+    'api_patterns': [           # Product API XHR/fetch URL fragments
+        '/api/', 'graphql', 'search', 'product', 'catalog', 'algolia', 'constructor.io'
+    ],
+    'fallback_selectors': [
+        'a[href*="/shop/"]',
+        'a[data-testid="product-card-link"]',
+        'a[href*="/p/"]',
+        'a[href*="/product/"]',
+        '.product-card a',
+        '[data-product-id]'
+    ]
+}
+
+
+# Request routing defaults (overridden per retailer by strategy['routing'])
+# Used by PatchrightRequestRouter via context.route
+ROUTING_DEFAULTS = {
+    'enabled': True,
+    'block_resource_types': ['media', 'font'],
+    'block_images': False,          # Screenshots need images - only for DOM-only flows
+    'baseline_sample_rate': 0.0,    # Fraction of loads left unblocked to measure deltas
+    'allow_patterns': [             # Anti-bot resources always load
+        'perimeterx', 'px-cdn', 'px-cloud', 'px-client', 'pxchk',
+        'challenges.cloudflare.com', '/cdn-cgi/', 'akamai', '/akam/',
+        'captcha', 'datadome', 'kasada'
+    ],
+    'tracker_patterns': [           # Stubbed (empty response)
+        'google-analytics.com', 'googletagmanager.com', 'doubleclick.net',
+        'googleadservices.com', 'googlesyndication.com', 'connect.facebook.net',
+        'facebook.com/tr', 'analytics.tiktok.com', 'ct.pinterest.com', 'sc-static.net',
+        'bat.bing.com', 'clarity.ms', 'hotjar.com', 'fullstory.com', 'quantummetric.com',
+        'segment.io', 'segment.com/analytics', 'criteo.com', 'criteo.net',
+        'scorecardresearch.com', 'quantserve.com', 'nr-data.net', 'js-agent.newrelic.com',
+        'demdex.net', 'omtrdc.net', 'adnxs.com', 'rubiconproject.com', 'taboola.com',
+        'outbrain.com', 'attn.tv', 'attentivemobile.com', 'klaviyo.com', 'branch.io'
+    ]
+}
+
+
+# Network capture defaults (overridden per retailer by strategy['network_capture'])
+# Used by PatchrightNetworkCapture to read product JSON from XHR/fetch responses
+NETWORK_CAPTURE_DEFAULTS = {
+    'enabled': True,
+    'api_patterns': ['/api/', 'graphql', '/product/', '/products/', 'productdetail', 'product-detail'],
+    'max_body_bytes': 2_000_000,
+    'max_responses': 40,
+    'drain_timeout': 3.0
+}
+
+
 # Screenshot strategies per retailer (for multi-screenshot capture)
 SCREENSHOT_STRATEGIES = {
     'anthropologie': {
@@ -393,6 +478,9 @@ class PatchrightRetailerStrategies:
     - Wait strategies
     - Product selectors
     - Screenshot strategies
+    - Page readiness configs
+    - Request routing (resource blocking) profiles
+    - Network capture (product JSON) configs
     - Anti-bot complexity levels
     """
     
@@ -429,6 +517,56 @@ class PatchrightRetailerStrategies:
             'anti_bot_complexity': 'unknown'
         }
     
+    def get_readiness_config(self, retailer: str) -> Dict:
+        """
+        Get page readiness config (defaults + retailer overrides)
+        
+        Product selectors come from the retailer's product_selectors and
+        polling catalog_selectors; the generic fallbacks (which also match
+        navigation links) are only used for retailers without any.
+        """
+        strategy = self.get_strategy(retailer)
+        config = dict(READINESS_DEFAULTS)
+        config.update(strategy.get('readiness', {}))
+        
+        selectors = list(strategy.get('product_selectors', []))
+        selectors.extend(strategy.get('polling_config', {}).get('catalog_selectors', []))
+        config['product_selectors'] = list(dict.fromkeys(selectors)) or list(config['fallback_selectors'])
+        
+        config['timing_variance'] = get_anti_scraping_config(retailer).get('timing_variance', False)
+        return config
+    
+    def get_routing_profile(self, retailer: str) -> Dict:
+        """
+        Get request routing profile (defaults + retailer overrides)
+        
+        Retailer allow_patterns/tracker_patterns extend the defaults.
+        """
+        strategy = self.get_strategy(retailer)
+        overrides = strategy.get('routing', {})
+        profile = dict(ROUTING_DEFAULTS)
+        profile.update(overrides)
+        
+        for key in ('allow_patterns', 'tracker_patterns'):
+            if key in overrides:
+                profile[key] = ROUTING_DEFAULTS[key] + list(overrides[key])
+        return profile
+    
+    def get_network_capture_config(self, retailer: str) -> Dict:
+        """
+        Get network capture config (defaults + retailer overrides)
+        
+        Retailer api_patterns extend the defaults.
+        """
+        strategy = self.get_strategy(retailer)
+        overrides = strategy.get('network_capture', {})
+        config = dict(NETWORK_CAPTURE_DEFAULTS)
+        config.update(overrides)
+        
+        if 'api_patterns' in overrides:
+            config['api_patterns'] = NETWORK_CAPTURE_DEFAULTS['api_patterns'] + list(overrides['api_patterns'])
+        return config
+    
     def get_screenshot_strategy(self, retailer: str) -> Dict:
         """
         Get screenshot strategy for retailer
@@ -17,7 +17,7 @@ sys.path.append(os.path.dirname(__file__))
 
 import json
 import sqlite3
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 import logging
@@ -46,6 +46,16 @@ class QueueItem:
     reviewed_by: Optional[str]
     added_at: datetime
     source_workflow: str
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[str] = None
+
+
+# Stored as priority_rank so the review order is an index scan
+PRIORITY_RANKS = {'high': 1, 'normal': 2, 'low': 3}
+
+PRIORITY_RANK_SQL = "CASE {col} WHEN 'high' THEN 1 WHEN 'normal' THEN 2 WHEN 'low' THEN 3 ELSE 2 END"
+
+LEASE_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
 
 
 class AssessmentQueueManager:
@@ -53,26 +63,44 @@ class AssessmentQueueManager:
     Manages the assessment queue for human review
     
     Features:
-    - Add products to queue (with priority)
+    - Add products to queue (with priority), one at a time or in bulk
     - Retrieve next product for review (by type)
     - Mark products as reviewed
     - Record review decisions
     - Queue statistics
     - Cleanup old reviewed items
+    
+    Performance:
+    - priority_rank column + covering index (review_type, status,
+      priority_rank, added_at) serves "next for review" without a sort
+    - Batch leasing: lease_batch() claims the next N pending items in one
+      UPDATE ... RETURNING, so concurrent reviewers never get the same item;
+      leases expire after LEASE_SECONDS (expired leases are reclaimable at
+      once and cleared by expire_leases())
+    - get_queue_items pages by keyset (added_at, id) instead of OFFSET
+    - assessment_queue_counts is kept current by triggers (including writes
+      made by the PHP web interface), so get_queue_stats reads a few rows
+    - One connection per manager, reused across calls
     """
     
+    LEASE_SECONDS = 900
+    
+    # Rows per multi-row INSERT in add_many (10 bound parameters per row)
+    ADD_MANY_CHUNK_ROWS = 500
+    
     def __init__(self, db_path: str = None):
         if db_path is None:
             # Default to products.db in Shared folder
             db_path = os.path.join(os.path.dirname(__file__), 'products.db')
         
         self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
         self._ensure_table_exists()
         logger.info(f"✅ Assessment Queue Manager initialized: {db_path}")
     
     def _ensure_table_exists(self):
         """Create assessment_queue table if it doesn't exist"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -124,11 +152,153 @@ class AssessmentQueueManager:
             ON assessment_queue(added_at)
         ''')
         
+        self._migrate_queue_access(conn)
+        
         conn.commit()
-        conn.close()
         
         logger.debug("Assessment queue table and indexes verified")
     
+    def _migrate_queue_access(self, conn: sqlite3.Connection):
+        """Add priority_rank, lease columns, review-order indexes and counters"""
+        cursor = conn.cursor()
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(assessment_queue)')}
+        
+        if 'priority_rank' not in columns:
+            cursor.execute('ALTER TABLE assessment_queue ADD COLUMN priority_rank INTEGER NOT NULL DEFAULT 2')
+            cursor.execute(f'''
+                UPDATE assessment_queue SET priority_rank = {PRIORITY_RANK_SQL.format(col='priority')}
+                WHERE priority <> 'normal'
+            ''')
+        if 'lease_owner' not in columns:
+            cursor.execute('ALTER TABLE assessment_queue ADD COLUMN lease_owner TEXT')
+        if 'lease_expires_at' not in columns:
+            cursor.execute('ALTER TABLE assessment_queue ADD COLUMN lease_expires_at TEXT')
+        
+        # Rows written elsewhere (web interface) get their rank from the trigger
+        for event, columns_clause in (('insert', 'INSERT'), ('update', 'UPDATE OF priority')):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_queue_priority_rank_{event}
+                AFTER {columns_clause} ON assessment_queue
+                WHEN NEW.priority_rank IS NOT {PRIORITY_RANK_SQL.format(col='NEW.priority')}
+                BEGIN
+                    UPDATE assessment_queue
+                    SET priority_rank = {PRIORITY_RANK_SQL.format(col='NEW.priority')}
+                    WHERE id = NEW.id;
+                END
+            ''')
+        
+        # Review order: pending items of a type by priority then FIFO (covering)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_queue_review_order
+            ON assessment_queue(review_type, status, priority_rank, added_at, lease_expires_at)
+        ''')
+        # Keyset pages for get_queue_items and the 24h review count
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_queue_type_status_added
+            ON assessment_queue(review_type, status, added_at)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_queue_reviewed_at
+            ON assessment_queue(reviewed_at)
+        ''')
+        
+        counters_exist = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'assessment_queue_counts'"
+        ).fetchone()
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS assessment_queue_counts (
+                review_type TEXT NOT NULL,
+                status TEXT NOT NULL,
+                priority TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (review_type, status, priority)
+            )
+        ''')
+        
+        increment = '''
+            INSERT INTO assessment_queue_counts (review_type, status, priority, count)
+            VALUES (NEW.review_type, NEW.status, NEW.priority, 1)
+            ON CONFLICT(review_type, status, priority) DO UPDATE SET count = count + 1;
+        '''
+        decrement = '''
+            UPDATE assessment_queue_counts SET count = count - 1
+            WHERE review_type = OLD.review_type AND status = OLD.status AND priority = OLD.priority;
+        '''
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_queue_counts_insert
+            AFTER INSERT ON assessment_queue
+            BEGIN {increment} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_queue_counts_delete
+            AFTER DELETE ON assessment_queue
+            BEGIN {decrement} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_queue_counts_update
+            AFTER UPDATE OF review_type, status, priority ON assessment_queue
+            WHEN OLD.review_type IS NOT NEW.review_type
+              OR OLD.status IS NOT NEW.status
+              OR OLD.priority IS NOT NEW.priority
+            BEGIN {decrement} {increment} END
+        ''')
+        
+        if not counters_exist:
+            self._rebuild_counts(cursor)
+    
+    @staticmethod
+    def _rebuild_counts(cursor: sqlite3.Cursor):
+        """Recompute assessment_queue_counts from the queue (caller commits)"""
+        cursor.execute('DELETE FROM assessment_queue_counts')
+        cursor.execute('''
+            INSERT INTO assessment_queue_counts (review_type, status, priority, count)
+            SELECT review_type, status, priority, COUNT(*)
+            FROM assessment_queue
+            GROUP BY review_type, status, priority
+        ''')
+    
+    def _get_connection(self) -> sqlite3.Connection:
+        """Shared connection for this manager (opened on first use)"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+        return self._conn
+    
+    def close(self):
+        """Close the shared connection"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+    
+    @staticmethod
+    def _row_to_item(row: sqlite3.Row) -> QueueItem:
+        """Build QueueItem from an assessment_queue row"""
+        keys = row.keys()
+        return QueueItem(
+            id=row['id'],
+            product_url=row['product_url'],
+            retailer=row['retailer'],
+            category=row['category'],
+            review_type=row['review_type'],
+            priority=row['priority'],
+            status=row['status'],
+            product_data=json.loads(row['product_data']),
+            suspected_match_data=json.loads(row['suspected_match_data']) if row['suspected_match_data'] else None,
+            review_decision=row['review_decision'],
+            reviewer_notes=row['reviewer_notes'],
+            reviewed_at=row['reviewed_at'],
+            reviewed_by=row['reviewed_by'],
+            added_at=row['added_at'],
+            source_workflow=row['source_workflow'],
+            lease_owner=row['lease_owner'] if 'lease_owner' in keys else None,
+            lease_expires_at=row['lease_expires_at'] if 'lease_expires_at' in keys else None
+        )
+    
+    @staticmethod
+    def _now() -> str:
+        return datetime.utcnow().strftime(LEASE_TIME_FORMAT)
+    
     async def add_to_queue(
         self,
         product: Dict,
@@ -155,7 +325,7 @@ class AssessmentQueueManager:
             Queue item ID (or existing ID if duplicate)
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             product_url = product.get('url')
@@ -170,11 +340,11 @@ class AssessmentQueueManager:
             try:
                 cursor.execute('''
                     INSERT INTO assessment_queue 
-                    (product_url, retailer, category, review_type, priority, status,
+                    (product_url, retailer, category, review_type, priority, priority_rank, status,
                      product_data, suspected_match_data, source_workflow)
-                    VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?)
+                    VALUES (?, ?, ?, ?, ?, ?, 'pending', ?, ?, ?)
                 ''', (product_url, retailer, category, review_type, priority,
-                      product_json, match_json, source_workflow))
+                      PRIORITY_RANKS.get(priority, 2), product_json, match_json, source_workflow))
                 
                 queue_id = cursor.lastrowid
                 conn.commit()
@@ -185,6 +355,8 @@ class AssessmentQueueManager:
                 logger.info(f"Added to queue: {review_type} review for {retailer} - {product.get('title', 'N/A')} (ID: {queue_id})")
                 
             except sqlite3.IntegrityError:
+                conn.rollback()
+                
                 # Already exists - get existing ID
                 cursor.execute('''
                     SELECT id FROM assessment_queue 
@@ -196,20 +368,125 @@ class AssessmentQueueManager:
                 
                 logger.warning(f"⚠️ Duplicate queue attempt - product already queued: {product.get('title', 'N/A')[:50]}... (ID: {queue_id})")
             
-            conn.close()
             return queue_id
             
         except Exception as e:
             logger.error(f"Failed to add product to queue: {e}")
             raise
     
+    async def add_many(
+        self,
+        products: List[Dict],
+        retailer: str,
+        category: str,
+        review_type: str,  # 'modesty' or 'duplication'
+        priority: str = 'normal',  # 'high', 'normal', 'low'
+        source_workflow: str = 'catalog_monitor',
+        suspected_matches: Optional[List[Optional[Dict]]] = None
+    ) -> List[Optional[int]]:
+        """
+        Add many products to assessment queue in one transaction
+        
+        Rows are inserted with INSERT ... ON CONFLICT DO NOTHING RETURNING,
+        ids of products already queued are looked up in one query, and
+        assessment_status is set for all newly queued URLs with one UPDATE.
+        
+        Args:
+            products: Product dicts (each must have 'url')
+            retailer: Retailer name
+            category: Product category
+            review_type: 'modesty' or 'duplication'
+            priority: 'high', 'normal', or 'low'
+            source_workflow: Source workflow name
+            suspected_matches: For duplication review - matched product data,
+                aligned with products (None entries allowed)
+            
+        Returns:
+            Queue item IDs aligned with products (existing ID if already queued)
+        """
+        if not products:
+            return []
+        
+        if suspected_matches is not None and len(suspected_matches) != len(products):
+            raise ValueError("suspected_matches must be aligned with products")
+        
+        rows = []
+        for index, product in enumerate(products):
+            product_url = product.get('url')
+            if not product_url:
+                raise ValueError("Product must have 'url' field")
+            
+            suspected_match = suspected_matches[index] if suspected_matches else None
+            rows.append((
+                product_url, retailer, category, review_type, priority,
+                PRIORITY_RANKS.get(priority, 2), json.dumps(product),
+                json.dumps(suspected_match) if suspected_match else None,
+                source_workflow
+            ))
+        
+        urls = [row[0] for row in rows]
+        ids_by_url: Dict[str, int] = {}
+        new_urls: List[str] = []
+        
+        try:
+            conn = self._get_connection()
+            with conn:
+                for start in range(0, len(rows), self.ADD_MANY_CHUNK_ROWS):
+                    chunk = rows[start:start + self.ADD_MANY_CHUNK_ROWS]
+                    values = ', '.join(["(?, ?, ?, ?, ?, ?, 'pending', ?, ?, ?)"] * len(chunk))
+                    inserted = conn.execute(f'''
+                        INSERT INTO assessment_queue 
+                        (product_url, retailer, category, review_type, priority, priority_rank, status,
+                         product_data, suspected_match_data, source_workflow)
+                        VALUES {values}
+                        ON CONFLICT(product_url, review_type) DO NOTHING
+                        RETURNING id, product_url
+                    ''', [value for row in chunk for value in row]).fetchall()
+                    
+                    for queue_id, product_url in inserted:
+                        ids_by_url[product_url] = queue_id
+                        new_urls.append(product_url)
+                
+                existing_urls = [url for url in dict.fromkeys(urls) if url not in ids_by_url]
+                if existing_urls:
+                    for queue_id, product_url in conn.execute('''
+                        SELECT id, product_url FROM assessment_queue
+                        WHERE review_type = ? AND product_url IN (SELECT value FROM json_each(?))
+                    ''', (review_type, json.dumps(existing_urls))):
+                        ids_by_url[product_url] = queue_id
+                
+                # Update assessment_status in products table (set-based)
+                if new_urls:
+                    try:
+                        conn.execute('''
+                            UPDATE products 
+                            SET assessment_status = 'queued', last_updated = ?
+                            WHERE url IN (SELECT value FROM json_each(?))
+                        ''', (datetime.utcnow().isoformat(), json.dumps(new_urls)))
+                    except sqlite3.OperationalError as e:
+                        logger.debug(f"Could not update assessment_status for queued products: {e}")
+            
+        except Exception as e:
+            logger.error(f"Failed to add products to queue: {e}")
+            raise
+        
+        duplicates = len(rows) - len(new_urls)
+        logger.info(
+            f"Added to queue: {len(new_urls)} {review_type} review(s) for {retailer}"
+            + (f" ({duplicates} already queued)" if duplicates else "")
+        )
+        
+        return [ids_by_url.get(url) for url in urls]
+    
     async def get_next_for_review(
         self,
         review_type: str,  # 'modesty' or 'duplication'
         priority_order: bool = True
     ) -> Optional[QueueItem]:
         """
-        Get next product for review
+        Get next product for review (without leasing it)
+        
+        Items currently leased by a reviewer are skipped.
         
         Args:
             review_type: 'modesty' or 'duplication'
@@ -219,68 +496,150 @@ class AssessmentQueueManager:
             QueueItem or None if queue is empty
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            conn = self._get_connection()
             
             if priority_order:
                 # Order by priority (high > normal > low) then oldest first
-                order_clause = '''
-                    ORDER BY 
-                        CASE priority 
-                            WHEN 'high' THEN 1 
-                            WHEN 'normal' THEN 2 
-                            WHEN 'low' THEN 3 
-                        END,
-                        added_at ASC
-                '''
+                order_clause = 'ORDER BY priority_rank, added_at'
             else:
                 # Simple FIFO
                 order_clause = 'ORDER BY added_at ASC'
             
-            query = f'''
+            row = conn.execute(f'''
                 SELECT * FROM assessment_queue 
                 WHERE review_type = ? AND status = 'pending'
+                AND (lease_expires_at IS NULL OR lease_expires_at <= ?)
                 {order_clause}
                 LIMIT 1
-            '''
-            
-            cursor.execute(query, (review_type,))
-            row = cursor.fetchone()
+            ''', (review_type, self._now())).fetchone()
             
             if not row:
-                conn.close()
                 return None
             
-            # Parse JSON fields
-            product_data = json.loads(row['product_data'])
-            suspected_match = json.loads(row['suspected_match_data']) if row['suspected_match_data'] else None
-            
-            queue_item = QueueItem(
-                id=row['id'],
-                product_url=row['product_url'],
-                retailer=row['retailer'],
-                category=row['category'],
-                review_type=row['review_type'],
-                priority=row['priority'],
-                status=row['status'],
-                product_data=product_data,
-                suspected_match_data=suspected_match,
-                review_decision=row['review_decision'],
-                reviewer_notes=row['reviewer_notes'],
-                reviewed_at=row['reviewed_at'],
-                reviewed_by=row['reviewed_by'],
-                added_at=row['added_at'],
-                source_workflow=row['source_workflow']
-            )
-            
-            conn.close()
-            return queue_item
+            return self._row_to_item(row)
             
         except Exception as e:
             logger.error(f"Failed to get next item for review: {e}")
             return None
     
+    async def lease_batch(
+        self,
+        review_type: str,
+        limit: int = 10,
+        reviewer: str = 'web_interface',
+        lease_seconds: Optional[int] = None
+    ) -> List[QueueItem]:
+        """
+        Atomically claim the next pending items for a reviewer
+        
+        Claims up to `limit` unleased (or lease-expired) pending items in
+        priority then FIFO order. Claimed items are hidden from other
+        reviewers until reviewed, skipped, released, or the lease expires.
+        
+        Args:
+            review_type: 'modesty' or 'duplication'
+            limit: Maximum items to claim
+            reviewer: Lease owner (reviewer or web session id)
+            lease_seconds: Lease length (default LEASE_SECONDS)
+            
+        Returns:
+            Claimed QueueItems in review order
+        """
+        lease_seconds = lease_seconds or self.LEASE_SECONDS
+        now = datetime.utcnow()
+        expires_at = (now + timedelta(seconds=lease_seconds)).strftime(LEASE_TIME_FORMAT)
+        
+        try:
+            conn = self._get_connection()
+            with conn:
+                rows = conn.execute('''
+                    UPDATE assessment_queue
+                    SET lease_owner = ?, lease_expires_at = ?
+                    WHERE id IN (
+                        SELECT id FROM assessment_queue
+                        WHERE review_type = ? AND status = 'pending'
+                        AND (lease_expires_at IS NULL OR lease_expires_at <= ?)
+                        ORDER BY priority_rank, added_at
+                        LIMIT ?
+                    )
+                    RETURNING *
+                ''', (reviewer, expires_at, review_type, now.strftime(LEASE_TIME_FORMAT), limit)).fetchall()
+            
+            # RETURNING order is unspecified
+            rows.sort(key=lambda r: (r['priority_rank'], r['added_at'] or '', r['id']))
+            
+            if rows:
+                logger.info(f"🔒 Leased {len(rows)} {review_type} item(s) to {reviewer} until {expires_at}")
+            return [self._row_to_item(row) for row in rows]
+            
+        except Exception as e:
+            logger.error(f"Failed to lease queue items: {e}")
+            return []
+    
+    async def release_leases(self, queue_ids: List[int], reviewer: Optional[str] = None) -> int:
+        """
+        Release leases (e.g. reviewer closed the session)
+        
+        Args:
+            queue_ids: Queue item IDs
+            reviewer: Only release leases held by this reviewer (None = any)
+            
+        Returns:
+            Number of leases released
+        """
+        if not queue_ids:
+            return 0
+        
+        try:
+            conn = self._get_connection()
+            placeholders = ','.join('?' * len(queue_ids))
+            query = f'''
+                UPDATE assessment_queue
+                SET lease_owner = NULL, lease_expires_at = NULL
+                WHERE id IN ({placeholders}) AND lease_owner IS NOT NULL
+            '''
+            params = list(queue_ids)
+            if reviewer is not None:
+                query += ' AND lease_owner = ?'
+                params.append(reviewer)
+            
+            with conn:
+                released = conn.execute(query, params).rowcount
+            
+            logger.debug(f"Released {released} queue lease(s)")
+            return released
+            
+        except Exception as e:
+            logger.error(f"Failed to release leases: {e}")
+            return 0
+    
+    async def expire_leases(self) -> int:
+        """
+        Clear leases whose lease_expires_at has passed
+        
+        Expired items are already claimable by lease_batch(); this drops the
+        stale owner so the queue shows them as unleased again.
+        
+        Returns:
+            Number of leases cleared
+        """
+        try:
+            conn = self._get_connection()
+            with conn:
+                expired = conn.execute('''
+                    UPDATE assessment_queue
+                    SET lease_owner = NULL, lease_expires_at = NULL
+                    WHERE lease_expires_at IS NOT NULL AND lease_expires_at <= ?
+                ''', (self._now(),)).rowcount
+            
+            if expired:
+                logger.info(f"⌛ Cleared {expired} expired queue lease(s)")
+            return expired
+            
+        except Exception as e:
+            logger.error(f"Failed to expire leases: {e}")
+            return 0
+    
     async def mark_as_reviewed(
         self,
         queue_id: int,
@@ -301,7 +660,7 @@ class AssessmentQueueManager:
             True if successful
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             # Get product_url before updating
@@ -315,13 +674,14 @@ class AssessmentQueueManager:
                     review_decision = ?,
                     reviewer_notes = ?,
                     reviewed_at = ?,
-                    reviewed_by = ?
+                    reviewed_by = ?,
+                    lease_owner = NULL,
+                    lease_expires_at = NULL
                 WHERE id = ?
             ''', (decision, reviewer_notes, datetime.utcnow().isoformat(), reviewed_by, queue_id))
             
             conn.commit()
             affected = cursor.rowcount
-            conn.close()
             
             if affected > 0:
                 # Update assessment_status in products table
@@ -354,19 +714,19 @@ class AssessmentQueueManager:
             True if successful
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            conn = self._get_connection()
             
-            cursor.execute('''
+            conn.execute('''
                 UPDATE assessment_queue 
                 SET status = 'skipped',
                     reviewer_notes = ?,
-                    reviewed_at = ?
+                    reviewed_at = ?,
+                    lease_owner = NULL,
+                    lease_expires_at = NULL
                 WHERE id = ?
             ''', (reason, datetime.utcnow().isoformat(), queue_id))
             
             conn.commit()
-            conn.close()
             
             logger.info(f"Skipped queue item {queue_id}")
             return True
@@ -379,54 +739,45 @@ class AssessmentQueueManager:
         """
         Get queue statistics
         
+        Reads the trigger-maintained assessment_queue_counts table
+        (a handful of rows) instead of scanning the queue.
+        
         Returns:
             Dict with queue statistics
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Overall stats
-            cursor.execute('''
-                SELECT 
-                    COUNT(*) as total,
-                    SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) as pending,
-                    SUM(CASE WHEN status = 'reviewed' THEN 1 ELSE 0 END) as reviewed,
-                    SUM(CASE WHEN status = 'skipped' THEN 1 ELSE 0 END) as skipped
-                FROM assessment_queue
-            ''')
-            overall = cursor.fetchone()
+            conn = self._get_connection()
             
-            # By review type
-            cursor.execute('''
-                SELECT 
-                    review_type,
-                    COUNT(*) as total,
-                    SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) as pending,
-                    SUM(CASE WHEN priority = 'high' AND status = 'pending' THEN 1 ELSE 0 END) as high_priority
-                FROM assessment_queue
-                GROUP BY review_type
-            ''')
-            by_type = {row[0]: {'total': row[1], 'pending': row[2], 'high_priority': row[3]} 
-                      for row in cursor.fetchall()}
+            overall = {'total': 0, 'pending': 0, 'reviewed': 0, 'skipped': 0}
+            by_type = {}
             
-            # Recent activity (last 24 hours)
-            cursor.execute('''
+            for row in conn.execute('''
+                SELECT review_type, status, priority, count
+                FROM assessment_queue_counts
+                WHERE count > 0
+            '''):
+                review_type, status, priority, count = row['review_type'], row['status'], row['priority'], row['count']
+                
+                overall['total'] += count
+                if status in overall:
+                    overall[status] += count
+                
+                type_stats = by_type.setdefault(review_type, {'total': 0, 'pending': 0, 'high_priority': 0})
+                type_stats['total'] += count
+                if status == 'pending':
+                    type_stats['pending'] += count
+                    if priority == 'high':
+                        type_stats['high_priority'] += count
+            
+            # Recent activity (last 24 hours, range scan on idx_queue_reviewed_at)
+            reviewed_24h = conn.execute('''
                 SELECT COUNT(*) 
                 FROM assessment_queue 
                 WHERE reviewed_at >= datetime('now', '-1 day')
-            ''')
-            reviewed_24h = cursor.fetchone()[0]
-            
-            conn.close()
+            ''').fetchone()[0]
             
             return {
-                'overall': {
-                    'total': overall[0],
-                    'pending': overall[1],
-                    'reviewed': overall[2],
-                    'skipped': overall[3]
-                },
+                'overall': overall,
                 'by_review_type': by_type,
                 'recent_activity': {
                     'reviewed_last_24h': reviewed_24h
@@ -437,9 +788,16 @@ class AssessmentQueueManager:
             logger.error(f"Failed to get queue stats: {e}")
             return {}
     
+    async def rebuild_counts(self):
+        """Recompute queue counters from scratch (repair after manual edits)"""
+        conn = self._get_connection()
+        with conn:
+            self._rebuild_counts(conn.cursor())
+        logger.info("Rebuilt assessment queue counters")
+    
     async def clear_reviewed_items(self, days_old: int = 30) -> int:
         """
-        Clear old reviewed/skipped items from queue
+        Clear old reviewed/skipped items from queue (and expired leases)
         
         Args:
             days_old: Remove items reviewed more than this many days ago
@@ -448,12 +806,11 @@ class AssessmentQueueManager:
             Number of items removed
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            conn = self._get_connection()
             
             cutoff = (datetime.utcnow() - timedelta(days=days_old)).isoformat()
             
-            cursor.execute('''
+            cursor = conn.execute('''
                 DELETE FROM assessment_queue 
                 WHERE status IN ('reviewed', 'skipped')
                 AND reviewed_at < ?
@@ -461,36 +818,41 @@ class AssessmentQueueManager:
             
             removed = cursor.rowcount
             conn.commit()
-            conn.close()
             
             logger.info(f"Cleared {removed} old reviewed/skipped items (>{days_old} days)")
-            return removed
             
         except Exception as e:
             logger.error(f"Failed to clear reviewed items: {e}")
-            return 0
+            removed = 0
+        
+        # Queue maintenance: drop stale lease owners too
+        await self.expire_leases()
+        return removed
     
     async def get_queue_items(
         self,
         review_type: Optional[str] = None,
         status: Optional[str] = None,
-        limit: int = 100
+        limit: int = 100,
+        before: Optional[Tuple[str, int]] = None
     ) -> List[QueueItem]:
         """
-        Get multiple queue items (for batch operations)
+        Get multiple queue items (for batch operations), newest first
+        
+        Pages by keyset: pass the (added_at, id) of the last item of the
+        previous page as `before` to get the next page.
         
         Args:
             review_type: Filter by review type
             status: Filter by status
             limit: Maximum items to return
+            before: Keyset cursor (added_at, id) from the previous page
             
         Returns:
             List of QueueItem objects
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            conn = self._get_connection()
             
             query = 'SELECT * FROM assessment_queue WHERE 1=1'
             params = []
@@ -503,56 +865,38 @@ class AssessmentQueueManager:
                 query += ' AND status = ?'
                 params.append(status)
             
-            query += ' ORDER BY added_at DESC LIMIT ?'
+            if before:
+                query += ' AND (added_at, id) < (?, ?)'
+                params.extend(before)
+            
+            query += ' ORDER BY added_at DESC, id DESC LIMIT ?'
             params.append(limit)
             
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-            
-            items = []
-            for row in rows:
-                product_data = json.loads(row['product_data'])
-                suspected_match = json.loads(row['suspected_match_data']) if row['suspected_match_data'] else None
-                
-                items.append(QueueItem(
-                    id=row['id'],
-                    product_url=row['product_url'],
-                    retailer=row['retailer'],
-                    category=row['category'],
-                    review_type=row['review_type'],
-                    priority=row['priority'],
-                    status=row['status'],
-                    product_data=product_data,
-                    suspected_match_data=suspected_match,
-                    review_decision=row['review_decision'],
-                    reviewer_notes=row['reviewer_notes'],
-                    reviewed_at=row['reviewed_at'],
-                    reviewed_by=row['reviewed_by'],
-                    added_at=row['added_at'],
-                    source_workflow=row['source_workflow']
-                ))
-            
-            conn.close()
-            return items
+            return [self._row_to_item(row) for row in conn.execute(query, params)]
             
         except Exception as e:
             logger.error(f"Failed to get queue items: {e}")
             return []
     
+    @staticmethod
+    def next_page_cursor(items: List[QueueItem]) -> Optional[Tuple[str, int]]:
+        """Keyset cursor for the page after `items` (None when empty)"""
+        if not items:
+            return None
+        return (items[-1].added_at, items[-1].id)
+    
     def _update_product_assessment_status(self, product_url: str, status: str):
         """Update assessment_status in products table (synchronous)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            conn = self._get_connection()
             
-            cursor.execute('''
+            conn.execute('''
                 UPDATE products 
                 SET assessment_status = ?, last_updated = ?
                 WHERE url = ?
             ''', (status, datetime.utcnow().isoformat(), product_url))
             
             conn.commit()
-            conn.close()
             
         except Exception as e:
             logger.debug(f"Could not update assessment_status for {product_url}: {e}")
@@ -560,8 +904,6 @@ class AssessmentQueueManager:
 
 # CLI for testing
 if __name__ == "__main__":
-    import asyncio
-    
     async def test_queue():
         """Test queue operations"""
         manager = AssessmentQueueManager()
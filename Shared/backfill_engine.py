@@ -0,0 +1,291 @@
+"""
+Backfill Engine
+Chunked, resumable backfills over large SQLite tables
+
+A backfill job reads its rows with keyset pagination (key > cursor ORDER BY
+key LIMIT chunk_size), processes each chunk against lookup tables preloaded
+once into memory (shared with worker processes through the pool
+initializer), and writes the results with executemany. The chunk's results
+and the resume cursor are committed in the same transaction, so an
+interrupted run picks up after the last committed chunk.
+
+Progress is logged per chunk as rows/s with an ETA.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from logger_config import setup_logging
+
+logger = setup_logging(__name__)
+
+
+# Worker process state, set once by the pool initializer
+_worker_process_chunk: Optional[Callable] = None
+_worker_context: Any = None
+
+
+def _init_worker(process_chunk: Callable, context: Any):
+    global _worker_process_chunk, _worker_context
+    _worker_process_chunk = process_chunk
+    _worker_context = context
+
+
+def _run_chunk(rows: List[tuple]) -> Tuple[List[tuple], Dict]:
+    return _worker_process_chunk(_worker_context, rows)
+
+
+def merge_counts(total: Dict, delta: Dict) -> Dict:
+    """Add nested dicts of numbers into total (in place)"""
+    for key, value in delta.items():
+        if isinstance(value, dict):
+            merge_counts(total.setdefault(key, {}), value)
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+class BackfillJob(ABC):
+    """
+    Base class for a backfill job
+
+    Subclasses define the rows to read and how to process and write them.
+    process_chunk must be a staticmethod (it runs in worker processes) and
+    must not touch the database.
+    """
+
+    name: str = None
+    table: str = None
+    key_column: str = 'rowid'
+    columns: str = '*'
+    where: str = '1 = 1'
+
+    def load_context(self, conn: sqlite3.Connection) -> Any:
+        """Lookup tables for process_chunk (must be picklable)"""
+        return None
+
+    @staticmethod
+    @abstractmethod
+    def process_chunk(context: Any, rows: List[tuple]) -> Tuple[List[tuple], Dict]:
+        """
+        Process rows (first column is the key)
+
+        Returns:
+            (write parameters for write(), stats counts for this chunk)
+        """
+
+    @abstractmethod
+    def write(self, conn: sqlite3.Connection, results: List[tuple]):
+        """executemany the chunk's results (caller commits)"""
+
+    def finish(self, conn: sqlite3.Connection, stats: Dict):
+        """Called once after the last chunk (caller commits)"""
+        pass
+
+
+class BackfillEngine:
+    """
+    Run a BackfillJob in chunks with a resume cursor
+
+    Features:
+    - Keyset pagination over the job's table (no OFFSET, no full fetchall)
+    - Lookup tables loaded once, shipped to each worker process once
+    - Chunks processed across a process pool, written in key order
+    - Results + cursor + cumulative stats committed per chunk
+    - Resumes an interrupted run; a completed job starts a fresh pass
+
+    Usage:
+        engine = BackfillEngine('Shared/products.db', MyJob(), workers=4)
+        summary = await engine.run()
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        job: BackfillJob,
+        chunk_size: int = 2000,
+        workers: int = None
+    ):
+        self.db_path = db_path
+        self.job = job
+        self.chunk_size = chunk_size
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+
+    def _get_connection(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_progress_table(self, conn):
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS backfill_progress (
+                job TEXT PRIMARY KEY,
+                last_key INTEGER,
+                rows_processed INTEGER DEFAULT 0,
+                rows_written INTEGER DEFAULT 0,
+                stats TEXT,
+                started_at TEXT,
+                updated_at TEXT,
+                completed_at TEXT
+            )
+        ''')
+        conn.commit()
+
+    def _load_progress(self, conn, restart: bool) -> Dict:
+        row = conn.execute('''
+            SELECT last_key, rows_processed, rows_written, stats, completed_at
+            FROM backfill_progress WHERE job = ?
+        ''', (self.job.name,)).fetchone()
+
+        if row and not restart and row[4] is None:
+            logger.info(f"⏯️ Resuming {self.job.name} after key {row[0]} ({row[1]:,} rows already processed)")
+            return {
+                'last_key': row[0],
+                'rows_processed': row[1],
+                'rows_written': row[2],
+                'stats': json.loads(row[3]) if row[3] else {}
+            }
+
+        now = datetime.now().isoformat()
+        conn.execute('''
+            INSERT OR REPLACE INTO backfill_progress
+            (job, last_key, rows_processed, rows_written, stats, started_at, updated_at, completed_at)
+            VALUES (?, NULL, 0, 0, '{}', ?, ?, NULL)
+        ''', (self.job.name, now, now))
+        conn.commit()
+        return {'last_key': None, 'rows_processed': 0, 'rows_written': 0, 'stats': {}}
+
+    def _fetch_chunk(self, conn, after_key) -> List[tuple]:
+        job = self.job
+        if after_key is None:
+            return conn.execute(f'''
+                SELECT {job.key_column}, {job.columns} FROM {job.table}
+                WHERE {job.where}
+                ORDER BY {job.key_column} LIMIT ?
+            ''', (self.chunk_size,)).fetchall()
+        return conn.execute(f'''
+            SELECT {job.key_column}, {job.columns} FROM {job.table}
+            WHERE ({job.where}) AND {job.key_column} > ?
+            ORDER BY {job.key_column} LIMIT ?
+        ''', (after_key, self.chunk_size)).fetchall()
+
+    def _count_remaining(self, conn, after_key) -> int:
+        job = self.job
+        if after_key is None:
+            return conn.execute(f'SELECT COUNT(*) FROM {job.table} WHERE {job.where}').fetchone()[0]
+        return conn.execute(
+            f'SELECT COUNT(*) FROM {job.table} WHERE ({job.where}) AND {job.key_column} > ?',
+            (after_key,)
+        ).fetchone()[0]
+
+    async def run(self, restart: bool = False) -> Dict:
+        """
+        Run (or resume) the job
+
+        Returns:
+            Summary with rows_processed, rows_written, elapsed, rows_per_second, stats
+        """
+        conn = self._get_connection()
+        pool = None
+        try:
+            self._init_progress_table(conn)
+            progress = self._load_progress(conn, restart)
+            remaining = self._count_remaining(conn, progress['last_key'])
+
+            logger.info(f"📊 {self.job.name}: {remaining:,} rows to process "
+                        f"(chunks of {self.chunk_size:,}, {self.workers} worker(s))")
+
+            load_start = time.perf_counter()
+            context = self.job.load_context(conn)
+            logger.info(f"📚 Lookup tables loaded in {time.perf_counter() - load_start:.1f}s")
+
+            if self.workers > 1:
+                pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(self.job.process_chunk, context)
+                )
+
+            start = time.perf_counter()
+            processed_this_run = 0
+            in_flight = deque()
+            read_key = progress['last_key']
+            exhausted = False
+
+            while True:
+                # Keep the pool busy: up to two chunks queued per worker
+                while not exhausted and len(in_flight) < max(1, self.workers * 2):
+                    rows = self._fetch_chunk(conn, read_key)
+                    if not rows:
+                        exhausted = True
+                        break
+                    read_key = rows[-1][0]
+                    if pool:
+                        future = asyncio.wrap_future(pool.submit(_run_chunk, rows))
+                    else:
+                        future = asyncio.get_running_loop().create_future()
+                        future.set_result(self.job.process_chunk(context, rows))
+                    in_flight.append((read_key, len(rows), future))
+
+                if not in_flight:
+                    break
+
+                # Write in key order so the cursor only moves past committed rows
+                chunk_key, chunk_rows, future = in_flight.popleft()
+                results, chunk_stats = await future
+
+                self.job.write(conn, results)
+                progress['rows_processed'] += chunk_rows
+                progress['rows_written'] += len(results)
+                merge_counts(progress['stats'], chunk_stats)
+                conn.execute('''
+                    UPDATE backfill_progress
+                    SET last_key = ?, rows_processed = ?, rows_written = ?, stats = ?, updated_at = ?
+                    WHERE job = ?
+                ''', (
+                    chunk_key, progress['rows_processed'], progress['rows_written'],
+                    json.dumps(progress['stats']), datetime.now().isoformat(), self.job.name
+                ))
+                conn.commit()
+
+                processed_this_run += chunk_rows
+                elapsed = time.perf_counter() - start
+                rate = processed_this_run / elapsed if elapsed > 0 else 0.0
+                eta = (remaining - processed_this_run) / rate if rate else 0.0
+                logger.info(
+                    f"⏳ Processed {processed_this_run:,}/{remaining:,} "
+                    f"({processed_this_run / max(remaining, 1) * 100:.1f}%) - "
+                    f"{rate:,.0f} rows/s, ETA {eta:.0f}s"
+                )
+
+            self.job.finish(conn, progress['stats'])
+            conn.execute('''
+                UPDATE backfill_progress SET completed_at = ?, updated_at = ? WHERE job = ?
+            ''', (datetime.now().isoformat(), datetime.now().isoformat(), self.job.name))
+            conn.commit()
+
+            elapsed = time.perf_counter() - start
+            summary = {
+                'rows_processed': progress['rows_processed'],
+                'rows_written': progress['rows_written'],
+                'rows_this_run': processed_this_run,
+                'elapsed': elapsed,
+                'rows_per_second': processed_this_run / elapsed if elapsed > 0 else 0.0,
+                'stats': progress['stats']
+            }
+            logger.info(
+                f"✅ {self.job.name} complete: {processed_this_run:,} rows in {elapsed:.1f}s "
+                f"({summary['rows_per_second']:,.0f} rows/s)"
+            )
+            return summary
+
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+            conn.close()
@@ -4,10 +4,13 @@ Sets lifecycle_stage for existing products in products table
 Run manually AFTER schema changes are applied
 """
 
-import sqlite3
+import argparse
+import asyncio
 from datetime import datetime
 import logging
 
+from backfill_engine import BackfillEngine, BackfillJob
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
@@ -15,11 +18,82 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def determine_lifecycle_stage(
+    source: str, 
+    shopify_status: str, 
+    modesty_status: str,
+    assessment_status: str
+) -> str:
+    """Determine lifecycle stage based on existing fields"""
+    
+    # Products from New Product Importer
+    if source == 'new_product_import':
+        return 'imported_direct'
+    
+    # Products published to Shopify (approved)
+    if shopify_status == 'published':
+        return 'assessed_approved'
+    
+    # Products kept as draft (rejected or pending)
+    if shopify_status == 'draft':
+        # Check if actually rejected
+        if modesty_status == 'not_modest':
+            return 'assessed_rejected'
+        # Otherwise pending assessment
+        return 'pending_assessment'
+    
+    # Products in assessment queue
+    if assessment_status in ['queued', 'pending_modesty_review']:
+        return 'pending_assessment'
+    
+    # Default: unknown
+    return 'unknown'
+
+
+class LifecycleStageJob(BackfillJob):
+    """Backfill job: classify products without a lifecycle_stage"""
+    
+    name = 'lifecycle_stages'
+    table = 'products'
+    key_column = 'rowid'
+    columns = 'source, shopify_status, modesty_status, assessment_status'
+    where = 'lifecycle_stage IS NULL'
+    
+    @staticmethod
+    def process_chunk(context, rows):
+        updates = []
+        stats = {}
+        
+        for rowid, source, shopify_status, modesty_status, assessment_status in rows:
+            lifecycle_stage = determine_lifecycle_stage(
+                source, shopify_status, modesty_status, assessment_status
+            )
+            
+            # Determine data_completeness
+            data_completeness = 'full'  # All existing products have full data
+            if shopify_status in ['published', 'draft']:
+                data_completeness = 'enriched'  # Has Shopify data
+            
+            updates.append((lifecycle_stage, data_completeness, rowid))
+            stats[lifecycle_stage] = stats.get(lifecycle_stage, 0) + 1
+        
+        return updates, stats
+    
+    def write(self, conn, results):
+        conn.executemany("""
+            UPDATE products
+            SET lifecycle_stage = ?,
+                data_completeness = ?
+            WHERE rowid = ?
+        """, results)
+
+
 class LifecycleBackfiller:
     """Backfills lifecycle stages for existing products"""
     
-    def __init__(self, db_path: str = 'Shared/products.db'):
+    def __init__(self, db_path: str = 'Shared/products.db', chunk_size: int = 5000):
         self.db_path = db_path
+        self.chunk_size = chunk_size
         self.stats = {
             'total_products': 0,
             'imported_direct': 0,
@@ -29,93 +103,27 @@ class LifecycleBackfiller:
             'unknown': 0
         }
     
-    def backfill_all(self):
-        """Main backfill process"""
+    def backfill_all(self, restart: bool = False):
+        """Main backfill process (resumes an interrupted run unless restart)"""
         logger.info("="*60)
         logger.info("🔄 STARTING LIFECYCLE BACKFILL")
         logger.info("="*60)
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get all products without lifecycle_stage
-        cursor.execute("""
-            SELECT url, source, shopify_status, modesty_status, assessment_status
-            FROM products
-            WHERE lifecycle_stage IS NULL
-        """)
-        products = cursor.fetchall()
-        self.stats['total_products'] = len(products)
-        
-        logger.info(f"\n📊 Found {len(products):,} products to classify\n")
-        
-        processed = 0
-        for product in products:
-            url, source, shopify_status, modesty_status, assessment_status = product
-            
-            # Determine lifecycle_stage
-            lifecycle_stage = self._determine_lifecycle_stage(
-                source, shopify_status, modesty_status, assessment_status
-            )
-            
-            # Determine data_completeness
-            data_completeness = 'full'  # All existing products have full data
-            if shopify_status in ['published', 'draft']:
-                data_completeness = 'enriched'  # Has Shopify data
-            
-            # Update product
-            cursor.execute("""
-                UPDATE products
-                SET lifecycle_stage = ?,
-                    data_completeness = ?
-                WHERE url = ?
-            """, (lifecycle_stage, data_completeness, url))
-            
-            # Track stats
-            self.stats[lifecycle_stage] += 1
-            
-            processed += 1
-            if processed % 100 == 0:
-                logger.info(f"⏳ Processed {processed:,}/{len(products):,} ({processed/len(products)*100:.1f}%)")
-                conn.commit()
+        # Classification is cheap; a process pool would cost more than it saves
+        engine = BackfillEngine(
+            self.db_path,
+            LifecycleStageJob(),
+            chunk_size=self.chunk_size,
+            workers=1
+        )
+        summary = asyncio.run(engine.run(restart=restart))
         
-        conn.commit()
-        conn.close()
+        for stage, count in summary['stats'].items():
+            self.stats[stage] = count
+        self.stats['total_products'] = summary['rows_processed']
         
         self._print_stats()
     
-    def _determine_lifecycle_stage(
-        self, 
-        source: str, 
-        shopify_status: str, 
-        modesty_status: str,
-        assessment_status: str
-    ) -> str:
-        """Determine lifecycle stage based on existing fields"""
-        
-        # Products from New Product Importer
-        if source == 'new_product_import':
-            return 'imported_direct'
-        
-        # Products published to Shopify (approved)
-        if shopify_status == 'published':
-            return 'assessed_approved'
-        
-        # Products kept as draft (rejected or pending)
-        if shopify_status == 'draft':
-            # Check if actually rejected
-            if modesty_status == 'not_modest':
-                return 'assessed_rejected'
-            # Otherwise pending assessment
-            return 'pending_assessment'
-        
-        # Products in assessment queue
-        if assessment_status in ['queued', 'pending_modesty_review']:
-            return 'pending_assessment'
-        
-        # Default: unknown
-        return 'unknown'
-    
     def _print_stats(self):
         """Print summary statistics"""
         total = self.stats['total_products']
@@ -134,6 +142,12 @@ class LifecycleBackfiller:
 
 
 if __name__ == '__main__':
-    backfiller = LifecycleBackfiller()
-    backfiller.backfill_all()
+    parser = argparse.ArgumentParser(description='Backfill products.lifecycle_stage')
+    parser.add_argument('--db', default='Shared/products.db', help='Products database path')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per chunk')
+    parser.add_argument('--restart', action='store_true', help='Ignore the resume cursor and start over')
+    args = parser.parse_args()
+    
+    backfiller = LifecycleBackfiller(args.db, chunk_size=args.chunk_size)
+    backfiller.backfill_all(restart=args.restart)
 
@@ -3,9 +3,15 @@ Backfill Product Linking
 Links existing catalog_products entries to products table entries
 Also initializes retailer_url_patterns with baseline data
 
+Runs on the chunked backfill engine: products are loaded once into
+per-retailer lookup tables, catalog rows are matched in chunks across a
+process pool, links are written with executemany, and an interrupted run
+resumes from the last committed chunk.
+
 Run manually AFTER schema changes are applied
 """
 
+import argparse
 import asyncio
 import sqlite3
 from datetime import datetime
@@ -14,6 +20,8 @@ from difflib import SequenceMatcher
 import logging
 import json
 
+from backfill_engine import BackfillEngine, BackfillJob
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
@@ -21,11 +29,221 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _normalize_url(url: str) -> str:
+    return url.split('?')[0].rstrip('/')
+
+
+def load_product_tables(conn: sqlite3.Connection) -> Dict[str, Dict]:
+    """
+    Per-retailer lookup tables over the products table
+    
+    Mirrors the per-row queries of the matching levels: exact URL,
+    normalized URL, product code, exact title, and 1-dollar price buckets
+    for the fuzzy title pass. First row (by rowid) wins, like LIMIT 1.
+    """
+    tables: Dict[str, Dict] = {}
+    
+    def table_for(retailer):
+        return tables.setdefault(retailer, {
+            'urls': set(),
+            'normalized': {},
+            'codes': {},
+            'titles': {},
+            'price_buckets': {},
+            'prefer_fuzzy': False
+        })
+    
+    rows = conn.execute("""
+        SELECT url, retailer, title, price, product_code FROM products ORDER BY rowid
+    """)
+    for url, retailer, title, price, product_code in rows:
+        if not url:
+            continue
+        t = table_for(retailer)
+        t['urls'].add(url)
+        t['normalized'].setdefault(_normalize_url(url), url)
+        if product_code:
+            t['codes'].setdefault(product_code, url)
+        if title is not None and price is not None:
+            t['titles'].setdefault(title, []).append((price, url))
+            t['price_buckets'].setdefault(int(price // 1), []).append(
+                (price, url, title.lower().strip())
+            )
+    
+    # Retailers whose URLs are unstable skip straight to title matching
+    try:
+        for retailer, best_method, stability in conn.execute("""
+            SELECT retailer, best_dedup_method, url_stability_score FROM retailer_url_patterns
+        """):
+            if stability is not None:
+                table_for(retailer)['prefer_fuzzy'] = (
+                    stability < 0.50 or best_method == 'fuzzy_title_price'
+                )
+    except sqlite3.OperationalError:
+        pass
+    
+    return tables
+
+
+def match_catalog_product(
+    tables: Dict[str, Dict],
+    catalog_url: str,
+    retailer: str,
+    title: str,
+    price: float,
+    product_code: str
+) -> Optional[Tuple[str, float, str]]:
+    """
+    Try to match catalog product to products table
+    Returns: (product_url, confidence, method) or None
+    """
+    t = tables.get(retailer)
+    if not t:
+        return None
+    
+    prefer_fuzzy = t['prefer_fuzzy']
+    
+    # Level 1: Exact URL match (skip if prefer fuzzy)
+    if not prefer_fuzzy and catalog_url in t['urls']:
+        return (catalog_url, 1.0, 'exact_url')
+    
+    # Level 2: Normalized URL match
+    if not prefer_fuzzy:
+        url = t['normalized'].get(_normalize_url(catalog_url))
+        if url:
+            return (url, 0.95, 'normalized_url')
+    
+    # Level 3: Product code match
+    if product_code and not prefer_fuzzy:
+        url = t['codes'].get(product_code)
+        if url:
+            return (url, 0.90, 'product_code')
+    
+    if not (title and price):
+        return None
+    
+    # Level 4: Exact title + price
+    for candidate_price, url in t['titles'].get(title, ()):
+        if abs(candidate_price - price) < 1.0:
+            return (url, 0.95, 'exact_title_price')
+    
+    # Level 5: Fuzzy title + price (ALWAYS try, especially for unstable retailers)
+    query = title.lower().strip()
+    matcher = SequenceMatcher(None, query, '')
+    best_match = None
+    best_similarity = 0.0
+    
+    bucket = int(price // 1)
+    for key in (bucket - 1, bucket, bucket + 1):
+        for candidate_price, url, candidate_title in t['price_buckets'].get(key, ()):
+            if abs(candidate_price - price) >= 1.0:
+                continue
+            
+            matcher.set_seq2(candidate_title)
+            # Upper bounds first: only > 0.90 and > best can change the outcome
+            floor = max(best_similarity, 0.90)
+            if matcher.real_quick_ratio() <= floor or matcher.quick_ratio() <= floor:
+                continue
+            
+            similarity = matcher.ratio()
+            if similarity > best_similarity:
+                best_similarity = similarity
+                best_match = url
+    
+    if best_similarity > 0.90:
+        confidence = 0.85 + (best_similarity - 0.90) * 0.5
+        return (best_match, confidence, 'fuzzy_title_price')
+    
+    # No match found with sufficient confidence
+    return None
+
+
+class ProductLinkingJob(BackfillJob):
+    """Backfill job: link unlinked catalog_products rows"""
+    
+    name = 'product_linking'
+    table = 'catalog_products'
+    key_column = 'id'
+    columns = 'catalog_url, retailer, title, price, product_code'
+    where = 'linked_product_url IS NULL'
+    
+    def __init__(self, linker: 'ProductLinker'):
+        self.linker = linker
+    
+    def load_context(self, conn):
+        return load_product_tables(conn)
+    
+    @staticmethod
+    def process_chunk(tables, rows):
+        updates = []
+        overall = {
+            'linked': 0, 'high_confidence': 0, 'medium_confidence': 0,
+            'unlinked': 0, 'by_method': {}, 'by_retailer': {}
+        }
+        retailers = {}
+        
+        for cp_id, catalog_url, retailer, title, price, product_code in rows:
+            r = retailers.setdefault(retailer, {
+                'total': 0, 'linked': 0, 'url_changes': 0, 'method_counts': {},
+                'confidence_sum': 0.0, 'confidence_count': 0
+            })
+            r['total'] += 1
+            
+            match = match_catalog_product(tables, catalog_url, retailer, title, price, product_code)
+            if not match:
+                overall['unlinked'] += 1
+                continue
+            
+            product_url, confidence, method = match
+            
+            # Track method usage
+            r['method_counts'][method] = r['method_counts'].get(method, 0) + 1
+            r['confidence_sum'] += confidence
+            r['confidence_count'] += 1
+            
+            # Track URL changes
+            if _normalize_url(catalog_url) != _normalize_url(product_url):
+                r['url_changes'] += 1
+            
+            # Only link if confidence >= 85%
+            if confidence >= 0.85:
+                updates.append((product_url, confidence, method, cp_id))
+                overall['linked'] += 1
+                overall['by_method'][method] = overall['by_method'].get(method, 0) + 1
+                overall['by_retailer'][retailer] = overall['by_retailer'].get(retailer, 0) + 1
+                r['linked'] += 1
+                
+                if confidence >= 0.95:
+                    overall['high_confidence'] += 1
+                else:
+                    overall['medium_confidence'] += 1
+            else:
+                overall['unlinked'] += 1
+        
+        return updates, {'overall': overall, 'retailers': retailers}
+    
+    def write(self, conn, results):
+        conn.executemany("""
+            UPDATE catalog_products
+            SET linked_product_url = ?,
+                link_confidence = ?,
+                link_method = ?
+            WHERE id = ?
+        """, results)
+    
+    def finish(self, conn, stats):
+        # Initialize retailer_url_patterns table with learned data
+        self.linker.retailer_stats = stats.get('retailers', {})
+        self.linker._initialize_retailer_patterns(conn.cursor())
+
+
 class ProductLinker:
     """Links catalog_products to products table using multi-level matching"""
     
-    def __init__(self, db_path: str = 'Shared/products.db'):
+    def __init__(self, db_path: str = 'Shared/products.db', workers: int = None, chunk_size: int = 2000):
         self.db_path = db_path
+        self.workers = workers
+        self.chunk_size = chunk_size
         self.stats = {
             'total_catalog_products': 0,
             'linked': 0,
@@ -41,205 +259,28 @@ class ProductLinker:
         """Get database connection"""
         return sqlite3.connect(self.db_path)
     
-    async def backfill_all(self):
-        """Main backfill process"""
+    async def backfill_all(self, restart: bool = False):
+        """Main backfill process (resumes an interrupted run unless restart)"""
         logger.info("="*60)
         logger.info("🔗 STARTING PRODUCT LINKING BACKFILL")
         logger.info("="*60)
         
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Get all catalog products not yet linked
-        cursor.execute("""
-            SELECT id, catalog_url, retailer, title, price, product_code, image_urls
-            FROM catalog_products
-            WHERE linked_product_url IS NULL
-        """)
-        catalog_products = cursor.fetchall()
-        self.stats['total_catalog_products'] = len(catalog_products)
-        
-        logger.info(f"\n📊 Found {len(catalog_products):,} catalog products to link\n")
-        
-        # Initialize retailer stats tracking
-        cursor.execute("SELECT DISTINCT retailer FROM catalog_products")
-        retailers = [r[0] for r in cursor.fetchall()]
-        for retailer in retailers:
-            self.retailer_stats[retailer] = {
-                'total': 0,
-                'linked': 0,
-                'url_changes': 0,
-                'method_counts': {},
-                'confidences': []
-            }
-        
-        # Process each one
-        processed = 0
-        for cp in catalog_products:
-            cp_id, catalog_url, retailer, title, price, product_code, image_urls = cp
-            
-            match = await self._find_matching_product(
-                cursor, catalog_url, retailer, title, price, product_code, image_urls
-            )
-            
-            # Track retailer stats
-            self.retailer_stats[retailer]['total'] += 1
-            
-            if match:
-                product_url, confidence, method = match
-                
-                # Track method usage
-                self.retailer_stats[retailer]['method_counts'][method] = \
-                    self.retailer_stats[retailer]['method_counts'].get(method, 0) + 1
-                self.retailer_stats[retailer]['confidences'].append(confidence)
-                
-                # Track URL changes
-                normalized_catalog = catalog_url.split('?')[0].rstrip('/')
-                normalized_product = product_url.split('?')[0].rstrip('/')
-                if normalized_catalog != normalized_product:
-                    self.retailer_stats[retailer]['url_changes'] += 1
-                
-                # Only link if confidence >= 85%
-                if confidence >= 0.85:
-                    # Update catalog_products
-                    cursor.execute("""
-                        UPDATE catalog_products
-                        SET linked_product_url = ?,
-                            link_confidence = ?,
-                            link_method = ?
-                        WHERE id = ?
-                    """, (product_url, confidence, method, cp_id))
-                    
-                    self.stats['linked'] += 1
-                    self.stats['by_method'][method] = self.stats['by_method'].get(method, 0) + 1
-                    self.stats['by_retailer'][retailer] = self.stats['by_retailer'].get(retailer, 0) + 1
-                    self.retailer_stats[retailer]['linked'] += 1
-                    
-                    if confidence >= 0.95:
-                        self.stats['high_confidence'] += 1
-                    else:
-                        self.stats['medium_confidence'] += 1
-                else:
-                    self.stats['unlinked'] += 1
-            else:
-                self.stats['unlinked'] += 1
-            
-            processed += 1
-            if processed % 100 == 0:
-                logger.info(f"⏳ Processed {processed:,}/{len(catalog_products):,} ({processed/len(catalog_products)*100:.1f}%)")
-                conn.commit()  # Commit periodically
-        
-        conn.commit()
-        
-        # Initialize retailer_url_patterns table with learned data
-        await self._initialize_retailer_patterns(cursor)
+        engine = BackfillEngine(
+            self.db_path,
+            ProductLinkingJob(self),
+            chunk_size=self.chunk_size,
+            workers=self.workers
+        )
+        summary = await engine.run(restart=restart)
         
-        conn.commit()
-        conn.close()
+        overall = summary['stats'].get('overall', {})
+        self.stats.update({key: value for key, value in overall.items() if key in self.stats})
+        self.stats['total_catalog_products'] = summary['rows_processed']
         
         self._print_stats()
+        logger.info(f"⚡ Throughput: {summary['rows_per_second']:,.0f} rows/s")
     
-    async def _find_matching_product(
-        self, 
-        cursor, 
-        catalog_url: str, 
-        retailer: str, 
-        title: str, 
-        price: float, 
-        product_code: str, 
-        image_urls: str
-    ) -> Optional[Tuple[str, float, str]]:
-        """
-        Try to match catalog product to products table
-        Returns: (product_url, confidence, method) or None
-        """
-        
-        # Check if this retailer prefers fuzzy matching (would be empty initially)
-        cursor.execute("""
-            SELECT best_dedup_method, url_stability_score 
-            FROM retailer_url_patterns 
-            WHERE retailer = ?
-        """, (retailer,))
-        pattern_result = cursor.fetchone()
-        
-        prefer_fuzzy = False
-        if pattern_result:
-            best_method, stability = pattern_result
-            prefer_fuzzy = (stability < 0.50 or best_method == 'fuzzy_title_price')
-        
-        # Level 1: Exact URL match (skip if prefer fuzzy)
-        if not prefer_fuzzy:
-            cursor.execute("""
-                SELECT url FROM products 
-                WHERE url = ? AND retailer = ?
-            """, (catalog_url, retailer))
-            result = cursor.fetchone()
-            if result:
-                return (result[0], 1.0, 'exact_url')
-        
-        # Level 2: Normalized URL match
-        if not prefer_fuzzy:
-            normalized = catalog_url.split('?')[0].rstrip('/')
-            cursor.execute("""
-                SELECT url FROM products 
-                WHERE RTRIM(SUBSTR(url, 1, INSTR(url || '?', '?') - 1), '/') = ?
-                AND retailer = ?
-            """, (normalized, retailer))
-            result = cursor.fetchone()
-            if result:
-                return (result[0], 0.95, 'normalized_url')
-        
-        # Level 3: Product code match
-        if product_code and not prefer_fuzzy:
-            cursor.execute("""
-                SELECT url FROM products 
-                WHERE product_code = ? AND retailer = ?
-            """, (product_code, retailer))
-            result = cursor.fetchone()
-            if result:
-                return (result[0], 0.90, 'product_code')
-        
-        # Level 4: Exact title + price
-        if title and price:
-            cursor.execute("""
-                SELECT url FROM products 
-                WHERE title = ? AND ABS(price - ?) < 1.0 AND retailer = ?
-            """, (title, price, retailer))
-            result = cursor.fetchone()
-            if result:
-                return (result[0], 0.95, 'exact_title_price')
-        
-        # Level 5: Fuzzy title + price (ALWAYS try, especially for unstable retailers)
-        if title and price:
-            cursor.execute("""
-                SELECT url, title FROM products 
-                WHERE ABS(price - ?) < 1.0 AND retailer = ?
-            """, (price, retailer))
-            
-            products = cursor.fetchall()
-            
-            best_match = None
-            best_similarity = 0.0
-            
-            for product_url, product_title in products:
-                similarity = SequenceMatcher(
-                    None, 
-                    title.lower().strip(), 
-                    product_title.lower().strip()
-                ).ratio()
-                
-                if similarity > best_similarity:
-                    best_similarity = similarity
-                    best_match = product_url
-            
-            if best_similarity > 0.90:
-                confidence = 0.85 + (best_similarity - 0.90) * 0.5
-                return (best_match, confidence, 'fuzzy_title_price')
-        
-        # No match found with sufficient confidence
-        return None
-    
-    async def _initialize_retailer_patterns(self, cursor):
+    def _initialize_retailer_patterns(self, cursor):
         """Initialize retailer_url_patterns table with backfill data"""
         logger.info("\n" + "="*60)
         logger.info("🌱 INITIALIZING RETAILER PATTERNS")
@@ -265,7 +306,10 @@ class ProductLinker:
                 best_method = 'url'
             
             # Calculate average confidence
-            avg_confidence = sum(stats['confidences']) / len(stats['confidences']) if stats['confidences'] else 0.85
+            avg_confidence = (
+                stats['confidence_sum'] / stats['confidence_count']
+                if stats['confidence_count'] else 0.85
+            )
             
             # Generate notes
             notes = (
@@ -335,8 +379,15 @@ class ProductLinker:
 
 async def main():
     """Main entry point"""
-    linker = ProductLinker()
-    await linker.backfill_all()
+    parser = argparse.ArgumentParser(description='Link catalog_products to products')
+    parser.add_argument('--db', default='Shared/products.db', help='Products database path')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=2000, help='Rows per chunk')
+    parser.add_argument('--restart', action='store_true', help='Ignore the resume cursor and start over')
+    args = parser.parse_args()
+    
+    linker = ProductLinker(args.db, workers=args.workers, chunk_size=args.chunk_size)
+    await linker.backfill_all(restart=args.restart)
 
 
 if __name__ == '__main__':
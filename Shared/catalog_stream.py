@@ -0,0 +1,131 @@
+"""
+Catalog Stream - Incremental catalog extraction primitives
+
+Shared by the catalog towers' stream_catalog() async generators and the
+streaming catalog monitor path. A tower yields CatalogChunk objects as soon
+as a page (or a slice of a page's product tiles) has been parsed, so the
+consumer can dedup, snapshot and re-extract while later pages are fetched.
+
+Key features:
+- CatalogChunk: one batch of products with its page number and source URL
+- catalog_page_urls(): page URLs to walk (pagination helper or single URL)
+- chunk_products() / page_chunks(): split a page's products into bounded batches
+- prefetch_pages(): fetch pages one ahead of the consumer, yield in order
+"""
+
+import asyncio
+import os
+import sys
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
+
+sys.path.append(os.path.dirname(__file__))
+from pagination_url_helper import get_pagination_urls
+
+# Products per yielded chunk (bounds the consumer's per-chunk DB work and memory)
+STREAM_CHUNK_SIZE = int(os.getenv('CATALOG_STREAM_CHUNK_SIZE', '25'))
+
+# Pages fetched ahead of the one the consumer is processing
+STREAM_PREFETCH_PAGES = int(os.getenv('CATALOG_STREAM_PREFETCH_PAGES', '1'))
+
+
+@dataclass
+class CatalogChunk:
+    """A batch of catalog products yielded by a tower's stream_catalog()"""
+    products: List[Dict]
+    page: int                   # 1-based page number
+    url: str                    # Page URL the products came from
+    method_used: str
+    chunk: int = 0              # Chunk index within the page
+    last_in_page: bool = True
+    error: Optional[str] = None
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+
+def catalog_page_urls(
+    catalog_url: str,
+    retailer: str,
+    category: str,
+    max_pages: int = 1,
+    custom_url: bool = False
+) -> List[str]:
+    """
+    Page URLs to stream for a catalog
+
+    Paginated retailers get their configured page URLs (capped at max_pages);
+    infinite-scroll retailers and custom URLs get the single catalog URL.
+    """
+    if not custom_url:
+        pagination_urls = get_pagination_urls(retailer, category)
+        if pagination_urls:
+            return pagination_urls[:max(1, max_pages)]
+    return [catalog_url]
+
+
+def chunk_products(products: List[Dict], chunk_size: Optional[int] = None) -> Iterator[List[Dict]]:
+    """Split products into batches of at most chunk_size (at least one batch)"""
+    size = max(1, chunk_size or STREAM_CHUNK_SIZE)
+    if not products:
+        yield []
+        return
+    for start in range(0, len(products), size):
+        yield products[start:start + size]
+
+
+def page_chunks(
+    products: List[Dict],
+    page: int,
+    url: str,
+    method_used: str,
+    chunk_size: Optional[int] = None,
+    error: Optional[str] = None,
+    stats: Optional[Dict[str, Any]] = None
+) -> Iterator[CatalogChunk]:
+    """CatalogChunks for one parsed page (an empty page yields one empty chunk)"""
+    batches = list(chunk_products(products, chunk_size))
+    for index, batch in enumerate(batches):
+        yield CatalogChunk(
+            products=batch,
+            page=page,
+            url=url,
+            method_used=method_used,
+            chunk=index,
+            last_in_page=index == len(batches) - 1,
+            error=error,
+            stats=stats or {}
+        )
+
+
+async def prefetch_pages(
+    page_urls: List[str],
+    fetch_page: Callable[[int, str], Awaitable[Any]],
+    prefetch: Optional[int] = None
+) -> AsyncIterator[Any]:
+    """
+    Run fetch_page(page, url) for each page and yield the results in page order
+
+    Up to `prefetch` pages are fetched ahead of the consumer, so the next page
+    downloads while the current one is being processed. Pages not yet consumed
+    are cancelled if the consumer stops early.
+    """
+    ahead = STREAM_PREFETCH_PAGES if prefetch is None else max(0, prefetch)
+    pending = deque()
+    remaining = iter(enumerate(page_urls, 1))
+
+    def start_next():
+        item = next(remaining, None)
+        if item is not None:
+            pending.append(asyncio.ensure_future(fetch_page(*item)))
+
+    for _ in range(ahead + 1):
+        start_next()
+
+    try:
+        while pending:
+            result = await pending.popleft()
+            start_next()
+            yield result
+    finally:
+        for task in pending:
+            task.cancel()
@@ -3,6 +3,12 @@
 Database Sync Module
 Two-way sync: Pulls assessments from server, then pushes local changes
 Uses lifecycle tracking to merge changes intelligently
+
+Modes:
+- changeset (default): ships only rows changed since the last sync as
+  gzipped JSONL deltas in both directions (see db_changesets.py)
+- full: uploads/downloads the whole products.db over SCP (first sync and
+  fallback when the server cannot run the changeset tool)
 """
 
 import paramiko
@@ -16,6 +22,8 @@ import sqlite3
 import json
 import tempfile
 
+import db_changesets
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,12 +33,13 @@ class DatabaseSync:
     Used by catalog monitoring workflow to keep assessment pipeline updated
     """
     
-    def __init__(self, local_db_path: Optional[str] = None):
+    def __init__(self, local_db_path: Optional[str] = None, mode: str = 'changeset'):
         """
         Initialize database sync
         
         Args:
             local_db_path: Path to local database (defaults to Shared/products.db)
+            mode: 'changeset' (incremental deltas) or 'full' (whole-file SCP)
         """
         if local_db_path is None:
             # Default to Shared/products.db
@@ -44,6 +53,15 @@ class DatabaseSync:
         self.server_password = "modestyassessor"
         self.remote_db_path = "/var/www/html/web_assessment/data/products.db"
         
+        # Changeset sync: tool uploaded next to nothing web-served
+        self.mode = mode
+        self.remote_tool_path = "/root/db_changesets.py"
+        self.remote_tmp_dir = "/tmp"
+        
+        # Transfer stats for this instance
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        
         logger.info(f"DatabaseSync initialized: {self.local_db_path} -> {self.remote_db_path}")
     
     def validate_local_db(self) -> Tuple[bool, str]:
@@ -97,6 +115,7 @@ class DatabaseSync:
                 scp.get(self.remote_db_path, temp_server_db.name)
             
             ssh.close()
+            self.bytes_received += os.path.getsize(temp_server_db.name)
             logger.info("✅ Server database downloaded")
             
             # Query server database for assessed products
@@ -196,6 +215,41 @@ class DatabaseSync:
         """
         Two-way sync: Pull assessments from server, then push local changes
         
+        In changeset mode only rows changed since the last sync are shipped;
+        falls back to the full-file sync if the changeset sync fails.
+        
+        Args:
+            create_backup: Create backup of server DB before writing to it
+            verify: Verify upload after completion (full mode)
+            pull_first: Pull server assessments before pushing (default: True)
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if self.mode == 'changeset':
+            try:
+                return self.sync_changesets(create_backup=create_backup, pull_first=pull_first)
+            except Exception as e:
+                logger.warning(f"⚠️  Changeset sync failed ({e}), falling back to full sync")
+            
+            # The server DB (and its sync_changelog numbering) is replaced,
+            # so the stored cursors no longer mean anything
+            success = self._sync_full_file(create_backup, verify, pull_first)
+            if success:
+                self._rebaseline_cursors()
+            return success
+        
+        return self._sync_full_file(create_backup, verify, pull_first)
+    
+    def _sync_full_file(
+        self,
+        create_backup: bool = True,
+        verify: bool = True,
+        pull_first: bool = True
+    ) -> bool:
+        """
+        Full-file two-way sync: Pull assessments from server, then upload the whole DB
+        
         Args:
             create_backup: Create backup of server DB before overwriting
             verify: Verify upload after completion
@@ -266,6 +320,7 @@ class DatabaseSync:
             logger.info("📤 Uploading database to server...")
             with SCPClient(ssh.get_transport(), progress=self._progress) as scp:
                 scp.put(str(self.local_db_path), self.remote_db_path)
+            self.bytes_sent += self.local_db_path.stat().st_size
             logger.info("✅ Upload complete")
             
             # Set correct permissions
@@ -300,6 +355,230 @@ class DatabaseSync:
             logger.error(f"❌ Database sync failed: {e}")
             return False
     
+    # =================== CHANGESET SYNC ===================
+    
+    def sync_changesets(self, create_backup: bool = True, pull_first: bool = True) -> bool:
+        """
+        Incremental two-way sync using row-level changesets
+        
+        Process:
+        1. Install change tracking locally and on the server (idempotent)
+        2. First run (no cursors yet): full-file sync establishes the baseline
+        3. Pull: server rows changed since pull_cursor → apply assessments (LWW)
+        4. Push: local rows changed since push_cursor → server upsert (LWW)
+        
+        Raises:
+            Exception: If the server cannot run the changeset tool
+        """
+        valid, message = self.validate_local_db()
+        if not valid:
+            logger.error(f"❌ Database sync failed: {message}")
+            return False
+        
+        local_conn = sqlite3.connect(self.local_db_path, timeout=30)
+        try:
+            db_changesets.install(local_conn)
+            push_cursor = db_changesets.get_meta(local_conn, 'push_cursor')
+            pull_cursor = db_changesets.get_meta(local_conn, 'pull_cursor')
+            local_version = db_changesets.max_version(local_conn)
+        finally:
+            local_conn.close()
+        
+        ssh = self._connect_ssh()
+        try:
+            self._upload_changeset_tool(ssh)
+            remote_version = self._run_remote_tool(ssh, 'max-version')['max_version']
+            
+            if push_cursor is None or pull_cursor is None or remote_version is None:
+                logger.info("📋 No changeset baseline yet - running full sync once")
+                ssh.close()
+                if not self._sync_full_file(create_backup=create_backup, verify=False, pull_first=pull_first):
+                    return False
+                
+                ssh = self._connect_ssh()
+                remote_version = self._run_remote_tool(ssh, 'install')['max_version']
+                self._set_cursors(push=local_version, pull=remote_version)
+                logger.info(f"✅ Changeset baseline recorded (local v{local_version}, server v{remote_version})")
+                return True
+            
+            pulled = 0
+            if pull_first:
+                pulled = self._pull_changeset(ssh, int(pull_cursor))
+            
+            pushed = self._push_changeset(ssh, int(push_cursor), create_backup)
+            
+            logger.info("=" * 60)
+            logger.info(
+                f"✅ CHANGESET SYNC COMPLETE: pulled {pulled}, pushed {pushed} rows "
+                f"(sent {self.bytes_sent:,} B, received {self.bytes_received:,} B)"
+            )
+            logger.info("=" * 60)
+            return True
+        finally:
+            ssh.close()
+    
+    def _pull_changeset(self, ssh, since_version: int) -> int:
+        """Download server changes since cursor and apply assessments locally"""
+        logger.info(f"🔽 Pulling server changes since v{since_version}...")
+        remote_file = f"{self.remote_tmp_dir}/pull_changeset_{os.getpid()}.jsonl.gz"
+        header = self._run_remote_tool(
+            ssh, 'export', '--since', str(since_version), '--out', remote_file
+        )
+        
+        if header['changes'] == 0:
+            self._remove_remote_file(ssh, remote_file)
+            logger.info("ℹ️  No server changes to pull")
+            self._set_cursors(pull=header['to_version'])
+            return 0
+        
+        local_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jsonl.gz')
+        local_file.close()
+        try:
+            with SCPClient(ssh.get_transport()) as scp:
+                scp.get(remote_file, local_file.name)
+            self._remove_remote_file(ssh, remote_file)
+            self.bytes_received += os.path.getsize(local_file.name)
+            
+            _, changes = db_changesets.read_changeset(local_file.name)
+            local_conn = sqlite3.connect(self.local_db_path, timeout=30)
+            try:
+                stats = db_changesets.apply_changes(local_conn, changes, mode='lww')
+                db_changesets.set_meta(local_conn, 'pull_cursor', header['to_version'])
+            finally:
+                local_conn.close()
+        finally:
+            os.unlink(local_file.name)
+        
+        logger.info(f"✅ Applied {stats['applied']} server changes ({stats['skipped']} skipped)")
+        return stats['applied']
+    
+    def _push_changeset(self, ssh, since_version: int, create_backup: bool) -> int:
+        """Export local changes since cursor and apply them on the server"""
+        logger.info(f"🔼 Pushing local changes since v{since_version}...")
+        local_conn = sqlite3.connect(self.local_db_path, timeout=30)
+        try:
+            header, changes = db_changesets.export_changes(local_conn, since_version)
+        finally:
+            local_conn.close()
+        
+        if not changes:
+            logger.info("ℹ️  No local changes to push")
+            self._set_cursors(push=header['to_version'])
+            return 0
+        
+        local_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jsonl.gz')
+        local_file.close()
+        remote_file = f"{self.remote_tmp_dir}/push_changeset_{os.getpid()}.jsonl.gz"
+        try:
+            self.bytes_sent += db_changesets.write_changeset(local_file.name, header, changes)
+            with SCPClient(ssh.get_transport()) as scp:
+                scp.put(local_file.name, remote_file)
+        finally:
+            os.unlink(local_file.name)
+        
+        if create_backup:
+            backup_name = f"{self.remote_db_path}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            stdin, stdout, stderr = ssh.exec_command(f"cp {self.remote_db_path} {backup_name}")
+            stdout.channel.recv_exit_status()
+        
+        stats = self._run_remote_tool(
+            ssh, 'apply', '--in', remote_file, '--mode', 'upsert'
+        )
+        self._remove_remote_file(ssh, remote_file)
+        
+        self._set_cursors(push=header['to_version'])
+        logger.info(
+            f"✅ Server applied {stats['applied']} rows, {stats['deleted']} deletes "
+            f"({stats['skipped']} kept server version)"
+        )
+        return stats['applied'] + stats['deleted']
+    
+    def _rebaseline_cursors(self):
+        """
+        Record fresh cursors after a full-file sync (same as the first-run baseline)
+        
+        If the server cannot be reached, the cursors are cleared instead so the
+        next changeset sync establishes the baseline itself.
+        """
+        try:
+            local_conn = sqlite3.connect(self.local_db_path, timeout=30)
+            try:
+                db_changesets.install(local_conn)
+                local_version = db_changesets.max_version(local_conn)
+            finally:
+                local_conn.close()
+            
+            ssh = self._connect_ssh()
+            try:
+                self._upload_changeset_tool(ssh)
+                remote_version = self._run_remote_tool(ssh, 'install')['max_version']
+            finally:
+                ssh.close()
+            
+            self._set_cursors(push=local_version, pull=remote_version)
+            logger.info(f"✅ Changeset baseline re-recorded (local v{local_version}, server v{remote_version})")
+        except Exception as e:
+            logger.warning(f"⚠️  Could not re-record changeset baseline ({e}), clearing cursors")
+            local_conn = sqlite3.connect(self.local_db_path, timeout=30)
+            try:
+                db_changesets.delete_meta(local_conn, 'push_cursor', 'pull_cursor')
+            finally:
+                local_conn.close()
+    
+    def _remove_remote_file(self, ssh, remote_file: str):
+        stdin, stdout, stderr = ssh.exec_command(f"rm -f {remote_file}")
+        stdout.channel.recv_exit_status()  # Wait for completion
+    
+    def _set_cursors(self, push: Optional[int] = None, pull: Optional[int] = None):
+        local_conn = sqlite3.connect(self.local_db_path, timeout=30)
+        try:
+            if push is not None:
+                db_changesets.set_meta(local_conn, 'push_cursor', push)
+            if pull is not None:
+                db_changesets.set_meta(local_conn, 'pull_cursor', pull)
+        finally:
+            local_conn.close()
+    
+    def _connect_ssh(self) -> paramiko.SSHClient:
+        ssh = paramiko.SSHClient()
+        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        ssh.connect(
+            self.server_ip,
+            username=self.server_user,
+            password=self.server_password,
+            timeout=10
+        )
+        return ssh
+    
+    def _upload_changeset_tool(self, ssh):
+        """Upload db_changesets.py (stdlib only) so the server can export/apply deltas"""
+        tool_path = Path(db_changesets.__file__)
+        with SCPClient(ssh.get_transport()) as scp:
+            scp.put(str(tool_path), self.remote_tool_path)
+        self.bytes_sent += tool_path.stat().st_size
+    
+    def _run_remote_tool(self, ssh, command: str, *args: str) -> Dict:
+        """Run the changeset tool against the server DB and parse its JSON result"""
+        cmd = ' '.join(
+            ['python3', self.remote_tool_path, command, '--db', self.remote_db_path, *args]
+        )
+        stdin, stdout, stderr = ssh.exec_command(cmd)
+        exit_status = stdout.channel.recv_exit_status()
+        output = stdout.read().decode().strip()
+        
+        if exit_status != 0:
+            raise RuntimeError(f"remote {command} failed: {stderr.read().decode().strip()[:300]}")
+        
+        return json.loads(output.splitlines()[-1])
+    
+    def get_sync_stats(self) -> Dict:
+        """Bytes transferred by this instance"""
+        return {
+            'mode': self.mode,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received
+        }
+    
     def _progress(self, filename, size, sent):
         """Progress callback for SCP upload"""
         if size > 0:
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Database Changesets - Row-level change tracking and compressed deltas
+Used by database_sync.py for incremental two-way sync with the web server
+
+Triggers on the synced tables record every inserted/updated/deleted row in
+sync_changelog with a monotonically increasing version. A changeset is the
+set of rows changed since a version cursor, shipped as gzipped JSON lines
+and applied on the other side in one transaction with last-writer-wins on
+the assessment timestamp.
+
+Standard library only: the same file is uploaded to the server and run
+there as a CLI (install / export / apply / max-version).
+"""
+
+import argparse
+import gzip
+import json
+import sqlite3
+import sys
+from typing import Dict, List, Optional, Tuple
+
+# Synced tables
+# key: natural key columns (surrogate ids differ between databases)
+# lww_column: timestamp deciding who wins for the lww_columns
+# decided_column / decided_values: a pulled row is only applied if it is in a
+#   decided state, and then only over a local row that is undecided or older
+SYNC_TABLES = {
+    'products': {
+        'key': ('url',),
+        'lww_column': 'assessed_at',
+        'lww_columns': ('lifecycle_stage', 'assessed_at', 'modesty_status', 'shopify_status', 'last_updated'),
+        'decided_column': 'lifecycle_stage',
+        'decided_values': ('assessed_approved', 'assessed_rejected'),
+    },
+    'assessment_queue': {
+        'key': ('product_url', 'review_type'),
+        'lww_column': 'reviewed_at',
+        'lww_columns': ('status', 'review_decision', 'reviewer_notes', 'reviewed_at', 'reviewed_by'),
+    },
+}
+
+# Never shipped (autoincrement ids and review leases are local to each database)
+EXCLUDED_COLUMNS = {'id', 'lease_owner', 'lease_expires_at'}
+
+KEY_SEPARATOR = '\x1f'
+
+FORMAT_VERSION = 1
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+
+def _key_expr(table: str, prefix: str) -> str:
+    """SQL expression building the row_key from NEW./OLD. columns"""
+    sep = "char(31)"
+    return f" || {sep} || ".join(f"{prefix}.{col}" for col in SYNC_TABLES[table]['key'])
+
+
+def _has_unique_key(conn: sqlite3.Connection, table: str, key: Tuple[str, ...]) -> bool:
+    """True if a full (non-partial) UNIQUE index or primary key covers exactly the key columns"""
+    for index in conn.execute(f'PRAGMA index_list({table})').fetchall():
+        _, name, unique, _, partial = index[:5]
+        if not unique or partial:
+            continue
+        columns = [row[2] for row in conn.execute(f'PRAGMA index_info("{name}")')]
+        if set(columns) == set(key):
+            return True
+    return False
+
+
+def _ensure_unique_key(conn: sqlite3.Connection, table: str) -> None:
+    """
+    Upserts use ON CONFLICT(<key>), which needs a UNIQUE index on the key
+
+    Creates the index when missing; raises if duplicate keys prevent it.
+    """
+    key = SYNC_TABLES[table]['key']
+    if _has_unique_key(conn, table, key):
+        return
+    try:
+        conn.execute(
+            f'CREATE UNIQUE INDEX IF NOT EXISTS idx_sync_{table}_key ON {table} ({", ".join(key)})'
+        )
+    except sqlite3.IntegrityError as e:
+        raise RuntimeError(
+            f"{table} has duplicate {'/'.join(key)} values - changeset sync needs them unique "
+            f"(dedupe the table or use full sync): {e}"
+        ) from e
+
+
+def install(conn: sqlite3.Connection) -> List[str]:
+    """
+    Create sync_changelog / sync_meta and change-tracking triggers (idempotent)
+
+    Also makes sure each synced table has a UNIQUE index on its key, which
+    the upsert in apply_changes() relies on.
+
+    Returns:
+        Tables that received triggers (tables missing from the database are skipped)
+
+    Raises:
+        RuntimeError: a synced table has duplicate keys
+    """
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS sync_changelog (
+            table_name TEXT NOT NULL,
+            row_key TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            deleted INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (table_name, row_key)
+        );
+        CREATE INDEX IF NOT EXISTS idx_sync_changelog_version ON sync_changelog(version);
+        CREATE TABLE IF NOT EXISTS sync_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    ''')
+
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    installed = []
+
+    for table in SYNC_TABLES:
+        if table not in existing:
+            continue
+
+        _ensure_unique_key(conn, table)
+
+        # Changes written while applying a changeset are not re-logged (no echo)
+        guard = "(SELECT value FROM sync_meta WHERE key = 'applying') IS NOT '1'"
+        next_version = "(SELECT COALESCE(MAX(version), 0) + 1 FROM sync_changelog)"
+
+        for event, prefix, deleted in (('INSERT', 'NEW', 0), ('UPDATE', 'NEW', 0), ('DELETE', 'OLD', 1)):
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_sync_{table}_{event.lower()}
+                AFTER {event} ON {table}
+                WHEN {guard}
+                BEGIN
+                    INSERT OR REPLACE INTO sync_changelog (table_name, row_key, version, deleted)
+                    VALUES ('{table}', {_key_expr(table, prefix)}, {next_version}, {deleted});
+                END
+            ''')
+        installed.append(table)
+
+    conn.commit()
+    return installed
+
+
+def is_installed(conn: sqlite3.Connection) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sync_changelog'"
+    ).fetchone()
+    return row is not None
+
+
+def max_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute('SELECT COALESCE(MAX(version), 0) FROM sync_changelog').fetchone()
+    return row[0]
+
+
+def get_meta(conn: sqlite3.Connection, key: str, default: Optional[str] = None) -> Optional[str]:
+    row = conn.execute('SELECT value FROM sync_meta WHERE key = ?', (key,)).fetchone()
+    return row[0] if row else default
+
+
+def set_meta(conn: sqlite3.Connection, key: str, value) -> None:
+    conn.execute('INSERT OR REPLACE INTO sync_meta (key, value) VALUES (?, ?)', (key, str(value)))
+    conn.commit()
+
+
+def delete_meta(conn: sqlite3.Connection, *keys: str) -> None:
+    conn.executemany('DELETE FROM sync_meta WHERE key = ?', [(key,) for key in keys])
+    conn.commit()
+
+
+# =================== EXPORT ===================
+
+def export_changes(conn: sqlite3.Connection, since_version: int) -> Tuple[Dict, List[Dict]]:
+    """
+    Rows changed after since_version
+
+    Returns:
+        (header, changes) where each change is {'t': table, 'k': key, 'd': deleted, 'r': row}
+    """
+    conn.row_factory = sqlite3.Row
+    to_version = max_version(conn)
+
+    changelog = conn.execute('''
+        SELECT table_name, row_key, deleted FROM sync_changelog
+        WHERE version > ? AND version <= ?
+        ORDER BY version
+    ''', (since_version, to_version)).fetchall()
+
+    changes = []
+    lookups = {}
+    for table, spec in SYNC_TABLES.items():
+        where = ' AND '.join(f'{col} = ?' for col in spec['key'])
+        lookups[table] = f'SELECT * FROM {table} WHERE {where}'
+
+    for entry in changelog:
+        table = entry['table_name']
+        if table not in SYNC_TABLES:
+            continue
+
+        change = {'t': table, 'k': entry['row_key'], 'd': entry['deleted']}
+        if not entry['deleted']:
+            key_values = entry['row_key'].split(KEY_SEPARATOR)
+            row = conn.execute(lookups[table], key_values).fetchone()
+            if row is None:
+                continue  # Deleted after being logged; a tombstone follows
+            change['r'] = {k: row[k] for k in row.keys() if k not in EXCLUDED_COLUMNS}
+        changes.append(change)
+
+    header = {
+        'format': FORMAT_VERSION,
+        'from_version': since_version,
+        'to_version': to_version,
+        'changes': len(changes),
+    }
+    return header, changes
+
+
+def write_changeset(path: str, header: Dict, changes: List[Dict]) -> int:
+    """Write gzipped JSON lines; returns compressed size in bytes"""
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write(json.dumps(header) + '\n')
+        for change in changes:
+            f.write(json.dumps(change, ensure_ascii=False, default=str) + '\n')
+
+    with open(path, 'rb') as f:
+        f.seek(0, 2)
+        return f.tell()
+
+
+def read_changeset(path: str) -> Tuple[Dict, List[Dict]]:
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        changes = [json.loads(line) for line in f if line.strip()]
+    return header, changes
+
+
+# =================== APPLY ===================
+
+def apply_changes(conn: sqlite3.Connection, changes: List[Dict], mode: str = 'upsert') -> Dict[str, int]:
+    """
+    Apply a changeset in one transaction
+
+    Modes:
+        upsert: insert/update full rows and apply deletes (local → server push).
+                LWW columns keep the target's values when the target's
+                lww_column is newer than the incoming one.
+        lww:    update only the LWW columns of rows that already exist
+                (server → local pull, same rule as the original assessment
+                pull): incoming rows must be decided (e.g. assessed_approved /
+                assessed_rejected), and win over a local row that is not yet
+                decided or whose lww_column is older
+
+    Returns:
+        Counts: applied, skipped, deleted
+    """
+    conn.row_factory = sqlite3.Row
+    stats = {'applied': 0, 'skipped': 0, 'deleted': 0}
+    columns_cache = {}
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute("INSERT OR REPLACE INTO sync_meta (key, value) VALUES ('applying', '1')")
+
+        for change in changes:
+            table = change['t']
+            spec = SYNC_TABLES.get(table)
+            if spec is None:
+                stats['skipped'] += 1
+                continue
+
+            if table not in columns_cache:
+                columns_cache[table] = set(_table_columns(conn, table))
+            target_columns = columns_cache[table]
+            if not target_columns:
+                stats['skipped'] += 1
+                continue
+
+            key_values = change['k'].split(KEY_SEPARATOR)
+            key_where = ' AND '.join(f'{col} = ?' for col in spec['key'])
+
+            if change.get('d'):
+                if mode == 'upsert':
+                    conn.execute(f'DELETE FROM {table} WHERE {key_where}', key_values)
+                    stats['deleted'] += 1
+                else:
+                    stats['skipped'] += 1
+                continue
+
+            row = {k: v for k, v in change['r'].items() if k in target_columns}
+
+            if mode == 'lww':
+                changed = _apply_lww(conn, table, spec, row, key_where, key_values)
+            else:
+                changed = _apply_upsert(conn, table, spec, row)
+
+            if changed > 0:
+                stats['applied'] += 1
+            else:
+                stats['skipped'] += 1
+
+        conn.execute("DELETE FROM sync_meta WHERE key = 'applying'")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return stats
+
+
+def _apply_lww(conn, table, spec, row, key_where, key_values) -> int:
+    lww = spec['lww_column']
+    if row.get(lww) is None:
+        return 0  # Nothing decided remotely
+
+    decided_column = spec.get('decided_column')
+    decided_values = spec.get('decided_values', ())
+    if decided_column and row.get(decided_column) not in decided_values:
+        return 0
+
+    columns = [col for col in spec['lww_columns'] if col in row]
+    assignments = ', '.join(f'{col} = ?' for col in columns)
+
+    newer = f'{lww} IS NULL OR ? > {lww}'
+    params = [row[lww]]
+    if decided_column:
+        placeholders = ', '.join('?' for _ in decided_values)
+        newer = f'{decided_column} IS NULL OR {decided_column} NOT IN ({placeholders}) OR {newer}'
+        params = list(decided_values) + params
+
+    return conn.execute(
+        f'''
+        UPDATE {table} SET {assignments}
+        WHERE {key_where} AND ({newer})
+        ''',
+        [row[col] for col in columns] + key_values + params
+    ).rowcount
+
+
+def _apply_upsert(conn, table, spec, row) -> int:
+    lww = spec['lww_column']
+    columns = list(row.keys())
+    placeholders = ', '.join('?' for _ in columns)
+    key_cols = ', '.join(spec['key'])
+
+    # Target keeps its LWW columns if it was decided more recently
+    incoming_wins = (
+        f"({table}.{lww} IS NULL OR "
+        f"(excluded.{lww} IS NOT NULL AND excluded.{lww} >= {table}.{lww}))"
+    )
+    assignments = []
+    for col in columns:
+        if col in spec['key']:
+            continue
+        if col in spec['lww_columns']:
+            assignments.append(f"{col} = CASE WHEN {incoming_wins} THEN excluded.{col} ELSE {table}.{col} END")
+        else:
+            assignments.append(f"{col} = excluded.{col}")
+
+    sql = f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({placeholders})'
+    if assignments:
+        sql += f' ON CONFLICT({key_cols}) DO UPDATE SET {", ".join(assignments)}'
+    else:
+        sql += f' ON CONFLICT({key_cols}) DO NOTHING'
+
+    return conn.execute(sql, [row[col] for col in columns]).rowcount
+
+
+# =================== CLI (runs on the server) ===================
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='SQLite changeset tool')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_install = sub.add_parser('install')
+    p_install.add_argument('--db', required=True)
+
+    p_max = sub.add_parser('max-version')
+    p_max.add_argument('--db', required=True)
+
+    p_export = sub.add_parser('export')
+    p_export.add_argument('--db', required=True)
+    p_export.add_argument('--since', type=int, default=0)
+    p_export.add_argument('--out', required=True)
+
+    p_apply = sub.add_parser('apply')
+    p_apply.add_argument('--db', required=True)
+    p_apply.add_argument('--in', dest='infile', required=True)
+    p_apply.add_argument('--mode', choices=['upsert', 'lww'], default='upsert')
+
+    args = parser.parse_args(argv)
+    conn = sqlite3.connect(args.db, timeout=30)
+
+    try:
+        if args.command == 'install':
+            result = {'installed': install(conn), 'max_version': max_version(conn)}
+        elif args.command == 'max-version':
+            result = {'max_version': max_version(conn) if is_installed(conn) else None}
+        elif args.command == 'export':
+            header, changes = export_changes(conn, args.since)
+            header['bytes'] = write_changeset(args.out, header, changes)
+            result = header
+        else:
+            install(conn)
+            header, changes = read_changeset(args.infile)
+            result = apply_changes(conn, changes, args.mode)
+            result['max_version'] = max_version(conn)
+    finally:
+        conn.close()
+
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
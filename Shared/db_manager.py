@@ -19,6 +19,7 @@ from datetime import datetime
 from pathlib import Path
 
 from logger_config import setup_logging
+from tracing import traced
 
 # Import existing DB manager
 try:
@@ -68,6 +69,7 @@ class DatabaseManager:
     
     # =================== PRODUCT QUERIES (for Product Updater) ===================
     
+    @traced('db')
     async def get_product_by_url(self, url: str) -> Optional[Dict]:
         """Get product by URL from products table"""
         try:
@@ -89,6 +91,7 @@ class DatabaseManager:
             logger.error(f"Failed to get product by URL: {e}")
             return None
     
+    @traced('db')
     async def query_products(
         self,
         retailer: Optional[str] = None,
@@ -151,6 +154,7 @@ class DatabaseManager:
         
         return await asyncio.to_thread(_query)
     
+    @traced('db')
     async def update_product_record(
         self,
         url: str,
@@ -218,6 +222,7 @@ class DatabaseManager:
             logger.error(f"Failed to update product record: {e}")
             return False
     
+    @traced('db')
     async def save_product(
         self,
         url: str,
@@ -347,6 +352,7 @@ class DatabaseManager:
             logger.error(f"Failed to save product: {e}")
             return False
     
+    @traced('db')
     async def save_catalog_product(
         self,
         product: Dict,
@@ -432,6 +438,7 @@ class DatabaseManager:
             logger.error(f"Failed to save catalog product: {e}")
             return False
     
+    @traced('db')
     async def update_shopify_status(
         self,
         url: str,
@@ -474,6 +481,7 @@ class DatabaseManager:
             logger.error(f"Failed to update shopify_status: {e}")
             return False
     
+    @traced('db')
     async def update_last_checked(self, url: str) -> bool:
         """
         Update only the last_checked timestamp (no data changes)
@@ -500,6 +508,7 @@ class DatabaseManager:
         
         return await asyncio.to_thread(_update)
     
+    @traced('db')
     async def mark_product_delisted(self, url: str) -> bool:
         """Mark product as delisted in database"""
         def _update():
@@ -529,6 +538,7 @@ class DatabaseManager:
         
         return await asyncio.to_thread(_update)
     
+    @traced('db')
     async def batch_update_products(self, updates: List[Dict]) -> bool:
         """
         Batch update multiple products in a single transaction
@@ -634,6 +644,7 @@ class DatabaseManager:
         
         return await asyncio.to_thread(_batch_update)
     
+    @traced('db')
     async def update_assessment_status(self, url: str, assessment_status: str) -> bool:
         """
         Update assessment_status for a product
@@ -663,6 +674,7 @@ class DatabaseManager:
     
     # =================== CATALOG OPERATIONS (for Catalog workflows) ===================
     
+    @traced('db')
     async def create_catalog_baseline(
         self,
         retailer: str,
@@ -748,6 +760,7 @@ class DatabaseManager:
             logger.error(f"Failed to create baseline: {e}")
             return None
     
+    @traced('db')
     async def record_monitoring_run(
         self,
         retailer: str,
@@ -781,12 +794,48 @@ class DatabaseManager:
         
         return False
     
+    @traced('db')
+    async def get_catalog_last_change(self, retailer: str, category: str) -> Optional[datetime]:
+        """
+        When a product last appeared in this catalog for the first time
+        (newest first-seen date in catalog_products), or None if never scanned
+        
+        The GROUP BY scan runs in a worker thread.
+        """
+        def _query():
+            try:
+                conn = self._get_connection()
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT MAX(first_seen) FROM (
+                        SELECT MIN(discovered_date) AS first_seen
+                        FROM catalog_products
+                        WHERE retailer = ? AND category = ?
+                        GROUP BY catalog_url
+                    )
+                ''', (retailer, category))
+                
+                row = cursor.fetchone()
+                conn.close()
+                
+                if row and row[0]:
+                    return datetime.fromisoformat(str(row[0]).replace('Z', ''))
+                return None
+                
+            except Exception as e:
+                logger.error(f"Failed to get catalog last change: {e}")
+                return None
+        
+        return await asyncio.to_thread(_query)
+    
     # =================== DEDUPLICATION (for Catalog Monitor) ===================
     
     async def find_product_by_url(self, url: str, retailer: str) -> Optional[Dict]:
         """Find product by exact URL in products table"""
         return await self.get_product_by_url(url)
     
+    @traced('db')
     async def find_product_by_normalized_url(self, normalized_url: str, retailer: str) -> Optional[Dict]:
         """
         Find product by normalized URL (async wrapper for sync DB)
@@ -827,6 +876,7 @@ class DatabaseManager:
         
         return await asyncio.to_thread(_query)
     
+    @traced('db')
     async def find_product_by_code(self, product_code: str, retailer: str) -> Optional[Dict]:
         """Find product by product code (async wrapper for sync DB)"""
         import asyncio
@@ -859,6 +909,7 @@ class DatabaseManager:
         
         return await asyncio.to_thread(_query)
     
+    @traced('db')
     async def find_product_by_title_price(
         self,
         title: str,
@@ -896,6 +947,7 @@ class DatabaseManager:
         """Find products by retailer"""
         return await self.query_products(retailer=retailer, limit=limit)
     
+    @traced('db')
     async def find_product_by_image(self, image_url: str, retailer: str) -> Optional[Dict]:
         """Find product by image URL (async wrapper for sync DB)"""
         import asyncio
@@ -924,6 +976,7 @@ class DatabaseManager:
         
         return await asyncio.to_thread(_query)
     
+    @traced('db')
     async def find_baseline_product_by_url(self, url: str, retailer: str) -> Optional[Dict]:
         """Find product in catalog baseline by URL (async)"""
         if not self.catalog_db:
@@ -951,6 +1004,7 @@ class DatabaseManager:
             logger.error(f"Failed to find baseline product: {e}")
             return None
     
+    @traced('db')
     async def find_baseline_product_by_code(self, product_code: str, retailer: str) -> Optional[Dict]:
         """Find product in catalog baseline by product code (async)"""
         if not self.catalog_db:
@@ -981,6 +1035,7 @@ class DatabaseManager:
             logger.error(f"Failed to find baseline by code: {e}")
             return None
     
+    @traced('db')
     async def find_baseline_product_by_title_price(
         self,
         title: str,
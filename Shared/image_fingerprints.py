@@ -0,0 +1,399 @@
+"""
+Image Fingerprints - Perceptual-hash index for image dedup and placeholder detection
+
+Each downloaded product image gets a 64-bit perceptual hash (pHash) computed
+from its bytes. Hashes are stored per product in image_fingerprints.db and
+loaded into an in-memory multi-index hash table per retailer, so "is this
+the same photo as one we already have?" is a Hamming-distance lookup that
+survives CDN size, quality and format rewrites (Revolve /n/ct/ vs /n/uv/,
+scene7 $params$, _1094_1405 size suffixes).
+
+Image URLs are also indexed under a canonical key with size/quality
+parameters stripped, so catalog-stage dedup can match without downloading.
+
+Placeholders are detected automatically: an image whose hash (within
+PLACEHOLDER_DISTANCE) shows up on PLACEHOLDER_MIN_PRODUCTS different
+products of the same retailer is marked as a placeholder and excluded from
+matching and from downloads. The threshold sits above a typical colourway
+count, so a photo shared by a few colour variants is not marked.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from io import BytesIO
+from typing import Dict, List, Optional, Set, Tuple
+
+from logger_config import setup_logging
+
+logger = setup_logging(__name__)
+
+try:
+    import imagehash
+    from PIL import Image
+    IMAGEHASH_AVAILABLE = True
+except ImportError:
+    IMAGEHASH_AVAILABLE = False
+    logger.warning("⚠️ imagehash not installed - image fingerprinting disabled")
+
+
+# Canonical image key: same photo regardless of size/quality rewrites
+_CANONICAL_REWRITES = [
+    (re.compile(r'^https?://'), ''),
+    (re.compile(r'[?#].*$'), ''),
+    (re.compile(r'\$[^$/]*\$'), ''),                       # scene7 presets
+    (re.compile(r'/n/[a-z]{1,3}/'), '/n/*/'),              # Revolve view dirs
+    (re.compile(r'/\d{2,4}w/'), '/'),                      # width dirs
+    (re.compile(r'_\d{2,4}[_x]\d{2,4}(?=\.\w+$)'), ''),   # size suffixes
+    (re.compile(r'_(?:thumb|small|medium|large|xl|sw|s|m|l)(?=\.\w+$)'), ''),
+    (re.compile(r'\.(?:jpe?g|png|webp|avif)$'), ''),
+]
+
+
+def canonical_image_key(url: str) -> str:
+    """Image URL without scheme, query, size and quality variants"""
+    key = (url or '').strip().lower()
+    for pattern, replacement in _CANONICAL_REWRITES:
+        key = pattern.sub(replacement, key)
+    return key
+
+
+def compute_fingerprint(image_bytes: bytes) -> Optional[int]:
+    """64-bit pHash of image bytes, or None if unavailable/undecodable"""
+    if not IMAGEHASH_AVAILABLE or not image_bytes:
+        return None
+    try:
+        image = Image.open(BytesIO(image_bytes))
+        # JPEG: decode at reduced scale, pHash only needs 32x32
+        image.draft('L', (128, 128))
+        return int(str(imagehash.phash(image)), 16)
+    except Exception as e:
+        logger.debug(f"Could not fingerprint image: {e}")
+        return None
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class MultiIndexHash:
+    """
+    Multi-index hashing over 64-bit hashes (Hamming metric)
+
+    Each hash is split into CHUNKS 16-bit chunks, each with its own bucket
+    table. If two hashes are within distance r, at least one chunk differs
+    in at most r // CHUNKS bits (pigeonhole), so a search only probes the
+    buckets for those few chunk variants and verifies the candidates -
+    about 70 dict lookups for r=6 regardless of index size.
+    """
+
+    CHUNKS = 4
+    CHUNK_BITS = 16
+
+    def __init__(self):
+        self.tables = [{} for _ in range(self.CHUNKS)]
+        self.items: Dict[int, list] = {}
+        self.size = 0
+
+    def _chunks(self, fingerprint: int) -> List[int]:
+        mask = (1 << self.CHUNK_BITS) - 1
+        return [(fingerprint >> (i * self.CHUNK_BITS)) & mask for i in range(self.CHUNKS)]
+
+    def add(self, fingerprint: int, item):
+        self.size += 1
+        if fingerprint in self.items:
+            self.items[fingerprint].append(item)
+            return
+        self.items[fingerprint] = [item]
+        for table, chunk in zip(self.tables, self._chunks(fingerprint)):
+            table.setdefault(chunk, []).append(fingerprint)
+
+    def _variants(self, chunk: int, radius: int) -> List[int]:
+        """chunk with every combination of up to radius bits flipped"""
+        variants = [chunk]
+        frontier = [(chunk, -1)]
+        for _ in range(radius):
+            next_frontier = []
+            for value, last_bit in frontier:
+                for bit in range(last_bit + 1, self.CHUNK_BITS):
+                    flipped = value ^ (1 << bit)
+                    variants.append(flipped)
+                    next_frontier.append((flipped, bit))
+            frontier = next_frontier
+        return variants
+
+    def search(self, fingerprint: int, max_distance: int) -> List[Tuple[int, object]]:
+        """(distance, item) pairs within max_distance, nearest first"""
+        sub_radius = max_distance // self.CHUNKS
+        candidates = set()
+        for table, chunk in zip(self.tables, self._chunks(fingerprint)):
+            for variant in self._variants(chunk, sub_radius):
+                bucket = table.get(variant)
+                if bucket:
+                    candidates.update(bucket)
+
+        results = []
+        for candidate in candidates:
+            distance = hamming_distance(fingerprint, candidate)
+            if distance <= max_distance:
+                results.extend((distance, item) for item in self.items[candidate])
+
+        results.sort(key=lambda pair: pair[0])
+        return results
+
+
+class ImageFingerprintIndex:
+    """
+    Per-retailer perceptual-hash index backed by SQLite
+
+    Features:
+    - add(): store an image's fingerprint for a product (and its canonical URL)
+    - find_similar(): Hamming-distance search, placeholders excluded
+    - find_by_image_url(): canonical URL lookup (no download needed)
+    - is_placeholder(): recurring images across many products
+
+    In-memory tables are built lazily per retailer and rebuilt after
+    RELOAD_SECONDS so entries written by other processes show up.
+
+    Usage:
+        index = get_fingerprint_index()
+        index.add('revolve', product_url, image_url, fingerprint)
+        placeholders = index.add_many('revolve', product_url, [(image_url, fingerprint)])
+        matches = index.find_similar('revolve', fingerprint)
+    """
+
+    # Same photo re-encoded/resized typically lands within a few bits
+    MATCH_DISTANCE = 6
+    PLACEHOLDER_DISTANCE = 2
+    PLACEHOLDER_MIN_PRODUCTS = int(os.getenv('IMAGE_PLACEHOLDER_MIN_PRODUCTS', '10'))
+    RELOAD_SECONDS = 600
+
+    def __init__(self, db_path: str = None):
+        if db_path is None:
+            db_path = os.path.join(os.path.dirname(__file__), 'image_fingerprints.db')
+        self.db_path = db_path
+        self._lock = threading.RLock()
+
+        # retailer -> (loaded_at, table, {canonical_key: product_url}, placeholders table)
+        self._retailers: Dict[str, tuple] = {}
+
+        self._init_db()
+
+    def _get_connection(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _init_db(self):
+        conn = self._get_connection()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS image_fingerprints (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    retailer TEXT NOT NULL,
+                    product_url TEXT NOT NULL,
+                    image_url TEXT NOT NULL,
+                    canonical_key TEXT NOT NULL,
+                    fingerprint INTEGER NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(retailer, product_url, canonical_key)
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_fingerprint_key
+                ON image_fingerprints(retailer, canonical_key)
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS image_placeholders (
+                    retailer TEXT NOT NULL,
+                    fingerprint INTEGER NOT NULL,
+                    product_count INTEGER DEFAULT 0,
+                    detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (retailer, fingerprint)
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_signed(fingerprint: int) -> int:
+        """SQLite INTEGER is signed 64-bit"""
+        return fingerprint - (1 << 64) if fingerprint >= (1 << 63) else fingerprint
+
+    @staticmethod
+    def _to_unsigned(value: int) -> int:
+        return value + (1 << 64) if value < 0 else value
+
+    def _load(self, retailer: str) -> tuple:
+        with self._lock:
+            cached = self._retailers.get(retailer)
+            if cached and time.monotonic() - cached[0] < self.RELOAD_SECONDS:
+                return cached
+
+            table = MultiIndexHash()
+            keys: Dict[str, str] = {}
+            placeholders = MultiIndexHash()
+
+            conn = self._get_connection()
+            try:
+                rows = conn.execute('''
+                    SELECT product_url, image_url, canonical_key, fingerprint
+                    FROM image_fingerprints WHERE retailer = ?
+                ''', (retailer,)).fetchall()
+                placeholder_rows = conn.execute('''
+                    SELECT fingerprint FROM image_placeholders WHERE retailer = ?
+                ''', (retailer,)).fetchall()
+            finally:
+                conn.close()
+
+            for product_url, image_url, key, value in rows:
+                table.add(self._to_unsigned(value), (product_url, image_url))
+                keys.setdefault(key, product_url)
+            for (value,) in placeholder_rows:
+                fingerprint = self._to_unsigned(value)
+                placeholders.add(fingerprint, fingerprint)
+
+            entry = (time.monotonic(), table, keys, placeholders)
+            self._retailers[retailer] = entry
+            logger.debug(
+                f"🧬 Loaded {table.size} image fingerprints for {retailer} "
+                f"({placeholders.size} placeholders)"
+            )
+            return entry
+
+    def add(self, retailer: str, product_url: str, image_url: str, fingerprint: int) -> bool:
+        """
+        Store a product image fingerprint
+
+        Returns:
+            True if the image is (now) a known placeholder
+        """
+        return bool(self.add_many(retailer, product_url, [(image_url, fingerprint)]))
+
+    def add_many(self, retailer: str, product_url: str, images: List[Tuple[str, int]]) -> Set[str]:
+        """
+        Store a product's image fingerprints in one transaction
+
+        Blocking (SQLite); async callers run it in a thread.
+
+        Args:
+            images: (image_url, fingerprint) pairs
+
+        Returns:
+            Image URLs that are (now) known placeholders
+        """
+        if not images:
+            return set()
+
+        with self._lock:
+            _, table, keys, placeholders = self._load(retailer)
+
+            conn = self._get_connection()
+            try:
+                inserted = []
+                for image_url, fingerprint in images:
+                    key = canonical_image_key(image_url)
+                    cursor = conn.execute('''
+                        INSERT OR IGNORE INTO image_fingerprints
+                        (retailer, product_url, image_url, canonical_key, fingerprint)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', (retailer, product_url, image_url, key, self._to_signed(fingerprint)))
+                    if cursor.rowcount:
+                        inserted.append((image_url, key, fingerprint))
+                conn.commit()
+            finally:
+                conn.close()
+
+            for image_url, key, fingerprint in inserted:
+                table.add(fingerprint, (product_url, image_url))
+                keys.setdefault(key, product_url)
+
+            placeholder_urls = set()
+            for image_url, fingerprint in images:
+                if placeholders.search(fingerprint, self.PLACEHOLDER_DISTANCE):
+                    placeholder_urls.add(image_url)
+                    continue
+
+                # Same image on many different products → placeholder
+                products = {item[0] for _, item in table.search(fingerprint, self.PLACEHOLDER_DISTANCE)}
+                if len(products) >= self.PLACEHOLDER_MIN_PRODUCTS:
+                    self._mark_placeholder(retailer, fingerprint, len(products), placeholders)
+                    placeholder_urls.add(image_url)
+
+        return placeholder_urls
+
+    def _mark_placeholder(self, retailer: str, fingerprint: int, product_count: int, placeholders: MultiIndexHash):
+        conn = self._get_connection()
+        try:
+            conn.execute('''
+                INSERT OR REPLACE INTO image_placeholders (retailer, fingerprint, product_count)
+                VALUES (?, ?, ?)
+            ''', (retailer, self._to_signed(fingerprint), product_count))
+            conn.commit()
+        finally:
+            conn.close()
+
+        placeholders.add(fingerprint, fingerprint)
+        logger.info(
+            f"🧩 Detected placeholder image for {retailer} "
+            f"(shared by {product_count} products): {fingerprint:016x}"
+        )
+
+    def is_placeholder(self, retailer: str, fingerprint: int) -> bool:
+        _, _, _, placeholders = self._load(retailer)
+        return bool(placeholders.search(fingerprint, self.PLACEHOLDER_DISTANCE))
+
+    def find_similar(
+        self,
+        retailer: str,
+        fingerprint: int,
+        max_distance: int = None,
+        exclude_product_url: str = None
+    ) -> List[Dict]:
+        """
+        Products with a near-identical image, nearest first
+
+        Returns:
+            [{product_url, image_url, distance}] (one entry per product)
+        """
+        if max_distance is None:
+            max_distance = self.MATCH_DISTANCE
+
+        _, table, _, placeholders = self._load(retailer)
+        if placeholders.search(fingerprint, self.PLACEHOLDER_DISTANCE):
+            return []
+
+        matches = []
+        seen = set()
+        for distance, (product_url, image_url) in table.search(fingerprint, max_distance):
+            if product_url in seen or product_url == exclude_product_url:
+                continue
+            seen.add(product_url)
+            matches.append({'product_url': product_url, 'image_url': image_url, 'distance': distance})
+        return matches
+
+    def find_by_image_url(self, retailer: str, image_url: str) -> Optional[str]:
+        """Product URL already indexed under the same canonical image key"""
+        _, _, keys, _ = self._load(retailer)
+        return keys.get(canonical_image_key(image_url))
+
+    def invalidate(self, retailer: str = None):
+        with self._lock:
+            if retailer is None:
+                self._retailers.clear()
+            else:
+                self._retailers.pop(retailer, None)
+
+
+_indexes: Dict[str, ImageFingerprintIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_fingerprint_index(db_path: str = None) -> ImageFingerprintIndex:
+    """Process-wide index (one per database file)"""
+    key = db_path or ''
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = ImageFingerprintIndex(db_path)
+        return _indexes[key]
@@ -17,15 +17,17 @@ import re
 import asyncio
 import aiohttp
 import hashlib
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Union
 from datetime import datetime
-from PIL import Image
-from io import BytesIO
 import logging
 
 # Add shared path for imports
 sys.path.append(os.path.dirname(__file__))
 from logger_config import setup_logging
+from tracing import traced
+from image_url_classifier import ImageURLClassifier, extract_url_pattern
+from image_fingerprints import compute_fingerprint, get_fingerprint_index
+from image_transcoder import ImageBuffer, get_image_transcoder, probe_image_size
 
 logger = setup_logging(__name__)
 
@@ -38,10 +40,14 @@ class ImageProcessor:
     1. URL Enhancement: Transform URLs to highest quality versions
     2. Quality Ranking: Score and rank images by quality indicators
     3. Validation: Filter out placeholders, thumbnails, broken URLs
-    4. Download: Fetch images from URLs and save to disk
+    4. Download: Fetch images from URLs into memory (optionally saved to disk)
     5. Pattern Learning: Track successful transformations per retailer
+    6. Fingerprinting: pHash per downloaded image for dedup + placeholder detection
     """
     
+    # Concurrent single-image fingerprint downloads (catalog dedup lookups)
+    FINGERPRINT_CONCURRENCY = int(os.getenv('IMAGE_FINGERPRINT_CONCURRENCY', '4'))
+    
     def __init__(self, download_base_dir: str = None):
         self.download_base_dir = download_base_dir or os.path.join(
             os.path.dirname(__file__), "downloads"
@@ -58,6 +64,23 @@ class ImageProcessor:
         # Initialize pattern learning
         self._init_pattern_learning()
         
+        # Compiled URL exclusion + batched download stats
+        self.url_classifier = ImageURLClassifier(self.pattern_db_path)
+        
+        # Perceptual-hash index (shared across instances)
+        try:
+            self.fingerprint_index = get_fingerprint_index()
+        except Exception as e:
+            logger.warning(f"⚠️ Image fingerprint index unavailable: {e}")
+            self.fingerprint_index = None
+        
+        # Decode work (fingerprints) runs in the shared image process pool
+        self.transcoder = get_image_transcoder()
+        
+        # fingerprint_url(): one reused session, capped concurrency
+        self._fingerprint_session: Optional[aiohttp.ClientSession] = None
+        self._fingerprint_semaphore = asyncio.Semaphore(self.FINGERPRINT_CONCURRENCY)
+        
         logger.info(f"✅ ImageProcessor initialized (downloads: {self.download_base_dir})")
     
     def _init_pattern_learning(self):
@@ -116,12 +139,15 @@ class ImageProcessor:
         except Exception as e:
             logger.error(f"Failed to initialize pattern learning: {e}")
     
+    @traced('images')
     async def process_images(
         self,
         image_urls: List[str],
         retailer: str,
-        product_title: str = "Product"
-    ) -> List[str]:
+        product_title: str = "Product",
+        product_url: str = None,
+        in_memory: bool = False
+    ) -> Union[List[str], List[ImageBuffer]]:
         """
         Complete image processing pipeline
         
@@ -129,17 +155,20 @@ class ImageProcessor:
             image_urls: Raw image URLs from extraction
             retailer: Retailer name (for specific transformations)
             product_title: Product title (for filename generation)
+            product_url: Product URL (indexes image fingerprints for dedup)
+            in_memory: Return ImageBuffers instead of writing files
         
         Returns:
-            List of local file paths (ready for Shopify upload)
+            List of local file paths, or ImageBuffers when in_memory
+            (either is accepted by ShopifyManager for upload)
         
         Process:
         1. Filter invalid/placeholder URLs
         2. Enhance URLs (retailer-specific transformations)
         3. Rank by quality indicators
         4. Download top 5 images
-        5. Validate downloaded images
-        6. Learn from results
+        5. Validate downloaded images (known placeholder images dropped)
+        6. Index fingerprints, learn from results
         """
         logger.info(f"🖼️ Processing {len(image_urls)} images for {retailer}")
         
@@ -165,13 +194,18 @@ class ImageProcessor:
             logger.debug(f"✅ Ranked and selected top {len(ranked_urls)} images")
             
             # Step 4: Download images
-            file_paths = await self._download_images(ranked_urls, retailer, product_title)
-            logger.info(f"✅ Successfully downloaded {len(file_paths)} images")
+            images = await self._download_images(ranked_urls, retailer, product_title, in_memory)
+            logger.info(f"✅ Successfully downloaded {len(images)} images")
+            
+            # Step 5: Index fingerprints (drops newly detected placeholders)
+            images = await self._index_fingerprints(images, retailer, product_url)
             
-            # Step 5: Learn from results
-            await self._learn_from_results(ranked_urls, file_paths, retailer)
+            # Step 6: Learn from results
+            await self._learn_from_results(ranked_urls, images, retailer)
             
-            return file_paths
+            if in_memory:
+                return images
+            return [image.file_path for image in images]
             
         except Exception as e:
             logger.error(f"❌ Image processing failed: {e}")
@@ -180,50 +214,9 @@ class ImageProcessor:
     async def _filter_valid_urls(self, image_urls: List[str], retailer: str) -> List[str]:
         """
         Filter out placeholder, thumbnail, and invalid URLs
-        Uses learned patterns + static exclusion rules
-        """
-        valid_urls = []
-        
-        # Load learned placeholder patterns for this retailer
-        learned_patterns = await self._get_placeholder_patterns(retailer)
-        
-        # Static exclusion patterns (common across retailers)
-        static_exclude_patterns = [
-            r'placeholder',
-            r'loading',
-            r'spinner',
-            r'blank\.gif',
-            r'spacer\.gif',
-            r'data:image',  # Base64 embedded images
-            r'\.svg$',  # Vector graphics (usually placeholders)
-            r'_icon',
-            r'logo',
-            r'badge',
-            r'/icons?/',
-            r'/badges?/',
-            # NOTE: _V\d+ patterns (Revolve) are NOT excluded here
-            # They are kept and transformed to full-size in _enhance_urls()
-        ]
-        
-        all_exclude_patterns = static_exclude_patterns + learned_patterns
-        
-        for url in image_urls:
-            if not url or len(url) < 10:
-                continue
-            
-            # Check exclusion patterns
-            if any(re.search(pattern, url, re.IGNORECASE) for pattern in all_exclude_patterns):
-                logger.debug(f"🚫 Excluded (placeholder/icon): {url[:80]}")
-                continue
-            
-            # Must be HTTP/HTTPS
-            if not url.startswith(('http://', 'https://')):
-                logger.debug(f"🚫 Excluded (invalid protocol): {url[:80]}")
-                continue
-            
-            valid_urls.append(url)
-        
-        return valid_urls
+        Uses learned patterns + static exclusion rules (compiled per retailer)
+        """
+        return self.url_classifier.filter_valid_urls(image_urls, retailer)
     
     async def _enhance_urls(self, image_urls: List[str], retailer: str) -> List[str]:
         """
@@ -231,6 +224,7 @@ class ImageProcessor:
         Uses learned patterns + static transformation rules
         """
         enhanced_urls = []
+        seen = set()
         
         for url in image_urls:
             try:
@@ -253,7 +247,8 @@ class ImageProcessor:
                     # Generic enhancement
                     enhanced_url = self._transform_generic_url(url)
                 
-                if enhanced_url and enhanced_url not in enhanced_urls:
+                if enhanced_url and enhanced_url not in seen:
+                    seen.add(enhanced_url)
                     enhanced_urls.append(enhanced_url)
                     if enhanced_url != url:
                         logger.debug(f"🔧 Enhanced: {url[:50]} → {enhanced_url[:50]}")
@@ -261,7 +256,8 @@ class ImageProcessor:
             except Exception as e:
                 logger.warning(f"⚠️ Enhancement failed for {url[:50]}: {e}")
                 # Keep original on failure
-                if url not in enhanced_urls:
+                if url not in seen:
+                    seen.add(url)
                     enhanced_urls.append(url)
         
         return enhanced_urls
@@ -498,32 +494,39 @@ class ImageProcessor:
             
             return score
         
-        # Sort by quality score (highest first)
-        ranked = sorted(image_urls, key=quality_score, reverse=True)
+        # Sort by quality score (highest first), scoring each URL once
+        scored = sorted(
+            ((quality_score(url), url) for url in image_urls),
+            key=lambda item: item[0],
+            reverse=True
+        )
         
         # Log top 3 for debugging
-        for i, url in enumerate(ranked[:3]):
-            logger.debug(f"Rank {i+1} (score={quality_score(url)}): {url[:80]}")
+        for i, (score, url) in enumerate(scored[:3]):
+            logger.debug(f"Rank {i+1} (score={score}): {url[:80]}")
         
-        return ranked
+        return [url for _, url in scored]
     
     async def _download_images(
         self,
         image_urls: List[str],
         retailer: str,
-        product_title: str
-    ) -> List[str]:
+        product_title: str,
+        in_memory: bool = False
+    ) -> List[ImageBuffer]:
         """
-        Download images from URLs to disk
+        Download images from URLs (saved to disk unless in_memory)
         
         Returns:
-            List of local file paths
+            List of ImageBuffers (file_path set when saved to disk)
         """
         # Create retailer-specific download directory
-        retailer_dir = os.path.join(self.download_base_dir, f"{retailer}_images")
-        os.makedirs(retailer_dir, exist_ok=True)
+        retailer_dir = None
+        if not in_memory:
+            retailer_dir = os.path.join(self.download_base_dir, f"{retailer}_images")
+            os.makedirs(retailer_dir, exist_ok=True)
         
-        file_paths = []
+        images = []
         
         # Download concurrently
         async with aiohttp.ClientSession() as session:
@@ -537,13 +540,90 @@ class ImageProcessor:
             results = await asyncio.gather(*tasks, return_exceptions=True)
             
             for result in results:
-                if isinstance(result, str):  # Success (file path)
-                    file_paths.append(result)
+                if isinstance(result, ImageBuffer):  # Success
+                    images.append(result)
                 elif isinstance(result, Exception):
                     logger.warning(f"Download failed: {result}")
         
-        logger.info(f"📥 Downloaded {len(file_paths)}/{len(image_urls)} images for {retailer}")
-        return file_paths
+        logger.info(f"📥 Downloaded {len(images)}/{len(image_urls)} images for {retailer}")
+        return images
+    
+    async def _index_fingerprints(
+        self,
+        images: List[ImageBuffer],
+        retailer: str,
+        product_url: Optional[str]
+    ) -> List[ImageBuffer]:
+        """
+        Store downloaded image fingerprints for product_url
+        
+        All of the product's fingerprints are written in one transaction in a
+        worker thread. Newly found placeholder URLs are learned as placeholder
+        patterns, so later runs drop them before downloading.
+        
+        Returns:
+            images without those that turned out to be placeholders
+        """
+        fingerprinted = [image for image in images if image.fingerprint is not None]
+        if not fingerprinted or not product_url or not self.fingerprint_index:
+            return images
+        
+        def _index():
+            placeholder_urls = self.fingerprint_index.add_many(
+                retailer, product_url, [(image.url, image.fingerprint) for image in fingerprinted]
+            )
+            for url in placeholder_urls:
+                self.url_classifier.learn_placeholder_pattern(retailer, re.escape(url.split('?')[0]))
+            return placeholder_urls
+        
+        try:
+            placeholder_urls = await asyncio.to_thread(_index)
+        except Exception as e:
+            logger.debug(f"Could not index image fingerprints: {e}")
+            return images
+        
+        kept = []
+        for image in images:
+            if image.url in placeholder_urls:
+                logger.info(f"🧩 Dropping placeholder image: {image.url[:80]}")
+                if image.file_path:
+                    try:
+                        os.remove(image.file_path)
+                    except OSError:
+                        pass
+            else:
+                kept.append(image)
+        
+        return kept
+    
+    async def fingerprint_url(self, url: str, retailer: str) -> Optional[int]:
+        """
+        Download one image and return its pHash (None on any failure)
+        
+        Used for dedup of catalog products that have no local images yet.
+        Downloads share one session and at most FINGERPRINT_CONCURRENCY run at once.
+        """
+        try:
+            headers = self._get_download_headers(url, retailer)
+            async with self._fingerprint_semaphore:
+                if self._fingerprint_session is None or self._fingerprint_session.closed:
+                    self._fingerprint_session = aiohttp.ClientSession()
+                async with self._fingerprint_session.get(
+                    url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)
+                ) as response:
+                    if response.status != 200:
+                        return None
+                    image_data = await response.read()
+            return await self.transcoder.run(compute_fingerprint, image_data)
+        except Exception as e:
+            logger.debug(f"Could not fingerprint {url[:80]}: {e}")
+            return None
+    
+    async def close(self):
+        """Close the fingerprint_url() session"""
+        if self._fingerprint_session is not None and not self._fingerprint_session.closed:
+            await self._fingerprint_session.close()
+        self._fingerprint_session = None
     
     def _get_download_headers(self, url: str, retailer: str) -> Dict[str, str]:
         """
@@ -615,37 +695,20 @@ class ImageProcessor:
         session: aiohttp.ClientSession,
         url: str,
         retailer: str,
-        save_dir: str,
+        save_dir: Optional[str],
         product_title: str,
         index: int
-    ) -> str:
+    ) -> ImageBuffer:
         """
         Download a single image from URL
         
         Returns:
-            Local file path on success
+            ImageBuffer on success (written to save_dir unless it is None)
         
         Raises:
             Exception on failure
         """
         try:
-            # Generate safe filename
-            safe_title = re.sub(r'[^\w\s-]', '', product_title)[:50]
-            safe_title = re.sub(r'[-\s]+', '_', safe_title)
-            
-            # Use URL hash for uniqueness
-            url_hash = hashlib.md5(url.encode()).hexdigest()[:8]
-            
-            # Determine file extension
-            ext = 'jpg'
-            if url.lower().endswith('.png'):
-                ext = 'png'
-            elif url.lower().endswith('.webp'):
-                ext = 'webp'
-            
-            filename = f"{safe_title}_{url_hash}_{index}.{ext}"
-            file_path = os.path.join(save_dir, filename)
-            
             # Get retailer-specific headers (includes Referer for anti-hotlinking)
             headers = self._get_download_headers(url, retailer)
             
@@ -654,21 +717,39 @@ class ImageProcessor:
                 if response.status == 200:
                     image_data = await response.read()
                     
-                    # Validate image data
+                    # Validate image data (header only, no pixel decode)
                     try:
-                        img = Image.open(BytesIO(image_data))
-                        width, height = img.size
+                        probed = probe_image_size(image_data)
+                        if not probed:
+                            raise ValueError("Unreadable image header")
+                        image_format, width, height = probed
                         
                         # Minimum size check
                         if width < 100 or height < 100:
                             raise ValueError(f"Image too small: {width}x{height}")
                         
-                        # Save to disk
-                        with open(file_path, 'wb') as f:
-                            f.write(image_data)
+                        image = ImageBuffer(
+                            url=url,
+                            data=image_data,
+                            width=width,
+                            height=height,
+                            format=image_format,
+                            index=index
+                        )
+                        
+                        # Recurring placeholder images (detected across products)
+                        if self.fingerprint_index:
+                            fingerprint = await self.transcoder.run(compute_fingerprint, image_data)
+                            if fingerprint is not None:
+                                if self.fingerprint_index.is_placeholder(retailer, fingerprint):
+                                    raise ValueError("Known placeholder image")
+                                image.fingerprint = fingerprint
                         
-                        logger.debug(f"✅ Downloaded: {filename} ({width}x{height})")
-                        return file_path
+                        if save_dir:
+                            image.file_path = self._save_image(image, save_dir, product_title)
+                        
+                        logger.debug(f"✅ Downloaded: {url[:80]} ({width}x{height})")
+                        return image
                         
                     except Exception as img_error:
                         raise ValueError(f"Invalid image data: {img_error}")
@@ -679,34 +760,35 @@ class ImageProcessor:
             logger.warning(f"❌ Failed to download {url[:80]}: {e}")
             raise
     
+    def _save_image(self, image: ImageBuffer, save_dir: str, product_title: str) -> str:
+        """Write downloaded image to save_dir; returns file path"""
+        # Generate safe filename
+        safe_title = re.sub(r'[^\w\s-]', '', product_title)[:50]
+        safe_title = re.sub(r'[-\s]+', '_', safe_title)
+        
+        # Use URL hash for uniqueness
+        url_hash = hashlib.md5(image.url.encode()).hexdigest()[:8]
+        
+        # Determine file extension
+        ext = 'jpg'
+        if image.url.lower().endswith('.png'):
+            ext = 'png'
+        elif image.url.lower().endswith('.webp'):
+            ext = 'webp'
+        
+        file_path = os.path.join(save_dir, f"{safe_title}_{url_hash}_{image.index}.{ext}")
+        with open(file_path, 'wb') as f:
+            f.write(image.view)
+        return file_path
+    
     async def _get_placeholder_patterns(self, retailer: str) -> List[str]:
         """Load learned placeholder patterns for retailer"""
-        import sqlite3
-        
-        try:
-            conn = sqlite3.connect(self.pattern_db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT pattern FROM placeholder_patterns
-                WHERE retailer = ?
-                ORDER BY detection_count DESC
-                LIMIT 20
-            ''', (retailer,))
-            
-            patterns = [row[0] for row in cursor.fetchall()]
-            conn.close()
-            
-            return patterns
-            
-        except Exception as e:
-            logger.debug(f"Could not load placeholder patterns: {e}")
-            return []
+        return self.url_classifier.learned_patterns(retailer)
     
     async def _learn_from_results(
         self,
         attempted_urls: List[str],
-        successful_paths: List[str],
+        downloaded: List[ImageBuffer],
         retailer: str
     ):
         """
@@ -714,67 +796,29 @@ class ImageProcessor:
         
         Tracks:
         - Which URL patterns successfully downloaded
-        - Which transformations worked
         - Download success rates per pattern
-        """
-        import sqlite3
         
+        Stats are buffered by the URL classifier and written in batches.
+        """
         try:
-            success_count = len(successful_paths)
             total_count = len(attempted_urls)
             
             if total_count == 0:
                 return
             
-            conn = sqlite3.connect(self.pattern_db_path)
-            cursor = conn.cursor()
-            
-            # Extract URL patterns and update stats
-            for url in attempted_urls:
-                is_success = any(url in path for path in successful_paths)
-                
-                # Extract pattern (domain + path structure)
-                pattern = self._extract_url_pattern(url)
-                
-                # Update download stats
-                cursor.execute('''
-                    INSERT INTO download_stats (retailer, url_pattern, download_success, download_failure)
-                    VALUES (?, ?, ?, ?)
-                    ON CONFLICT(retailer, url_pattern) DO UPDATE SET
-                        download_success = download_success + ?,
-                        download_failure = download_failure + ?,
-                        last_updated = CURRENT_TIMESTAMP
-                ''', (
-                    retailer, pattern,
-                    1 if is_success else 0,
-                    0 if is_success else 1,
-                    1 if is_success else 0,
-                    0 if is_success else 1
-                ))
+            succeeded = {image.url for image in downloaded}
+            outcomes = [(url, url in succeeded) for url in attempted_urls]
             
-            conn.commit()
-            conn.close()
+            self.url_classifier.record_downloads(retailer, outcomes)
             
-            logger.debug(f"📊 Learned from {total_count} URLs ({success_count} successful)")
+            logger.debug(f"📊 Learned from {total_count} URLs ({len(downloaded)} successful)")
             
         except Exception as e:
             logger.debug(f"Pattern learning failed: {e}")
     
     def _extract_url_pattern(self, url: str) -> str:
         """Extract general pattern from URL for learning"""
-        try:
-            # Remove protocol
-            url = re.sub(r'^https?://', '', url)
-            
-            # Extract domain + first path segment
-            match = re.match(r'([^/]+)(/[^/]+)?', url)
-            if match:
-                return match.group(0)
-            
-            return url[:100]
-            
-        except Exception:
-            return url[:50]
+        return extract_url_pattern(url)
 
 
 # Singleton instance for easy importing
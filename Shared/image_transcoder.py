@@ -0,0 +1,308 @@
+"""
+Image Transcoder - In-memory image pipeline from download to Shopify upload
+
+Downloaded images stay in memory as ImageBuffer objects (bytes + header
+dimensions) instead of being written to disk and reopened. Dimension checks
+read only the image header (JPEG SOF / PNG IHDR / GIF / WebP chunk), and all
+pixel work - decode, RGB convert, resize, JPEG encode, base64 - runs in a
+shared ProcessPoolExecutor so the event loop keeps downloading and
+extracting while images are being transcoded. No temp files are written.
+
+Workers report the CPU time they spent per image so callers (and
+tests/BENCHMARK_image_transcode.py) can account for per-product image CPU.
+"""
+
+import asyncio
+import base64
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+from PIL import Image
+
+from logger_config import setup_logging
+
+logger = setup_logging(__name__)
+
+
+# Shopify image requirements
+SHOPIFY_MAX_FILE_SIZE = 20 * 1024 * 1024  # 20MB max
+SHOPIFY_MIN_DIMENSION = 100
+SHOPIFY_MAX_DIMENSION = 5760
+SHOPIFY_TARGET_DIMENSION = 2048
+SHOPIFY_JPEG_QUALITY = 85
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+@dataclass
+class ImageBuffer:
+    """Downloaded image held in memory"""
+    url: str
+    data: bytes
+    width: int
+    height: int
+    format: str  # 'jpeg', 'png', 'gif', 'webp' or PIL format name
+    index: int = 0
+    fingerprint: Optional[int] = None
+    file_path: Optional[str] = None  # Set only when also saved to disk
+
+    @property
+    def view(self) -> memoryview:
+        """Zero-copy view of the image bytes"""
+        return memoryview(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+@dataclass
+class TranscodedImage:
+    """Shopify-ready JPEG produced by a worker (base64 attachment or raw bytes)"""
+    attachment: Optional[str]
+    data: Optional[bytes]
+    width: int
+    height: int
+    size: int
+    cpu_seconds: float
+
+
+# =================== HEADER PROBES ===================
+
+def probe_image_size(data: BytesLike) -> Optional[Tuple[str, int, int]]:
+    """
+    (format, width, height) from the image header, without decoding pixels
+
+    Falls back to PIL's lazy open for formats not parsed here.
+    Returns None when the bytes are not a readable image.
+    """
+    view = memoryview(data)
+    try:
+        head = bytes(view[:32])
+        if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+            width, height = struct.unpack('>II', head[16:24])
+            return ('png', width, height)
+        if head[:6] in (b'GIF87a', b'GIF89a'):
+            width, height = struct.unpack('<HH', head[6:10])
+            return ('gif', width, height)
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+            size = _probe_webp(head)
+            if size:
+                return ('webp',) + size
+        if head[:2] == b'\xff\xd8':
+            size = _probe_jpeg(view)
+            if size:
+                return ('jpeg',) + size
+    except (struct.error, IndexError):
+        pass
+
+    try:
+        with Image.open(BytesIO(view)) as img:
+            return (str(img.format or '').lower(), img.size[0], img.size[1])
+    except Exception:
+        return None
+
+
+def _probe_webp(head: bytes) -> Optional[Tuple[int, int]]:
+    chunk = head[12:16]
+    if chunk == b'VP8 ':
+        width, height = struct.unpack('<HH', head[26:30])
+        return (width & 0x3FFF, height & 0x3FFF)
+    if chunk == b'VP8L':
+        b0, b1, b2, b3 = head[21:25]
+        width = 1 + (((b1 & 0x3F) << 8) | b0)
+        height = 1 + (((b3 & 0x0F) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+        return (width, height)
+    if chunk == b'VP8X':
+        width = 1 + int.from_bytes(head[24:27], 'little')
+        height = 1 + int.from_bytes(head[27:30], 'little')
+        return (width, height)
+    return None
+
+
+# Start-of-frame markers (baseline, progressive, lossless, ...); not DHT/JPG/DAC
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _probe_jpeg(view: memoryview) -> Optional[Tuple[int, int]]:
+    """Walk JPEG segments to the first SOF marker"""
+    position = 2
+    length = len(view)
+    while position + 9 < length:
+        if view[position] != 0xFF:
+            return None
+        marker = view[position + 1]
+        if marker == 0xFF:  # Fill byte
+            position += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:  # No length field
+            position += 2
+            continue
+        segment_length = (view[position + 2] << 8) | view[position + 3]
+        if marker in _JPEG_SOF_MARKERS:
+            height = (view[position + 5] << 8) | view[position + 6]
+            width = (view[position + 7] << 8) | view[position + 8]
+            return (width, height)
+        position += 2 + segment_length
+    return None
+
+
+def check_shopify_requirements(size: int, width: int, height: int) -> Optional[str]:
+    """Reason the image cannot be uploaded to Shopify, or None if it can"""
+    if size > SHOPIFY_MAX_FILE_SIZE:
+        return f"file too large ({size:,} bytes)"
+    if width < SHOPIFY_MIN_DIMENSION or height < SHOPIFY_MIN_DIMENSION:
+        return f"too small ({width}x{height})"
+    if width > SHOPIFY_MAX_DIMENSION or height > SHOPIFY_MAX_DIMENSION:
+        return f"too large ({width}x{height})"
+    return None
+
+
+# =================== WORKER FUNCTIONS ===================
+
+def transcode_for_shopify(
+    data: bytes,
+    max_dimension: int = SHOPIFY_TARGET_DIMENSION,
+    quality: int = SHOPIFY_JPEG_QUALITY,
+    as_attachment: bool = True
+) -> TranscodedImage:
+    """
+    Validate, convert to RGB, downscale and JPEG-encode one image (worker side)
+
+    JPEGs are decoded at reduced scale (draft mode) when they are larger
+    than the target, which skips most of the IDCT work for big originals.
+    Returns a base64 attachment (REST image API) or, with
+    as_attachment=False, the raw JPEG bytes (staged uploads).
+
+    Raises:
+        ValueError if the image does not meet Shopify requirements
+    """
+    cpu_start = time.process_time()
+
+    probed = probe_image_size(data)
+    if not probed:
+        raise ValueError("unreadable image")
+    reason = check_shopify_requirements(len(data), probed[1], probed[2])
+    if reason:
+        raise ValueError(reason)
+
+    with Image.open(BytesIO(data)) as img:
+        if img.format == 'JPEG' and max(img.size) > max_dimension:
+            img.draft('RGB', (max_dimension, max_dimension))
+
+        # Convert to RGB if necessary
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        # Resize if too large (maintain aspect ratio)
+        if max(img.size) > max_dimension:
+            img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+        output = BytesIO()
+        img.save(output, 'JPEG', quality=quality, optimize=True)
+        width, height = img.size
+
+    if as_attachment:
+        encoded = output.getbuffer()
+        attachment = base64.b64encode(encoded).decode('ascii')
+        size = len(encoded)
+        del encoded
+        raw = None
+    else:
+        raw = output.getvalue()
+        attachment = None
+        size = len(raw)
+
+    return TranscodedImage(
+        attachment=attachment,
+        data=raw,
+        width=width,
+        height=height,
+        size=size,
+        cpu_seconds=time.process_time() - cpu_start
+    )
+
+
+# =================== POOL ===================
+
+class ImageTranscoder:
+    """
+    Shared process pool for image pixel work
+
+    Features:
+    - Lazy ProcessPoolExecutor (TRANSCODE_WORKERS processes)
+    - Falls back to a thread when the pool cannot start or breaks
+    - transcode_many() transcodes a product's images concurrently
+
+    Usage:
+        transcoder = get_image_transcoder()
+        results = await transcoder.transcode_many([buffer.data for buffer in images])
+    """
+
+    TRANSCODE_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or self.TRANSCODE_WORKERS
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_failed = False
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self._pool is None and not self._pool_failed:
+            try:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                logger.debug(f"🧵 Image transcode pool started ({self.workers} workers)")
+            except (OSError, NotImplementedError) as e:
+                logger.warning(f"⚠️ Image process pool unavailable, transcoding in threads: {e}")
+                self._pool_failed = True
+        return self._pool
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run a picklable top-level function in the pool"""
+        pool = self._get_pool()
+        if pool is None:
+            return await asyncio.to_thread(fn, *args)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            logger.warning("⚠️ Image transcode pool broke, restarting")
+            self._pool = None
+            return await asyncio.to_thread(fn, *args)
+
+    async def transcode(self, data: BytesLike, as_attachment: bool = True) -> TranscodedImage:
+        return await self.run(
+            transcode_for_shopify, bytes(data),
+            SHOPIFY_TARGET_DIMENSION, SHOPIFY_JPEG_QUALITY, as_attachment
+        )
+
+    async def transcode_many(
+        self,
+        images: List[BytesLike],
+        as_attachment: bool = True
+    ) -> List[Union[TranscodedImage, Exception]]:
+        """Transcode images concurrently (failures returned as exceptions, order kept)"""
+        return await asyncio.gather(
+            *(self.transcode(data, as_attachment) for data in images),
+            return_exceptions=True
+        )
+
+    def shutdown(self, wait: bool = False):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+
+_transcoder: Optional[ImageTranscoder] = None
+
+
+def get_image_transcoder() -> ImageTranscoder:
+    """Process-wide transcoder (one pool per process)"""
+    global _transcoder
+    if _transcoder is None:
+        _transcoder = ImageTranscoder()
+    return _transcoder
@@ -0,0 +1,412 @@
+"""
+Image URL Classifier - Compiled placeholder/icon exclusion for image URLs
+
+Static exclusion rules and each retailer's learned placeholder patterns are
+compiled once per retailer and kept in memory: plain-text patterns become a
+set of lowercase substrings (a few `in` checks on the lowered URL), and the
+remaining real regexes are joined into one case-insensitive alternation.
+Filtering a product's candidate images needs no database access. The cache
+is invalidated when a new placeholder pattern is learned (and expires after
+CACHE_TTL_SECONDS to pick up patterns learned by other processes).
+
+Download outcomes per URL pattern are aggregated in memory and upserted into
+image_patterns.db in batches on a worker thread.
+
+Unique keys on (retailer, url_pattern) / (retailer, pattern) are added by an
+explicit migration that merges duplicate rows first (never on import):
+    python Shared/image_url_classifier.py --migrate
+"""
+
+import argparse
+import atexit
+import asyncio
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from logger_config import setup_logging
+
+logger = setup_logging(__name__)
+
+
+# Static exclusion patterns (common across retailers)
+STATIC_EXCLUDE_PATTERNS = [
+    r'placeholder',
+    r'loading',
+    r'spinner',
+    r'blank\.gif',
+    r'spacer\.gif',
+    r'data:image',  # Base64 embedded images
+    r'\.svg$',  # Vector graphics (usually placeholders)
+    r'_icon',
+    r'logo',
+    r'badge',
+    r'/icons?/',
+    r'/badges?/',
+    # NOTE: _V\d+ patterns (Revolve) are NOT excluded here
+    # They are kept and transformed to full-size in _enhance_urls()
+]
+
+# A pattern with no regex metacharacters (escaped punctuation allowed)
+LITERAL_PATTERN_RE = re.compile(r'(?:[^\\.^$*+?{}\[\]|()]|\\[^A-Za-z0-9])*')
+
+# Domain + first path segment, e.g. "media.aritzia.com/media"
+URL_PATTERN_RE = re.compile(r'^(?:https?://)?([^/]+(?:/[^/]+)?)')
+
+
+def extract_url_pattern(url: str) -> str:
+    """General pattern of a URL (domain + first path segment) for learning"""
+    match = URL_PATTERN_RE.match(url)
+    return match.group(1) if match else url[:100]
+
+
+class ExclusionMatcher:
+    """Compiled exclusion patterns: substring literals + one residual regex"""
+
+    def __init__(self, patterns: List[str]):
+        literals = []
+        regexes = []
+        for pattern in patterns:
+            if LITERAL_PATTERN_RE.fullmatch(pattern):
+                literals.append(re.sub(r'\\(.)', r'\1', pattern).lower())
+            else:
+                regexes.append(pattern)
+
+        self.literals = tuple(dict.fromkeys(literals))
+        self.regex = (
+            re.compile('|'.join(f'(?:{p})' for p in regexes), re.IGNORECASE)
+            if regexes else None
+        )
+
+    def search(self, url: str) -> bool:
+        lowered = url.lower()
+        for literal in self.literals:
+            if literal in lowered:
+                return True
+        return self.regex is not None and self.regex.search(lowered) is not None
+
+
+class ImageURLClassifier:
+    """
+    Per-retailer compiled image URL exclusion + batched download stats
+
+    Features:
+    - One compiled matcher per retailer (static + learned patterns)
+    - In-memory cache, invalidated when a placeholder pattern is learned
+    - Invalid learned patterns are matched literally instead of failing
+    - Download stats buffered and written in one transaction per flush
+      (kept for the next flush if the write fails)
+
+    Usage:
+        classifier = ImageURLClassifier(db_path)
+        valid = classifier.filter_valid_urls(urls, 'revolve')
+        classifier.record_downloads('revolve', [(url, True), ...])
+    """
+
+    LEARNED_PATTERN_LIMIT = 20
+    CACHE_TTL_SECONDS = 600
+
+    # Download stats flush: batch size or interval, whichever comes first
+    STATS_BATCH_SIZE = 50
+    STATS_FLUSH_INTERVAL_SECONDS = 60
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+        # retailer -> (compiled_at, matcher)
+        self._matcher_cache: Dict[str, Tuple[float, ExclusionMatcher]] = {}
+
+        # (retailer, url_pattern) -> [successes, failures]
+        self._pending_stats: Dict[Tuple[str, str], List[int]] = {}
+        self._pending_events = 0
+        self._last_flush = time.monotonic()
+        self._stats_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+        atexit.register(self.flush_download_stats)
+
+    def _get_connection(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    # =================== MIGRATION ===================
+
+    def migrate(self) -> bool:
+        """
+        Merge duplicate pattern rows and add unique keys (explicit, run once per DB)
+
+        download_stats rows sharing (retailer, url_pattern) are summed into the
+        oldest row; placeholder_patterns rows sharing (retailer, pattern) keep
+        the oldest row with the summed detection_count and latest last_seen.
+
+        Returns:
+            True if the unique indexes exist afterwards
+        """
+        try:
+            conn = self._get_connection()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute('''
+                    UPDATE download_stats SET
+                        download_success = (
+                            SELECT SUM(d.download_success) FROM download_stats d
+                            WHERE d.retailer = download_stats.retailer
+                              AND d.url_pattern IS download_stats.url_pattern
+                        ),
+                        download_failure = (
+                            SELECT SUM(d.download_failure) FROM download_stats d
+                            WHERE d.retailer = download_stats.retailer
+                              AND d.url_pattern IS download_stats.url_pattern
+                        )
+                    WHERE id IN (
+                        SELECT MIN(id) FROM download_stats
+                        GROUP BY retailer, url_pattern HAVING COUNT(*) > 1
+                    )
+                ''')
+                merged_stats = conn.execute('''
+                    DELETE FROM download_stats WHERE id NOT IN (
+                        SELECT MIN(id) FROM download_stats GROUP BY retailer, url_pattern
+                    )
+                ''').rowcount
+                conn.execute('''
+                    UPDATE placeholder_patterns SET
+                        detection_count = (
+                            SELECT SUM(p.detection_count) FROM placeholder_patterns p
+                            WHERE p.retailer = placeholder_patterns.retailer
+                              AND p.pattern = placeholder_patterns.pattern
+                        ),
+                        last_seen = (
+                            SELECT MAX(p.last_seen) FROM placeholder_patterns p
+                            WHERE p.retailer = placeholder_patterns.retailer
+                              AND p.pattern = placeholder_patterns.pattern
+                        )
+                    WHERE id IN (
+                        SELECT MIN(id) FROM placeholder_patterns
+                        GROUP BY retailer, pattern HAVING COUNT(*) > 1
+                    )
+                ''')
+                merged_patterns = conn.execute('''
+                    DELETE FROM placeholder_patterns WHERE id NOT IN (
+                        SELECT MIN(id) FROM placeholder_patterns GROUP BY retailer, pattern
+                    )
+                ''').rowcount
+                conn.execute('''
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_download_stats_pattern
+                    ON download_stats(retailer, url_pattern)
+                ''')
+                conn.execute('''
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_placeholder_pattern
+                    ON placeholder_patterns(retailer, pattern)
+                ''')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Image pattern DB migration failed: {e}")
+            return False
+
+        logger.info(
+            f"✅ Image pattern DB migrated: merged {merged_stats} duplicate download_stats "
+            f"and {merged_patterns} duplicate placeholder_patterns rows"
+        )
+        return True
+
+    # =================== EXCLUSION ===================
+
+    def exclusion_matcher(self, retailer: str) -> ExclusionMatcher:
+        """Compiled exclusion matcher for retailer (cached)"""
+        cached = self._matcher_cache.get(retailer)
+        if cached and time.monotonic() - cached[0] < self.CACHE_TTL_SECONDS:
+            return cached[1]
+
+        patterns = STATIC_EXCLUDE_PATTERNS + [
+            self._safe_pattern(p) for p in self.learned_patterns(retailer)
+        ]
+        matcher = ExclusionMatcher(patterns)
+        self._matcher_cache[retailer] = (time.monotonic(), matcher)
+        return matcher
+
+    def is_excluded(self, url: str, retailer: str) -> bool:
+        return self.exclusion_matcher(retailer).search(url)
+
+    def filter_valid_urls(self, image_urls: List[str], retailer: str) -> List[str]:
+        """
+        Drop placeholder/icon URLs, short URLs and non-HTTP(S) URLs
+
+        Order of the remaining URLs is preserved.
+        """
+        search = self.exclusion_matcher(retailer).search
+        valid_urls = []
+
+        for url in image_urls:
+            if not url or len(url) < 10:
+                continue
+
+            if search(url):
+                logger.debug(f"🚫 Excluded (placeholder/icon): {url[:80]}")
+                continue
+
+            if not url.startswith(('http://', 'https://')):
+                logger.debug(f"🚫 Excluded (invalid protocol): {url[:80]}")
+                continue
+
+            valid_urls.append(url)
+
+        return valid_urls
+
+    def learn_placeholder_pattern(self, retailer: str, pattern: str):
+        """Record a placeholder pattern for retailer and recompile its matcher"""
+        try:
+            conn = self._get_connection()
+            try:
+                updated = conn.execute('''
+                    UPDATE placeholder_patterns SET
+                        detection_count = detection_count + 1,
+                        last_seen = CURRENT_TIMESTAMP
+                    WHERE retailer = ? AND pattern = ?
+                ''', (retailer, pattern)).rowcount
+                if not updated:
+                    conn.execute('''
+                        INSERT INTO placeholder_patterns (retailer, pattern, detection_count)
+                        VALUES (?, ?, 1)
+                    ''', (retailer, pattern))
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not save placeholder pattern for {retailer}: {e}")
+            return
+
+        self.invalidate(retailer)
+
+    def invalidate(self, retailer: Optional[str] = None):
+        """Drop compiled matchers (one retailer, or all)"""
+        if retailer is None:
+            self._matcher_cache.clear()
+        else:
+            self._matcher_cache.pop(retailer, None)
+
+    def learned_patterns(self, retailer: str) -> List[str]:
+        """Retailer's learned placeholder patterns, most frequently detected first"""
+        try:
+            conn = self._get_connection()
+            try:
+                rows = conn.execute('''
+                    SELECT pattern FROM placeholder_patterns
+                    WHERE retailer = ?
+                    ORDER BY detection_count DESC
+                    LIMIT ?
+                ''', (retailer, self.LEARNED_PATTERN_LIMIT)).fetchall()
+            finally:
+                conn.close()
+            return [row[0] for row in rows if row[0]]
+        except Exception as e:
+            logger.debug(f"Could not load placeholder patterns: {e}")
+            return []
+
+    @staticmethod
+    def _safe_pattern(pattern: str) -> str:
+        """Pattern as-is if it compiles, else matched literally"""
+        try:
+            re.compile(pattern)
+            return pattern
+        except re.error:
+            return re.escape(pattern)
+
+    # =================== DOWNLOAD STATS ===================
+
+    def record_downloads(self, retailer: str, outcomes: Iterable[Tuple[str, bool]]):
+        """
+        Buffer download outcomes (url, success) for retailer
+
+        Flushed on a worker thread once STATS_BATCH_SIZE outcomes are pending
+        or STATS_FLUSH_INTERVAL_SECONDS have passed since the last flush.
+        """
+        with self._stats_lock:
+            for url, success in outcomes:
+                counts = self._pending_stats.setdefault((retailer, extract_url_pattern(url)), [0, 0])
+                counts[0 if success else 1] += 1
+                self._pending_events += 1
+
+            due = (
+                self._pending_events >= self.STATS_BATCH_SIZE
+                or time.monotonic() - self._last_flush >= self.STATS_FLUSH_INTERVAL_SECONDS
+            )
+
+        if due:
+            try:
+                asyncio.get_running_loop().run_in_executor(None, self.flush_download_stats)
+            except RuntimeError:
+                self.flush_download_stats()
+
+    def flush_download_stats(self) -> int:
+        """Upsert buffered download stats; returns rows written"""
+        with self._flush_lock:
+            with self._stats_lock:
+                pending, self._pending_stats = self._pending_stats, {}
+                self._pending_events = 0
+                self._last_flush = time.monotonic()
+
+            if not pending:
+                return 0
+
+            rows = [
+                (retailer, pattern, successes, failures)
+                for (retailer, pattern), (successes, failures) in pending.items()
+            ]
+
+            try:
+                conn = self._get_connection()
+                try:
+                    new_rows = []
+                    for retailer, pattern, successes, failures in rows:
+                        updated = conn.execute('''
+                            UPDATE download_stats SET
+                                download_success = download_success + ?,
+                                download_failure = download_failure + ?,
+                                last_updated = CURRENT_TIMESTAMP
+                            WHERE retailer = ? AND url_pattern = ?
+                        ''', (successes, failures, retailer, pattern)).rowcount
+                        if not updated:
+                            new_rows.append((retailer, pattern, successes, failures))
+                    conn.executemany('''
+                        INSERT INTO download_stats (retailer, url_pattern, download_success, download_failure)
+                        VALUES (?, ?, ?, ?)
+                    ''', new_rows)
+                    conn.commit()
+                finally:
+                    conn.close()
+            except Exception as e:
+                logger.warning(f"⚠️ Download stats flush failed, keeping {len(rows)} patterns for retry: {e}")
+                self._restore_pending(pending)
+                return 0
+
+            logger.debug(f"📊 Flushed download stats for {len(rows)} URL patterns")
+            return len(rows)
+
+    def _restore_pending(self, pending: Dict[Tuple[str, str], List[int]]):
+        """Put unflushed stats back in the buffer (merged with anything recorded since)"""
+        with self._stats_lock:
+            for key, (successes, failures) in pending.items():
+                counts = self._pending_stats.setdefault(key, [0, 0])
+                counts[0] += successes
+                counts[1] += failures
+                self._pending_events += successes + failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Image URL classifier maintenance')
+    parser.add_argument('--migrate', action='store_true',
+                        help='Merge duplicate pattern rows and add unique keys')
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(__file__), 'image_patterns.db'))
+    args = parser.parse_args()
+
+    if args.migrate:
+        sys.exit(0 if ImageURLClassifier(args.db).migrate() else 1)
+    parser.print_help()
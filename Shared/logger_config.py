@@ -1,46 +1,192 @@
 """
 Logger Configuration - Centralized logging setup for the entire system
+
+Non-blocking backend: every module logger gets the same QueueHandler, and a
+single QueueListener thread per process owns the console and file handlers
+(scraper_main.log, errors.log, scraper_main.jsonl and the topic logs).
+Emitting a record only stamps run context and puts it on a queue, so disk
+I/O never runs on the event-loop thread.
+
+JSON-lines records carry run_id, retailer and tower. Use set_log_context() /
+log_context() at workflow entry points, and SampledLogger for per-item
+DEBUG in hot loops.
 """
 
+import atexit
+import contextvars
+import json
 import logging
 import logging.handlers
 import os
+import queue
+import sys
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+# Per-item DEBUG in hot paths: log 1 of every N calls per call site
+DEFAULT_SAMPLE_EVERY = int(os.getenv('LOG_DEBUG_SAMPLE_EVERY', '50'))
+
+# Run context (contextvars follow asyncio tasks)
+_DEFAULT_RUN_ID = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+_run_id_var = contextvars.ContextVar('log_run_id', default=_DEFAULT_RUN_ID)
+_retailer_var = contextvars.ContextVar('log_retailer', default=None)
+_tower_var = contextvars.ContextVar('log_tower', default=None)
+
+# Logger name keywords → tower
+TOWER_KEYWORDS = (
+    ('commercial', 'commercial'),
+    ('zenrows', 'commercial'),
+    ('markdown', 'markdown'),
+    ('patchright', 'patchright'),
+)
+
+# Process-wide queue backend (created lazily by setup_logging)
+_queue_handler = None
+_queue_listener = None
+_backend_lock = threading.Lock()
+
+
+def set_log_context(
+    run_id: Optional[str] = None,
+    retailer: Optional[str] = None,
+    tower: Optional[str] = None
+):
+    """Set run_id / retailer / tower for records emitted from the current context"""
+    if run_id is not None:
+        _run_id_var.set(run_id)
+    if retailer is not None:
+        _retailer_var.set(retailer)
+    if tower is not None:
+        _tower_var.set(tower)
+
+
+@contextmanager
+def log_context(
+    run_id: Optional[str] = None,
+    retailer: Optional[str] = None,
+    tower: Optional[str] = None
+):
+    """Temporarily set log context (restored on exit)"""
+    tokens = []
+    if run_id is not None:
+        tokens.append((_run_id_var, _run_id_var.set(run_id)))
+    if retailer is not None:
+        tokens.append((_retailer_var, _retailer_var.set(retailer)))
+    if tower is not None:
+        tokens.append((_tower_var, _tower_var.set(tower)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def get_run_id() -> str:
+    """Current run_id"""
+    return _run_id_var.get()
+
+
+def get_log_context() -> Dict[str, Optional[str]]:
+    """Current run_id / retailer / tower"""
+    return {
+        'run_id': _run_id_var.get(),
+        'retailer': _retailer_var.get(),
+        'tower': _tower_var.get()
+    }
+
+
+def _tower_from_name(name: str) -> Optional[str]:
+    lower = name.lower()
+    for keyword, tower in TOWER_KEYWORDS:
+        if keyword in lower:
+            return tower
+    return None
+
+
+class _ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that stamps run context and does the minimum work on the
+    emitting thread (message interpolation + exception text)
+    """
+
+    def prepare(self, record):
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+
+        record.message = message
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+
+        record.run_id = _run_id_var.get()
+        record.retailer = _retailer_var.get()
+        record.tower = _tower_from_name(record.name) or _tower_var.get()
+        return record
+
+
+class JSONLinesFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message + run context"""
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'run_id': getattr(record, 'run_id', None),
+            'retailer': getattr(record, 'retailer', None),
+            'tower': getattr(record, 'tower', None),
+        }
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _LoggerNameFilter(logging.Filter):
+    """Route records by logger name keywords (replaces per-logger topic handlers)"""
+
+    def __init__(self, keywords):
+        super().__init__()
+        self.keywords = keywords
+
+    def filter(self, record):
+        name = record.name.lower()
+        return any(keyword in name for keyword in self.keywords)
+
+
+class PerformanceFilter(logging.Filter):
+    """Timing and metrics messages only"""
+
+    def filter(self, record):
+        return any(keyword in record.getMessage().lower()
+                   for keyword in ['processing time', 'duration', 'completed', 'performance'])
+
+
+def _build_handlers(log_dir: Path):
+    """The single set of console/file handlers owned by the queue listener"""
 
-def setup_logging(name: str = None) -> logging.Logger:
-    """Setup comprehensive logging configuration"""
-    
-    # Create logs directory
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-    
-    # Get logger
-    logger = logging.getLogger(name or __name__)
-    
-    # Prevent duplicate handlers
-    if logger.handlers:
-        return logger
-    
-    logger.setLevel(logging.DEBUG)
-    
-    # Create formatters
     detailed_formatter = logging.Formatter(
         '[%(asctime)s.%(msecs)03d] [%(levelname)s] [%(name)s] %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
-    
+
     simple_formatter = logging.Formatter(
         '[%(asctime)s] [%(levelname)s] %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
-    
+
+    handlers = []
+
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(simple_formatter)
-    logger.addHandler(console_handler)
-    
+    handlers.append(console_handler)
+
     # Main log file (all operations)
     main_handler = logging.handlers.RotatingFileHandler(
         log_dir / "scraper_main.log",
@@ -49,8 +195,18 @@ def setup_logging(name: str = None) -> logging.Logger:
     )
     main_handler.setLevel(logging.DEBUG)
     main_handler.setFormatter(detailed_formatter)
-    logger.addHandler(main_handler)
-    
+    handlers.append(main_handler)
+
+    # Structured log (JSON lines with run_id / retailer / tower)
+    json_handler = logging.handlers.RotatingFileHandler(
+        log_dir / "scraper_main.jsonl",
+        maxBytes=50*1024*1024,  # 50MB
+        backupCount=5
+    )
+    json_handler.setLevel(logging.DEBUG)
+    json_handler.setFormatter(JSONLinesFormatter())
+    handlers.append(json_handler)
+
     # Error log file (errors and warnings only)
     error_handler = logging.handlers.RotatingFileHandler(
         log_dir / "errors.log",
@@ -59,68 +215,148 @@ def setup_logging(name: str = None) -> logging.Logger:
     )
     error_handler.setLevel(logging.WARNING)
     error_handler.setFormatter(detailed_formatter)
-    logger.addHandler(error_handler)
-    
+    handlers.append(error_handler)
+
     # Performance log (timing and metrics)
-    if name and any(keyword in name.lower() for keyword in ['processor', 'extractor', 'manager']):
-        performance_handler = logging.handlers.RotatingFileHandler(
-            log_dir / "performance.log",
-            maxBytes=20*1024*1024,  # 20MB
-            backupCount=3
-        )
-        performance_handler.setLevel(logging.INFO)
-        performance_handler.setFormatter(detailed_formatter)
-        
-        # Create a filter for performance metrics
-        class PerformanceFilter(logging.Filter):
-            def filter(self, record):
-                return any(keyword in record.getMessage().lower() 
-                          for keyword in ['processing time', 'duration', 'completed', 'performance'])
-        
-        performance_handler.addFilter(PerformanceFilter())
-        logger.addHandler(performance_handler)
-    
-    # Shopify operations log
-    if name and 'shopify' in name.lower():
-        shopify_handler = logging.handlers.RotatingFileHandler(
-            log_dir / "shopify_operations.log",
-            maxBytes=20*1024*1024,  # 20MB
-            backupCount=3
-        )
-        shopify_handler.setLevel(logging.DEBUG)
-        shopify_handler.setFormatter(detailed_formatter)
-        logger.addHandler(shopify_handler)
-    
-    # Image processing log
-    if name and 'image' in name.lower():
-        image_handler = logging.handlers.RotatingFileHandler(
-            log_dir / "image_processing.log",
-            maxBytes=20*1024*1024,  # 20MB
+    performance_handler = logging.handlers.RotatingFileHandler(
+        log_dir / "performance.log",
+        maxBytes=20*1024*1024,  # 20MB
+        backupCount=3
+    )
+    performance_handler.setLevel(logging.INFO)
+    performance_handler.setFormatter(detailed_formatter)
+    performance_handler.addFilter(_LoggerNameFilter(('processor', 'extractor', 'manager')))
+    performance_handler.addFilter(PerformanceFilter())
+    handlers.append(performance_handler)
+
+    # Topic logs: (file, keywords, max size)
+    topic_logs = [
+        ("shopify_operations.log", ('shopify',), 20),
+        ("image_processing.log", ('image',), 20),
+        ("pattern_learning.log", ('pattern',), 10),
+    ]
+    for filename, keywords, max_mb in topic_logs:
+        topic_handler = logging.handlers.RotatingFileHandler(
+            log_dir / filename,
+            maxBytes=max_mb*1024*1024,
             backupCount=3
         )
-        image_handler.setLevel(logging.DEBUG)
-        image_handler.setFormatter(detailed_formatter)
-        logger.addHandler(image_handler)
-    
-    # Pattern learning log
-    if name and 'pattern' in name.lower():
-        pattern_handler = logging.handlers.RotatingFileHandler(
-            log_dir / "pattern_learning.log",
-            maxBytes=10*1024*1024,  # 10MB
-            backupCount=3
+        topic_handler.setLevel(logging.DEBUG)
+        topic_handler.setFormatter(detailed_formatter)
+        topic_handler.addFilter(_LoggerNameFilter(keywords))
+        handlers.append(topic_handler)
+
+    return handlers
+
+
+def _get_queue_handler() -> logging.Handler:
+    """Create the process-wide QueueHandler and start its listener (once)"""
+    global _queue_handler, _queue_listener
+
+    with _backend_lock:
+        if _queue_handler is not None:
+            return _queue_handler
+
+        # Create logs directory
+        log_dir = Path("logs")
+        log_dir.mkdir(exist_ok=True)
+
+        log_queue = queue.SimpleQueue()
+        _queue_handler = _ContextQueueHandler(log_queue)
+        _queue_handler.setLevel(logging.DEBUG)
+
+        _queue_listener = logging.handlers.QueueListener(
+            log_queue,
+            *_build_handlers(log_dir),
+            respect_handler_level=True
         )
-        pattern_handler.setLevel(logging.DEBUG)
-        pattern_handler.setFormatter(detailed_formatter)
-        logger.addHandler(pattern_handler)
-    
+        _queue_listener.start()
+        atexit.register(shutdown_logging)
+
+        return _queue_handler
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        for handler in _queue_listener.handlers:
+            handler.close()
+        _queue_listener = None
+
+
+def setup_logging(name: str = None) -> logging.Logger:
+    """Setup comprehensive logging configuration"""
+
+    # Get logger
+    logger = logging.getLogger(name or __name__)
+
+    # Prevent duplicate handlers
+    if logger.handlers:
+        return logger
+
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(_get_queue_handler())
+
     return logger
 
+
+class SampledLogger:
+    """
+    Sampled / rate-limited logging for per-item hot paths
+
+    DEBUG and INFO calls log the first call and then 1 of every `every`
+    calls per call site, noting how many were skipped. WARNING and above
+    always pass through.
+
+    Usage:
+        sampled = SampledLogger(logger)
+        for product in products:
+            sampled.debug(f"Checked {product['url']}")
+    """
+
+    def __init__(self, logger: logging.Logger, every: int = None):
+        self.logger = logger
+        self.every = max(1, every or DEFAULT_SAMPLE_EVERY)
+        self._counts: Dict[Tuple[str, int], int] = {}
+
+    def _should_log(self) -> Tuple[bool, int]:
+        frame = sys._getframe(3)
+        key = (frame.f_code.co_filename, frame.f_lineno)
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        return count % self.every == 0, (self.every - 1 if count else 0)
+
+    def _log(self, level: int, msg, *args, **kwargs):
+        if not self.logger.isEnabledFor(level):
+            return
+        emit, skipped = self._should_log()
+        if emit:
+            if skipped:
+                msg = f"{msg} (sampled 1/{self.every})"
+            kwargs.setdefault('stacklevel', 3)
+            self.logger.log(level, msg, *args, **kwargs)
+
+    def debug(self, msg, *args, **kwargs):
+        self._log(logging.DEBUG, msg, *args, **kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        self._log(logging.INFO, msg, *args, **kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        self.logger.warning(msg, *args, **kwargs)
+
+    def error(self, msg, *args, **kwargs):
+        self.logger.error(msg, *args, **kwargs)
+
+
 def log_batch_summary(batch_id: str, results: dict):
     """Log daily batch summary"""
-    
+
     summary_logger = logging.getLogger("batch_summary")
     summary_logger.setLevel(logging.INFO)
-    
+
     # Create handler if it doesn't exist
     if not summary_logger.handlers:
         handler = logging.handlers.RotatingFileHandler(
@@ -128,15 +364,15 @@ def log_batch_summary(batch_id: str, results: dict):
             maxBytes=5*1024*1024,  # 5MB
             backupCount=30  # Keep 30 days
         )
-        
+
         formatter = logging.Formatter(
             '[%(asctime)s] BATCH_SUMMARY: %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
-        
+
         handler.setFormatter(formatter)
         summary_logger.addHandler(handler)
-    
+
     # Create summary message
     summary = (
         f"Batch {batch_id} - "
@@ -147,19 +383,19 @@ def log_batch_summary(batch_id: str, results: dict):
         f"Success Rate: {results.get('success_rate', 0):.1f}%, "
         f"Duration: {results.get('duration_minutes', 0):.1f}min"
     )
-    
+
     summary_logger.info(summary)
 
 def setup_structured_logging():
     """Setup structured logging for metrics and analytics"""
-    
+
     # Disable some noisy third-party loggers
     logging.getLogger('aiohttp').setLevel(logging.WARNING)
     logging.getLogger('urllib3').setLevel(logging.WARNING)
     logging.getLogger('PIL').setLevel(logging.WARNING)
-    
+
     # Set root logger level
     logging.getLogger().setLevel(logging.WARNING)
 
 # Initialize structured logging when module is imported
-setup_structured_logging()
\ No newline at end of file
+setup_structured_logging()
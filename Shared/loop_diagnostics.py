@@ -0,0 +1,350 @@
+"""
+Loop Diagnostics - Event-loop lag and blocking-call detector for async workflows
+
+The workflows are async, but some of the work they call is not:
+- sqlite3 snapshots
+- smtplib notifications
+- synchronous Gemini generate_content
+- PIL
+- pickle cache I/O
+- plain file writes
+
+Any of these stalls every in-flight product while it runs. Diagnostics
+mode shows where that happens:
+
+- Lag sampling: an EventLoopLagMonitor ticks every LAG_INTERVAL_SECONDS
+  and records how late each wake-up was (p50/p90/p99/max in the report)
+- asyncio debug mode with slow_callback_duration = the threshold: every
+  callback/task step that runs longer is captured with asyncio's
+  description of it
+- Watchdog thread: when the loop has not ticked for longer than the
+  threshold, it samples the loop thread's current frame
+  (sys._current_frames) every SAMPLE_INTERVAL_SECONDS until the loop
+  recovers, so the stall is attributed to the line that was blocking
+
+Samples are grouped by call site, meaning the innermost frame in this repo
+plus the function it was in when sampled. They are ranked by total blocked
+time and written to <repo>/logs/loop_diagnostics/<workflow>_<timestamp>.json. The
+top entries are also logged. The call site at the top is where offloading
+to a thread or process pays off most.
+
+Environment:
+    LOOP_DIAGNOSTICS=1              Enable without the CLI flag
+    LOOP_BLOCK_THRESHOLD_MS=100     Stall / slow-callback threshold
+    LOOP_DIAGNOSTICS_DIR=<repo>/logs/loop_diagnostics
+
+Usage:
+    diagnostics = start_loop_diagnostics('product_updater', enabled=args.diagnose_loop)
+    try:
+        ...
+    finally:
+        if diagnostics:
+            await diagnostics.stop()
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(__file__))
+from logger_config import setup_logging
+from metrics_server import EventLoopLagMonitor
+
+logger = setup_logging(__name__)
+
+LOOP_DIAGNOSTICS = os.getenv('LOOP_DIAGNOSTICS', '0').lower() in ('1', 'true', 'yes')
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv('LOOP_BLOCK_THRESHOLD_MS', '100'))
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+LOOP_DIAGNOSTICS_DIR = os.getenv('LOOP_DIAGNOSTICS_DIR', os.path.join(REPO_ROOT, 'logs', 'loop_diagnostics'))
+
+# asyncio's slow-callback warning: "Executing <Handle ...> took 0.253 seconds"
+_SLOW_CALLBACK_PATTERN = re.compile(r'Executing (.+) took ([\d.]+) seconds', re.DOTALL)
+
+
+class _SlowCallbackHandler(logging.Handler):
+    """Captures asyncio debug-mode slow-callback warnings"""
+
+    def __init__(self, diagnostics: 'LoopDiagnostics'):
+        super().__init__(logging.WARNING)
+        self.diagnostics = diagnostics
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            match = _SLOW_CALLBACK_PATTERN.search(record.getMessage())
+        except Exception:
+            return
+        if match:
+            self.diagnostics.record_slow_callback(match.group(1), float(match.group(2)))
+
+
+class LoopDiagnostics:
+    """
+    Blocking-call detector for one event loop
+
+    Features:
+    - Event-loop lag histogram
+    - asyncio debug slow-callback capture
+    - Watchdog thread sampling the loop thread's stack during stalls
+    - Ranked JSON report of the worst blocking call sites
+
+    Usage:
+        diagnostics = LoopDiagnostics('catalog_monitor')
+        diagnostics.start()          # from inside the running loop
+        ...
+        report_path = await diagnostics.stop()
+    """
+
+    LAG_INTERVAL_SECONDS = 0.05
+    SAMPLE_INTERVAL_SECONDS = 0.01
+    STACK_DEPTH = 12
+    TOP_N = 15
+
+    def __init__(self, workflow: str, threshold_ms: float = None, output_dir: str = None):
+        self.workflow = workflow
+        self.threshold = (threshold_ms or LOOP_BLOCK_THRESHOLD_MS) / 1000
+        self.output_dir = output_dir or LOOP_DIAGNOSTICS_DIR
+        self.lag_monitor = EventLoopLagMonitor(self.LAG_INTERVAL_SECONDS)
+
+        self.sites: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.stalls: List[Dict[str, Any]] = []
+        self.slow_callbacks: Dict[str, Dict[str, Any]] = {}
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._previous_debug = False
+        self._previous_slow_callback_duration = 0.1
+        self._handler: Optional[_SlowCallbackHandler] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._started_at = 0.0
+
+    # =================== LIFECYCLE ===================
+
+    def start(self) -> 'LoopDiagnostics':
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._started_at = time.monotonic()
+
+        self._previous_debug = self._loop.get_debug()
+        self._previous_slow_callback_duration = self._loop.slow_callback_duration
+        self._loop.set_debug(True)
+        self._loop.slow_callback_duration = self.threshold
+
+        self._handler = _SlowCallbackHandler(self)
+        logging.getLogger('asyncio').addHandler(self._handler)
+
+        self.lag_monitor.start()
+        self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._watchdog.start()
+
+        logger.info(
+            f"🩺 Loop diagnostics enabled for {self.workflow} "
+            f"(threshold {self.threshold * 1000:.0f}ms, asyncio debug on)"
+        )
+        return self
+
+    async def stop(self) -> Optional[str]:
+        """Stop sampling, restore the loop, write and log the report. Returns the report path."""
+        if self._loop is None:
+            return None
+        self._stopped.set()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+        await self.lag_monitor.stop()
+        if self._handler is not None:
+            logging.getLogger('asyncio').removeHandler(self._handler)
+            self._handler = None
+
+        self._loop.set_debug(self._previous_debug)
+        self._loop.slow_callback_duration = self._previous_slow_callback_duration
+        self._loop = None
+
+        report = self.build_report()
+        path = self._write_report(report)
+        logger.info('\n' + self.format_report(report))
+        if path:
+            logger.info(f"🩺 Loop diagnostics report: {path}")
+        return path
+
+    # =================== SAMPLING ===================
+
+    def _watch(self):
+        stall_started = None
+        last_sample = None
+        stall_sites: Dict[Tuple[str, str], int] = {}
+
+        while not self._stopped.wait(self.SAMPLE_INTERVAL_SECONDS):
+            now = time.monotonic()
+            silent_for = now - self.lag_monitor.last_tick - self.LAG_INTERVAL_SECONDS
+
+            if silent_for < self.threshold:
+                if stall_started is not None:
+                    self._finish_stall(stall_started, now, stall_sites)
+                    stall_started, stall_sites = None, {}
+                continue
+
+            if stall_started is None:
+                stall_started = self.lag_monitor.last_tick + self.LAG_INTERVAL_SECONDS
+                last_sample = stall_started
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            blocked = now - last_sample
+            last_sample = now
+            key = self._record_sample(frame, blocked)
+            stall_sites[key] = stall_sites.get(key, 0) + 1
+            del frame
+
+        if stall_started is not None:
+            self._finish_stall(stall_started, time.monotonic(), stall_sites)
+
+    def _record_sample(self, frame, blocked: float) -> Tuple[str, str]:
+        stack = traceback.extract_stack(frame, limit=self.STACK_DEPTH)
+        leaf = stack[-1] if stack else None
+        site = next((entry for entry in reversed(stack) if self._is_repo_frame(entry.filename)), leaf)
+
+        site_label = f"{self._short_path(site.filename)}:{site.lineno} in {site.name}" if site else '?'
+        leaf_label = f"{self._short_path(leaf.filename)}:{leaf.lineno} in {leaf.name}" if leaf else '?'
+        key = (site_label, leaf_label)
+
+        with self._lock:
+            entry = self.sites.get(key)
+            if entry is None:
+                entry = self.sites[key] = {
+                    'site': site_label,
+                    'leaf': leaf_label,
+                    'code': (site.line or '').strip() if site else '',
+                    'samples': 0,
+                    'blocked_s': 0.0,
+                    'stalls': 0,
+                    'stack': [
+                        f"{self._short_path(item.filename)}:{item.lineno} in {item.name}: {(item.line or '').strip()}"
+                        for item in stack
+                    ]
+                }
+            entry['samples'] += 1
+            entry['blocked_s'] += max(0.0, blocked)
+        return key
+
+    def _finish_stall(self, started: float, ended: float, stall_sites: Dict[Tuple[str, str], int]):
+        duration = ended - started
+        top_key = max(stall_sites, key=stall_sites.get) if stall_sites else None
+        with self._lock:
+            for key in stall_sites:
+                self.sites[key]['stalls'] += 1
+                self.sites[key]['max_stall_s'] = max(self.sites[key].get('max_stall_s', 0.0), duration)
+            self.stalls.append({
+                'at_s': round(started - self._started_at, 3),
+                'duration_s': round(duration, 4),
+                'site': top_key[0] if top_key else None
+            })
+
+    def record_slow_callback(self, description: str, seconds: float):
+        # Strip object addresses so repeated callbacks group together
+        description = re.sub(r' at 0x[0-9a-f]+', '', description)[:300]
+        with self._lock:
+            entry = self.slow_callbacks.setdefault(description, {'count': 0, 'total_s': 0.0, 'max_s': 0.0})
+            entry['count'] += 1
+            entry['total_s'] += seconds
+            entry['max_s'] = max(entry['max_s'], seconds)
+
+    @staticmethod
+    def _is_repo_frame(filename: str) -> bool:
+        filename = os.path.abspath(filename)
+        return (
+            filename.startswith(REPO_ROOT)
+            and 'site-packages' not in filename
+            and os.path.basename(filename) != 'loop_diagnostics.py'
+        )
+
+    @staticmethod
+    def _short_path(filename: str) -> str:
+        filename = os.path.abspath(filename)
+        if filename.startswith(REPO_ROOT):
+            return os.path.relpath(filename, REPO_ROOT)
+        marker = 'site-packages' + os.sep
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+        return os.path.basename(filename)
+
+    # =================== REPORT ===================
+
+    def build_report(self) -> Dict[str, Any]:
+        with self._lock:
+            sites = sorted(self.sites.values(), key=lambda entry: entry['blocked_s'], reverse=True)
+            slow_callbacks = sorted(
+                ({'callback': name, **stats} for name, stats in self.slow_callbacks.items()),
+                key=lambda entry: entry['total_s'], reverse=True
+            )
+            stalls = list(self.stalls)
+
+        lag = self.lag_monitor.histogram.to_dict()
+        return {
+            'workflow': self.workflow,
+            'generated_at': datetime.now().isoformat(),
+            'duration_s': round(time.monotonic() - self._started_at, 3),
+            'threshold_ms': self.threshold * 1000,
+            'event_loop_lag': lag,
+            'total_stalls': len(stalls),
+            'total_blocked_s': round(sum(stall['duration_s'] for stall in stalls), 3),
+            'blocking_sites': [
+                {**entry, 'blocked_s': round(entry['blocked_s'], 4)} for entry in sites
+            ],
+            'slow_callbacks': slow_callbacks[:self.TOP_N * 2],
+            'stalls': sorted(stalls, key=lambda stall: stall['duration_s'], reverse=True)[:100]
+        }
+
+    def format_report(self, report: Dict[str, Any]) -> str:
+        lag = report['event_loop_lag']
+        lines = [
+            f"🩺 Loop diagnostics: {self.workflow}, {report['duration_s']:.1f}s, "
+            f"{report['total_stalls']} stalls > {report['threshold_ms']:.0f}ms "
+            f"({report['total_blocked_s']:.2f}s blocked)",
+            f"   lag p50 {lag['p50'] * 1000:.1f}ms, p90 {lag['p90'] * 1000:.1f}ms, "
+            f"p99 {lag['p99'] * 1000:.1f}ms, max {lag['max'] * 1000:.1f}ms"
+        ]
+        if report['blocking_sites']:
+            lines.append(f"{'blocked s':>10} {'stalls':>6} {'max ms':>8}  call site → blocking frame")
+            for entry in report['blocking_sites'][:self.TOP_N]:
+                lines.append(
+                    f"{entry['blocked_s']:>10.3f} {entry['stalls']:>6} "
+                    f"{entry.get('max_stall_s', 0.0) * 1000:>8.0f}  {entry['site']} → {entry['leaf']}"
+                )
+        else:
+            lines.append("   No blocking call sites over the threshold")
+        return '\n'.join(lines)
+
+    def _write_report(self, report: Dict[str, Any]) -> Optional[str]:
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(
+                self.output_dir, f"{self.workflow}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            )
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2, default=str)
+            return path
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write loop diagnostics report: {e}")
+            return None
+
+
+def start_loop_diagnostics(workflow: str, enabled: bool = False, threshold_ms: float = None) -> Optional[LoopDiagnostics]:
+    """
+    Start diagnostics on the running loop if enabled (argument or LOOP_DIAGNOSTICS)
+
+    Returns None when disabled.
+    """
+    if not (enabled or LOOP_DIAGNOSTICS):
+        return None
+    return LoopDiagnostics(workflow, threshold_ms=threshold_ms).start()
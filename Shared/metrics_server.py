@@ -0,0 +1,324 @@
+"""
+Metrics Server - Live Prometheus metrics for long-running workflow processes
+
+Product updates, catalog monitors and imports run for minutes to hours, and
+until now the only thing to watch while they ran was the log. This module
+keeps a small in-process registry and serves it in the Prometheus text
+format from an embedded aiohttp server on a local port. The server runs on
+the workflow's own event loop, so a scrape that hangs means the loop is
+stalled.
+
+Exposed:
+- Stage latency histograms from tracing (extract, fetch, parse, llm,
+  images, shopify, db, ... per retailer)
+- Event-loop lag (sampled every LAG_INTERVAL_SECONDS)
+- Rate limiter concurrency, pending/in-flight products, DB write queue
+  depth, checkpoint progress, per-action product counters
+- ZenRows and Jina request outcomes, ZenRows spend, markdown and HTML
+  cache hit/miss counts (HTMLCacheManager.get_stats)
+
+Environment:
+    METRICS_PORT=9108          Enable the server on this port (unset = off)
+    METRICS_HOST=127.0.0.1     Bind address
+
+Usage:
+    from metrics_server import metrics, start_metrics_server
+
+    metrics.inc('smf_fetch_requests_total', service='jina', retailer=retailer, outcome='success')
+    metrics.register_collector('product_updater', self._collect_metrics)
+
+    server = await start_metrics_server(args.metrics_port)   # None when disabled
+    try:
+        ...
+    finally:
+        if server:
+            await server.stop()
+"""
+
+import asyncio
+import inspect
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from aiohttp import web
+
+sys.path.append(os.path.dirname(__file__))
+from logger_config import setup_logging
+from tracing import LatencyHistogram, tracer
+
+logger = setup_logging(__name__)
+
+METRICS_PORT = os.getenv('METRICS_PORT')
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+
+# Prometheus 'le' bounds for every histogram (seconds)
+HISTOGRAM_BOUNDS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0]
+
+LAG_INTERVAL_SECONDS = 0.5
+
+# name -> (type, help). Metrics not listed here are exposed as untyped.
+METRIC_DEFINITIONS = {
+    'smf_stage_duration_seconds': ('histogram', 'Traced call duration by stage and retailer'),
+    'smf_event_loop_lag_seconds': ('histogram', 'Delay between a scheduled wake-up and the loop running it'),
+    'smf_event_loop_lag_max_seconds': ('gauge', 'Worst event-loop lag seen since the server started'),
+    'smf_process_uptime_seconds': ('gauge', 'Seconds since the metrics server started'),
+    'smf_rate_limiter_concurrency': ('gauge', 'Current AdaptiveRateLimiter concurrency'),
+    'smf_rate_limiter_max_concurrency': ('gauge', 'AdaptiveRateLimiter concurrency ceiling'),
+    'smf_rate_limit_hits_total': ('counter', 'Rate-limit responses seen by the rate limiter'),
+    'smf_products_pending': ('gauge', 'Products waiting to be started'),
+    'smf_products_in_flight': ('gauge', 'Products currently being processed'),
+    'smf_products_total': ('counter', 'Finished products by outcome'),
+    'smf_db_write_queue_depth': ('gauge', 'Product DB writes waiting for the next batch commit'),
+    'smf_checkpoint_urls': ('gauge', 'Checkpoint progress of the current batch'),
+    'smf_fetch_requests_total': ('counter', 'Page fetches by service and outcome'),
+    'smf_zenrows_cost_dollars_total': ('counter', 'Estimated ZenRows spend'),
+    'smf_zenrows_credits_used': ('gauge', 'ZenRows credits used by this scheduler run'),
+    'smf_scheduler_jobs': ('gauge', 'Catalog monitor scheduler jobs by state'),
+    'smf_cache_requests_total': ('counter', 'Page cache lookups by result'),
+    'smf_html_cache_entries': ('gauge', 'Rows in the HTML cache'),
+    'smf_html_cache_size_bytes': ('gauge', 'HTML stored in the HTML cache'),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Dict[str, Any], Union[float, LatencyHistogram]]
+
+
+def _label_key(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, '' if value is None else str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    In-process counters, gauges and scrape-time collectors
+
+    Features:
+    - inc()/set_gauge() are thread-safe and cheap enough for hot paths
+    - Collectors (sync or async callables returning samples) are called on
+      each scrape, so existing stats methods (get_stats(), queue lengths)
+      are read live instead of being copied into the registry
+    - Sample values may be LatencyHistogram instances, rendered as
+      Prometheus histograms
+
+    Usage:
+        from metrics_server import metrics
+        metrics.inc('smf_products_total', workflow='product_updater', action='updated')
+        print(await metrics.render())
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._collectors: Dict[str, Callable[[], Any]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def register_collector(self, key: str, collector: Callable[[], Any]):
+        """Register (or replace) a scrape-time collector under key"""
+        with self._lock:
+            self._collectors[key] = collector
+
+    def unregister_collector(self, key: str):
+        with self._lock:
+            self._collectors.pop(key, None)
+
+    async def collect(self) -> Dict[str, Dict[Labels, Union[float, LatencyHistogram]]]:
+        """All samples grouped by metric name"""
+        with self._lock:
+            grouped: Dict[str, Dict[Labels, Union[float, LatencyHistogram]]] = {
+                name: dict(series) for name, series in self._counters.items()
+            }
+            for name, series in self._gauges.items():
+                grouped.setdefault(name, {}).update(series)
+            collectors = list(self._collectors.items())
+
+        for key, collector in collectors:
+            try:
+                samples = collector()
+                if inspect.isawaitable(samples):
+                    samples = await samples
+                for name, labels, value in samples or ():
+                    if value is not None:
+                        grouped.setdefault(name, {})[_label_key(labels)] = value
+            except Exception as e:
+                logger.debug(f"Metrics collector '{key}' failed: {e}")
+        return grouped
+
+    async def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)"""
+        lines = []
+        for name, series in sorted((await self.collect()).items()):
+            metric_type, help_text = METRIC_DEFINITIONS.get(name, ('untyped', name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in sorted(series.items(), key=lambda item: item[0]):
+                if isinstance(value, LatencyHistogram):
+                    lines.extend(self._render_histogram(name, labels, value))
+                else:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histogram(name: str, labels: Labels, histogram: LatencyHistogram) -> List[str]:
+        lines = []
+        for bound, count in zip(HISTOGRAM_BOUNDS, histogram.cumulative_counts(HISTOGRAM_BOUNDS)):
+            lines.append(f"{name}_bucket{_format_labels(labels, (('le', _format_value(bound)),))} {count}")
+        lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {histogram.count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.total)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return lines
+
+
+class EventLoopLagMonitor:
+    """
+    Samples event-loop lag: sleeps for a fixed interval and records how
+    late the wake-up was. Anything blocking the loop (sync I/O, CPU-heavy
+    parsing) shows up as lag. last_tick (time.monotonic) lets another
+    thread notice a stall while it is still happening.
+    """
+
+    def __init__(self, interval: float = LAG_INTERVAL_SECONDS):
+        self.interval = interval
+        self.histogram = LatencyHistogram()
+        self.max_lag = 0.0
+        self.last_tick = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self.last_tick = time.monotonic()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - scheduled)
+            self.last_tick = time.monotonic()
+            self.histogram.record(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def collect(self) -> Iterable[Sample]:
+        yield 'smf_event_loop_lag_seconds', {}, self.histogram
+        yield 'smf_event_loop_lag_max_seconds', {}, self.max_lag
+
+
+def _collect_stage_histograms() -> Iterable[Sample]:
+    for (stage, retailer), histogram in tracer.snapshot().items():
+        yield 'smf_stage_duration_seconds', {'stage': stage, 'retailer': retailer}, histogram
+
+
+class MetricsServer:
+    """
+    Embedded aiohttp server for /metrics (Prometheus) and /healthz
+
+    Runs on the caller's event loop and starts the event-loop lag monitor.
+    """
+
+    def __init__(self, registry: MetricsRegistry = None, host: str = None, port: int = None):
+        self.registry = registry or metrics
+        self.host = host or METRICS_HOST
+        self.port = int(port or METRICS_PORT or 9108)
+        self.lag_monitor = EventLoopLagMonitor()
+        self.started_at = time.time()
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> 'MetricsServer':
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle_metrics)
+        app.router.add_get('/healthz', self._handle_health)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+        self.started_at = time.time()
+        self.lag_monitor.start()
+        self.registry.register_collector('event_loop_lag', self.lag_monitor.collect)
+        self.registry.register_collector('stage_histograms', _collect_stage_histograms)
+        self.registry.register_collector('uptime', lambda: [
+            ('smf_process_uptime_seconds', {}, round(time.time() - self.started_at, 3))
+        ])
+        logger.info(f"📈 Metrics server listening on http://{self.host}:{self.port}/metrics")
+        return self
+
+    async def stop(self):
+        await self.lag_monitor.stop()
+        for key in ('event_loop_lag', 'stage_histograms', 'uptime'):
+            self.registry.unregister_collector(key)
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        logger.debug("📈 Metrics server stopped")
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        body = await self.registry.render()
+        return web.Response(text=body, content_type='text/plain', charset='utf-8',
+                            headers={'X-Content-Type-Options': 'nosniff'})
+
+    async def _handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            'status': 'ok',
+            'uptime_s': round(time.time() - self.started_at, 1),
+            'event_loop_lag_max_s': round(self.lag_monitor.max_lag, 4)
+        })
+
+
+metrics = MetricsRegistry()
+
+
+async def start_metrics_server(port: Optional[int] = None, host: Optional[str] = None) -> Optional[MetricsServer]:
+    """
+    Start the metrics server if a port is given (argument or METRICS_PORT)
+
+    Returns None when metrics are disabled or the port can't be bound - a
+    workflow never fails because its metrics endpoint did.
+    """
+    port = port or METRICS_PORT
+    if not port:
+        return None
+    try:
+        return await MetricsServer(host=host, port=int(port)).start()
+    except OSError as e:
+        logger.warning(f"⚠️ Metrics server not started on port {port}: {e}")
+        return None
@@ -7,14 +7,13 @@ import asyncio
 import smtplib
 import json
 import os
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
 
 from logger_config import setup_logging
+from notification_outbox import NotificationOutbox
 
 logger = setup_logging(__name__)
 
@@ -43,8 +42,21 @@ class EnhancedNotificationManager:
     """
     Enhanced notification manager supporting both existing scraper 
     and new catalog monitoring notifications
+    
+    Emails are not sent inline: notifications go to a SQLite outbox and a
+    background sender delivers them (see notification_outbox.py), so
+    workflows never wait on the mail server.
     """
     
+    # Notification types coalesced into digests when they arrive in bursts
+    DIGEST_TYPES = {
+        NotificationType.CATALOG_MONITORING_COMPLETE,
+        NotificationType.CATALOG_BASELINE_ESTABLISHED,
+        NotificationType.BATCH_ERROR,
+        NotificationType.CATALOG_SYSTEM_ERROR,
+        NotificationType.SYSTEM_HEALTH_ALERT,
+    }
+    
     def __init__(self, config_path: str = None):
         # Load configuration
         if config_path is None:
@@ -58,6 +70,12 @@ class EnhancedNotificationManager:
         # Notification templates
         self.templates = self._load_notification_templates()
         
+        # Outbox + background sender (started on first enqueue)
+        self.outbox = NotificationOutbox(
+            self.email_config,
+            outbox_config=self.notification_config.get('outbox', {})
+        )
+        
         logger.info("✅ Enhanced notification manager initialized")
     
     def _load_config(self, config_path: str) -> Dict:
@@ -319,14 +337,15 @@ System Status: {system_status_url}
             message = template.message_template.format(**context)
             recipients = custom_recipients or template.recipients
             
-            # Send notification
+            # Queue notification (delivered by the outbox sender)
             success = await self._send_email_notification(
-                subject, message, recipients, template.html_template, context)
+                subject, message, recipients, template.html_template, context,
+                notification_type=notification_type, priority=template.priority)
             
             if success:
-                logger.info(f"✅ Sent {notification_type.value} notification to {len(recipients)} recipients")
+                logger.info(f"📮 Queued {notification_type.value} notification for {len(recipients)} recipients")
             else:
-                logger.error(f"❌ Failed to send {notification_type.value} notification")
+                logger.error(f"❌ Failed to queue {notification_type.value} notification")
             
             return success
             
@@ -511,55 +530,57 @@ System Status: {system_status_url}
     
     async def _send_email_notification(self, subject: str, message: str,
                                      recipients: List[str], html_template: str = None,
-                                     context: Dict = None) -> bool:
-        """Send email notification"""
+                                     context: Dict = None,
+                                     notification_type: NotificationType = None,
+                                     priority: str = 'medium') -> bool:
+        """Queue email notification in the outbox (returns without network I/O)"""
         
         try:
             if not self.email_config.get('enabled', True):
                 logger.debug("Email notifications disabled")
                 return True
             
-            # SMTP configuration
-            smtp_server = self.email_config.get('smtp_server', 'smtp.gmail.com')
-            smtp_port = self.email_config.get('smtp_port', 587)
-            use_tls = self.email_config.get('use_tls', True)
-            username = self.email_config.get('username')
-            password = self.email_config.get('password')
-            from_email = self.email_config.get('from_email', username)
-            
-            if not username or not password:
+            if not self.email_config.get('username') or not self.email_config.get('password'):
                 logger.warning("Email credentials not configured")
                 return False
             
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = from_email
-            msg['To'] = ', '.join(recipients)
-            
-            # Add plain text part
-            text_part = MIMEText(message, 'plain')
-            msg.attach(text_part)
-            
-            # Add HTML part if template provided
+            # Render HTML part if template provided
+            html_content = None
             if html_template and context:
                 html_content = html_template.format(**context)
-                html_part = MIMEText(html_content, 'html')
-                msg.attach(html_part)
             
-            # Send email
-            with smtplib.SMTP(smtp_server, smtp_port) as server:
-                if use_tls:
-                    server.starttls()
-                server.login(username, password)
-                server.send_message(msg)
+            self.outbox.enqueue(
+                subject,
+                message,
+                recipients,
+                html=html_content,
+                notification_type=notification_type.value if notification_type else None,
+                digest_key=self._get_digest_key(notification_type, context),
+                priority=priority
+            )
             
             return True
             
         except Exception as e:
-            logger.error(f"Failed to send email notification: {e}")
+            logger.error(f"Failed to queue email notification: {e}")
             return False
     
+    def _get_digest_key(self, notification_type: Optional[NotificationType],
+                        context: Optional[Dict]) -> Optional[str]:
+        """
+        Digest key for burst coalescing (None = send on its own)
+        
+        Monitor/baseline results coalesce per type across retailers;
+        errors coalesce per error type so a repeating failure is one email.
+        """
+        if notification_type not in self.DIGEST_TYPES:
+            return None
+        
+        error_type = (context or {}).get('error_type') or (context or {}).get('alert_type')
+        if error_type:
+            return f"{notification_type.value}:{error_type}"
+        return notification_type.value
+    
     # =================== HTML TEMPLATES ===================
     
     def _get_batch_completion_html_template(self) -> str:
@@ -672,20 +693,15 @@ System Status: {system_status_url}
             'notifications_enabled': self.notification_config.get('enabled', True),
             'templates_loaded': len(self.templates),
             'recipients_configured': len(self.notification_config.get('default_recipients', [])),
+            'outbox': self.outbox.get_stats(),
             'last_test': None,
             'status': 'unknown'
         }
         
-        # Test email connection if configured
+        # Test email connection if configured (off the event loop)
         if health_status['email_configured']:
             try:
-                # Quick connection test
-                smtp_server = self.email_config.get('smtp_server', 'smtp.gmail.com')
-                smtp_port = self.email_config.get('smtp_port', 587)
-                
-                with smtplib.SMTP(smtp_server, smtp_port, timeout=10) as server:
-                    if self.email_config.get('use_tls', True):
-                        server.starttls()
+                await asyncio.to_thread(self._test_smtp_connection)
                 
                 health_status['status'] = 'healthy'
                 health_status['last_test'] = datetime.utcnow().isoformat()
@@ -697,6 +713,15 @@ System Status: {system_status_url}
             health_status['status'] = 'not_configured'
         
         return health_status
+    
+    def _test_smtp_connection(self):
+        """Quick connection test (blocking - run via asyncio.to_thread)"""
+        smtp_server = self.email_config.get('smtp_server', 'smtp.gmail.com')
+        smtp_port = self.email_config.get('smtp_port', 587)
+        
+        with smtplib.SMTP(smtp_server, smtp_port, timeout=10) as server:
+            if self.email_config.get('use_tls', True):
+                server.starttls()
 
 # Maintain backward compatibility with existing notification_manager usage
 class NotificationManager(EnhancedNotificationManager):
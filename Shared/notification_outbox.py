@@ -0,0 +1,435 @@
+"""
+Notification Outbox - Durable email queue with a background SMTP sender
+
+Workflows enqueue notifications into a local SQLite table and return
+immediately. A daemon sender thread delivers them over one reused SMTP
+session, coalesces bursts that share a digest key (per-retailer monitor
+results, repeated errors) into a single digest email, and retries failures
+with exponential backoff. Undelivered rows survive restarts and are picked
+up by the next process. Rows are claimed ('sending') with one atomic UPDATE
+before delivery, so processes sharing the outbox never send the same row twice.
+"""
+
+import atexit
+import json
+import os
+import smtplib
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Dict, List, Optional
+
+from logger_config import setup_logging
+
+logger = setup_logging(__name__)
+
+
+class NotificationOutbox:
+    """
+    SQLite-backed notification outbox
+
+    Features:
+    - enqueue() is a single local INSERT (no network I/O)
+    - Background sender thread with one persistent SMTP connection
+    - Digest coalescing: rows with the same digest_key and recipients that
+      arrive within digest_window_seconds are sent as one email
+    - Exponential backoff retries, rows marked 'failed' after max_attempts
+    - Rows claimed with UPDATE ... RETURNING before sending; claims older than
+      CLAIM_TIMEOUT_SECONDS (a sender that died mid-send) are re-queued
+    - Drains due rows at interpreter exit (bounded by drain_on_exit_seconds)
+
+    Usage:
+        outbox = NotificationOutbox(email_config)
+        outbox.enqueue(subject, message, recipients, digest_key='monitoring_complete')
+    """
+
+    # Sender loop
+    POLL_INTERVAL_SECONDS = 2.0
+    BATCH_SIZE = 50
+
+    # Retry / backoff
+    MAX_ATTEMPTS = 6
+    RETRY_BASE_SECONDS = 30
+    RETRY_MAX_SECONDS = 3600
+
+    # Digest coalescing window
+    DIGEST_WINDOW_SECONDS = 120
+
+    # Close the SMTP session after this long without sending
+    SMTP_IDLE_SECONDS = 60
+
+    SMTP_TIMEOUT_SECONDS = 30
+
+    # A 'sending' claim older than this belongs to a dead sender: re-queue it
+    CLAIM_TIMEOUT_SECONDS = 300
+
+    def __init__(self, email_config: Dict, db_path: str = None, outbox_config: Dict = None):
+        if db_path is None:
+            db_path = os.path.join(os.path.dirname(__file__), 'notification_outbox.db')
+        self.db_path = db_path
+
+        self.email_config = email_config or {}
+        outbox_config = outbox_config or {}
+        self.digest_window_seconds = outbox_config.get('digest_window_seconds', self.DIGEST_WINDOW_SECONDS)
+        self.max_attempts = outbox_config.get('max_attempts', self.MAX_ATTEMPTS)
+        self.drain_on_exit_seconds = outbox_config.get('drain_on_exit_seconds', 20)
+
+        self._smtp = None
+        self._smtp_last_used = 0.0
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._atexit_registered = False
+
+        self.last_sent_at = None
+        self.last_error = None
+
+        # Claim owner (host:pid:outbox) written with each claim, for debugging
+        self._claim_owner = f"{socket.gethostname()}:{os.getpid()}:{id(self)}"
+
+        self._init_db()
+
+    # =================== STORAGE ===================
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS notification_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    notification_type TEXT,
+                    subject TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    html TEXT,
+                    recipients TEXT NOT NULL,
+                    digest_key TEXT,
+                    priority TEXT DEFAULT 'medium',
+                    status TEXT DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    sent_at REAL,
+                    last_error TEXT,
+                    claimed_at REAL,
+                    claimed_by TEXT
+                )
+            ''')
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(notification_outbox)')}
+            if 'claimed_at' not in columns:
+                conn.execute('ALTER TABLE notification_outbox ADD COLUMN claimed_at REAL')
+            if 'claimed_by' not in columns:
+                conn.execute('ALTER TABLE notification_outbox ADD COLUMN claimed_by TEXT')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_outbox_status_next
+                ON notification_outbox(status, next_attempt_at)
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def enqueue(
+        self,
+        subject: str,
+        message: str,
+        recipients: List[str],
+        html: Optional[str] = None,
+        notification_type: Optional[str] = None,
+        digest_key: Optional[str] = None,
+        priority: str = 'medium'
+    ) -> int:
+        """
+        Queue a notification for background delivery
+
+        Returns:
+            Outbox row id
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+                INSERT INTO notification_outbox
+                (notification_type, subject, message, html, recipients,
+                 digest_key, priority, next_attempt_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                notification_type, subject, message, html,
+                json.dumps(sorted(recipients)), digest_key, priority, now, now
+            ))
+            conn.commit()
+            row_id = cursor.lastrowid
+        finally:
+            conn.close()
+
+        self.start()
+        self._wakeup.set()
+        return row_id
+
+    def get_stats(self) -> Dict:
+        """Outbox counts by status plus sender state"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                'SELECT status, COUNT(*) AS n FROM notification_outbox GROUP BY status'
+            ).fetchall()
+        finally:
+            conn.close()
+
+        counts = {row['status']: row['n'] for row in rows}
+        return {
+            'pending': counts.get('pending', 0),
+            'sending': counts.get('sending', 0),
+            'sent': counts.get('sent', 0),
+            'failed': counts.get('failed', 0),
+            'sender_running': bool(self._thread and self._thread.is_alive()),
+            'last_sent_at': datetime.utcfromtimestamp(self.last_sent_at).isoformat() if self.last_sent_at else None,
+            'last_error': self.last_error
+        }
+
+    # =================== SENDER THREAD ===================
+
+    def start(self):
+        """Start the background sender (idempotent)"""
+        with self._thread_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='notification-outbox', daemon=True
+            )
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def stop(self, drain_seconds: float = None):
+        """
+        Deliver whatever is due (ignoring digest windows) and stop the sender
+
+        The sender thread closes its own SMTP session on the way out; if it is
+        still sending when the join times out, the session is left to it.
+        """
+        if drain_seconds is None:
+            drain_seconds = self.drain_on_exit_seconds
+
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=drain_seconds)
+            if self._thread.is_alive():
+                logger.warning(f"⚠️ Notification sender still busy after {drain_seconds}s, not waiting")
+                return
+        self._close_smtp()
+
+    def _run(self):
+        while True:
+            stopping = self._stopping.is_set()
+            try:
+                self._process_due(flush=stopping)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Notification outbox sender error: {e}")
+
+            if stopping:
+                self._close_smtp()
+                return
+
+            if self._smtp and time.time() - self._smtp_last_used > self.SMTP_IDLE_SECONDS:
+                self._close_smtp()
+
+            self._wakeup.wait(self.POLL_INTERVAL_SECONDS)
+            self._wakeup.clear()
+
+    def _process_due(self, flush: bool = False):
+        """Claim and send every due digest group once"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            # Claims left behind by a sender that died mid-send
+            with conn:
+                requeued = conn.execute('''
+                    UPDATE notification_outbox
+                    SET status = 'pending', claimed_at = NULL, claimed_by = NULL
+                    WHERE status = 'sending' AND claimed_at < ?
+                ''', (now - self.CLAIM_TIMEOUT_SECONDS,)).rowcount
+            if requeued:
+                logger.warning(f"⚠️ Re-queued {requeued} notification(s) from a stale sender claim")
+
+            rows = conn.execute('''
+                SELECT * FROM notification_outbox
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY id
+                LIMIT ?
+            ''', (now, self.BATCH_SIZE)).fetchall()
+            if not rows:
+                return
+
+            ready_ids = []
+            for group in self._group_rows(rows):
+                oldest = min(row['created_at'] for row in group)
+                is_digest = group[0]['digest_key'] is not None
+                if is_digest and not flush and now - oldest < self.digest_window_seconds:
+                    continue  # Keep collecting the burst
+                ready_ids.extend(row['id'] for row in group)
+            if not ready_ids:
+                return
+
+            # Only rows still pending are ours: another process may have claimed some
+            with conn:
+                claimed = conn.execute('''
+                    UPDATE notification_outbox
+                    SET status = 'sending', claimed_at = ?, claimed_by = ?
+                    WHERE status = 'pending' AND id IN (SELECT value FROM json_each(?))
+                    RETURNING *
+                ''', (now, self._claim_owner, json.dumps(ready_ids))).fetchall()
+        finally:
+            conn.close()
+
+        claimed.sort(key=lambda row: row['id'])
+        for group in self._group_rows(claimed):
+            self._deliver_group(group)
+
+    def _group_rows(self, rows) -> List[List[sqlite3.Row]]:
+        """Rows sharing digest_key + recipients coalesce; others go alone"""
+        groups: Dict[tuple, List[sqlite3.Row]] = {}
+        for row in rows:
+            if row['digest_key']:
+                key = (row['digest_key'], row['recipients'])
+            else:
+                key = ('single', row['id'])
+            groups.setdefault(key, []).append(row)
+        return list(groups.values())
+
+    def _deliver_group(self, group: List[sqlite3.Row]):
+        ids = [row['id'] for row in group]
+        recipients = json.loads(group[0]['recipients'])
+
+        if len(group) == 1:
+            subject = group[0]['subject']
+            message = group[0]['message']
+            html = group[0]['html']
+        else:
+            subject, message = self._build_digest(group)
+            html = None
+
+        try:
+            self._send(subject, message, recipients, html)
+        except Exception as e:
+            self.last_error = str(e)
+            self._close_smtp()
+            self._schedule_retry(group, str(e))
+            return
+
+        self.last_sent_at = time.time()
+        self._mark(ids, 'sent')
+        if len(group) > 1:
+            logger.info(f"📬 Sent digest of {len(group)} notifications: {group[0]['digest_key']}")
+        else:
+            logger.info(f"📬 Sent notification: {subject[:60]}")
+
+    def _build_digest(self, group: List[sqlite3.Row]):
+        """One email for a burst of notifications"""
+        subject = f"{group[0]['subject']} (+{len(group) - 1} more)"
+        sections = []
+        for row in group:
+            created = datetime.utcfromtimestamp(row['created_at']).strftime('%Y-%m-%d %H:%M:%S')
+            sections.append(f"[{created} UTC] {row['subject']}\n{row['message'].strip()}")
+        message = (
+            f"{len(group)} notifications coalesced into one digest:\n\n"
+            + f"\n\n{'-' * 60}\n\n".join(sections)
+        )
+        return subject, message
+
+    def _schedule_retry(self, group: List[sqlite3.Row], error: str):
+        now = time.time()
+        conn = self._connect()
+        try:
+            for row in group:
+                attempts = row['attempts'] + 1
+                if attempts >= self.max_attempts:
+                    conn.execute('''
+                        UPDATE notification_outbox
+                        SET status = 'failed', attempts = ?, last_error = ?, claimed_at = NULL
+                        WHERE id = ?
+                    ''', (attempts, error[:500], row['id']))
+                else:
+                    delay = min(self.RETRY_BASE_SECONDS * (2 ** (attempts - 1)), self.RETRY_MAX_SECONDS)
+                    conn.execute('''
+                        UPDATE notification_outbox
+                        SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ?,
+                            claimed_at = NULL
+                        WHERE id = ?
+                    ''', (attempts, now + delay, error[:500], row['id']))
+            conn.commit()
+        finally:
+            conn.close()
+
+        logger.warning(f"⚠️ Notification delivery failed ({len(group)} queued, will retry): {error}")
+
+    def _mark(self, ids: List[int], status: str):
+        conn = self._connect()
+        try:
+            conn.executemany(
+                'UPDATE notification_outbox SET status = ?, sent_at = ?, claimed_at = NULL WHERE id = ?',
+                [(status, time.time(), row_id) for row_id in ids]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    # =================== SMTP ===================
+
+    def _get_smtp(self) -> smtplib.SMTP:
+        """Reuse the open session; reconnect if the server dropped it"""
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._close_smtp()
+
+        smtp_server = self.email_config.get('smtp_server', 'smtp.gmail.com')
+        smtp_port = self.email_config.get('smtp_port', 587)
+        server = smtplib.SMTP(smtp_server, smtp_port, timeout=self.SMTP_TIMEOUT_SECONDS)
+        if self.email_config.get('use_tls', True):
+            server.starttls()
+        server.login(self.email_config.get('username'), self.email_config.get('password'))
+        self._smtp = server
+        return server
+
+    def _close_smtp(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def _send(self, subject: str, message: str, recipients: List[str], html: Optional[str]):
+        username = self.email_config.get('username')
+        if not username or not self.email_config.get('password'):
+            raise RuntimeError("Email credentials not configured")
+
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = self.email_config.get('from_email', username)
+        msg['To'] = ', '.join(recipients)
+        msg.attach(MIMEText(message, 'plain'))
+        if html:
+            msg.attach(MIMEText(html, 'html'))
+
+        self._get_smtp().send_message(msg)
+        self._smtp_last_used = time.time()
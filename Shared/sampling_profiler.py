@@ -0,0 +1,394 @@
+"""
+Sampling Profiler - CPU and allocation profiling for workflow runs
+
+Shows where a slow monitor or updater run spends CPU: BeautifulSoup
+parsing, SequenceMatcher, JSON, asdict(), retailer routing regexes. It
+needs no code edits and is light enough for production runs.
+
+- CPU: a background thread samples every thread's stack
+  (sys._current_frames) every PROFILE_INTERVAL_MS. A sample is kept only
+  if the thread used CPU since the last one, judged by its own CPU clock
+  (pthread_getcpuclockid). Threads waiting on the network or sitting in
+  the selector therefore don't show up. Each sample is weighted by the CPU
+  time it stands for.
+- Scope: each sample is tagged with the innermost traced stage on its
+  stack (@traced / @traced_run wrappers) and the retailer of that call,
+  so the output splits per retailer and per stage
+- Allocations: tracemalloc (PROFILE_TRACEMALLOC_FRAMES deep) with a
+  snapshot at start and one at stop. The top-N growth sites are ranked by
+  size. Each is attributed to the retailers and stages whose CPU samples
+  ran the same lines.
+
+Output in profiles/<workflow>_<timestamp>/:
+    cpu.collapsed                 retailer;stage;frames... <cpu µs> (flamegraph.pl / speedscope)
+    cpu_<retailer>.collapsed      stage;frames... per retailer
+    cpu.speedscope.json           one speedscope profile per retailer
+    allocations.txt / .json       top-N allocation growth sites
+    summary.json                  CPU per (retailer, stage), hottest functions
+
+Environment:
+    PROFILE=1                     Enable without the CLI flag
+    PROFILE_INTERVAL_MS=10        Sampling interval
+    PROFILE_TRACEMALLOC_FRAMES=6  Traceback depth (0 disables allocation tracking)
+    PROFILE_DIR=profiles
+
+Usage:
+    profiler = start_profiler('catalog_monitor', enabled=args.profile)
+    try:
+        ...
+    finally:
+        if profiler:
+            profiler.stop()
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(__file__))
+from logger_config import setup_logging
+from tracing import frame_stage
+
+logger = setup_logging(__name__)
+
+PROFILE = os.getenv('PROFILE', '0').lower() in ('1', 'true', 'yes')
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '10'))
+PROFILE_TRACEMALLOC_FRAMES = int(os.getenv('PROFILE_TRACEMALLOC_FRAMES', '6'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Without per-thread CPU clocks, samples whose leaf frame is one of these are idle waits
+IDLE_LEAVES = {
+    ('selectors.py', 'select'), ('threading.py', 'wait'), ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'), ('thread.py', '_worker'), ('socket.py', 'readinto'), ('ssl.py', 'read')
+}
+
+class SamplingProfiler:
+    """
+    Low-overhead sampling CPU profiler plus tracemalloc allocation tracking
+
+    Features:
+    - Per-thread CPU-clock filtering (idle threads cost nothing)
+    - Samples scoped by traced stage and retailer
+    - Collapsed-stack, speedscope and allocation reports
+
+    Usage:
+        profiler = SamplingProfiler('product_updater').start()
+        ...
+        output_dir = profiler.stop()
+    """
+
+    TOP_N = 25
+
+    def __init__(self, workflow: str, interval_ms: float = None, tracemalloc_frames: int = None,
+                 output_dir: str = None):
+        self.workflow = workflow
+        self.interval = (interval_ms or PROFILE_INTERVAL_MS) / 1000
+        self.tracemalloc_frames = PROFILE_TRACEMALLOC_FRAMES if tracemalloc_frames is None else tracemalloc_frames
+        self.output_dir = os.path.join(
+            output_dir or PROFILE_DIR, f"{workflow}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        )
+
+        # Interned frames: code object -> index into self.frames
+        self.frames: List[Dict[str, Any]] = []
+        self._frame_ids: Dict[Any, int] = {}
+        # (retailer, stage, root-first frame ids) -> CPU µs
+        self.stacks: Counter = Counter()
+        # (filename, lineno) -> Counter((retailer, stage)), for allocation attribution
+        self.line_scopes: Dict[Tuple[str, int], Counter] = defaultdict(Counter)
+        self.samples = 0
+
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._cpu_clocks: Dict[int, Optional[int]] = {}
+        self._cpu_seen: Dict[int, float] = {}
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._started_tracemalloc = False
+        self._started_at = 0.0
+
+    # =================== LIFECYCLE ===================
+
+    def start(self) -> 'SamplingProfiler':
+        self._started_at = time.monotonic()
+        if self.tracemalloc_frames > 0:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.tracemalloc_frames)
+                self._started_tracemalloc = True
+            self._baseline = tracemalloc.take_snapshot()
+
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        logger.info(
+            f"🔬 Profiling {self.workflow}: sampling every {self.interval * 1000:.0f}ms"
+            + (f", tracemalloc {self.tracemalloc_frames} frames" if self._baseline else '')
+        )
+        return self
+
+    def stop(self) -> Optional[str]:
+        """Stop sampling and write all profile files. Returns the output directory."""
+        if self._thread is None:
+            return None
+        self._stopped.set()
+        self._thread.join(timeout=2)
+        self._thread = None
+
+        allocations = []
+        if self._baseline is not None:
+            allocations = self._allocation_sites(tracemalloc.take_snapshot())
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._write_collapsed()
+            self._write_speedscope()
+            self._write_allocations(allocations)
+            summary = self._write_summary(allocations)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write profile: {e}")
+            return None
+
+        logger.info(
+            f"🔬 Profile written to {self.output_dir} "
+            f"({self.samples} samples, {summary['cpu_seconds']:.1f}s CPU)"
+        )
+        for row in summary['by_stage'][:8]:
+            logger.info(f"   {row['cpu_s']:>8.2f}s  {row['retailer']:<18} {row['stage']}")
+        return self.output_dir
+
+    # =================== SAMPLING ===================
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == own_ident:
+                    continue
+                weight_us = self._cpu_delta_us(ident)
+                if weight_us is None:
+                    # No per-thread CPU clock: fall back to wall-clock samples minus idle waits
+                    code = frame.f_code
+                    if (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+                        continue
+                    weight_us = int(self.interval * 1_000_000)
+                elif weight_us <= 0:
+                    continue
+                self._record(frame, weight_us)
+            del frames, frame
+
+    def _cpu_delta_us(self, ident: int) -> Optional[int]:
+        if ident not in self._cpu_clocks:
+            try:
+                self._cpu_clocks[ident] = time.pthread_getcpuclockid(ident)
+            except (AttributeError, OSError):
+                self._cpu_clocks[ident] = None
+        clock = self._cpu_clocks[ident]
+        if clock is None:
+            return None
+        try:
+            cpu = time.clock_gettime(clock)
+        except OSError:
+            # Thread exited between _current_frames() and now
+            self._cpu_clocks.pop(ident, None)
+            self._cpu_seen.pop(ident, None)
+            return 0
+        previous = self._cpu_seen.get(ident)
+        self._cpu_seen[ident] = cpu
+        if previous is None:
+            return 0
+        return int((cpu - previous) * 1_000_000)
+
+    def _record(self, frame, weight_us: int):
+        stage = None
+        retailer = None
+        frame_ids = []
+        lines = []
+        while frame is not None:
+            code = frame.f_code
+            frame_id = self._frame_ids.get(code)
+            if frame_id is None:
+                frame_id = self._frame_ids[code] = len(self.frames)
+                self.frames.append({
+                    'name': code.co_name,
+                    'file': self._short_path(code.co_filename),
+                    'line': code.co_firstlineno
+                })
+            frame_ids.append(frame_id)
+            lines.append((code.co_filename, frame.f_lineno))
+
+            if stage is None or retailer is None:
+                scope = frame_stage(frame)
+                if scope is not None:
+                    stage = stage or scope[0]
+                    retailer = retailer or scope[1]
+            frame = frame.f_back
+
+        scope_key = (retailer or '-', stage or 'untraced')
+        self.stacks[(scope_key[0], scope_key[1], tuple(reversed(frame_ids)))] += weight_us
+        for line in lines:
+            self.line_scopes[line][scope_key] += weight_us
+        self.samples += 1
+
+    @staticmethod
+    def _short_path(filename: str) -> str:
+        filename = os.path.abspath(filename)
+        if filename.startswith(REPO_ROOT):
+            return os.path.relpath(filename, REPO_ROOT)
+        marker = 'site-packages' + os.sep
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+        return os.path.basename(filename)
+
+    def _frame_label(self, frame_id: int) -> str:
+        frame = self.frames[frame_id]
+        # ';' separates frames in the collapsed format
+        return f"{frame['name']} ({frame['file']}:{frame['line']})".replace(';', ',')
+
+    # =================== ALLOCATIONS ===================
+
+    def _allocation_sites(self, snapshot: tracemalloc.Snapshot) -> List[Dict[str, Any]]:
+        # Skipped after grouping rather than with filter_traces(), which is far slower on big snapshots
+        ignore = {os.path.abspath(tracemalloc.__file__), os.path.abspath(__file__)}
+
+        sites = []
+        for stat in snapshot.compare_to(self._baseline, 'traceback'):
+            if len(sites) >= self.TOP_N:
+                break
+            # Sorted by |size_diff|: freed memory ranks alongside growth
+            if stat.size_diff <= 0 or os.path.abspath(stat.traceback[0].filename) in ignore:
+                continue
+            scopes = Counter()
+            for frame in stat.traceback:
+                scopes.update(self.line_scopes.get((frame.filename, frame.lineno), {}))
+            total = sum(scopes.values()) or 1
+            sites.append({
+                'size_diff_kb': round(stat.size_diff / 1024, 1),
+                'size_kb': round(stat.size / 1024, 1),
+                'count_diff': stat.count_diff,
+                'scopes': [
+                    {'retailer': retailer, 'stage': stage, 'share': round(weight / total, 3)}
+                    for (retailer, stage), weight in scopes.most_common(3)
+                ],
+                'traceback': [
+                    f"{self._short_path(frame.filename)}:{frame.lineno}" for frame in reversed(stat.traceback)
+                ]
+            })
+        return sites
+
+    # =================== OUTPUT ===================
+
+    def _write_collapsed(self):
+        per_retailer: Dict[str, List[str]] = defaultdict(list)
+        combined = []
+        for (retailer, stage, frame_ids), weight in self.stacks.most_common():
+            frames = ';'.join(self._frame_label(frame_id) for frame_id in frame_ids)
+            combined.append(f"{retailer};{stage};{frames} {weight}")
+            per_retailer[retailer].append(f"{stage};{frames} {weight}")
+
+        with open(os.path.join(self.output_dir, 'cpu.collapsed'), 'w') as f:
+            f.write('\n'.join(combined) + '\n')
+        for retailer, lines in per_retailer.items():
+            safe_name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in retailer)
+            with open(os.path.join(self.output_dir, f"cpu_{safe_name}.collapsed"), 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+
+    def _write_speedscope(self):
+        # Stage becomes the root frame of each sample so speedscope groups by it
+        frames = list(self.frames)
+        stage_frames: Dict[str, int] = {}
+        profiles: Dict[str, Dict[str, list]] = defaultdict(lambda: {'samples': [], 'weights': []})
+
+        for (retailer, stage, frame_ids), weight in self.stacks.items():
+            if stage not in stage_frames:
+                stage_frames[stage] = len(frames)
+                frames.append({'name': f"[{stage}]"})
+            profile = profiles[retailer]
+            profile['samples'].append([stage_frames[stage], *frame_ids])
+            profile['weights'].append(weight)
+
+        document = {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': f"{self.workflow} CPU",
+            'exporter': 'smf_scraper sampling_profiler',
+            'activeProfileIndex': 0,
+            'shared': {'frames': frames},
+            'profiles': [
+                {
+                    'type': 'sampled',
+                    'name': retailer,
+                    'unit': 'microseconds',
+                    'startValue': 0,
+                    'endValue': sum(profile['weights']),
+                    'samples': profile['samples'],
+                    'weights': profile['weights']
+                }
+                for retailer, profile in sorted(profiles.items(), key=lambda item: -sum(item[1]['weights']))
+            ]
+        }
+        with open(os.path.join(self.output_dir, 'cpu.speedscope.json'), 'w') as f:
+            json.dump(document, f)
+
+    def _write_allocations(self, allocations: List[Dict[str, Any]]):
+        if self._baseline is None:
+            return
+        with open(os.path.join(self.output_dir, 'allocations.json'), 'w') as f:
+            json.dump(allocations, f, indent=2)
+
+        lines = [f"Top {len(allocations)} allocation growth sites ({self.workflow})", '']
+        for rank, site in enumerate(allocations, 1):
+            scopes = ', '.join(
+                f"{scope['retailer']}/{scope['stage']} {scope['share']:.0%}" for scope in site['scopes']
+            ) or 'no CPU samples on these lines'
+            lines.append(f"#{rank} +{site['size_diff_kb']:.1f} KiB ({site['count_diff']:+d} blocks) - {scopes}")
+            lines.extend(f"    {frame}" for frame in site['traceback'])
+            lines.append('')
+        with open(os.path.join(self.output_dir, 'allocations.txt'), 'w') as f:
+            f.write('\n'.join(lines))
+
+    def _write_summary(self, allocations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        by_scope: Counter = Counter()
+        self_time: Counter = Counter()
+        for (retailer, stage, frame_ids), weight in self.stacks.items():
+            by_scope[(retailer, stage)] += weight
+            if frame_ids:
+                self_time[frame_ids[-1]] += weight
+
+        summary = {
+            'workflow': self.workflow,
+            'duration_s': round(time.monotonic() - self._started_at, 3),
+            'interval_ms': self.interval * 1000,
+            'samples': self.samples,
+            'units': 'cpu_microseconds',
+            'cpu_seconds': sum(by_scope.values()) / 1_000_000,
+            'by_stage': [
+                {'retailer': retailer, 'stage': stage, 'cpu_s': round(weight / 1_000_000, 3)}
+                for (retailer, stage), weight in by_scope.most_common()
+            ],
+            'hottest_functions': [
+                {'function': self._frame_label(frame_id), 'self_cpu_s': round(weight / 1_000_000, 3)}
+                for frame_id, weight in self_time.most_common(self.TOP_N)
+            ],
+            'top_allocations': allocations[:10]
+        }
+        with open(os.path.join(self.output_dir, 'summary.json'), 'w') as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+
+def start_profiler(workflow: str, enabled: bool = False) -> Optional[SamplingProfiler]:
+    """
+    Start profiling if enabled (argument or PROFILE)
+
+    Returns None when disabled.
+    """
+    if not (enabled or PROFILE):
+        return None
+    return SamplingProfiler(workflow).start()
@@ -9,22 +9,70 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "../Shared"))
 sys.path.append(os.path.dirname(__file__))
 
 import json
-import base64
 import aiohttp
 import asyncio
 import re
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 from datetime import datetime
 from pathlib import Path
-from PIL import Image
 import os
 from dotenv import load_dotenv
 
 from logger_config import setup_logging
+from tracing import traced
+from image_transcoder import ImageBuffer, check_shopify_requirements, get_image_transcoder
 
 logger = setup_logging(__name__)
 
+
+# Admin GraphQL: staged image uploads
+STAGED_UPLOADS_CREATE = '''
+mutation stagedUploadsCreate($input: [StagedUploadInput!]!) {
+  stagedUploadsCreate(input: $input) {
+    stagedTargets { url resourceUrl parameters { name value } }
+    userErrors { field message }
+  }
+}
+'''
+
+PRODUCT_CREATE_MEDIA = '''
+mutation productCreateMedia($productId: ID!, $media: [CreateMediaInput!]!) {
+  productCreateMedia(productId: $productId, media: $media) {
+    media { id status alt }
+    mediaUserErrors { field message }
+  }
+}
+'''
+
+METAFIELDS_SET = '''
+mutation metafieldsSet($metafields: [MetafieldsSetInput!]!) {
+  metafieldsSet(metafields: $metafields) {
+    metafields { id key namespace }
+    userErrors { field message }
+  }
+}
+'''
+
+MEDIA_STATUS_QUERY = '''
+query mediaStatus($ids: [ID!]!) {
+  nodes(ids: $ids) {
+    ... on MediaImage { id status image { url } }
+  }
+}
+'''
+
+
 class ShopifyManager:
+    # Image upload: 'auto', 'src', 'staged' or 'attachment' (see _upload_images)
+    IMAGE_UPLOAD_MODE = 'auto'
+    
+    # Retailer CDNs Shopify can fetch from directly (no Referer/hotlink checks);
+    # URLs Shopify cannot fetch fall back to staged byte uploads
+    SRC_UPLOAD_RETAILERS = {'revolve', 'asos', 'nordstrom', 'uniqlo'}
+    
+    # How long to wait for staged media to finish processing
+    STAGED_MEDIA_READY_TIMEOUT = 20
+    
     def __init__(self):
         # Load environment variables from .env file
         # Look for .env file in project root (parent of Shared directory)
@@ -33,17 +81,19 @@ class ShopifyManager:
         env_path = os.path.join(project_root, '.env')
         load_dotenv(env_path)
         
-        # Load configuration
+        # Load configuration (optional when credentials come from the environment)
         config_path = os.path.join(script_dir, '../Shared/config.json')
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+        config = {}
+        if os.path.exists(config_path):
+            with open(config_path, 'r') as f:
+                config = json.load(f)
         
-        self.shopify_config = config['shopify']
+        self.shopify_config = config.get('shopify', {})
         
         # Load credentials from environment variables (with config.json as fallback)
-        self.store_url = os.getenv('SHOPIFY_STORE_URL') or self.shopify_config['store_url']
-        self.api_version = self.shopify_config['api_version']
-        self.access_token = os.getenv('SHOPIFY_ACCESS_TOKEN') or self.shopify_config['access_token']
+        self.store_url = os.getenv('SHOPIFY_STORE_URL') or self.shopify_config.get('store_url')
+        self.api_version = os.getenv('SHOPIFY_API_VERSION') or self.shopify_config.get('api_version', '2025-01')
+        self.access_token = os.getenv('SHOPIFY_ACCESS_TOKEN') or self.shopify_config.get('access_token')
         
         # Validate that we have actual credentials (not placeholder text)
         if not self.access_token or self.access_token.startswith('SHOPIFY_') or self.access_token == 'YOUR_':
@@ -52,80 +102,96 @@ class ShopifyManager:
                 "or update config.json with valid credentials."
             )
         
-        self.base_api_url = f"https://{self.store_url}/admin/api/{self.api_version}"
+        # SHOPIFY_API_BASE_URL points the manager at a stand-in server (tests/benchmarks)
+        self.base_api_url = (
+            os.getenv('SHOPIFY_API_BASE_URL') or f"https://{self.store_url}/admin/api"
+        ).rstrip('/') + f"/{self.api_version}"
+        self.graphql_url = f"{self.base_api_url}/graphql.json"
         self.headers = {
             'X-Shopify-Access-Token': self.access_token,
             'Content-Type': 'application/json'
         }
         
+        # Image decode/resize/encode runs in the shared image process pool
+        self.transcoder = get_image_transcoder()
+        
         logger.info(f"✅ ShopifyManager initialized for store: {self.store_url}")
     
+    @traced('shopify')
     async def create_product(self, extracted_data: Dict, retailer_name: str, modesty_level: str, 
-                           source_url: str, downloaded_images: List[str], product_type_override: str = None,
+                           source_url: str, downloaded_images: List[Union[str, ImageBuffer]], product_type_override: str = None,
                            published: bool = True) -> Dict[str, Any]:
         """
         Create a new Shopify product with all data and images
         
+        Product, variant and metafields go out in one POST. For SRC_UPLOAD_RETAILERS
+        the image URLs are embedded in that POST as well, so a typical product
+        is created in a single request; other images follow via _upload_images.
+        
         Args:
             published: If False, creates product as draft regardless of modesty_level
                       If True, uses modesty_level to determine status (backward compatible)
         """
         
         try:
-            # Build product payload
+            product_title = extracted_data.get('title', 'Product')
+            downloaded_images = (downloaded_images or [])[:5]  # Max 5 images per Shopify limits
+            inline_images = self._src_image_payloads(downloaded_images, retailer_name, product_title)
+            
+            # Build product payload (variant, metafields and src images inline)
             product_payload = self._build_product_payload(
-                extracted_data, retailer_name, modesty_level, product_type_override, published
+                extracted_data, retailer_name, modesty_level, product_type_override, published,
+                source_url=source_url, images=list(inline_images.values())
             )
             
-            # Create product
             async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_api_url}/products.json",
-                    headers=self.headers,
-                    data=json.dumps(product_payload)
-                ) as response:
-                    
-                    if response.status == 201:
-                        product_data = await response.json()
-                        product_id = product_data['product']['id']
-                        variant_id = product_data['product']['variants'][0]['id']
-                        
-                        logger.info(f"Created Shopify product: {product_id}")
-                        
-                        # Upload images and collect CDN URLs
-                        uploaded_images = []
-                        shopify_image_urls = []
-                        
-                        if downloaded_images:
-                            uploaded_images = await self._upload_images(session, product_id, downloaded_images, extracted_data.get('title', 'Product'))
-                            
-                            # Extract CDN URLs from uploaded images
-                            for image_info in uploaded_images:
-                                if isinstance(image_info, dict) and 'src' in image_info:
-                                    shopify_image_urls.append(image_info['src'])
-                                elif isinstance(image_info, str):
-                                    shopify_image_urls.append(image_info)
-                        
-                        # Add metafields
-                        await self._add_metafields(session, product_id, extracted_data, source_url, modesty_level, retailer_name)
-                        
-                        return {
-                            'success': True,
-                            'product_id': product_id,
-                            'variant_id': variant_id,
-                            'product_url': f"https://{self.store_url}/admin/products/{product_id}",
-                            'images_uploaded': len(uploaded_images),
-                            'shopify_image_urls': shopify_image_urls,  # NEW: Return CDN URLs
-                            'shopify_data': product_data['product']
-                        }
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Failed to create Shopify product: {response.status} - {error_text}")
-                        return {
-                            'success': False,
-                            'error': f"Shopify API error: {response.status} - {error_text}",
-                            'shopify_image_urls': []  # Return empty list on failure
-                        }
+                status, response_data = await self._post_product(session, product_payload)
+                
+                if status != 201:
+                    logger.error(f"Failed to create Shopify product: {status} - {response_data}")
+                    return {
+                        'success': False,
+                        'error': f"Shopify API error: {status} - {response_data}",
+                        'shopify_image_urls': []  # Return empty list on failure
+                    }
+                
+                product = response_data['product']
+                product_id = product['id']
+                variant_id = product['variants'][0]['id']
+                
+                logger.info(f"Created Shopify product: {product_id}")
+                
+                # Images Shopify fetched during the create call, by index
+                created_images = {
+                    image['position'] - 1: image
+                    for image in product.get('images', [])
+                    if image.get('position') and image['position'] - 1 in inline_images
+                }
+                
+                # Upload the rest (non-src images, or all of them if inline src was rejected)
+                uploaded_images = []
+                if downloaded_images:
+                    uploaded_images = await self._upload_images(
+                        session, product_id, downloaded_images, product_title, retailer_name,
+                        uploaded=created_images
+                    )
+                
+                # Extract CDN URLs from uploaded images
+                # (staged media still processing have no CDN URL yet)
+                shopify_image_urls = [
+                    image_info['src'] for image_info in uploaded_images
+                    if isinstance(image_info, dict) and image_info.get('src')
+                ]
+                
+                return {
+                    'success': True,
+                    'product_id': product_id,
+                    'variant_id': variant_id,
+                    'product_url': f"https://{self.store_url}/admin/products/{product_id}",
+                    'images_uploaded': len(uploaded_images),
+                    'shopify_image_urls': shopify_image_urls,  # NEW: Return CDN URLs
+                    'shopify_data': product
+                }
         
         except Exception as e:
             logger.error(f"Exception creating Shopify product: {e}")
@@ -135,71 +201,170 @@ class ShopifyManager:
                 'shopify_image_urls': []  # Return empty list on failure
             }
     
+    @traced('shopify')
     async def update_product(self, product_id: int, new_data: Dict, retailer_name: str) -> Dict[str, Any]:
-        """Update an existing Shopify product"""
+        """
+        Update an existing Shopify product
+        
+        Current product and metafields are fetched concurrently and diffed
+        against new_data: the product PUT carries only changed tags/variant
+        fields, and changed metafields go out in one metafieldsSet call.
+        Nothing is written when nothing changed.
+        """
         
         try:
             async with aiohttp.ClientSession() as session:
-                # Get current product data
-                async with session.get(
-                    f"{self.base_api_url}/products/{product_id}.json",
-                    headers=self.headers
-                ) as response:
-                    
-                    if response.status != 200:
-                        return {'success': False, 'error': f"Could not fetch product {product_id}"}
-                    
-                    current_product = await response.json()
-                    product = current_product['product']
-                    
-                    # Check if sale status changed for tag management
-                    current_tags = product.get('tags', '').split(', ') if product.get('tags') else []
-                    new_sale_status = new_data.get('sale_status', 'not on sale')
-                    
-                    # Update tags for sale status
-                    updated_tags = [tag for tag in current_tags if tag != 'on-sale']
-                    if new_sale_status == 'on sale':
-                        updated_tags.append('on-sale')
-                    
-                    # Build update payload
-                    update_payload = {
-                        "product": {
-                            "id": product_id,
-                            "tags": ', '.join(updated_tags),
-                            "variants": [{
-                                "id": product['variants'][0]['id'],
-                                "price": str(new_data.get('price', product['variants'][0]['price'])),
-                                "compare_at_price": str(new_data.get('original_price', '')) if new_sale_status == 'on sale' else None,
-                                "inventory_quantity": self._map_inventory_quantity(new_data.get('stock_status', 'in stock'))
-                            }]
-                        }
-                    }
-                    
-                    # Update product
-                    async with session.put(
-                        f"{self.base_api_url}/products/{product_id}.json",
-                        headers=self.headers,
-                        data=json.dumps(update_payload)
-                    ) as update_response:
-                        
-                        if update_response.status == 200:
-                            # Update metafields
-                            await self._update_metafields(session, product_id, new_data, retailer_name)
-                            
-                            logger.info(f"Updated Shopify product: {product_id}")
-                            return {
-                                'success': True,
-                                'product_id': product_id,
-                                'action': 'updated'
-                            }
-                        else:
-                            error_text = await update_response.text()
-                            return {'success': False, 'error': f"Update failed: {error_text}"}
+                # Get current product data and metafields
+                current_product, current_metafields = await asyncio.gather(
+                    self._get_json(session, f"/products/{product_id}.json"),
+                    self._get_json(session, f"/products/{product_id}/metafields.json")
+                )
+                
+                if not current_product:
+                    return {'success': False, 'error': f"Could not fetch product {product_id}"}
+                
+                product = current_product['product']
+                stored_metafields = {
+                    (mf['namespace'], mf['key']): mf
+                    for mf in (current_metafields or {}).get('metafields', [])
+                }
+                
+                product_changes = self._diff_product_fields(product, new_data)
+                metafield_changes = self._diff_metafields(stored_metafields, new_data)
+                
+                if not product_changes and not metafield_changes:
+                    logger.debug(f"No changes for Shopify product {product_id}")
+                    return {'success': True, 'product_id': product_id, 'action': 'unchanged'}
+                
+                # Stamp last_updated only when something actually changed
+                metafield_changes.append({
+                    "namespace": "custom",
+                    "key": "last_updated",
+                    "value": datetime.utcnow().isoformat() + "Z",
+                    "type": "date_time"
+                })
+                
+                writes = [self._set_metafields(session, product_id, metafield_changes)]
+                if product_changes:
+                    writes.append(self._put_product(
+                        session, product_id, {"product": {"id": product_id, **product_changes}}
+                    ))
+                
+                errors = [error for error in await asyncio.gather(*writes) if error]
+                if errors:
+                    return {'success': False, 'error': f"Update failed: {'; '.join(errors)}"}
+                
+                logger.info(f"Updated Shopify product: {product_id} "
+                           f"({len(product_changes)} product field(s), {len(metafield_changes)} metafield(s))")
+                return {
+                    'success': True,
+                    'product_id': product_id,
+                    'action': 'updated'
+                }
         
         except Exception as e:
             logger.error(f"Exception updating product {product_id}: {e}")
             return {'success': False, 'error': str(e)}
     
+    def _diff_product_fields(self, product: Dict, new_data: Dict) -> Dict:
+        """Tags and variant fields that differ from the stored product"""
+        changes = {}
+        
+        # Update tags for sale status
+        current_tags = product.get('tags', '').split(', ') if product.get('tags') else []
+        on_sale = new_data.get('sale_status', 'not on sale') == 'on sale'
+        updated_tags = [tag for tag in current_tags if tag != 'on-sale']
+        if on_sale:
+            updated_tags.append('on-sale')
+        if updated_tags != current_tags:
+            changes['tags'] = ', '.join(updated_tags)
+        
+        variant = product['variants'][0]
+        desired = {
+            'price': self._clean_price(new_data['price']) if new_data.get('price') else variant.get('price'),
+            'compare_at_price': (
+                self._clean_price(new_data['original_price'])
+                if on_sale and new_data.get('original_price') else None
+            ),
+            'inventory_quantity': self._map_inventory_quantity(new_data.get('stock_status', 'in stock'))
+        }
+        variant_changes = {
+            field: value for field, value in desired.items()
+            if self._normalize_field(variant.get(field)) != self._normalize_field(value)
+        }
+        if variant_changes:
+            changes['variants'] = [{'id': variant['id'], **variant_changes}]
+        
+        return changes
+    
+    @staticmethod
+    def _normalize_field(value: Any) -> Optional[str]:
+        """Comparable form of a Shopify field ("45.0" == "45.00", "" == None)"""
+        if value in (None, ''):
+            return None
+        try:
+            return f"{float(value):.2f}"
+        except (TypeError, ValueError):
+            return str(value)
+    
+    def _diff_metafields(self, stored: Dict, new_data: Dict) -> List[Dict]:
+        """
+        Update metafields whose stored value differs (last_updated excluded)
+        
+        Blank values are never in the list (see _build_update_metafields), so
+        a metafield that was never stored is only written once it has a value.
+        """
+        return [
+            metafield for metafield in self._build_update_metafields(new_data)
+            if (stored.get((metafield['namespace'], metafield['key'])) or {}).get('value') != metafield['value']
+        ]
+    
+    async def _post_product(self, session: aiohttp.ClientSession, payload: Dict):
+        """
+        POST a product payload
+        
+        If Shopify rejects the create (422) with an error about the inline
+        image URLs, the product is created again without images (callers
+        then upload them separately). Other 422s are returned as-is.
+        
+        Returns:
+            (status, product response JSON or error text)
+        """
+        async with session.post(
+            f"{self.base_api_url}/products.json",
+            headers=self.headers,
+            data=json.dumps(payload)
+        ) as response:
+            if response.status == 201:
+                return response.status, await response.json()
+            status, error_text = response.status, await response.text()
+        
+        if status == 422 and payload['product'].get('images') and 'image' in error_text.lower():
+            logger.info(f"↪️ Inline image URLs rejected ({error_text[:200]}), creating product without images")
+            retry_payload = {"product": {**payload['product'], "images": []}}
+            return await self._post_product(session, retry_payload)
+        
+        return status, error_text
+    
+    async def _put_product(self, session: aiohttp.ClientSession, product_id: int, payload: Dict) -> Optional[str]:
+        """PUT a (partial) product payload; returns an error string or None"""
+        async with session.put(
+            f"{self.base_api_url}/products/{product_id}.json",
+            headers=self.headers,
+            data=json.dumps(payload)
+        ) as response:
+            if response.status == 200:
+                return None
+            return f"product {response.status} - {await response.text()}"
+    
+    async def _get_json(self, session: aiohttp.ClientSession, path: str) -> Optional[Dict]:
+        async with session.get(f"{self.base_api_url}{path}", headers=self.headers) as response:
+            if response.status != 200:
+                logger.warning(f"GET {path} failed: {response.status}")
+                return None
+            return await response.json()
+
+    @traced('shopify')
     async def publish_product(self, product_id: int) -> Dict[str, Any]:
         """
         Publish a draft product to make it live on the store
@@ -244,6 +409,7 @@ class ShopifyManager:
             logger.error(f"Exception publishing product {product_id}: {e}")
             return {'success': False, 'error': str(e)}
     
+    @traced('shopify')
     async def unpublish_product(self, product_id: int) -> Dict[str, Any]:
         """
         Unpublish a product (change to draft status)
@@ -288,6 +454,7 @@ class ShopifyManager:
             logger.error(f"Exception unpublishing product {product_id}: {e}")
             return {'success': False, 'error': str(e)}
     
+    @traced('shopify')
     async def delist_product(self, product_id: int) -> Dict[str, Any]:
         """
         Delist a product that is no longer available at the retailer
@@ -430,12 +597,15 @@ class ShopifyManager:
             return "0.00"
 
     def _build_product_payload(self, extracted_data: Dict, retailer_name: str, modesty_level: str, 
-                              product_type_override: str = None, published: bool = True) -> Dict:
+                              product_type_override: str = None, published: bool = True,
+                              source_url: str = None, images: List[Dict] = None) -> Dict:
         """
         Build Shopify product payload with proper compliance
         
         Args:
             published: If False, forces status to 'draft' regardless of modesty_level
+            source_url: If given, the product metafields are embedded in the payload
+            images: Image entries ({'src', 'position', 'alt'}) to create with the product
         """
         
         # Calculate compare at price for sales
@@ -469,7 +639,7 @@ class ShopifyManager:
         # Generate SKU if needed
         sku = extracted_data.get('product_code') or self._generate_sku(extracted_data, retailer_name)
         
-        return {
+        payload = {
             "product": {
                 "title": extracted_data.get('title', 'Untitled Product'),
                 "body_html": self._format_product_description(extracted_data.get('description', '')),
@@ -496,9 +666,16 @@ class ShopifyManager:
                     "position": 1,
                     "values": ["Default"]
                 }],
-                "images": []  # Will be populated after creation
+                "images": images or []  # Non-src images are uploaded after creation
             }
         }
+        
+        if source_url is not None:
+            payload["product"]["metafields"] = self._build_metafields(
+                extracted_data, source_url, modesty_level, retailer_name
+            )
+        
+        return payload
     
     def _format_product_description(self, description: str) -> str:
         """Format description following Shopify HTML best practices"""
@@ -603,34 +780,130 @@ class ShopifyManager:
         }
         return status_mapping.get(stock_status, 100)
     
+    @traced('shopify')
     async def _upload_images(self, session: aiohttp.ClientSession, product_id: int, 
-                           image_paths: List[str], product_title: str) -> List[Dict]:
-        """Upload images to Shopify product"""
+                           images: List[Union[str, ImageBuffer]], product_title: str,
+                           retailer: str = None, uploaded: Dict[int, Dict] = None) -> List[Dict]:
+        """
+        Upload images to Shopify product (in parallel)
         
-        uploaded_images = []
+        Accepts in-memory ImageBuffers (from ImageProcessor.process_images(..., in_memory=True))
+        or local file paths. IMAGE_UPLOAD_MODE picks how bytes reach Shopify:
+        - 'src': Shopify fetches the (enhanced) retailer CDN URL itself; only for
+          SRC_UPLOAD_RETAILERS, whose CDNs serve images without hotlink checks
+        - 'staged': raw JPEG bytes go straight to Shopify's object storage via
+          stagedUploadsCreate, attached with one productCreateMedia call
+        - 'attachment': base64 JSON bodies to the REST images endpoint
+        - 'auto': src where allowed, staged for the rest, attachment as last resort
         
-        for i, image_path in enumerate(image_paths[:5]):  # Max 5 images per Shopify limits
-            try:
-                # Validate and optimize image
-                if not self._validate_shopify_image_requirements(image_path):
-                    logger.warning(f"Image {image_path} does not meet Shopify requirements, skipping")
-                    continue
-                
-                # Optimize image for Shopify
-                optimized_image_path = await self._optimize_image_for_shopify(image_path)
-                
-                # Encode image
-                with open(optimized_image_path, 'rb') as img_file:
-                    image_data = base64.b64encode(img_file.read()).decode('utf-8')
+        uploaded holds images (by index) already attached by the product create
+        call; those are only cleaned up, not uploaded again. Staged media that
+        were created but are still processing count as uploaded (never re-sent
+        as attachments).
+        
+        Returns:
+            Uploaded image dicts (each with 'src'; None while still processing) in position order
+        """
+        images = images[:5]  # Max 5 images per Shopify limits
+        alts = [self._image_alt(product_title, i) for i in range(len(images))]
+        mode = self.IMAGE_UPLOAD_MODE
+        uploaded = dict(uploaded or {})
+        
+        try:
+            # Shopify fetches the CDN URL: no transcode, no upload bandwidth
+            positions = [i for i in self._src_image_positions(images, retailer) if i not in uploaded]
+            if positions:
+                results = await asyncio.gather(*(
+                    self._upload_image_from_url(session, product_id, images[i].url, i + 1, alts[i])
+                    for i in positions
+                ))
+                for i, result in zip(positions, results):
+                    if result:
+                        uploaded[i] = result
                 
-                image_payload = {
-                    "image": {
-                        "attachment": image_data,
-                        "position": i + 1,
-                        "alt": f"{product_title} - Image {i + 1}"
-                    }
+                failed = len(positions) - sum(1 for i in positions if i in uploaded)
+                if failed:
+                    logger.info(f"↪️ {failed} CDN src image(s) rejected for product {product_id}, uploading bytes instead")
+            
+            remaining = [i for i in range(len(images)) if i not in uploaded]
+            
+            if remaining and mode in ('auto', 'staged'):
+                try:
+                    staged = await self._upload_images_staged(
+                        session, product_id, [images[i] for i in remaining], [alts[i] for i in remaining]
+                    )
+                    for i, result in zip(remaining, staged):
+                        if result:
+                            uploaded[i] = result
+                    remaining = [i for i in remaining if i not in uploaded]
+                except Exception as e:
+                    logger.warning(f"⚠️ Staged image upload failed for product {product_id}, using attachments: {e}")
+            
+            if remaining and mode != 'src':
+                attached = await self._upload_images_as_attachments(
+                    session, product_id, [images[i] for i in remaining],
+                    [i + 1 for i in remaining], [alts[i] for i in remaining]
+                )
+                for i, result in zip(remaining, attached):
+                    if result:
+                        uploaded[i] = result
+        
+        finally:
+            self._cleanup_image_files(images)
+        
+        return [uploaded[i] for i in sorted(uploaded)]
+    
+    def _src_image_positions(self, images: List[Union[str, ImageBuffer]], retailer: str) -> List[int]:
+        """Indexes of images Shopify can fetch from the retailer CDN itself"""
+        if self.IMAGE_UPLOAD_MODE not in ('auto', 'src') or (retailer or '').lower() not in self.SRC_UPLOAD_RETAILERS:
+            return []
+        return [
+            i for i, image in enumerate(images)
+            if isinstance(image, ImageBuffer)
+            and not check_shopify_requirements(len(image), image.width, image.height)
+        ]
+    
+    def _src_image_payloads(self, images: List[Union[str, ImageBuffer]], retailer: str,
+                            product_title: str) -> Dict[int, Dict]:
+        """Image entries to embed in the product create payload, by index"""
+        return {
+            i: {"src": images[i].url, "position": i + 1, "alt": self._image_alt(product_title, i)}
+            for i in self._src_image_positions(images, retailer)
+        }
+    
+    @staticmethod
+    def _image_alt(product_title: str, index: int) -> str:
+        return f"{product_title} - Image {index + 1}"
+    
+    async def _upload_images_as_attachments(self, session: aiohttp.ClientSession, product_id: int,
+                                            images: List[Union[str, ImageBuffer]], positions: List[int],
+                                            alts: List[str]) -> List[Optional[Dict]]:
+        """
+        Upload images as base64 attachments to the REST images endpoint
+        
+        Validation, RGB convert, resize, JPEG encode and base64 run in the image
+        process pool; the POSTs run concurrently.
+        
+        Returns:
+            Uploaded image dict (or None) per input image
+        """
+        transcoded = await self._transcode_images(images, as_attachment=True)
+        
+        async def post(image, position, alt, result):
+            label = image.url if isinstance(image, ImageBuffer) else image
+            if isinstance(result, Exception):
+                logger.warning(f"Image {label} does not meet Shopify requirements, skipping: {result}")
+                return None
+            
+            image_payload = {
+                "image": {
+                    "attachment": result.attachment,
+                    "position": position,
+                    "alt": alt
                 }
-                
+            }
+            
+            try:
                 async with session.post(
                     f"{self.base_api_url}/products/{product_id}/images.json",
                     headers=self.headers,
@@ -640,79 +913,207 @@ class ShopifyManager:
                     # Handle successful status codes (200-299 range)
                     if 200 <= response.status < 300:
                         image_data = await response.json()
-                        uploaded_images.append(image_data['image'])
-                        logger.info(f"✅ Successfully uploaded image {i + 1} for product {product_id} (HTTP {response.status})")
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"❌ Failed to upload image {i + 1} (HTTP {response.status}): {error_text}")
-                
-                # Clean up optimized image if different from original
-                if optimized_image_path != image_path and os.path.exists(optimized_image_path):
-                    os.remove(optimized_image_path)
+                        logger.info(f"✅ Successfully uploaded image {position} for product {product_id} (HTTP {response.status})")
+                        return image_data['image']
+                    
+                    error_text = await response.text()
+                    logger.error(f"❌ Failed to upload image {position} (HTTP {response.status}): {error_text}")
+                    return None
             
             except Exception as e:
-                logger.error(f"Error uploading image {image_path}: {e}")
-                continue
+                logger.error(f"Error uploading image {label}: {e}")
+                return None
         
-        # Clean up ALL original downloaded files after successful uploads
-        for image_path in image_paths:
-            try:
-                if os.path.exists(image_path):
-                    os.remove(image_path)
-                    logger.debug(f"🗑️ Cleaned up downloaded image: {image_path}")
-            except Exception as e:
-                logger.warning(f"Failed to clean up {image_path}: {e}")
+        return await asyncio.gather(*(
+            post(image, position, alt, result)
+            for image, position, alt, result in zip(images, positions, alts, transcoded)
+        ))
+    
+    async def _upload_images_staged(self, session: aiohttp.ClientSession, product_id: int,
+                                    images: List[Union[str, ImageBuffer]], alts: List[str]) -> List[Optional[Dict]]:
+        """
+        Upload raw JPEG bytes through GraphQL staged uploads
+        
+        Process:
+        1. Transcode in the image process pool (raw bytes, no base64)
+        2. stagedUploadsCreate: one upload target per image
+        3. POST all files to their targets concurrently
+        4. productCreateMedia: attach all uploaded files in one call
+        5. Wait for media processing to get the CDN URLs
+        
+        Created media are matched to images by alt text (the media list skips
+        inputs rejected in mediaUserErrors). Media still processing at the
+        timeout are returned with 'src' None; only failed or rejected media
+        come back as None.
+        
+        Returns:
+            Uploaded image dict (or None) per input image
+        
+        Raises:
+            Exception when the staged upload itself cannot be set up
+        """
+        transcoded = await self._transcode_images(images, as_attachment=False)
+        ready = [i for i, result in enumerate(transcoded) if not isinstance(result, Exception)]
+        for i, result in enumerate(transcoded):
+            if isinstance(result, Exception):
+                logger.warning(f"Image {i + 1} does not meet Shopify requirements, skipping: {result}")
+        if not ready:
+            return [None] * len(images)
+        
+        staged = await self._graphql(session, STAGED_UPLOADS_CREATE, {
+            'input': [{
+                'filename': f"{product_id}_{i + 1}.jpg",
+                'mimeType': 'image/jpeg',
+                'httpMethod': 'POST',
+                'resource': 'IMAGE',
+                'fileSize': str(transcoded[i].size)
+            } for i in ready]
+        })
+        errors = staged['stagedUploadsCreate']['userErrors']
+        if errors:
+            raise ValueError(f"stagedUploadsCreate: {errors}")
+        targets = staged['stagedUploadsCreate']['stagedTargets']
+        
+        # Targets are object storage URLs: never send the Shopify token there
+        async def upload(target, result):
+            form = aiohttp.FormData()
+            for parameter in target['parameters']:
+                form.add_field(parameter['name'], parameter['value'])
+            form.add_field('file', result.data, filename='image.jpg', content_type='image/jpeg')
+            async with session.post(target['url'], data=form) as response:
+                if response.status not in (200, 201, 204):
+                    raise ValueError(f"staged upload HTTP {response.status}: {(await response.text())[:200]}")
+            return target['resourceUrl']
+        
+        sources = await asyncio.gather(
+            *(upload(target, transcoded[i]) for target, i in zip(targets, ready)),
+            return_exceptions=True
+        )
+        attach = [(i, source) for i, source in zip(ready, sources) if not isinstance(source, Exception)]
+        for i, source in zip(ready, sources):
+            if isinstance(source, Exception):
+                logger.warning(f"⚠️ Staged upload of image {i + 1} failed: {source}")
+        if not attach:
+            return [None] * len(images)
+        
+        created = await self._graphql(session, PRODUCT_CREATE_MEDIA, {
+            'productId': f"gid://shopify/Product/{product_id}",
+            'media': [{
+                'originalSource': source,
+                'alt': alts[i],
+                'mediaContentType': 'IMAGE'
+            } for i, source in attach]
+        })
+        media_errors = created['productCreateMedia']['mediaUserErrors']
+        if media_errors:
+            logger.warning(f"⚠️ productCreateMedia errors for product {product_id}: {media_errors}")
+        media = [item for item in created['productCreateMedia']['media'] or [] if item]
+        
+        # Match by alt (unique per position), not by list position
+        index_by_alt = {alts[i]: i for i, _ in attach}
+        media_urls = await self._wait_for_media(session, [item['id'] for item in media])
+        
+        results: List[Optional[Dict]] = [None] * len(images)
+        for item in media:
+            i = index_by_alt.get(item.get('alt'))
+            if i is None or item['id'] not in media_urls:
+                continue
+            results[i] = {
+                'admin_graphql_api_id': item['id'],
+                'src': media_urls[item['id']],
+                'alt': alts[i]
+            }
         
-        return uploaded_images
+        processing = sum(1 for r in results if r and not r['src'])
+        logger.info(
+            f"✅ Uploaded {sum(1 for r in results if r)}/{len(images)} images for product {product_id} (staged)"
+            + (f", {processing} still processing" if processing else "")
+        )
+        return results
     
-    def _validate_shopify_image_requirements(self, image_path: str) -> bool:
-        """Validate image meets Shopify requirements"""
-        try:
-            if not os.path.exists(image_path):
-                return False
+    async def _wait_for_media(self, session: aiohttp.ClientSession, media_ids: List[str]) -> Dict[str, str]:
+        """
+        Poll until media are processed (or failed / timed out)
+        
+        Returns:
+            media id -> CDN URL for media that finished processing, or None
+            for media still processing at the timeout (failed media omitted)
+        """
+        urls: Dict[str, str] = {}
+        pending = list(media_ids)
+        deadline = asyncio.get_running_loop().time() + self.STAGED_MEDIA_READY_TIMEOUT
+        
+        while pending:
+            data = await self._graphql(session, MEDIA_STATUS_QUERY, {'ids': pending})
+            still_pending = []
+            for node in data.get('nodes') or []:
+                if not node:
+                    continue
+                if node.get('status') == 'READY' and node.get('image'):
+                    urls[node['id']] = node['image']['url']
+                elif node.get('status') == 'FAILED':
+                    logger.warning(f"⚠️ Shopify failed to process media {node['id']}")
+                else:
+                    still_pending.append(node['id'])
             
-            with Image.open(image_path) as img:
-                width, height = img.size
-                file_size = os.path.getsize(image_path)
-                
-                # Shopify image requirements
-                if file_size > 20 * 1024 * 1024:  # 20MB max
-                    return False
-                if width < 100 or height < 100:  # Minimum dimensions
-                    return False
-                if width > 5760 or height > 5760:  # Maximum dimensions
-                    return False
-                
-                return True
-        except Exception as e:
-            logger.error(f"Error validating image {image_path}: {e}")
-            return False
+            pending = still_pending
+            if pending and asyncio.get_running_loop().time() >= deadline:
+                logger.warning(f"⚠️ {len(pending)} media still processing after {self.STAGED_MEDIA_READY_TIMEOUT}s")
+                urls.update((media_id, None) for media_id in pending)
+                break
+            if pending:
+                await asyncio.sleep(1)
+        
+        return urls
     
-    async def _optimize_image_for_shopify(self, image_path: str) -> str:
-        """Optimize image for Shopify upload"""
-        try:
-            with Image.open(image_path) as img:
-                # Convert to RGB if necessary
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    img = img.convert('RGB')
-                
-                # Resize if too large (maintain aspect ratio)
-                max_dimension = 2048
-                if max(img.size) > max_dimension:
-                    img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
-                
-                # Save optimized version
-                optimized_path = image_path.replace('.jpg', '_optimized.jpg')
-                img.save(optimized_path, 'JPEG', quality=85, optimize=True)
-                
-                return optimized_path
-        except Exception as e:
-            logger.error(f"Error optimizing image {image_path}: {e}")
-            return image_path  # Return original if optimization fails
+    async def _graphql(self, session: aiohttp.ClientSession, query: str, variables: Dict) -> Dict:
+        """Run an Admin GraphQL request; returns data or raises on errors"""
+        async with session.post(
+            self.graphql_url,
+            headers=self.headers,
+            data=json.dumps({'query': query, 'variables': variables})
+        ) as response:
+            if response.status != 200:
+                raise ValueError(f"GraphQL HTTP {response.status}: {(await response.text())[:200]}")
+            body = await response.json()
+        
+        if body.get('errors'):
+            raise ValueError(f"GraphQL errors: {body['errors']}")
+        return body.get('data') or {}
+    
+    async def _transcode_images(self, images: List[Union[str, ImageBuffer]], as_attachment: bool) -> List:
+        """Transcode images in the process pool; failures come back as exceptions"""
+        sources = await asyncio.gather(
+            *(self._read_image_source(image) for image in images),
+            return_exceptions=True
+        )
+        readable = [source for source in sources if not isinstance(source, Exception)]
+        transcoded = iter(await self.transcoder.transcode_many(readable, as_attachment=as_attachment))
+        return [source if isinstance(source, Exception) else next(transcoded) for source in sources]
+    
+    async def _read_image_source(self, image: Union[str, ImageBuffer]) -> bytes:
+        """Image bytes from an ImageBuffer (no copy) or a file path"""
+        if isinstance(image, ImageBuffer):
+            return image.data
+        
+        if not os.path.exists(image):
+            raise FileNotFoundError(image)
+        return await asyncio.to_thread(Path(image).read_bytes)
+    
+    def _cleanup_image_files(self, images: List[Union[str, ImageBuffer]]):
+        """Delete downloaded files (file path inputs only)"""
+        for image in images:
+            if isinstance(image, ImageBuffer):
+                continue
+            try:
+                if os.path.exists(image):
+                    os.remove(image)
+                    logger.debug(f"🗑️ Cleaned up downloaded image: {image}")
+            except Exception as e:
+                logger.warning(f"Failed to clean up {image}: {e}")
     
-    async def _add_metafields(self, session: aiohttp.ClientSession, product_id: int, 
-                            extracted_data: Dict, source_url: str, modesty_level: str, retailer_name: str):
-        """Add custom metafields to product"""
+    def _build_metafields(self, extracted_data: Dict, source_url: str, modesty_level: str, retailer_name: str) -> List[Dict]:
+        """Custom metafields for a new product (sent inline with the product create)"""
         
         # Handle multiple product codes
         product_codes = []
@@ -722,7 +1123,7 @@ class ShopifyManager:
             else:
                 product_codes = [extracted_data['product_code']]
         
-        metafields = [
+        return self._present_metafields([
             {
                 "namespace": "custom",
                 "key": "stock_status", 
@@ -774,7 +1175,7 @@ class ShopifyManager:
             {
                 "namespace": "custom",
                 "key": "original_price",
-                "value": str(extracted_data.get('original_price', '')),
+                "value": str(extracted_data.get('original_price') or ''),
                 "type": "single_line_text_field"
             },
             # NEW: Visual analysis fields
@@ -793,100 +1194,52 @@ class ShopifyManager:
             {
                 "namespace": "clothing",
                 "key": "visual_analysis_confidence",
-                "value": str(extracted_data.get('visual_analysis_confidence', '')),
+                "value": str(extracted_data.get('visual_analysis_confidence') or ''),
                 "type": "single_line_text_field"
             },
             {
                 "namespace": "clothing",
                 "key": "visual_analysis_source",
-                "value": extracted_data.get('visual_analysis_source', ''),
+                "value": extracted_data.get('visual_analysis_source') or '',
                 "type": "single_line_text_field"
             }
-        ]
-        
-        for metafield in metafields:
-            try:
-                metafield_payload = {
-                    "metafield": {
-                        "namespace": metafield["namespace"],
-                        "key": metafield["key"],
-                        "value": metafield["value"],
-                        "type": metafield["type"],
-                        "owner_id": product_id,
-                        "owner_resource": "product"
-                    }
-                }
-                
-                async with session.post(
-                    f"{self.base_api_url}/products/{product_id}/metafields.json",
-                    headers=self.headers,
-                    data=json.dumps(metafield_payload)
-                ) as response:
-                    
-                    if response.status != 201:
-                        error_text = await response.text()
-                        logger.warning(f"Failed to create metafield {metafield['key']}: {error_text}")
-                    else:
-                        logger.debug(f"Created metafield {metafield['key']} for product {product_id}")
-            
-            except Exception as e:
-                logger.error(f"Error creating metafield {metafield['key']}: {e}")
+        ])
     
-    async def _update_metafields(self, session: aiohttp.ClientSession, product_id: int, 
-                               new_data: Dict, retailer_name: str):
-        """Update metafields for existing product"""
-        
-        # Update key metafields
-        update_metafields = [
-            ("custom", "stock_status", new_data.get('stock_status', 'in stock')),
-            ("custom", "last_updated", datetime.utcnow().isoformat() + "Z"),
-            ("custom", "sale_status", new_data.get('sale_status', 'not on sale')),
-            ("custom", "original_price", str(new_data.get('original_price', '')))
-        ]
-        
-        for namespace, key, value in update_metafields:
-            try:
-                # Get existing metafield first
-                async with session.get(
-                    f"{self.base_api_url}/products/{product_id}/metafields.json",
-                    headers=self.headers
-                ) as response:
-                    
-                    if response.status == 200:
-                        metafields_data = await response.json()
-                        metafields = metafields_data.get('metafields', [])
-                        
-                        # Find the metafield to update
-                        metafield_id = None
-                        for mf in metafields:
-                            if mf['namespace'] == namespace and mf['key'] == key:
-                                metafield_id = mf['id']
-                                break
-                        
-                        if metafield_id:
-                            # Update existing metafield
-                            update_payload = {
-                                "metafield": {
-                                    "id": metafield_id,
-                                    "value": value
-                                }
-                            }
-                            
-                            async with session.put(
-                                f"{self.base_api_url}/products/{product_id}/metafields/{metafield_id}.json",
-                                headers=self.headers,
-                                data=json.dumps(update_payload)
-                            ) as update_response:
-                                
-                                if update_response.status == 200:
-                                    logger.debug(f"Updated metafield {key} for product {product_id}")
-                                else:
-                                    error_text = await update_response.text()
-                                    logger.warning(f"Failed to update metafield {key}: {error_text}")
-            
-            except Exception as e:
-                logger.error(f"Error updating metafield {key}: {e}")
+    def _build_update_metafields(self, new_data: Dict) -> List[Dict]:
+        """Metafields refreshed on product updates (last_updated is added when anything changed)"""
+        return self._present_metafields([
+            {"namespace": "custom", "key": "stock_status",
+             "value": new_data.get('stock_status', 'in stock'), "type": "single_line_text_field"},
+            {"namespace": "custom", "key": "sale_status",
+             "value": new_data.get('sale_status', 'not on sale'), "type": "single_line_text_field"},
+            {"namespace": "custom", "key": "original_price",
+             "value": str(new_data.get('original_price') or ''), "type": "single_line_text_field"}
+        ])
+    
+    @staticmethod
+    def _present_metafields(metafields: List[Dict]) -> List[Dict]:
+        """Drop metafields without a value (Shopify rejects blank metafield values)"""
+        return [metafield for metafield in metafields if metafield['value'] not in (None, '')]
     
+    async def _set_metafields(self, session: aiohttp.ClientSession, product_id: int,
+                              metafields: List[Dict]) -> Optional[str]:
+        """Upsert metafields in one metafieldsSet call; returns an error string or None"""
+        owner_id = f"gid://shopify/Product/{product_id}"
+        try:
+            data = await self._graphql(session, METAFIELDS_SET, {
+                "metafields": [{**metafield, "ownerId": owner_id} for metafield in metafields]
+            })
+        except Exception as e:
+            return f"metafields {e}"
+        
+        errors = data['metafieldsSet']['userErrors']
+        if errors:
+            return f"metafields {errors}"
+        
+        logger.debug(f"Set {len(metafields)} metafield(s) for product {product_id}")
+        return None
+
+    @traced('shopify')
     async def get_product(self, product_id: int) -> Optional[Dict]:
         """Get product data from Shopify"""
         try:
@@ -913,14 +1266,24 @@ class ShopifyManager:
     
     # =================== PIPELINE SEPARATION METHODS ===================
     
+    @traced('shopify')
     async def create_draft_for_review(self, extracted_data: Dict, retailer_name: str) -> Optional[int]:
         """
         Create Shopify draft specifically for modesty review
         Returns shopify_product_id for tracking, or None if failed
         """
         try:
+            image_urls = extracted_data.get('image_urls') or []
+            if isinstance(image_urls, str):
+                image_urls = json.loads(image_urls) if image_urls.startswith('[') else [image_urls]
+            
+            # Upload first few images (limit to 5 for cost optimization); Shopify
+            # fetches them as part of the create call
+            image_urls = image_urls[:5]
+            images = [{"src": img_url, "position": position} for position, img_url in enumerate(image_urls, start=1)]
+            
             # Create draft with special "pending-modesty-review" tag
-            payload = self._build_product_payload(extracted_data, retailer_name, "pending_review")
+            payload = self._build_product_payload(extracted_data, retailer_name, "pending_review", images=images)
             
             # Add pending-modesty-review tag
             current_tags = payload["product"].get("tags", "")
@@ -930,61 +1293,65 @@ class ShopifyManager:
                 payload["product"]["tags"] = "pending-modesty-review"
             
             async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_api_url}/products.json",
-                    headers=self.headers,
-                    data=json.dumps(payload)
-                ) as response:
-                    if response.status == 201:
-                        result = await response.json()
-                        shopify_id = result['product']['id']
-                        
-                        # Upload images if available
-                        if extracted_data.get('image_urls'):
-                            try:
-                                # Download and upload images
-                                image_urls = extracted_data['image_urls']
-                                if isinstance(image_urls, str):
-                                    image_urls = json.loads(image_urls) if image_urls.startswith('[') else [image_urls]
-                                
-                                # Upload first few images (limit to 5 for cost optimization)
-                                for img_url in image_urls[:5]:
-                                    await self._upload_image_from_url(session, shopify_id, img_url)
-                            except Exception as img_error:
-                                logger.warning(f"Failed to upload images for draft {shopify_id}: {img_error}")
-                        
-                        logger.info(f"Created Shopify draft for review: {shopify_id}")
-                        return shopify_id
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Failed to create Shopify draft: {error_text}")
-                        return None
-                        
+                status, response_data = await self._post_product(session, payload)
+                if status != 201:
+                    logger.error(f"Failed to create Shopify draft: {response_data}")
+                    return None
+                
+                shopify_id = response_data['product']['id']
+                
+                # Inline URLs rejected: upload them one by one so the fetchable ones still land
+                if image_urls and not response_data['product'].get('images'):
+                    try:
+                        await asyncio.gather(*(
+                            self._upload_image_from_url(session, shopify_id, img_url, position)
+                            for position, img_url in enumerate(image_urls, start=1)
+                        ))
+                    except Exception as img_error:
+                        logger.warning(f"Failed to upload images for draft {shopify_id}: {img_error}")
+                
+                logger.info(f"Created Shopify draft for review: {shopify_id}")
+                return shopify_id
+        
         except Exception as e:
             logger.error(f"Exception creating Shopify draft: {e}")
             return None
     
-    async def _upload_image_from_url(self, session: aiohttp.ClientSession, product_id: int, image_url: str):
-        """Upload a single image from URL to Shopify product"""
+    async def _upload_image_from_url(self, session: aiohttp.ClientSession, product_id: int, image_url: str,
+                                     position: int = None, alt: str = None) -> Optional[Dict]:
+        """
+        Upload a single image from URL to Shopify product (Shopify fetches it)
+        
+        Returns:
+            Uploaded image dict, or None if Shopify could not fetch the URL
+        """
         try:
             image_payload = {
                 "image": {
                     "src": image_url
                 }
             }
+            if position:
+                image_payload["image"]["position"] = position
+            if alt:
+                image_payload["image"]["alt"] = alt
             
             async with session.post(
                 f"{self.base_api_url}/products/{product_id}/images.json",
                 headers=self.headers,
                 data=json.dumps(image_payload)
             ) as response:
-                if response.status == 201:
+                if 200 <= response.status < 300:
                     logger.debug(f"Uploaded image to product {product_id}")
+                    return (await response.json())['image']
                 else:
                     logger.warning(f"Failed to upload image: {response.status}")
+                    return None
         except Exception as e:
             logger.warning(f"Error uploading image: {e}")
+            return None
     
+    @traced('shopify')
     async def update_review_decision(self, shopify_id: int, decision: str) -> bool:
         """
         Update draft product based on modesty review decision
@@ -1039,6 +1406,7 @@ class ShopifyManager:
             logger.error(f"Exception updating review decision: {e}")
             return False
     
+    @traced('shopify')
     async def promote_duplicate_to_modesty_review(self, catalog_product_data: Dict, retailer_name: str) -> Optional[int]:
         """
         Promote a duplicate_uncertain product to full modesty review
@@ -1068,6 +1436,7 @@ class ShopifyManager:
             logger.error(f"Exception promoting duplicate to review: {e}")
             return None
     
+    @traced('shopify')
     async def update_modesty_decision(self, product_id: int, decision: str) -> bool:
         """
         Update product with modesty decision and remove not-assessed tag
@@ -0,0 +1,562 @@
+"""
+Tracing - Spans and per-stage latency histograms across workflows
+
+Answers "where did this product's wall-clock time go?": every traced call
+(tower extraction, Jina/ZenRows fetch, HTML parse, LLM call, image
+download, Shopify request, DB query) opens a span. Spans nest through a
+contextvar, so they follow asyncio tasks the same way log context does.
+
+Each finished span is:
+- Recorded in an HDR-style latency histogram per (stage, retailer), both
+  for the current workflow run and for the process
+- Exported as one JSON line to logs/traces/spans_<date>.jsonl (written by a
+  background thread, never on the event loop), and/or to an OpenTelemetry
+  collector over OTLP when opentelemetry-sdk is installed
+
+Workflow entry points are wrapped with @traced_run, which scopes
+histograms to that run and logs a summary table at the end, sorted by
+self time (time in a stage minus time in its traced children), so the
+stage at the top is the real bottleneck.
+
+Environment:
+    TRACING_ENABLED=0          Disable (decorators become no-ops)
+    TRACE_EXPORT=jsonl         jsonl | otlp | both | none
+    TRACE_DIR=<repo>/logs/traces   JSONL directory
+    OTEL_EXPORTER_OTLP_ENDPOINT / OTEL_SERVICE_NAME (read by the OTel SDK)
+
+Usage:
+    from tracing import traced, traced_run, span
+
+    @traced('fetch')
+    async def _fetch_markdown(self, url, retailer): ...
+
+    with span('dedup', retailer=retailer, products=len(products)):
+        ...
+"""
+
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(__file__))
+from logger_config import get_log_context, log_context, setup_logging
+
+logger = setup_logging(__name__)
+
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', '1').lower() not in ('0', 'false', 'no')
+TRACE_EXPORT = os.getenv('TRACE_EXPORT', 'jsonl').lower()
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+TRACE_DIR = os.getenv('TRACE_DIR', os.path.join(REPO_ROOT, 'logs', 'traces'))
+
+# Parameters picked up from traced calls
+RETAILER_PARAMS = ('retailer', 'retailer_name')
+ATTRIBUTE_PARAMS = ('url', 'catalog_url', 'product_id', 'shopify_id')
+
+try:
+    from opentelemetry import trace as otel_trace
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    OTEL_AVAILABLE = True
+except ImportError:
+    OTEL_AVAILABLE = False
+
+
+class LatencyHistogram:
+    """
+    HDR-style latency histogram (microsecond resolution)
+
+    Values are bucketed by magnitude (power of two) with SUB_BUCKET_BITS of
+    linear sub-buckets per magnitude, so every recorded value keeps ~0.8%
+    relative precision from 1µs to hours in a few hundred sparse buckets.
+    Merging two histograms is adding counts.
+    """
+
+    SUB_BUCKET_BITS = 8
+
+    def __init__(self):
+        self.buckets: Dict[Tuple[int, int], int] = {}
+        self.count = 0
+        self.total_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us = 0
+
+    def _bucket(self, value_us: int) -> Tuple[int, int]:
+        shift = max(0, value_us.bit_length() - self.SUB_BUCKET_BITS)
+        return shift, value_us >> shift
+
+    @staticmethod
+    def _bucket_value(bucket: Tuple[int, int]) -> int:
+        """Midpoint of a bucket's value range"""
+        shift, sub = bucket
+        return (sub << shift) + ((1 << shift) >> 1)
+
+    def record(self, seconds: float):
+        value_us = max(0, int(seconds * 1_000_000))
+        bucket = self._bucket(value_us)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total_us += value_us
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+        self.max_us = max(self.max_us, value_us)
+
+    def merge(self, other: 'LatencyHistogram'):
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += other.count
+        self.total_us += other.total_us
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, percent: float) -> float:
+        """Value (seconds) at percent (0-100)"""
+        if not self.count:
+            return 0.0
+        target = max(1, int(round(self.count * percent / 100.0)))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= target:
+                return min(self._bucket_value(bucket), self.max_us) / 1_000_000
+        return self.max_us / 1_000_000
+
+    def cumulative_counts(self, bounds: List[float]) -> List[int]:
+        """Count of values <= each bound (seconds, ascending) - Prometheus 'le' buckets"""
+        counts = [0] * len(bounds)
+        bounds_us = [bound * 1_000_000 for bound in bounds]
+        for bucket, count in self.buckets.items():
+            value_us = self._bucket_value(bucket)
+            for i, bound_us in enumerate(bounds_us):
+                if value_us <= bound_us:
+                    counts[i] += count
+        return counts
+
+    @property
+    def total(self) -> float:
+        return self.total_us / 1_000_000
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'min': (self.min_us or 0) / 1_000_000,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max_us / 1_000_000
+        }
+
+
+class Span:
+    """One timed operation; children attach through the current-span contextvar"""
+
+    __slots__ = (
+        'name', 'stage', 'retailer', 'trace_id', 'span_id', 'parent', 'run',
+        'attributes', 'started_at', '_start', 'duration', 'child_time', 'error', '_otel'
+    )
+
+    def __init__(self, name: str, stage: str, retailer: Optional[str], parent: Optional['Span'],
+                 run: Optional['TraceRun'], attributes: Dict[str, Any]):
+        self.name = name
+        self.stage = stage
+        self.retailer = retailer or (parent.retailer if parent else None)
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.run = run
+        self.attributes = attributes
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration = 0.0
+        self.child_time = 0.0
+        self.error: Optional[str] = None
+        self._otel = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def self_time(self) -> float:
+        # Concurrent children (gather) can add up to more than the parent's wall time
+        return max(0.0, self.duration - self.child_time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent.span_id if self.parent else None,
+            'run_id': self.run.run_id if self.run else get_log_context()['run_id'],
+            'name': self.name,
+            'stage': self.stage,
+            'retailer': self.retailer,
+            'start': datetime.fromtimestamp(self.started_at).isoformat(timespec='microseconds'),
+            'duration_ms': round(self.duration * 1000, 3),
+            'self_ms': round(self.self_time * 1000, 3),
+            'error': self.error,
+            'attributes': self.attributes
+        }
+
+
+class TraceRun:
+    """Histograms for one workflow run (see traced_run)"""
+
+    def __init__(self, workflow: str, run_id: str):
+        self.workflow = workflow
+        self.run_id = run_id
+        self.started_at = time.time()
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.self_times: Dict[Tuple[str, str], float] = {}
+
+    def record(self, span: Span):
+        key = (span.stage, span.retailer or '-')
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+        histogram.record(span.duration)
+        self.self_times[key] = self.self_times.get(key, 0.0) + span.self_time
+
+
+class JSONLSpanExporter:
+    """
+    Appends finished spans to TRACE_DIR/spans_<date>.jsonl from a writer thread
+
+    The thread (and the directory) are only created when the first record is
+    exported, so importing tracing has no side effects.
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or TRACE_DIR
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def export(self, record: Dict[str, Any]):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='span-writer', daemon=True)
+                    self._thread.start()
+        self._queue.put(record)
+
+    def _run(self):
+        os.makedirs(self.directory, exist_ok=True)
+        while True:
+            record = self._queue.get()
+            if record is None:
+                return
+            batch = [record]
+            # Drain whatever else is queued into the same write
+            while True:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    self._write(batch)
+                    return
+                batch.append(record)
+            self._write(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        path = os.path.join(self.directory, f"spans_{datetime.now().strftime('%Y%m%d')}.jsonl")
+        try:
+            with open(path, 'a') as f:
+                for record in batch:
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        except Exception as e:
+            logger.debug(f"Span export failed: {e}")
+
+    def shutdown(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+class Tracer:
+    """
+    Process-wide span sink: histograms, exporters and run summaries
+
+    Features:
+    - Per-run and process-wide histograms keyed by (stage, retailer)
+    - JSONL export (background thread) and optional OTLP export
+    - Summary table sorted by self time
+
+    Usage:
+        from tracing import tracer
+        print(tracer.format_summary())
+    """
+
+    def __init__(self):
+        self.enabled = TRACING_ENABLED
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self._jsonl: Optional[JSONLSpanExporter] = None
+        self._otel_tracer = None
+
+        if not self.enabled:
+            return
+        if TRACE_EXPORT in ('jsonl', 'both'):
+            self._jsonl = JSONLSpanExporter()
+        if TRACE_EXPORT in ('otlp', 'both'):
+            if OTEL_AVAILABLE:
+                provider = TracerProvider()
+                provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+                otel_trace.set_tracer_provider(provider)
+                self._otel_tracer = otel_trace.get_tracer('smf_scraper')
+            else:
+                logger.warning("⚠️ TRACE_EXPORT=otlp but opentelemetry-sdk is not installed - OTLP export disabled")
+        atexit.register(self.shutdown)
+
+    # =================== SPAN LIFECYCLE ===================
+
+    def start_span(self, name: str, stage: str, retailer: Optional[str] = None, **attributes) -> Span:
+        if retailer is None:
+            retailer = get_log_context()['retailer']
+        parent = _current_span.get()
+        span = Span(name, stage, retailer, parent, _current_run.get(), attributes)
+
+        if self._otel_tracer is not None:
+            parent_context = otel_trace.set_span_in_context(parent._otel) if parent and parent._otel else None
+            span._otel = self._otel_tracer.start_span(
+                name, context=parent_context, start_time=time.time_ns(),
+                attributes={'stage': stage, 'retailer': span.retailer or ''}
+            )
+        return span
+
+    def finish_span(self, span: Span, error: Optional[BaseException] = None):
+        span.duration = time.perf_counter() - span._start
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"[:300]
+        if span.parent is not None:
+            span.parent.child_time += span.duration
+
+        key = (span.stage, span.retailer or '-')
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.record(span.duration)
+            if span.run is not None:
+                span.run.record(span)
+
+        if self._jsonl is not None:
+            self._jsonl.export(span.to_dict())
+        if span._otel is not None:
+            for attr_key, value in span.attributes.items():
+                if isinstance(value, (str, int, float, bool)):
+                    span._otel.set_attribute(attr_key, value)
+            if span.error:
+                span._otel.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, span.error))
+            span._otel.end(end_time=time.time_ns())
+
+    # =================== SUMMARIES ===================
+
+    def snapshot(self) -> Dict[Tuple[str, str], LatencyHistogram]:
+        """Copy of the process-wide histograms, safe to read while spans keep finishing"""
+        snapshot = {}
+        with self._lock:
+            for key, histogram in self.histograms.items():
+                snapshot[key] = LatencyHistogram()
+                snapshot[key].merge(histogram)
+        return snapshot
+
+    def summary_rows(self, run: Optional[TraceRun] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            histograms = dict(run.histograms if run else self.histograms)
+            self_times = dict(run.self_times) if run else {}
+        rows = []
+        for (stage, retailer), histogram in histograms.items():
+            row = {'stage': stage, 'retailer': retailer, **histogram.to_dict()}
+            row['self'] = self_times.get((stage, retailer), row['total'])
+            rows.append(row)
+        rows.sort(key=lambda row: row['self'], reverse=True)
+        return rows
+
+    def format_summary(self, run: Optional[TraceRun] = None) -> str:
+        rows = self.summary_rows(run)
+        if not rows:
+            return 'No spans recorded'
+        wall = (time.time() - run.started_at) if run else None
+        lines = []
+        if run:
+            lines.append(f"⏱️ Trace summary: {run.workflow} ({run.run_id}), wall {wall:.1f}s")
+        lines.append(
+            f"{'stage':<12} {'retailer':<18} {'count':>6} {'self s':>9} {'total s':>9} "
+            f"{'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+        )
+        for row in rows:
+            lines.append(
+                f"{row['stage'][:12]:<12} {row['retailer'][:18]:<18} {row['count']:>6} "
+                f"{row['self']:>9.2f} {row['total']:>9.2f} {row['p50'] * 1000:>9.1f} "
+                f"{row['p90'] * 1000:>9.1f} {row['p99'] * 1000:>9.1f} {row['max'] * 1000:>9.1f}"
+            )
+        return '\n'.join(lines)
+
+    def export_summary(self, run: TraceRun):
+        if self._jsonl is not None:
+            self._jsonl.export({
+                'type': 'run_summary',
+                'run_id': run.run_id,
+                'workflow': run.workflow,
+                'wall_s': round(time.time() - run.started_at, 3),
+                'stages': self.summary_rows(run)
+            })
+
+    def shutdown(self):
+        if self._jsonl is not None:
+            self._jsonl.shutdown()
+            self._jsonl = None
+        if self._otel_tracer is not None:
+            otel_trace.get_tracer_provider().shutdown()
+            self._otel_tracer = None
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar('trace_span', default=None)
+_current_run: contextvars.ContextVar[Optional[TraceRun]] = contextvars.ContextVar('trace_run', default=None)
+
+tracer = Tracer()
+
+# Code objects of the traced()/traced_run() wrappers, so a sampling profiler
+# can find the innermost stage on another thread's stack (see frame_stage)
+WRAPPER_CODES = set()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def frame_stage(frame) -> Optional[Tuple[str, Optional[str]]]:
+    """(stage, retailer) if frame belongs to a traced wrapper call, else None"""
+    if frame.f_code not in WRAPPER_CODES:
+        return None
+    frame_locals = frame.f_locals
+    return frame_locals.get('stage', 'workflow'), frame_locals.get('retailer')
+
+
+@contextmanager
+def span(name: str, stage: str = None, retailer: str = None, **attributes):
+    """Time a block as a span (stage defaults to name)"""
+    if not tracer.enabled:
+        yield None
+        return
+    active = tracer.start_span(name, stage or name, retailer, **attributes)
+    token = _current_span.set(active)
+    try:
+        yield active
+    except BaseException as e:
+        tracer.finish_span(active, e)
+        raise
+    else:
+        tracer.finish_span(active)
+    finally:
+        _current_span.reset(token)
+
+
+def _call_context(fn: Callable) -> Callable[[tuple, dict], Tuple[Optional[str], Dict[str, Any]]]:
+    """Build a cheap (args, kwargs) -> (retailer, attributes) extractor for fn"""
+    try:
+        parameters = list(inspect.signature(fn).parameters)
+    except (TypeError, ValueError):
+        parameters = []
+    positions = {name: index for index, name in enumerate(parameters)}
+    retailer_params = [(name, positions[name]) for name in RETAILER_PARAMS if name in positions]
+    attribute_params = [(name, positions[name]) for name in ATTRIBUTE_PARAMS if name in positions]
+
+    def extract(args: tuple, kwargs: dict):
+        def value(name, index):
+            if name in kwargs:
+                return kwargs[name]
+            return args[index] if index < len(args) else None
+
+        retailer = None
+        for name, index in retailer_params:
+            retailer = value(name, index)
+            if retailer:
+                break
+        attributes = {}
+        for name, index in attribute_params:
+            found = value(name, index)
+            if found is not None:
+                attributes[name] = str(found)[:300]
+        return (retailer if isinstance(retailer, str) else None), attributes
+
+    return extract
+
+
+def traced(stage: str, name: str = None):
+    """
+    Decorator: run each call of a sync or async function in a span
+
+    retailer and url/product_id arguments are picked up automatically.
+    """
+    def decorator(fn: Callable) -> Callable:
+        if not TRACING_ENABLED:
+            return fn
+        span_name = name or fn.__qualname__
+        extract = _call_context(fn)
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                retailer, attributes = extract(args, kwargs)
+                with span(span_name, stage, retailer, **attributes):
+                    return await fn(*args, **kwargs)
+            WRAPPER_CODES.add(async_wrapper.__code__)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            retailer, attributes = extract(args, kwargs)
+            with span(span_name, stage, retailer, **attributes):
+                return fn(*args, **kwargs)
+        WRAPPER_CODES.add(wrapper.__code__)
+        return wrapper
+
+    return decorator
+
+
+def traced_run(workflow: str):
+    """
+    Decorator for workflow entry points (async)
+
+    Gives the call its own run_id (log records and spans share it), scopes
+    histograms to the run and logs the stage summary when it returns.
+    """
+    def decorator(fn: Callable) -> Callable:
+        if not TRACING_ENABLED:
+            return fn
+        extract = _call_context(fn)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            retailer, attributes = extract(args, kwargs)
+            run_id = f"{workflow}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+            run = TraceRun(workflow, run_id)
+            run_token = _current_run.set(run)
+            try:
+                with log_context(run_id=run_id, retailer=retailer):
+                    with span(workflow, 'workflow', retailer, **attributes):
+                        return await fn(*args, **kwargs)
+            finally:
+                _current_run.reset(run_token)
+                logger.info('\n' + tracer.format_summary(run))
+                tracer.export_summary(run)
+
+        WRAPPER_CODES.add(wrapper.__code__)
+        return wrapper
+
+    return decorator
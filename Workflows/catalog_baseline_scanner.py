@@ -27,6 +27,10 @@ from dataclasses import dataclass
 import logging
 
 from logger_config import setup_logging
+from tracing import traced_run
+from metrics_server import start_metrics_server
+from loop_diagnostics import start_loop_diagnostics
+from sampling_profiler import start_profiler
 from cost_tracker import cost_tracker
 from notification_manager import NotificationManager
 from db_manager import DatabaseManager
@@ -151,6 +155,7 @@ class CatalogBaselineScanner:
         
         logger.info("✅ Catalog Baseline Scanner initialized (Triple Tower: Markdown, Patchright, Commercial API)")
     
+    @traced_run('catalog_baseline_scanner')
     async def establish_baseline(
         self,
         retailer: str,
@@ -509,17 +514,33 @@ async def main():
     parser.add_argument('modesty_level', help='Modesty level (modest, moderately_modest)')
     parser.add_argument('--url', help='Custom catalog URL (overrides default)')
     parser.add_argument('--max-pages', type=int, default=10, help='Maximum pages to crawl')
+    parser.add_argument('--metrics-port', type=int, help='Serve live Prometheus metrics on this port')
+    parser.add_argument('--diagnose-loop', action='store_true',
+                        help='Detect event-loop stalls and write a blocking call-site report')
+    parser.add_argument('--profile', action='store_true',
+                        help='Sample CPU and allocations per retailer/stage into profiles/')
     
     args = parser.parse_args()
     
     scanner = CatalogBaselineScanner()
-    result = await scanner.establish_baseline(
-        retailer=args.retailer,
-        category=args.category,
-        modesty_level=args.modesty_level,
-        custom_url=args.url,
-        max_pages=args.max_pages
-    )
+    metrics_server = await start_metrics_server(args.metrics_port)
+    diagnostics = start_loop_diagnostics('catalog_baseline_scanner', enabled=args.diagnose_loop)
+    profiler = start_profiler('catalog_baseline_scanner', enabled=args.profile)
+    try:
+        result = await scanner.establish_baseline(
+            retailer=args.retailer,
+            category=args.category,
+            modesty_level=args.modesty_level,
+            custom_url=args.url,
+            max_pages=args.max_pages
+        )
+    finally:
+        if profiler:
+            profiler.stop()
+        if diagnostics:
+            await diagnostics.stop()
+        if metrics_server:
+            await metrics_server.stop()
     
     print(json.dumps({
         'success': result.success,
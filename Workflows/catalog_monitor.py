@@ -31,7 +31,12 @@ from urllib.parse import urlparse
 from difflib import SequenceMatcher
 import logging
 
-from logger_config import setup_logging
+from logger_config import setup_logging, set_log_context, SampledLogger
+from tracing import traced, traced_run
+from metrics_server import start_metrics_server
+from loop_diagnostics import start_loop_diagnostics
+from sampling_profiler import start_profiler
+from catalog_stream import catalog_page_urls
 from cost_tracker import cost_tracker
 from notification_manager import NotificationManager
 from db_manager import DatabaseManager
@@ -65,6 +70,7 @@ except ImportError:
     logger_temp.warning("⚠️ Commercial API tower not available - will use Patchright/Markdown")
 
 logger = setup_logging(__name__)
+sampled_logger = SampledLogger(logger)
 
 # Retailer classification for CATALOG scanning
 # ALL retailers use Patchright for catalog (JavaScript-loaded product URLs)
@@ -164,13 +170,36 @@ class CatalogMonitor:
     
     Deduplication: Most complex - multi-level matching
     Assessment Pipeline Integration: Both modesty and duplication reviews
+    Streaming: monitor_catalog_stream() runs steps 3-6 per catalog page/chunk
     """
     
+    # Download the first image of products that reach image dedup and
+    # compare its perceptual hash against the fingerprint index (one HTTP
+    # request per product in the dedup path, so off unless enabled)
+    IMAGE_FINGERPRINT_LOOKUP = os.getenv('IMAGE_FINGERPRINT_LOOKUP', '0').lower() in ('1', 'true', 'yes')
+    
+    # Streaming monitor: catalog products waiting for re-extraction (backpressure
+    # on the catalog stream)
+    STREAM_WORK_QUEUE_SIZE = 50
+    
+    # Uploaded drafts per assessment queue flush (queued as uploads complete)
+    ASSESSMENT_BATCH_SIZE = 25
+    
     def __init__(self):
         self.db_manager = DatabaseManager()
         self.notification_manager = NotificationManager()
         self.assessment_queue = AssessmentQueueManager()
         
+        # Perceptual-hash image index for image-based dedup (optional)
+        self.fingerprint_index = None
+        self._image_processor = None
+        try:
+            from image_fingerprints import IMAGEHASH_AVAILABLE, get_fingerprint_index
+            if IMAGEHASH_AVAILABLE:
+                self.fingerprint_index = get_fingerprint_index()
+        except Exception as e:
+            logger.warning(f"⚠️ Image fingerprint index unavailable: {e}")
+        
         # Initialize pattern learning (optional, non-critical)
         self.pattern_learner = None
         if PATTERN_LEARNING_AVAILABLE:
@@ -188,6 +217,9 @@ class CatalogMonitor:
         self.commercial_catalog_tower = None
         self.commercial_product_tower = None
         
+        # Forked monitors share the Commercial API towers and leave cleanup to this one
+        self.owns_commercial_towers = True
+        
         # Tower count
         tower_count = "Dual Tower"
         if COMMERCIAL_API_AVAILABLE:
@@ -357,7 +389,7 @@ class CatalogMonitor:
                         ))
                         
                         price_changes += 1
-                        logger.debug(f"💰 Price change: {product_url[:50]}... ${product_price} → ${catalog_price}")
+                        sampled_logger.debug(f"💰 Price change: {product_url[:50]}... ${product_price} → ${catalog_price}")
             
             except Exception as e:
                 logger.error(f"Price change detection failed: {e}")
@@ -536,7 +568,7 @@ class CatalogMonitor:
                         confidence = 0.65 + (best_overlap_ratio * 0.15)  # 0.65 to 0.80
                     
                     conn.close()
-                    logger.debug(f"Image match: {best_overlap_ratio:.0%} overlap, confidence {confidence:.2f}")
+                    sampled_logger.debug(f"Image match: {best_overlap_ratio:.0%} overlap, confidence {confidence:.2f}")
                     return {'linked_product_url': best_match, 'link_confidence': confidence, 'link_method': 'image_url_match'}
             
             except Exception as e:
@@ -545,6 +577,7 @@ class CatalogMonitor:
         conn.close()
         return None
     
+    @traced_run('catalog_monitor')
     async def monitor_catalog(
         self,
         retailer: str,
@@ -568,6 +601,7 @@ class CatalogMonitor:
         """
         start_time = datetime.utcnow()
         failures = []  # Track all failures for this run
+        set_log_context(retailer=retailer)
         
         try:
             logger.info("⚠️ PREREQUISITE CHECK: Product Updater should run before monitoring")
@@ -671,193 +705,119 @@ class CatalogMonitor:
             
             # Step 5: Process new products
             sent_to_modesty = 0
-            for product in dedup_results['new']:
-                product_url = product.get('url') or product.get('catalog_url')
-                if not product_url:
-                    logger.warning(f"Product missing URL, skipping: {product}")
-                    continue
-                
-                # Re-extract with SINGLE product extractor for full details (now passes category parameter)
-                # Use Markdown for retailers that support it (fast & cheap), Patchright for others
-                single_product_method = 'markdown' if retailer in MARKDOWN_SINGLE_PRODUCT_RETAILERS else 'patchright'
-                full_product = await self._extract_single_product(
-                    product_url,
-                    retailer,
-                    single_product_method,
-                    category  # Pass category for override logic
-                )
-                
-                # Check if extraction failed (returns dict with _extraction_error key)
-                if full_product and '_extraction_error' in full_product:
-                    # Track extraction failure with full error details
-                    failures.append({
-                        'url': product_url,
-                        'reason': full_product['_extraction_error'],
-                        'stage': 'extraction',
-                        'product_type': 'new',
-                        'method_attempted': full_product.get('_method_used', single_product_method),
-                        'attempted_at': datetime.utcnow().isoformat(),
-                        'certainty': 'known_error' if 'Unknown' not in full_product['_extraction_error'] else 'uncertain'
-                    })
-                    full_product = None  # Treat as failed
-                elif not full_product:
-                    # Unexpected None return (shouldn't happen with new code, but handle it)
-                    failures.append({
-                        'url': product_url,
-                        'reason': 'Product extraction returned None unexpectedly - possible unhandled exception in extractor',
-                        'stage': 'extraction',
-                        'product_type': 'new',
-                        'method_attempted': single_product_method,
-                        'attempted_at': datetime.utcnow().isoformat(),
-                        'certainty': 'uncertain'
-                    })
-                    full_product = None
-                
-                if full_product:
-                    # Add source URL (extractor doesn't include it)
-                    full_product['url'] = product_url
-                    full_product['catalog_url'] = product_url  # For consistency
-                    
-                    # MANGO-SPECIFIC FILTERING
-                    if retailer.lower() == 'mango':
-                        clothing_type = full_product.get('clothing_type', 'other')
-                        
-                        # Only allow dress, top, and dress_top to assessment pipeline
-                        if clothing_type not in ['dress', 'top', 'dress_top']:
-                            logger.info(f"⏭️ Skipping {clothing_type} (Mango filter): {full_product.get('title', 'N/A')}")
-                            
-                            # Upload to Shopify as draft (unpublished)
-                            await self._upload_non_assessed_product(
-                                full_product,
-                                retailer,
-                                status='draft'
-                            )
-                            continue
+            modesty_queue = []  # Queued every ASSESSMENT_BATCH_SIZE uploads
+            
+            # The draft upload of one product overlaps extraction of the next
+            pending_upload = None
+            
+            async def flush_modesty_queue():
+                batch = modesty_queue[:]
+                modesty_queue.clear()
+                await self._send_to_modesty_assessment(batch, retailer, category, modesty_level)
+            
+            async def finish_new_product_upload(upload):
+                nonlocal sent_to_modesty
+                full_product, product, product_url, upload_task = upload
+                if self._apply_draft_upload(
+                    full_product, product, product_url, await upload_task, 'new', retailer, failures
+                ):
+                    # Send to Assessment Pipeline for MODESTY review
+                    modesty_queue.append(full_product)
+                    sent_to_modesty += 1
+                    if len(modesty_queue) >= self.ASSESSMENT_BATCH_SIZE:
+                        await flush_modesty_queue()
+            
+            try:
+                for product in dedup_results['new']:
+                    product_url = product.get('url') or product.get('catalog_url')
+                    if not product_url:
+                        logger.warning(f"Product missing URL, skipping: {product}")
+                        continue
                     
-                    # NEW: Upload to Shopify as DRAFT before assessment
-                    shopify_result = await self._upload_to_shopify_as_draft(
-                        full_product,
-                        retailer,
-                        category
+                    # Re-extract with SINGLE product extractor for full details
+                    full_product = await self._reextract_catalog_product(
+                        product, product_url, 'new', retailer, category, failures
                     )
                     
-                    if shopify_result['success']:
-                        # Add Shopify data to product for assessment queue
-                        full_product['shopify_id'] = shopify_result['shopify_id']
-                        full_product['shopify_image_urls'] = shopify_result['shopify_image_urls']
-                        full_product['shopify_status'] = 'draft'
-                        
-                        # Send to Assessment Pipeline for MODESTY review
-                        await self._send_to_modesty_assessment(full_product, retailer, category, modesty_level)
-                        sent_to_modesty += 1
-                    else:
-                        # Track Shopify upload failure with full error details
-                        shopify_error = shopify_result.get('error', 'Unknown error - no error details provided by Shopify')
-                        failures.append({
-                            'url': product_url,
-                            'reason': f"Shopify upload failed: {shopify_error}",
-                            'stage': 'shopify_upload',
-                            'product_type': 'new',
-                            'product_title': full_product.get('title', 'Unknown'),
-                            'retailer': retailer,
-                            'attempted_at': datetime.utcnow().isoformat(),
-                            'certainty': 'known_error' if 'Unknown' not in shopify_error else 'uncertain',
-                            'shopify_status_code': shopify_result.get('status_code') if 'status_code' in shopify_result else None
-                        })
-                        logger.error(f"❌ Skipping assessment for {full_product.get('title')} - Shopify upload failed")
-                
-                # Respectful delay
-                await asyncio.sleep(0.5)
+                    if full_product and not await self._divert_filtered_product(full_product, retailer):
+                        # NEW: Upload to Shopify as DRAFT before assessment
+                        # (one upload in flight; it runs while the next product is extracted)
+                        if pending_upload:
+                            upload, pending_upload = pending_upload, None
+                            await finish_new_product_upload(upload)
+                        pending_upload = (
+                            full_product,
+                            product,
+                            product_url,
+                            asyncio.create_task(self._upload_to_shopify_as_draft(full_product, retailer, category))
+                        )
+                    
+                    # Respectful delay
+                    await asyncio.sleep(0.5)
+            finally:
+                # Queue everything already uploaded, even if the loop failed part-way
+                try:
+                    if pending_upload:
+                        await finish_new_product_upload(pending_upload)
+                finally:
+                    await flush_modesty_queue()
             
             # Step 6: Process suspected duplicates
             sent_to_duplicate_review = 0
-            for product in dedup_results['suspected_duplicate']:
-                product_url = product.get('url') or product.get('catalog_url')
-                if not product_url:
-                    logger.warning(f"Suspected duplicate missing URL, skipping: {product}")
-                    continue
-                
-                # Extract full product data (needed if promoted to modesty review later)
-                # Use Markdown for retailers that support it (fast & cheap), Patchright for others
-                single_product_method = 'markdown' if retailer in MARKDOWN_SINGLE_PRODUCT_RETAILERS else 'patchright'
-                full_product = await self._extract_single_product(
-                    product_url,
-                    retailer,
-                    single_product_method,
-                    category
-                )
-                
-                # Check if extraction failed (returns dict with _extraction_error key)
-                if full_product and '_extraction_error' in full_product:
-                    # Track extraction failure with full error details
-                    failures.append({
-                        'url': product_url,
-                        'reason': full_product['_extraction_error'],
-                        'stage': 'extraction',
-                        'product_type': 'suspected_duplicate',
-                        'method_attempted': full_product.get('_method_used', single_product_method),
-                        'suspected_match': product.get('suspected_match', {}).get('url') if product.get('suspected_match') else None,
-                        'attempted_at': datetime.utcnow().isoformat(),
-                        'certainty': 'known_error' if 'Unknown' not in full_product['_extraction_error'] else 'uncertain'
-                    })
-                    full_product = None  # Treat as failed
-                elif not full_product:
-                    # Unexpected None return (shouldn't happen with new code, but handle it)
-                    failures.append({
-                        'url': product_url,
-                        'reason': 'Product extraction returned None unexpectedly - possible unhandled exception in extractor',
-                        'stage': 'extraction',
-                        'product_type': 'suspected_duplicate',
-                        'method_attempted': single_product_method,
-                        'attempted_at': datetime.utcnow().isoformat(),
-                        'certainty': 'uncertain'
-                    })
-                    full_product = None
-                
-                if full_product:
-                    # Add source URL
-                    full_product['url'] = product_url
-                    full_product['catalog_url'] = product_url
+            duplicate_queue = []  # Queued every ASSESSMENT_BATCH_SIZE uploads
+            pending_upload = None
+            
+            async def flush_duplicate_queue():
+                batch = duplicate_queue[:]
+                duplicate_queue.clear()
+                await self._send_to_duplicate_assessment(batch, retailer, category)
+            
+            async def finish_duplicate_upload(upload):
+                nonlocal sent_to_duplicate_review
+                full_product, product, product_url, upload_task = upload
+                if self._apply_draft_upload(
+                    full_product, product, product_url, await upload_task, 'suspected_duplicate', retailer, failures
+                ):
+                    # Send to Assessment Pipeline for DUPLICATION review
+                    duplicate_queue.append(full_product)
+                    sent_to_duplicate_review += 1
+                    if len(duplicate_queue) >= self.ASSESSMENT_BATCH_SIZE:
+                        await flush_duplicate_queue()
+            
+            try:
+                for product in dedup_results['suspected_duplicate']:
+                    product_url = product.get('url') or product.get('catalog_url')
+                    if not product_url:
+                        logger.warning(f"Suspected duplicate missing URL, skipping: {product}")
+                        continue
                     
-                    # Upload to Shopify as DRAFT (in case it's "not duplicate" and needs modesty review)
-                    shopify_result = await self._upload_to_shopify_as_draft(
-                        full_product,
-                        retailer,
-                        category
+                    # Extract full product data (needed if promoted to modesty review later)
+                    full_product = await self._reextract_catalog_product(
+                        product, product_url, 'suspected_duplicate', retailer, category, failures
                     )
                     
-                    if shopify_result['success']:
-                        # Add Shopify data
-                        full_product['shopify_id'] = shopify_result['shopify_id']
-                        full_product['shopify_image_urls'] = shopify_result['shopify_image_urls']
-                        full_product['shopify_status'] = 'draft'
-                        
-                        # Preserve suspected match data from deduplication
-                        full_product['suspected_match'] = product.get('suspected_match')
-                        full_product['confidence_score'] = product.get('confidence_score')
-                        
-                        # Send to Assessment Pipeline for DUPLICATION review
-                        await self._send_to_duplicate_assessment(full_product, retailer, category)
-                        sent_to_duplicate_review += 1
-                    else:
-                        # Track Shopify upload failure with full error details
-                        shopify_error = shopify_result.get('error', 'Unknown error - no error details provided by Shopify')
-                        failures.append({
-                            'url': product_url,
-                            'reason': f"Shopify upload failed: {shopify_error}",
-                            'stage': 'shopify_upload',
-                            'product_type': 'suspected_duplicate',
-                            'product_title': full_product.get('title', 'Unknown'),
-                            'suspected_match': product.get('suspected_match', {}).get('url') if product.get('suspected_match') else None,
-                            'retailer': retailer,
-                            'attempted_at': datetime.utcnow().isoformat(),
-                            'certainty': 'known_error' if 'Unknown' not in shopify_error else 'uncertain',
-                            'shopify_status_code': shopify_result.get('status_code') if 'status_code' in shopify_result else None
-                        })
-                        logger.error(f"❌ Skipping duplicate assessment - Shopify upload failed for {full_product.get('title')}")
-                
-                # Respectful delay
-                await asyncio.sleep(0.5)
+                    if full_product:
+                        # Upload to Shopify as DRAFT (in case it's "not duplicate" and needs modesty review)
+                        # (one upload in flight; it runs while the next product is extracted)
+                        if pending_upload:
+                            upload, pending_upload = pending_upload, None
+                            await finish_duplicate_upload(upload)
+                        pending_upload = (
+                            full_product,
+                            product,
+                            product_url,
+                            asyncio.create_task(self._upload_to_shopify_as_draft(full_product, retailer, category))
+                        )
+                    
+                    # Respectful delay
+                    await asyncio.sleep(0.5)
+            finally:
+                # Queue everything already uploaded, even if the loop failed part-way
+                try:
+                    if pending_upload:
+                        await finish_duplicate_upload(pending_upload)
+                finally:
+                    await flush_duplicate_queue()
             
             # Step 7: Record monitoring run
             await self.db_manager.record_monitoring_run(
@@ -871,33 +831,7 @@ class CatalogMonitor:
             )
             
             # Step 8: Save failures if any
-            if failures:
-                from pathlib import Path
-                import json
-                
-                # Create batch ID
-                batch_id = f"catalog_monitor_{retailer}_{category}_{modesty_level}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
-                
-                failures_data = {
-                    'batch_id': batch_id,
-                    'workflow': 'catalog_monitor',
-                    'retailer': retailer,
-                    'category': category,
-                    'modesty_level': modesty_level,
-                    'run_date': start_time.isoformat(),
-                    'total_failed': len(failures),
-                    'failures': failures
-                }
-                
-                # Save to failures folder
-                failures_dir = Path("failures")
-                failures_dir.mkdir(exist_ok=True)
-                failures_file = failures_dir / f"{batch_id}_failures.json"
-                
-                with open(failures_file, 'w') as f:
-                    json.dump(failures_data, f, indent=2)
-                
-                logger.warning(f"⚠️  {len(failures)} failures saved to {failures_file}")
+            self._save_failures(failures, retailer, category, modesty_level, start_time)
             
             # Step 9: Notifications
             processing_time = (datetime.utcnow() - start_time).total_seconds()
@@ -914,11 +848,9 @@ class CatalogMonitor:
                 total_cost=total_cost
             )
             
-            # Cleanup Commercial API towers if used
-            if COMMERCIAL_API_AVAILABLE and self.commercial_catalog_tower:
-                await self.commercial_catalog_tower.cleanup()
-            if COMMERCIAL_API_AVAILABLE and self.commercial_product_tower:
-                await self.commercial_product_tower.cleanup()
+            # Cleanup Commercial API towers if used (forked runs leave them to the owner)
+            if self.owns_commercial_towers:
+                await self.cleanup()
             
             return MonitorResult(
                 success=True,
@@ -940,15 +872,327 @@ class CatalogMonitor:
             
             # Cleanup Commercial API towers if used
             try:
-                if COMMERCIAL_API_AVAILABLE and self.commercial_catalog_tower:
-                    await self.commercial_catalog_tower.cleanup()
-                if COMMERCIAL_API_AVAILABLE and self.commercial_product_tower:
-                    await self.commercial_product_tower.cleanup()
+                if self.owns_commercial_towers:
+                    await self.cleanup()
+            except:
+                pass  # Don't fail on cleanup errors
+            
+            return self._error_result(retailer, category, modesty_level, start_time, str(e))
+    
+    @traced_run('catalog_monitor')
+    async def monitor_catalog_stream(
+        self,
+        retailer: str,
+        category: str,
+        modesty_level: str,
+        custom_url: Optional[str] = None,
+        max_pages: int = 5
+    ) -> MonitorResult:
+        """
+        Monitor catalog for new products, processing the catalog as it streams in
+        
+        Same steps and result as monitor_catalog(), but the catalog tower's
+        stream_catalog() yields products per page / DOM chunk. Each chunk is
+        deduplicated and price-checked as soon as it arrives, and its new
+        products and suspected duplicates are handed to a re-extraction worker
+        that runs while later pages are still being fetched. The catalog
+        snapshot is saved once the whole catalog has been deduplicated, so
+        products on later pages never match this run's own snapshot rows.
+        
+        Args:
+            retailer: Retailer name
+            category: Product category
+            modesty_level: Modesty level to monitor
+            custom_url: Custom catalog URL (optional, single page)
+            max_pages: Maximum pages to scan for paginated retailers
+            
+        Returns:
+            MonitorResult
+        """
+        start_time = datetime.utcnow()
+        failures = []  # Track all failures for this run
+        set_log_context(retailer=retailer)
+        worker = None
+        
+        try:
+            logger.info("⚠️ PREREQUISITE CHECK: Product Updater should run before monitoring")
+            logger.info(f"📊 Monitoring catalog (streaming): {retailer}/{category}/{modesty_level}")
+            
+            # Step 1: Get catalog page URLs
+            if custom_url:
+                catalog_url = custom_url
+            else:
+                catalog_url = self._get_catalog_url(retailer, category, workflow='monitoring')
+                if not catalog_url:
+                    return self._error_result(
+                        retailer, category, modesty_level, start_time,
+                        f'No catalog URL configured for {retailer}/{category}'
+                    )
+            
+            page_urls = catalog_page_urls(catalog_url, retailer, category, max_pages, custom_url=bool(custom_url))
+            logger.info(f"   URL: {catalog_url} ({len(page_urls)} page(s))")
+            
+            # Step 2: Initialize towers
+            await self._initialize_towers()
+            
+            # Step 3: Stream catalog with appropriate tower
+            if COMMERCIAL_API_AVAILABLE and CommercialAPIConfig.should_use_commercial_api(retailer):
+                logger.info(f"🌐 Streaming {retailer} catalog via Commercial API Tower")
+                catalog_stream = self.commercial_catalog_tower.stream_catalog(
+                    page_urls, retailer, category, max_products=100
+                )
+                method_used = 'commercial_api'
+            else:
+                logger.info(f"🔄 Streaming {retailer} catalog via Patchright Tower (DOM extraction)")
+                catalog_stream = self.patchright_catalog_tower.stream_catalog(page_urls, retailer)
+                method_used = 'patchright'
+            
+            counts = {
+                'scanned': 0,
+                'new': 0,
+                'suspected_duplicate': 0,
+                'confirmed_existing': 0,
+                'price_changes': 0,
+                'sent_to_modesty': 0,
+                'sent_to_duplicate_review': 0
+            }
+            page_errors = []
+            seen_urls = set()
+            snapshot_products = []  # Saved after the last chunk is deduplicated
+            
+            # Bounded: a slow re-extraction worker throttles the catalog stream
+            work_queue = asyncio.Queue(maxsize=self.STREAM_WORK_QUEUE_SIZE)
+            worker = asyncio.create_task(self._stream_reextract_worker(
+                work_queue, retailer, category, modesty_level, counts, failures
+            ))
+            
+            async def hand_off(item):
+                # A dead worker never drains the queue: fail instead of blocking on put()
+                put = asyncio.ensure_future(work_queue.put(item))
+                done, _ = await asyncio.wait({put, worker}, return_when=asyncio.FIRST_COMPLETED)
+                if put not in done:
+                    put.cancel()
+                    worker.result()
+                    raise RuntimeError("Re-extraction worker stopped before the catalog stream ended")
+            
+            try:
+                async for chunk in catalog_stream:
+                    if chunk.error:
+                        logger.warning(f"⚠️ Catalog page {chunk.page} failed: {chunk.error}")
+                        page_errors.append(chunk.error)
+                        continue
+                    
+                    # Normalize field names and drop products already seen on earlier pages
+                    products = []
+                    for product in chunk.products:
+                        if 'url' in product and 'catalog_url' not in product:
+                            product['catalog_url'] = product['url']
+                        product_url = product.get('catalog_url')
+                        if product_url and product_url in seen_urls:
+                            continue
+                        if product_url:
+                            seen_urls.add(product_url)
+                        products.append(product)
+                    
+                    if not products:
+                        continue
+                    counts['scanned'] += len(products)
+                    
+                    # Step 4: Deduplication against DB (multi-level)
+                    dedup_results = await self._deduplicate_catalog_products(products, retailer, category)
+                    counts['new'] += len(dedup_results['new'])
+                    counts['suspected_duplicate'] += len(dedup_results['suspected_duplicate'])
+                    counts['confirmed_existing'] += len(dedup_results['confirmed_existing'])
+                    
+                    logger.info(
+                        f"📦 Page {chunk.page} chunk {chunk.chunk + 1}: {len(products)} products "
+                        f"(new {len(dedup_results['new'])}, suspected {len(dedup_results['suspected_duplicate'])}, "
+                        f"existing {len(dedup_results['confirmed_existing'])})"
+                    )
+                    
+                    # Step 4.6: Price changes for this chunk (snapshot deferred)
+                    snapshot_products.extend(products)
+                    counts['price_changes'] += await self._detect_price_changes(
+                        catalog_products=products,
+                        retailer=retailer
+                    )
+                    
+                    # Steps 5-6: Hand off to the re-extraction worker
+                    for product in dedup_results['new']:
+                        await hand_off(('new', product))
+                    for product in dedup_results['suspected_duplicate']:
+                        await hand_off(('suspected_duplicate', product))
+            finally:
+                await catalog_stream.aclose()
+            
+            # Step 4.5: Save catalog snapshot (ALL products, after dedup of every chunk)
+            await self._save_catalog_snapshot(
+                catalog_products=snapshot_products,
+                retailer=retailer,
+                category=category,
+                modesty_level=modesty_level
+            )
+            
+            await hand_off(None)
+            await worker
+            
+            if counts['scanned'] == 0 and page_errors:
+                return self._error_result(
+                    retailer, category, modesty_level, start_time,
+                    str(page_errors)
+                )
+            
+            logger.info(f"📦 Scanned {counts['scanned']} products from catalog")
+            logger.info("🔍 Deduplication results:")
+            logger.info(f"   New: {counts['new']}")
+            logger.info(f"   Suspected duplicates: {counts['suspected_duplicate']}")
+            logger.info(f"   Confirmed existing: {counts['confirmed_existing']}")
+            
+            # Step 7: Record monitoring run
+            await self.db_manager.record_monitoring_run(
+                retailer=retailer,
+                category=category,
+                modesty_level=modesty_level,
+                products_scanned=counts['scanned'],
+                new_found=counts['new'],
+                duplicates=counts['suspected_duplicate'],
+                run_time=datetime.utcnow()
+            )
+            
+            # Step 8: Save failures if any
+            self._save_failures(failures, retailer, category, modesty_level, start_time)
+            
+            # Step 9: Notifications
+            processing_time = (datetime.utcnow() - start_time).total_seconds()
+            total_cost = cost_tracker.get_session_cost()
+            
+            await self.notification_manager.send_monitoring_summary(
+                retailer=retailer,
+                category=category,
+                modesty_level=modesty_level,
+                products_scanned=counts['scanned'],
+                new_found=counts['new'],
+                suspected_duplicates=counts['suspected_duplicate'],
+                processing_time=processing_time,
+                total_cost=total_cost
+            )
+            
+            # Cleanup Commercial API towers if used (forked runs leave them to the owner)
+            if self.owns_commercial_towers:
+                await self.cleanup()
+            
+            return MonitorResult(
+                success=True,
+                retailer=retailer,
+                category=category,
+                modesty_level=modesty_level,
+                products_scanned=counts['scanned'],
+                new_products_found=counts['new'],
+                suspected_duplicates=counts['suspected_duplicate'],
+                confirmed_existing=counts['confirmed_existing'],
+                sent_to_modesty_review=counts['sent_to_modesty'],
+                sent_to_duplicate_review=counts['sent_to_duplicate_review'],
+                processing_time=processing_time,
+                method_used=method_used
+            )
+            
+        except Exception as e:
+            logger.error(f"Catalog monitoring failed: {e}")
+            
+            if worker and not worker.done():
+                worker.cancel()
+            
+            # Cleanup Commercial API towers if used
+            try:
+                if self.owns_commercial_towers:
+                    await self.cleanup()
             except:
                 pass  # Don't fail on cleanup errors
             
             return self._error_result(retailer, category, modesty_level, start_time, str(e))
     
+    async def _stream_reextract_worker(
+        self,
+        work_queue: asyncio.Queue,
+        retailer: str,
+        category: str,
+        modesty_level: str,
+        counts: Dict[str, int],
+        failures: List[Dict]
+    ):
+        """
+        Re-extract, upload and queue for assessment the products handed over
+        by monitor_catalog_stream() until it sends None
+        
+        Same per-product flow as monitor_catalog() steps 5-6: one draft upload
+        in flight while the next product is extracted. Assessment batches are
+        flushed every ASSESSMENT_BATCH_SIZE products.
+        """
+        queues = {'new': [], 'suspected_duplicate': []}
+        pending_upload = None
+        
+        async def flush(product_type):
+            batch = queues[product_type]
+            queues[product_type] = []
+            if product_type == 'new':
+                await self._send_to_modesty_assessment(batch, retailer, category, modesty_level)
+            else:
+                await self._send_to_duplicate_assessment(batch, retailer, category)
+        
+        async def finish_upload(upload):
+            product_type, full_product, product, product_url, upload_task = upload
+            if self._apply_draft_upload(
+                full_product, product, product_url, await upload_task, product_type, retailer, failures
+            ):
+                queues[product_type].append(full_product)
+                counts['sent_to_modesty' if product_type == 'new' else 'sent_to_duplicate_review'] += 1
+                if len(queues[product_type]) >= self.ASSESSMENT_BATCH_SIZE:
+                    await flush(product_type)
+        
+        try:
+            while True:
+                item = await work_queue.get()
+                if item is None:
+                    break
+                
+                product_type, product = item
+                product_url = product.get('url') or product.get('catalog_url')
+                if not product_url:
+                    logger.warning(f"Product missing URL, skipping: {product}")
+                    continue
+                
+                # A failing product must not stop the worker (the stream would block on a full queue)
+                try:
+                    full_product = await self._reextract_catalog_product(
+                        product, product_url, product_type, retailer, category, failures
+                    )
+                    
+                    if full_product and not (product_type == 'new' and await self._divert_filtered_product(full_product, retailer)):
+                        if pending_upload:
+                            upload, pending_upload = pending_upload, None
+                            await finish_upload(upload)
+                        pending_upload = (
+                            product_type,
+                            full_product,
+                            product,
+                            product_url,
+                            asyncio.create_task(self._upload_to_shopify_as_draft(full_product, retailer, category))
+                        )
+                except Exception as e:
+                    logger.error(f"Streaming re-extraction failed for {product_url}: {e}")
+                
+                # Respectful delay
+                await asyncio.sleep(0.5)
+        finally:
+            # Queue everything already uploaded, even if the worker failed part-way
+            try:
+                if pending_upload:
+                    await finish_upload(pending_upload)
+            finally:
+                await flush('new')
+                await flush('suspected_duplicate')
+    
+    @traced('dedup')
     async def _deduplicate_catalog_products(
         self,
         catalog_products: List[Dict],
@@ -982,6 +1226,11 @@ class CatalogMonitor:
         for product in catalog_products:
             match_result = await self._find_matching_product(product, retailer, category)
             
+            sampled_logger.debug(
+                f"🔍 Dedup: {(product.get('url') or product.get('catalog_url') or '')[:60]} → "
+                f"{match_result['status']} ({match_result['match_method']})"
+            )
+            
             if match_result['status'] == 'confirmed_new':
                 results['new'].append(product)
             elif match_result['status'] == 'suspected_duplicate':
@@ -1210,13 +1459,44 @@ class CatalogMonitor:
         return None
     
     async def _check_image_url_match(self, product: Dict, retailer: str) -> Optional[Dict]:
-        """Check for image URL match"""
+        """
+        Check for image match
+        
+        1. Canonical image URL (size/quality params stripped) in the fingerprint index
+        2. Perceptual hash of the first image (Hamming distance, multi-index hashing)
+        3. Image URL substring in the products table
+        """
         images = product.get('images', [])
         if not images:
             return None
         
         # Check first image
         first_image = images[0] if isinstance(images, list) else images
+        if not first_image:
+            return None
+        
+        if self.fingerprint_index:
+            try:
+                product_url = self.fingerprint_index.find_by_image_url(retailer, first_image)
+                if product_url:
+                    existing = await self.db_manager.find_product_by_url(product_url, retailer)
+                    if existing:
+                        return {'confidence': 0.95, 'product': existing}
+                
+                if self.IMAGE_FINGERPRINT_LOOKUP:
+                    fingerprint = await self._get_image_processor().fingerprint_url(first_image, retailer)
+                    if fingerprint is not None:
+                        matches = self.fingerprint_index.find_similar(
+                            retailer, fingerprint, exclude_product_url=product.get('url')
+                        )
+                        for match in matches:
+                            existing = await self.db_manager.find_product_by_url(match['product_url'], retailer)
+                            if existing:
+                                # 0 bits → 0.95, MATCH_DISTANCE bits → 0.90
+                                confidence = 0.95 - 0.05 * match['distance'] / self.fingerprint_index.MATCH_DISTANCE
+                                return {'confidence': confidence, 'product': existing}
+            except Exception as e:
+                logger.debug(f"Image fingerprint lookup failed: {e}")
         
         # Check main products table
         existing = await self.db_manager.find_product_by_image(first_image, retailer)
@@ -1225,6 +1505,12 @@ class CatalogMonitor:
         
         return None
     
+    def _get_image_processor(self):
+        if self._image_processor is None:
+            from image_processor import ImageProcessor
+            self._image_processor = ImageProcessor()
+        return self._image_processor
+    
     def _normalize_clothing_type(self, raw_type: str) -> str:
         """
         Normalize clothing type names to standard format
@@ -1402,12 +1688,11 @@ class CatalogMonitor:
         """
         try:
             from shopify_manager import ShopifyManager
-            from image_processor import ImageProcessor
             
             shopify = ShopifyManager()
-            image_proc = ImageProcessor()
+            image_proc = self._get_image_processor()
             
-            # Process images (download from retailer URLs)
+            # Process images (download from retailer URLs, kept in memory)
             image_urls = product.get('image_urls', [])
             downloaded_images = []
             
@@ -1416,7 +1701,9 @@ class CatalogMonitor:
                 downloaded_images = await image_proc.process_images(
                     image_urls=image_urls,
                     retailer=retailer,
-                    product_title=product.get('title', 'Product')
+                    product_title=product.get('title', 'Product'),
+                    product_url=product.get('url'),
+                    in_memory=True
                 )
                 logger.info(f"✅ Downloaded {len(downloaded_images)} images")
             
@@ -1523,41 +1810,256 @@ class CatalogMonitor:
     
     async def _send_to_modesty_assessment(
         self,
-        product: Dict,
+        products: List[Dict],
         retailer: str,
         category: str,
         modesty_level: str
     ):
-        """Send product to Assessment Pipeline for MODESTY review"""
-        await self.assessment_queue.add_to_queue(
-            product=product,
+        """Send products to Assessment Pipeline for MODESTY review (one batch)"""
+        await self._queue_for_assessment(
+            products,
             retailer=retailer,
             category=category,
             review_type='modesty',
-            priority='normal',
-            source_workflow='catalog_monitor'
+            priority='normal'
         )
-        logger.debug(f"Sent to modesty assessment: {product.get('title', 'N/A')}")
     
     async def _send_to_duplicate_assessment(
         self,
-        product: Dict,
+        products: List[Dict],
         retailer: str,
         category: str
     ):
-        """Send product to Assessment Pipeline for DUPLICATION review"""
-        suspected_match = product.get('suspected_match')
-        
-        await self.assessment_queue.add_to_queue(
-            product=product,
+        """Send products to Assessment Pipeline for DUPLICATION review (one batch)"""
+        await self._queue_for_assessment(
+            products,
             retailer=retailer,
             category=category,
             review_type='duplication',
             priority='low',
-            source_workflow='catalog_monitor',
-            suspected_match=suspected_match
+            suspected_matches=[product.get('suspected_match') for product in products]
         )
-        logger.debug(f"Sent to duplication assessment: {product.get('title', 'N/A')}")
+    
+    async def _queue_for_assessment(
+        self,
+        products: List[Dict],
+        retailer: str,
+        category: str,
+        review_type: str,
+        priority: str,
+        suspected_matches: Optional[List[Optional[Dict]]] = None
+    ):
+        """
+        Queue a batch with add_many; if the batch fails, queue one product at a
+        time so a single bad row only loses itself (never raises)
+        """
+        if not products:
+            return
+        
+        try:
+            await self.assessment_queue.add_many(
+                products,
+                retailer=retailer,
+                category=category,
+                review_type=review_type,
+                priority=priority,
+                source_workflow='catalog_monitor',
+                suspected_matches=suspected_matches
+            )
+            logger.debug(f"Sent {len(products)} product(s) to {review_type} assessment")
+            return
+        except Exception as e:
+            logger.warning(f"⚠️ Batch {review_type} queueing failed ({e}), queueing {len(products)} product(s) one at a time")
+        
+        for index, product in enumerate(products):
+            try:
+                await self.assessment_queue.add_to_queue(
+                    product=product,
+                    retailer=retailer,
+                    category=category,
+                    review_type=review_type,
+                    priority=priority,
+                    source_workflow='catalog_monitor',
+                    suspected_match=suspected_matches[index] if suspected_matches else None
+                )
+            except Exception as e:
+                logger.error(f"❌ Could not queue {product.get('url', 'N/A')} for {review_type} assessment: {e}")
+    
+    async def _reextract_catalog_product(
+        self,
+        product: Dict,
+        product_url: str,
+        product_type: str,
+        retailer: str,
+        category: str,
+        failures: List[Dict]
+    ) -> Optional[Dict]:
+        """
+        Re-extract a catalog product with the SINGLE product extractor
+        
+        Use Markdown for retailers that support it (fast & cheap), Patchright
+        for others. Extraction failures are appended to `failures`.
+        
+        Returns:
+            Full product dict with url/catalog_url set, or None if extraction failed
+        """
+        single_product_method = 'markdown' if retailer in MARKDOWN_SINGLE_PRODUCT_RETAILERS else 'patchright'
+        full_product = await self._extract_single_product(
+            product_url,
+            retailer,
+            single_product_method,
+            category  # Pass category for override logic
+        )
+        
+        # Check if extraction failed (returns dict with _extraction_error key)
+        if full_product and '_extraction_error' in full_product:
+            # Track extraction failure with full error details
+            failure = {
+                'url': product_url,
+                'reason': full_product['_extraction_error'],
+                'stage': 'extraction',
+                'product_type': product_type,
+                'method_attempted': full_product.get('_method_used', single_product_method)
+            }
+            if product_type == 'suspected_duplicate':
+                failure['suspected_match'] = product.get('suspected_match', {}).get('url') if product.get('suspected_match') else None
+            failure['attempted_at'] = datetime.utcnow().isoformat()
+            failure['certainty'] = 'known_error' if 'Unknown' not in full_product['_extraction_error'] else 'uncertain'
+            failures.append(failure)
+            return None
+        elif not full_product:
+            # Unexpected None return (shouldn't happen with new code, but handle it)
+            failures.append({
+                'url': product_url,
+                'reason': 'Product extraction returned None unexpectedly - possible unhandled exception in extractor',
+                'stage': 'extraction',
+                'product_type': product_type,
+                'method_attempted': single_product_method,
+                'attempted_at': datetime.utcnow().isoformat(),
+                'certainty': 'uncertain'
+            })
+            return None
+        
+        # Add source URL (extractor doesn't include it)
+        full_product['url'] = product_url
+        full_product['catalog_url'] = product_url  # For consistency
+        return full_product
+    
+    async def _divert_filtered_product(self, full_product: Dict, retailer: str) -> bool:
+        """
+        Retailer-specific filtering before assessment
+        
+        Returns True when the product was uploaded directly as a non-assessed
+        draft and must not go to the assessment pipeline.
+        """
+        # MANGO-SPECIFIC FILTERING
+        if retailer.lower() == 'mango':
+            clothing_type = full_product.get('clothing_type', 'other')
+            
+            # Only allow dress, top, and dress_top to assessment pipeline
+            if clothing_type not in ['dress', 'top', 'dress_top']:
+                logger.info(f"⏭️ Skipping {clothing_type} (Mango filter): {full_product.get('title', 'N/A')}")
+                
+                # Upload to Shopify as draft (unpublished)
+                await self._upload_non_assessed_product(
+                    full_product,
+                    retailer,
+                    status='draft'
+                )
+                return True
+        
+        return False
+    
+    def _apply_draft_upload(
+        self,
+        full_product: Dict,
+        product: Dict,
+        product_url: str,
+        shopify_result: Dict,
+        product_type: str,
+        retailer: str,
+        failures: List[Dict]
+    ) -> bool:
+        """
+        Attach the Shopify draft upload result to a re-extracted product
+        
+        Returns True if the upload succeeded and the product can be queued for
+        assessment; upload failures are appended to `failures`.
+        """
+        if shopify_result['success']:
+            # Add Shopify data to product for assessment queue
+            full_product['shopify_id'] = shopify_result['shopify_id']
+            full_product['shopify_image_urls'] = shopify_result['shopify_image_urls']
+            full_product['shopify_status'] = 'draft'
+            
+            if product_type == 'suspected_duplicate':
+                # Preserve suspected match data from deduplication
+                full_product['suspected_match'] = product.get('suspected_match')
+                full_product['confidence_score'] = product.get('confidence_score')
+            return True
+        
+        # Track Shopify upload failure with full error details
+        shopify_error = shopify_result.get('error', 'Unknown error - no error details provided by Shopify')
+        failure = {
+            'url': product_url,
+            'reason': f"Shopify upload failed: {shopify_error}",
+            'stage': 'shopify_upload',
+            'product_type': product_type,
+            'product_title': full_product.get('title', 'Unknown')
+        }
+        if product_type == 'suspected_duplicate':
+            failure['suspected_match'] = product.get('suspected_match', {}).get('url') if product.get('suspected_match') else None
+        failure.update({
+            'retailer': retailer,
+            'attempted_at': datetime.utcnow().isoformat(),
+            'certainty': 'known_error' if 'Unknown' not in shopify_error else 'uncertain',
+            'shopify_status_code': shopify_result.get('status_code') if 'status_code' in shopify_result else None
+        })
+        failures.append(failure)
+        
+        if product_type == 'suspected_duplicate':
+            logger.error(f"❌ Skipping duplicate assessment - Shopify upload failed for {full_product.get('title')}")
+        else:
+            logger.error(f"❌ Skipping assessment for {full_product.get('title')} - Shopify upload failed")
+        return False
+    
+    def _save_failures(
+        self,
+        failures: List[Dict],
+        retailer: str,
+        category: str,
+        modesty_level: str,
+        start_time: datetime
+    ):
+        """Write this run's failures to failures/<batch_id>_failures.json"""
+        if not failures:
+            return
+        
+        from pathlib import Path
+        
+        # Create batch ID
+        batch_id = f"catalog_monitor_{retailer}_{category}_{modesty_level}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+        
+        failures_data = {
+            'batch_id': batch_id,
+            'workflow': 'catalog_monitor',
+            'retailer': retailer,
+            'category': category,
+            'modesty_level': modesty_level,
+            'run_date': start_time.isoformat(),
+            'total_failed': len(failures),
+            'failures': failures
+        }
+        
+        # Save to failures folder
+        failures_dir = Path("failures")
+        failures_dir.mkdir(exist_ok=True)
+        failures_file = failures_dir / f"{batch_id}_failures.json"
+        
+        with open(failures_file, 'w') as f:
+            json.dump(failures_data, f, indent=2)
+        
+        logger.warning(f"⚠️  {len(failures)} failures saved to {failures_file}")
     
     def _normalize_url(self, url: str) -> str:
         """Normalize URL by removing query parameters"""
@@ -1631,6 +2133,35 @@ class CatalogMonitor:
         
         logger.debug("All towers initialized")
     
+    def fork(self) -> 'CatalogMonitor':
+        """
+        Run-scoped monitor for concurrent runs (see catalog_monitor_scheduler)
+        
+        Shares this monitor's DB manager, assessment queue, notifications,
+        fingerprint index, pattern learner, image processor and Markdown /
+        Commercial API towers. Patchright towers keep per-run browser state, so
+        each fork gets its own. Call _initialize_towers() on this monitor before
+        forking; cleanup() on this monitor closes everything shared.
+        """
+        # Created here so forks share one fingerprint session, closed by cleanup()
+        self._get_image_processor()
+        
+        run = CatalogMonitor.__new__(CatalogMonitor)
+        run.__dict__.update(self.__dict__)
+        run.patchright_catalog_tower = None
+        run.patchright_product_tower = None
+        run.owns_commercial_towers = False
+        return run
+    
+    async def cleanup(self):
+        """Close Commercial API tower clients and log their stats"""
+        if COMMERCIAL_API_AVAILABLE and self.commercial_catalog_tower:
+            await self.commercial_catalog_tower.cleanup()
+        if COMMERCIAL_API_AVAILABLE and self.commercial_product_tower:
+            await self.commercial_product_tower.cleanup()
+        if self._image_processor is not None:
+            await self._image_processor.close()
+    
     def _error_result(
         self,
         retailer: str,
@@ -1668,6 +2199,13 @@ async def main():
     parser.add_argument('modesty_level', help='Modesty level to monitor')
     parser.add_argument('--url', help='Custom catalog URL')
     parser.add_argument('--max-pages', type=int, default=5, help='Maximum pages to scan')
+    parser.add_argument('--stream', action='store_true',
+                        help='Process catalog pages as they are extracted (dedup/re-extract while fetching)')
+    parser.add_argument('--metrics-port', type=int, help='Serve live Prometheus metrics on this port')
+    parser.add_argument('--diagnose-loop', action='store_true',
+                        help='Detect event-loop stalls and write a blocking call-site report')
+    parser.add_argument('--profile', action='store_true',
+                        help='Sample CPU and allocations per retailer/stage into profiles/')
     
     args = parser.parse_args()
     
@@ -1675,13 +2213,25 @@ async def main():
     print("   This prevents false positives from URL/product code changes.\n")
     
     monitor = CatalogMonitor()
-    result = await monitor.monitor_catalog(
-        retailer=args.retailer,
-        category=args.category,
-        modesty_level=args.modesty_level,
-        custom_url=args.url,
-        max_pages=args.max_pages
-    )
+    metrics_server = await start_metrics_server(args.metrics_port)
+    diagnostics = start_loop_diagnostics('catalog_monitor', enabled=args.diagnose_loop)
+    profiler = start_profiler('catalog_monitor', enabled=args.profile)
+    try:
+        monitor_fn = monitor.monitor_catalog_stream if args.stream else monitor.monitor_catalog
+        result = await monitor_fn(
+            retailer=args.retailer,
+            category=args.category,
+            modesty_level=args.modesty_level,
+            custom_url=args.url,
+            max_pages=args.max_pages
+        )
+    finally:
+        if profiler:
+            profiler.stop()
+        if diagnostics:
+            await diagnostics.stop()
+        if metrics_server:
+            await metrics_server.stop()
     
     # Sync database to web server if products were added to assessment queue
     if result.sent_to_modesty_review > 0 or result.sent_to_duplicate_review > 0:
@@ -0,0 +1,539 @@
+"""
+Catalog Monitor Scheduler
+Runs the catalog monitor across the whole retailer matrix concurrently
+
+Replaces:
+- Launching catalog_monitor.py once per retailer/category/modesty level
+
+Keeps:
+- CatalogMonitor.monitor_catalog / monitor_catalog_stream per run (unchanged)
+- One set of DB, assessment queue, notification and Commercial API resources
+
+Adds:
+- Per-tower and per-retailer concurrency caps
+- ZenRows credit budget gating Commercial API runs
+- Priority by time since the catalog last changed
+"""
+
+# Add paths for imports
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), "../Shared"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "../Extraction/Markdown"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "../Extraction/Patchright"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "../Extraction/CommercialAPI"))
+
+import asyncio
+import json
+from typing import List, Dict, Optional
+from datetime import datetime
+from dataclasses import dataclass, field
+
+from logger_config import setup_logging
+from metrics_server import metrics, start_metrics_server
+from loop_diagnostics import start_loop_diagnostics
+from sampling_profiler import start_profiler
+from pagination_url_helper import PAGINATED_RETAILERS, PAGINATION_URLS
+from catalog_stream import catalog_page_urls
+from database_sync import sync_database_async
+
+import catalog_monitor
+from catalog_monitor import CatalogMonitor, MonitorResult, CATALOG_URLS
+
+logger = setup_logging(__name__)
+
+RETAILER_CONFIG_PATH = os.path.join(os.path.dirname(__file__), '../Knowledge/RETAILER_CONFIG.json')
+
+DEFAULT_MODESTY_LEVELS = ['modest', 'moderately_modest']
+
+
+@dataclass
+class MonitorJob:
+    """One catalog monitoring run (retailer/category, labelled with a modesty level)"""
+    retailer: str
+    category: str
+    modesty_level: str
+    tower: str                          # 'commercial_api' or 'patchright'
+    pages: int = 1
+    last_change: Optional[datetime] = None
+    estimated_credits: int = 0
+    status: str = 'pending'             # pending, running, completed, failed, skipped_budget
+    result: Optional[MonitorResult] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.retailer}/{self.category}/{self.modesty_level}"
+
+
+@dataclass
+class SchedulerResult:
+    """Result of one scheduler pass over the retailer matrix"""
+    jobs: List[MonitorJob]
+    processing_time: float
+    credits_used: int
+    credit_budget: Optional[int]
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def sent_to_review(self) -> int:
+        return sum(
+            job.result.sent_to_modesty_review + job.result.sent_to_duplicate_review
+            for job in self.jobs if job.result
+        )
+
+
+class CatalogMonitorScheduler:
+    """
+    Runs CatalogMonitor for every retailer × category × modesty level at once
+
+    Features:
+    - Retailer matrix from Knowledge/RETAILER_CONFIG.json (catalog_urls) plus
+      pagination_url_helper, limited to combinations the monitor has a URL for
+    - Global, per-tower and per-retailer concurrency caps. Runs of the same
+      retailer default to one at a time: they dedup against the same catalog
+      rows and hit the same anti-bot protection
+    - ZenRows credit budget: a Commercial API run only starts if the credits
+      used so far, plus the estimates of running jobs, plus its own estimate
+      fit the budget. Runs that can never fit are skipped, not failed
+    - Priority: catalogs whose last new product is oldest (or never seen) go
+      first; a job blocked by a cap does not hold back other retailers
+    - One base CatalogMonitor owns the DB manager, assessment queue,
+      notifications and Commercial API towers; each run is a fork() of it
+      with its own Patchright browser state
+
+    Usage:
+        scheduler = CatalogMonitorScheduler(credit_budget=5000)
+        result = await scheduler.run(scheduler.build_jobs())
+    """
+
+    MAX_CONCURRENT_RUNS = int(os.getenv('SCHEDULER_MAX_CONCURRENT', '6'))
+
+    # Patchright runs each hold a browser; Commercial API runs share one client
+    TOWER_CONCURRENCY = {
+        'patchright': int(os.getenv('SCHEDULER_PATCHRIGHT_CONCURRENCY', '3')),
+        'commercial_api': int(os.getenv('SCHEDULER_COMMERCIAL_CONCURRENCY', '4'))
+    }
+
+    RETAILER_CONCURRENCY = int(os.getenv('SCHEDULER_RETAILER_CONCURRENCY', '1'))
+
+    # Re-extractions reserved per Commercial API run on top of its catalog pages
+    ESTIMATED_PRODUCT_FETCHES_PER_RUN = 20
+
+    def __init__(
+        self,
+        credit_budget: Optional[int] = None,
+        max_pages: int = 5,
+        streaming: bool = False,
+        max_concurrent: Optional[int] = None,
+        tower_concurrency: Optional[Dict[str, int]] = None,
+        retailer_concurrency: Optional[int] = None
+    ):
+        self.monitor = CatalogMonitor()
+        self.credit_budget = credit_budget
+        self.max_pages = max_pages
+        self.streaming = streaming
+        self.max_concurrent = max_concurrent or self.MAX_CONCURRENT_RUNS
+        self.tower_concurrency = {**self.TOWER_CONCURRENCY, **(tower_concurrency or {})}
+        self.retailer_concurrency = retailer_concurrency or self.RETAILER_CONCURRENCY
+
+        self.retailer_config = self._load_retailer_config()
+
+        self._jobs: List[MonitorJob] = []
+        self._credit_baseline = 0
+
+        metrics.register_collector('catalog_monitor_scheduler', self._collect_metrics)
+
+        logger.info(
+            f"✅ Catalog Monitor Scheduler initialized "
+            f"(max {self.max_concurrent} runs, towers {self.tower_concurrency}, "
+            f"{self.retailer_concurrency}/retailer, budget "
+            f"{self.credit_budget if self.credit_budget is not None else 'unlimited'} credits)"
+        )
+
+    def _load_retailer_config(self) -> Dict[str, Dict]:
+        try:
+            with open(RETAILER_CONFIG_PATH, 'r') as f:
+                return json.load(f).get('retailers', {})
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load RETAILER_CONFIG.json, using monitor catalog URLs: {e}")
+            return {}
+
+    # =================== JOB MATRIX ===================
+
+    def retailer_matrix(self, retailers: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """
+        Retailer → categories to monitor
+
+        Categories come from RETAILER_CONFIG.json catalog_urls and the
+        pagination helper; only combinations the monitor has a catalog URL
+        for are kept.
+        """
+        names = retailers or sorted(set(self.retailer_config) | set(CATALOG_URLS))
+        matrix = {}
+        for retailer in names:
+            retailer = retailer.lower()
+            config = self.retailer_config.get(retailer, {})
+            if config.get('monitoring_frequency') == 'never':
+                continue
+
+            categories = set(config.get('catalog_urls', {}))
+            if retailer in PAGINATED_RETAILERS:
+                categories |= set(PAGINATION_URLS.get(retailer, {}))
+            categories |= set(CATALOG_URLS.get(retailer, {}))
+
+            categories = sorted(c for c in categories if self.monitor._get_catalog_url(retailer, c))
+            if categories:
+                matrix[retailer] = categories
+            else:
+                logger.warning(f"⚠️ No catalog URLs for {retailer}, skipping")
+        return matrix
+
+    def _tower_for(self, retailer: str) -> str:
+        if catalog_monitor.COMMERCIAL_API_AVAILABLE and \
+                catalog_monitor.CommercialAPIConfig.should_use_commercial_api(retailer):
+            return 'commercial_api'
+        return 'patchright'
+
+    def _credits_per_request(self) -> int:
+        if not catalog_monitor.COMMERCIAL_API_AVAILABLE:
+            return 0
+        config = catalog_monitor.CommercialAPIConfig
+        if config.ACTIVE_PROVIDER.lower() != 'zenrows':
+            return 0
+        return config.ZENROWS_CREDITS_PER_REQUEST
+
+    def build_jobs(
+        self,
+        retailers: Optional[List[str]] = None,
+        categories: Optional[List[str]] = None,
+        modesty_levels: Optional[List[str]] = None
+    ) -> List[MonitorJob]:
+        """
+        Jobs for the retailer matrix (unprioritised; run() orders them)
+
+        Catalog URLs do not depend on the modesty level (modesty is reviewed
+        per product), so each catalog is scanned by one job, labelled with
+        the first modesty level. Categories that resolve to the same catalog
+        pages (Mango's monitoring URL) are scanned once as well.
+        """
+        levels = modesty_levels or DEFAULT_MODESTY_LEVELS
+        if len(levels) > 1:
+            logger.info(f"🔁 Modesty levels {', '.join(levels)} share catalog URLs: scanning once as '{levels[0]}'")
+
+        jobs = []
+        scanned: Dict[tuple, MonitorJob] = {}
+        for retailer, retailer_categories in self.retailer_matrix(retailers).items():
+            tower = self._tower_for(retailer)
+            for category in retailer_categories:
+                if categories and category not in categories:
+                    continue
+
+                catalog_url = self.monitor._get_catalog_url(retailer, category)
+                page_urls = catalog_page_urls(catalog_url, retailer, category, self.max_pages)
+                scan_key = (retailer, tuple(page_urls))
+                if scan_key in scanned:
+                    logger.info(f"🔁 {retailer}/{category} scans the same catalog as {scanned[scan_key].key}, skipping")
+                    continue
+
+                pages = len(page_urls) if self.streaming else 1
+
+                estimated_credits = 0
+                if tower == 'commercial_api':
+                    estimated_credits = (pages + self.ESTIMATED_PRODUCT_FETCHES_PER_RUN) * self._credits_per_request()
+
+                job = MonitorJob(
+                    retailer=retailer,
+                    category=category,
+                    modesty_level=levels[0],
+                    tower=tower,
+                    pages=pages,
+                    estimated_credits=estimated_credits
+                )
+                scanned[scan_key] = job
+                jobs.append(job)
+        return jobs
+
+    async def prioritize(self, jobs: List[MonitorJob]) -> List[MonitorJob]:
+        """Oldest last change first; catalogs with no history go to the front"""
+        last_changes = {}
+        for job in jobs:
+            key = (job.retailer, job.category)
+            if key not in last_changes:
+                last_changes[key] = await self.monitor.db_manager.get_catalog_last_change(*key)
+            job.last_change = last_changes[key]
+
+        return sorted(jobs, key=lambda job: (job.last_change is not None, job.last_change or datetime.min))
+
+    # =================== CREDIT BUDGET ===================
+
+    def credits_used(self) -> int:
+        """ZenRows credits spent by the shared Commercial API clients this run"""
+        return self._commercial_requests() * self._credits_per_request() - self._credit_baseline
+
+    def _commercial_requests(self) -> int:
+        requests = 0
+        for tower in (self.monitor.commercial_catalog_tower, self.monitor.commercial_product_tower):
+            client = getattr(tower, 'api_client', None) if tower else None
+            requests += getattr(client, 'total_requests', 0) if client else 0
+        return requests
+
+    def _fits_budget(self, job: MonitorJob, reserved: int) -> bool:
+        if self.credit_budget is None or job.estimated_credits == 0:
+            return True
+        return self.credits_used() + reserved + job.estimated_credits <= self.credit_budget
+
+    # =================== SCHEDULING ===================
+
+    def _next_runnable(
+        self,
+        pending: List[MonitorJob],
+        running: List[MonitorJob]
+    ) -> Optional[MonitorJob]:
+        """Highest-priority pending job whose caps and budget allow it to start"""
+        reserved = sum(job.estimated_credits for job in running)
+        for job in pending:
+            if sum(1 for r in running if r.tower == job.tower) >= self.tower_concurrency.get(job.tower, 1):
+                continue
+            if sum(1 for r in running if r.retailer == job.retailer) >= self.retailer_concurrency:
+                continue
+            if not self._fits_budget(job, reserved):
+                continue
+            return job
+        return None
+
+    async def _run_job(self, job: MonitorJob) -> MonitorJob:
+        run_monitor = self.monitor.fork()
+        monitor_fn = run_monitor.monitor_catalog_stream if self.streaming else run_monitor.monitor_catalog
+
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        logger.info(f"▶️ Starting {job.key} ({job.tower})")
+
+        try:
+            job.result = await monitor_fn(
+                retailer=job.retailer,
+                category=job.category,
+                modesty_level=job.modesty_level,
+                max_pages=self.max_pages
+            )
+            job.status = 'completed' if job.result.success else 'failed'
+        except Exception as e:
+            logger.error(f"❌ {job.key} crashed: {e}")
+            job.status = 'failed'
+        finally:
+            job.finished_at = datetime.utcnow()
+            # Patchright towers are per fork; close anything a failed run left open
+            for tower in (run_monitor.patchright_catalog_tower, run_monitor.patchright_product_tower):
+                cleanup = getattr(tower, '_cleanup', None) if tower else None
+                if cleanup:
+                    try:
+                        await cleanup()
+                    except Exception:
+                        pass
+
+        elapsed = (job.finished_at - job.started_at).total_seconds()
+        if job.result and job.result.success:
+            logger.info(
+                f"✅ {job.key}: {job.result.new_products_found} new, "
+                f"{job.result.suspected_duplicates} suspected ({elapsed:.1f}s)"
+            )
+        else:
+            error = job.result.error if job.result else 'crashed'
+            logger.warning(f"⚠️ {job.key} failed after {elapsed:.1f}s: {error}")
+        return job
+
+    async def run(self, jobs: List[MonitorJob]) -> SchedulerResult:
+        """
+        Run jobs concurrently under the caps and budget
+
+        Returns:
+            SchedulerResult with every job's status and MonitorResult
+        """
+        start_time = datetime.utcnow()
+
+        await self.monitor._initialize_towers()
+        self._credit_baseline = self._commercial_requests() * self._credits_per_request()
+
+        pending = await self.prioritize(jobs)
+        self._jobs = list(pending)
+        running: Dict[asyncio.Task, MonitorJob] = {}
+
+        logger.info(f"🗓️ Scheduling {len(pending)} monitor runs:")
+        for job in pending:
+            last = job.last_change.strftime('%Y-%m-%d %H:%M') if job.last_change else 'never'
+            logger.info(f"   {job.key:<45} {job.tower:<15} last change: {last}")
+
+        try:
+            while pending or running:
+                while len(running) < self.max_concurrent:
+                    job = self._next_runnable(pending, list(running.values()))
+                    if not job:
+                        break
+                    pending.remove(job)
+                    running[asyncio.create_task(self._run_job(job))] = job
+
+                if not running:
+                    # Nothing can start and nothing will free capacity: the budget is spent
+                    for job in pending:
+                        job.status = 'skipped_budget'
+                        logger.warning(
+                            f"💸 Skipping {job.key}: needs ~{job.estimated_credits} credits, "
+                            f"{self.credits_used()}/{self.credit_budget} used"
+                        )
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    running.pop(task)
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            await self.monitor.cleanup()
+
+        counts = {}
+        for job in self._jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+
+        result = SchedulerResult(
+            jobs=self._jobs,
+            processing_time=(datetime.utcnow() - start_time).total_seconds(),
+            credits_used=self.credits_used(),
+            credit_budget=self.credit_budget,
+            counts=counts
+        )
+        self._log_summary(result)
+        return result
+
+    def _log_summary(self, result: SchedulerResult):
+        logger.info("=" * 60)
+        logger.info(f"🗓️ SCHEDULER SUMMARY ({result.processing_time:.1f}s)")
+        logger.info("=" * 60)
+        for job in result.jobs:
+            elapsed = (job.finished_at - job.started_at).total_seconds() if job.finished_at and job.started_at else 0
+            new_found = job.result.new_products_found if job.result else 0
+            logger.info(f"   {job.key:<45} {job.status:<15} {new_found:>4} new {elapsed:>8.1f}s")
+        logger.info(f"   Jobs: {result.counts}")
+        if result.credit_budget is not None:
+            logger.info(f"   ZenRows credits: {result.credits_used}/{result.credit_budget}")
+
+    def _collect_metrics(self):
+        states = {}
+        for job in self._jobs:
+            states[job.status] = states.get(job.status, 0) + 1
+        for state, count in states.items():
+            yield 'smf_scheduler_jobs', {'state': state}, count
+        yield 'smf_zenrows_credits_used', {}, self.credits_used()
+
+
+async def main():
+    """CLI entry point for the Catalog Monitor Scheduler"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Monitor all retailer catalogs concurrently')
+    parser.add_argument('--retailers', nargs='+', help='Retailers to monitor (default: all configured)')
+    parser.add_argument('--categories', nargs='+', help='Categories to monitor (default: all configured)')
+    parser.add_argument('--modesty-levels', nargs='+', default=DEFAULT_MODESTY_LEVELS,
+                        help='Modesty levels to monitor (each catalog is scanned once, as the first level)')
+    parser.add_argument('--max-pages', type=int, default=5, help='Maximum pages to scan per catalog')
+    parser.add_argument('--stream', action='store_true', help='Use the streaming monitor path')
+    parser.add_argument('--zenrows-credits', type=int, default=os.getenv('ZENROWS_CREDIT_BUDGET'),
+                        help='ZenRows credit budget for Commercial API runs (default: unlimited)')
+    parser.add_argument('--max-concurrent', type=int, help='Maximum concurrent monitor runs')
+    parser.add_argument('--patchright-concurrency', type=int, help='Maximum concurrent Patchright runs')
+    parser.add_argument('--commercial-concurrency', type=int, help='Maximum concurrent Commercial API runs')
+    parser.add_argument('--retailer-concurrency', type=int, help='Maximum concurrent runs per retailer')
+    parser.add_argument('--dry-run', action='store_true', help='Print the prioritised plan and exit')
+    parser.add_argument('--metrics-port', type=int, help='Serve live Prometheus metrics on this port')
+    parser.add_argument('--diagnose-loop', action='store_true',
+                        help='Detect event-loop stalls and write a blocking call-site report')
+    parser.add_argument('--profile', action='store_true',
+                        help='Sample CPU and allocations per retailer/stage into profiles/')
+
+    args = parser.parse_args()
+
+    print("⚠️ IMPORTANT: Run Product Updater first to ensure DB is up-to-date!")
+    print("   This prevents false positives from URL/product code changes.\n")
+
+    tower_concurrency = {}
+    if args.patchright_concurrency:
+        tower_concurrency['patchright'] = args.patchright_concurrency
+    if args.commercial_concurrency:
+        tower_concurrency['commercial_api'] = args.commercial_concurrency
+
+    scheduler = CatalogMonitorScheduler(
+        credit_budget=int(args.zenrows_credits) if args.zenrows_credits is not None else None,
+        max_pages=args.max_pages,
+        streaming=args.stream,
+        max_concurrent=args.max_concurrent,
+        tower_concurrency=tower_concurrency,
+        retailer_concurrency=args.retailer_concurrency
+    )
+    jobs = scheduler.build_jobs(args.retailers, args.categories, args.modesty_levels)
+
+    if args.dry_run:
+        for job in await scheduler.prioritize(jobs):
+            print(json.dumps({
+                'job': job.key,
+                'tower': job.tower,
+                'pages': job.pages,
+                'estimated_credits': job.estimated_credits,
+                'last_change': job.last_change.isoformat() if job.last_change else None
+            }))
+        return
+
+    metrics_server = await start_metrics_server(args.metrics_port)
+    diagnostics = start_loop_diagnostics('catalog_monitor_scheduler', enabled=args.diagnose_loop)
+    profiler = start_profiler('catalog_monitor_scheduler', enabled=args.profile)
+    try:
+        result = await scheduler.run(jobs)
+    finally:
+        if profiler:
+            profiler.stop()
+        if diagnostics:
+            await diagnostics.stop()
+        if metrics_server:
+            await metrics_server.stop()
+
+    # One database sync for the whole pass instead of one per run
+    if result.sent_to_review > 0:
+        logger.info("\n" + "=" * 60)
+        logger.info("SYNCING DATABASE TO WEB SERVER")
+        logger.info("=" * 60)
+
+        try:
+            sync_success = await sync_database_async()
+
+            if sync_success:
+                logger.info("✅ Database synced to assessmodesty.com")
+            else:
+                logger.warning("⚠️  Database sync failed - assessment pipeline may show stale data")
+                logger.warning("Run 'python3 Shared/database_sync.py' manually to sync")
+
+        except Exception as e:
+            logger.error(f"❌ Database sync error: {e}")
+    else:
+        logger.info("ℹ️  No products added to assessment queue - skipping database sync")
+
+    print(json.dumps({
+        'processing_time': result.processing_time,
+        'jobs': result.counts,
+        'credits_used': result.credits_used,
+        'credit_budget': result.credit_budget,
+        'runs': [
+            {
+                'job': job.key,
+                'status': job.status,
+                'new_products_found': job.result.new_products_found if job.result else 0,
+                'suspected_duplicates': job.result.suspected_duplicates if job.result else 0,
+                'error': job.result.error if job.result else None
+            }
+            for job in result.jobs
+        ]
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -32,6 +32,10 @@ from urllib.parse import urlparse
 import logging
 
 from logger_config import setup_logging
+from tracing import traced, traced_run
+from metrics_server import metrics, start_metrics_server
+from loop_diagnostics import start_loop_diagnostics
+from sampling_profiler import start_profiler
 from shopify_manager import ShopifyManager
 from checkpoint_manager import CheckpointManager
 from cost_tracker import cost_tracker
@@ -110,6 +114,8 @@ class NewProductImporter:
         # Modesty assessment (Gemini)
         self.modesty_assessor = None
         
+        metrics.register_collector('new_product_importer', self._collect_metrics)
+        
         # Tower count
         tower_count = "Dual Tower"
         if COMMERCIAL_API_AVAILABLE:
@@ -117,6 +123,14 @@ class NewProductImporter:
         
         logger.info(f"✅ New Product Importer initialized ({tower_count})")
     
+    def _collect_metrics(self):
+        """Live state for the metrics endpoint (read on each scrape)"""
+        labels = {'workflow': 'new_product_importer'}
+        for state, value in self.checkpoint_manager.get_stats().items():
+            if isinstance(value, int):
+                yield 'smf_checkpoint_urls', {**labels, 'state': state}, value
+    
+    @traced_run('new_product_importer')
     async def run_batch_import(
         self,
         batch_file: str,
@@ -431,6 +445,7 @@ class NewProductImporter:
                 'error': str(e)
             }
     
+    @traced('product')
     async def _import_single_product(
         self,
         url: str,
@@ -544,16 +559,18 @@ class NewProductImporter:
             
             # Step 3: Process images (enhance URLs + download)
             image_urls = product_data.get('image_urls', [])
-            downloaded_image_paths = []
+            downloaded_images = []
             
             if image_urls:
                 logger.debug(f"🖼️ Processing {len(image_urls)} images")
-                downloaded_image_paths = await image_processor.process_images(
+                downloaded_images = await image_processor.process_images(
                     image_urls=image_urls,
                     retailer=retailer,
-                    product_title=product_data.get('title', 'Product')
+                    product_title=product_data.get('title', 'Product'),
+                    product_url=url,
+                    in_memory=True
                 )
-                logger.info(f"✅ Processed {len(downloaded_image_paths)} images")
+                logger.info(f"✅ Processed {len(downloaded_images)} images")
             
             # Step 4: Upload to Shopify if modest/moderately_modest
             shopify_id = None
@@ -566,7 +583,7 @@ class NewProductImporter:
                     retailer_name=retailer,
                     modesty_level=modesty_classification,
                     source_url=url,
-                    downloaded_images=downloaded_image_paths,  # ✅ File paths, not URLs
+                    downloaded_images=downloaded_images,  # ✅ Downloaded images, not URLs
                     product_type_override=product_type_override
                 )
                 
@@ -776,16 +793,32 @@ async def main():
                        help='Expected modesty level for batch')
     parser.add_argument('--product-type', help='Override product type (e.g., "Tops", "Dresses")')
     parser.add_argument('--resume', action='store_true', help='Resume from checkpoint')
+    parser.add_argument('--metrics-port', type=int, help='Serve live Prometheus metrics on this port')
+    parser.add_argument('--diagnose-loop', action='store_true',
+                        help='Detect event-loop stalls and write a blocking call-site report')
+    parser.add_argument('--profile', action='store_true',
+                        help='Sample CPU and allocations per retailer/stage into profiles/')
     
     args = parser.parse_args()
     
     importer = NewProductImporter()
-    result = await importer.run_batch_import(
-        batch_file=args.batch_file,
-        modesty_level=args.modesty_level,
-        product_type_override=args.product_type,
-        resume=args.resume
-    )
+    metrics_server = await start_metrics_server(args.metrics_port)
+    diagnostics = start_loop_diagnostics('new_product_importer', enabled=args.diagnose_loop)
+    profiler = start_profiler('new_product_importer', enabled=args.profile)
+    try:
+        result = await importer.run_batch_import(
+            batch_file=args.batch_file,
+            modesty_level=args.modesty_level,
+            product_type_override=args.product_type,
+            resume=args.resume
+        )
+    finally:
+        if profiler:
+            profiler.stop()
+        if diagnostics:
+            await diagnostics.stop()
+        if metrics_server:
+            await metrics_server.stop()
     
     # Result is already a dict
     print(json.dumps(result, indent=2))
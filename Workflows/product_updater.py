@@ -28,6 +28,10 @@ from dataclasses import dataclass, asdict
 import logging
 
 from logger_config import setup_logging
+from tracing import traced, traced_run
+from metrics_server import metrics, start_metrics_server
+from loop_diagnostics import start_loop_diagnostics
+from sampling_profiler import start_profiler
 from shopify_manager import ShopifyManager
 from checkpoint_manager import CheckpointManager
 from cost_tracker import cost_tracker
@@ -161,6 +165,8 @@ class ProductUpdater:
         # Batch DB writes queue
         self.db_write_queue = []
         
+        metrics.register_collector('product_updater', self._collect_metrics)
+        
         # Tower count
         tower_count = "Dual Tower"
         if COMMERCIAL_API_AVAILABLE:
@@ -168,6 +174,18 @@ class ProductUpdater:
         
         logger.info(f"✅ Product Updater initialized ({tower_count})")
     
+    def _collect_metrics(self):
+        """Live state for the metrics endpoint (read on each scrape)"""
+        labels = {'workflow': 'product_updater'}
+        yield 'smf_rate_limiter_concurrency', labels, self.rate_limiter.current_concurrency
+        yield 'smf_rate_limiter_max_concurrency', labels, self.rate_limiter.max_concurrency
+        yield 'smf_rate_limit_hits_total', labels, self.rate_limiter.rate_limit_count
+        yield 'smf_db_write_queue_depth', labels, len(self.db_write_queue)
+        for state, value in self.checkpoint_manager.get_stats().items():
+            if isinstance(value, int):
+                yield 'smf_checkpoint_urls', {**labels, 'state': state}, value
+    
+    @traced_run('product_updater')
     async def run_batch_update(
         self,
         batch_file: Optional[str] = None,
@@ -316,6 +334,7 @@ class ProductUpdater:
                 'error': str(e)
             }
     
+    @traced('product')
     async def _update_single_product(
         self,
         product: Dict,
@@ -465,15 +484,17 @@ class ProductUpdater:
                 if image_urls:
                     logger.info(f"🖼️ Processing {len(image_urls)} images (first time or previous failure)")
                     try:
-                        # Step 3a: Download images to local disk
-                        downloaded_image_paths = await image_processor.process_images(
+                        # Step 3a: Download images (kept in memory, no temp files)
+                        downloaded_images = await image_processor.process_images(
                             image_urls=image_urls,
                             retailer=retailer,
-                            product_title=extraction_result.data.get('title', 'Product')
+                            product_title=extraction_result.data.get('title', 'Product'),
+                            product_url=url,
+                            in_memory=True
                         )
                         
-                        if downloaded_image_paths:
-                            logger.info(f"✅ Downloaded {len(downloaded_image_paths)} images to local disk")
+                        if downloaded_images:
+                            logger.info(f"✅ Downloaded {len(downloaded_images)} images")
                             
                             # Step 3b: Upload images to Shopify
                             import aiohttp
@@ -481,8 +502,9 @@ class ProductUpdater:
                                 uploaded_images = await self.shopify_manager._upload_images(
                                     session=session,
                                     product_id=shopify_id,
-                                    image_paths=downloaded_image_paths,
-                                    product_title=extraction_result.data.get('title', 'Product')
+                                    images=downloaded_images,
+                                    product_title=extraction_result.data.get('title', 'Product'),
+                                    retailer=retailer
                                 )
                             
                             if uploaded_images:
@@ -775,6 +797,7 @@ class ProductUpdater:
         """Record individual product result and update counters"""
         results['results'].append(asdict(result))
         results['processed'] += 1
+        metrics.inc('smf_products_total', workflow='product_updater', action=result.action)
         
         # Update counters based on action
         if result.action == 'updated':
@@ -868,6 +891,9 @@ class ProductUpdater:
                 task = asyncio.create_task(self._update_single_product(product, tower))
                 processing.add(task)
             
+            metrics.set_gauge('smf_products_pending', len(pending), workflow='product_updater', tower=tower)
+            metrics.set_gauge('smf_products_in_flight', len(processing), workflow='product_updater', tower=tower)
+            
             if not processing:
                 break
             
@@ -898,6 +924,8 @@ class ProductUpdater:
             
             # Small delay between batches
             await asyncio.sleep(0.1)
+        
+        metrics.set_gauge('smf_products_in_flight', 0, workflow='product_updater', tower=tower)
 
 
 # CLI entry point
@@ -911,28 +939,44 @@ async def main():
     parser.add_argument('--min-age-days', type=int, help='Minimum age in days')
     parser.add_argument('--sale-status', choices=['on_sale', 'regular'], help='Sale status filter')
     parser.add_argument('--limit', type=int, default=5000, help='Maximum products to update')
+    parser.add_argument('--metrics-port', type=int, help='Serve live Prometheus metrics on this port')
+    parser.add_argument('--diagnose-loop', action='store_true',
+                        help='Detect event-loop stalls and write a blocking call-site report')
+    parser.add_argument('--profile', action='store_true',
+                        help='Sample CPU and allocations per retailer/stage into profiles/')
     
     args = parser.parse_args()
     
     updater = ProductUpdater()
+    metrics_server = await start_metrics_server(args.metrics_port)
+    diagnostics = start_loop_diagnostics('product_updater', enabled=args.diagnose_loop)
+    profiler = start_profiler('product_updater', enabled=args.profile)
     
-    if args.batch_file:
-        result = await updater.run_batch_update(batch_file=args.batch_file)
-    else:
-        filters = {
-            'retailer': args.retailer,
-            'min_age_days': args.min_age_days,
-            'sale_status': args.sale_status,
-            'limit': args.limit
-        }
-        # Remove None values
-        filters = {k: v for k, v in filters.items() if v is not None}
-        
-        if not filters:
-            print("Error: Must provide either --batch-file or filter arguments")
-            return
-        
-        result = await updater.run_batch_update(filters=filters)
+    try:
+        if args.batch_file:
+            result = await updater.run_batch_update(batch_file=args.batch_file)
+        else:
+            filters = {
+                'retailer': args.retailer,
+                'min_age_days': args.min_age_days,
+                'sale_status': args.sale_status,
+                'limit': args.limit
+            }
+            # Remove None values
+            filters = {k: v for k, v in filters.items() if v is not None}
+            
+            if not filters:
+                print("Error: Must provide either --batch-file or filter arguments")
+                return
+            
+            result = await updater.run_batch_update(filters=filters)
+    finally:
+        if profiler:
+            profiler.stop()
+        if diagnostics:
+            await diagnostics.stop()
+        if metrics_server:
+            await metrics_server.stop()
     
     print(json.dumps(result, indent=2))
 
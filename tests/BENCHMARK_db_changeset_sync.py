@@ -0,0 +1,236 @@
+"""
+Benchmark Changeset Sync - Local two-database harness
+Verifies that changeset sync (Shared/db_changesets.py) converges and
+measures bytes transferred vs the full-file SCP sync
+
+Simulates one sync cycle between a "local" and a "server" products.db:
+- Local: new products found, prices updated, a few products deleted
+- Server: products assessed from the web interface
+- Conflicts: same product assessed on both sides (newest assessed_at wins)
+
+Usage:
+    python tests/BENCHMARK_db_changeset_sync.py
+    python tests/BENCHMARK_db_changeset_sync.py --products 50000 --changes 500
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Shared'))
+
+import db_changesets
+
+PRODUCTS_SCHEMA = '''
+    CREATE TABLE products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        url TEXT UNIQUE NOT NULL,
+        retailer TEXT,
+        title TEXT,
+        price REAL,
+        description TEXT,
+        images TEXT,
+        lifecycle_stage TEXT,
+        modesty_status TEXT,
+        shopify_status TEXT,
+        assessed_at TIMESTAMP,
+        last_updated TIMESTAMP
+    )
+'''
+
+QUEUE_SCHEMA = '''
+    CREATE TABLE assessment_queue (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_url TEXT NOT NULL,
+        retailer TEXT NOT NULL,
+        review_type TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        product_data TEXT NOT NULL,
+        review_decision TEXT,
+        reviewer_notes TEXT,
+        reviewed_at TIMESTAMP,
+        reviewed_by TEXT,
+        UNIQUE(product_url, review_type)
+    )
+'''
+
+
+def build_database(path, n_products):
+    """Local DB with n_products pending assessment"""
+    conn = sqlite3.connect(path)
+    conn.execute(PRODUCTS_SCHEMA)
+    conn.execute(QUEUE_SCHEMA)
+    rows = [
+        (
+            f"https://example.com/p/{i}", 'revolve', f"Product {i}", 50.0 + i % 200,
+            'Long product description ' * 20, '["https://cdn.example.com/%d.jpg"]' % i,
+            'pending_assessment', None, 'draft', None, '2026-01-01 00:00:00'
+        )
+        for i in range(n_products)
+    ]
+    conn.executemany('''
+        INSERT INTO products (url, retailer, title, price, description, images,
+            lifecycle_stage, modesty_status, shopify_status, assessed_at, last_updated)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.executemany('''
+        INSERT INTO assessment_queue (product_url, retailer, review_type, product_data)
+        VALUES (?, 'revolve', 'modesty', '{}')
+    ''', [(row[0],) for row in rows])
+    conn.commit()
+    conn.close()
+
+
+def snapshot(path):
+    """Table contents without surrogate ids, for convergence checks"""
+    conn = sqlite3.connect(path)
+    products = conn.execute('''
+        SELECT url, retailer, title, price, description, images, lifecycle_stage,
+               modesty_status, shopify_status, assessed_at, last_updated
+        FROM products ORDER BY url
+    ''').fetchall()
+    queue = conn.execute('''
+        SELECT product_url, review_type, status, review_decision, reviewed_at
+        FROM assessment_queue ORDER BY product_url, review_type
+    ''').fetchall()
+    conn.close()
+    return products, queue
+
+
+def ship(source_path, since, target_path, mode, workdir, name):
+    """Export → gzip file → apply; returns (bytes, to_version, stats, seconds)"""
+    start = time.perf_counter()
+    conn = sqlite3.connect(source_path)
+    header, changes = db_changesets.export_changes(conn, since)
+    conn.close()
+
+    path = os.path.join(workdir, f"{name}.jsonl.gz")
+    size = db_changesets.write_changeset(path, header, changes)
+
+    _, changes = db_changesets.read_changeset(path)
+    conn = sqlite3.connect(target_path)
+    stats = db_changesets.apply_changes(conn, changes, mode=mode)
+    conn.close()
+    return size, header['to_version'], stats, time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark changeset DB sync')
+    arg_parser.add_argument('--products', type=int, default=20000, help='Products in the database')
+    arg_parser.add_argument('--changes', type=int, default=200, help='Changes per side per cycle')
+    arg_parser.add_argument('--seed', type=int, default=7)
+    args = arg_parser.parse_args()
+
+    random.seed(args.seed)
+    workdir = tempfile.mkdtemp(prefix='changeset_bench_')
+    local_db = os.path.join(workdir, 'local.db')
+    server_db = os.path.join(workdir, 'server.db')
+
+    try:
+        # Baseline: full-file sync (what every sync cost before)
+        build_database(local_db, args.products)
+        conn = sqlite3.connect(local_db)
+        db_changesets.install(conn)
+        push_cursor = db_changesets.max_version(conn)
+        conn.close()
+
+        shutil.copy(local_db, server_db)
+        full_file_bytes = os.path.getsize(local_db)
+
+        conn = sqlite3.connect(server_db)
+        pull_cursor = db_changesets.max_version(conn)
+        conn.close()
+
+        urls = [f"https://example.com/p/{i}" for i in range(args.products)]
+        server_assessed = random.sample(urls, args.changes)
+        conflicts = server_assessed[:max(1, args.changes // 10)]
+
+        # Server: web assessments
+        conn = sqlite3.connect(server_db)
+        for url in server_assessed:
+            conn.execute('''
+                UPDATE products SET lifecycle_stage = 'assessed_approved', modesty_status = 'modest',
+                    shopify_status = 'published', assessed_at = '2026-03-02 10:00:00',
+                    last_updated = '2026-03-02 10:00:00'
+                WHERE url = ?
+            ''', (url,))
+            conn.execute('''
+                UPDATE assessment_queue SET status = 'reviewed', review_decision = 'modest',
+                    reviewed_at = '2026-03-02 10:00:00', reviewed_by = 'web_interface'
+                WHERE product_url = ?
+            ''', (url,))
+        conn.commit()
+        conn.close()
+
+        # Local: new products, price updates, older conflicting assessments, deletes
+        conn = sqlite3.connect(local_db)
+        for i in range(args.changes):
+            conn.execute('''
+                INSERT INTO products (url, retailer, title, price, lifecycle_stage, shopify_status, last_updated)
+                VALUES (?, 'revolve', ?, 99.0, 'pending_assessment', 'draft', '2026-03-01 00:00:00')
+            ''', (f"https://example.com/new/{i}", f"New product {i}"))
+        for url in random.sample(urls, args.changes):
+            conn.execute('UPDATE products SET price = price + 1 WHERE url = ?', (url,))
+        for url in conflicts:
+            conn.execute('''
+                UPDATE products SET lifecycle_stage = 'assessed_rejected', modesty_status = 'not_modest',
+                    assessed_at = '2026-03-01 09:00:00'
+                WHERE url = ?
+            ''', (url,))
+        deleted = [url for url in random.sample(urls, 5) if url not in server_assessed]
+        for url in deleted:
+            conn.execute('DELETE FROM products WHERE url = ?', (url,))
+        conn.commit()
+        conn.close()
+
+        # Sync cycle: pull (LWW) then push (upsert)
+        pull_bytes, pull_cursor, pull_stats, pull_s = ship(
+            server_db, pull_cursor, local_db, 'lww', workdir, 'pull')
+        push_bytes, push_cursor, push_stats, push_s = ship(
+            local_db, push_cursor, server_db, 'upsert', workdir, 'push')
+
+        # Convergence
+        local_products, local_queue = snapshot(local_db)
+        server_products, server_queue = snapshot(server_db)
+        converged = local_products == server_products
+        queue_converged = local_queue == server_queue
+
+        conn = sqlite3.connect(local_db)
+        winners = conn.execute(
+            f"SELECT COUNT(*) FROM products WHERE url IN ({','.join('?' * len(conflicts))}) "
+            "AND assessed_at = '2026-03-02 10:00:00'", conflicts
+        ).fetchone()[0]
+        conn.close()
+
+        # A second cycle with no changes must ship nothing
+        idle_pull, _, _, _ = ship(server_db, pull_cursor, local_db, 'lww', workdir, 'pull2')
+        idle_push, _, idle_stats, _ = ship(local_db, push_cursor, server_db, 'upsert', workdir, 'push2')
+
+        print(f"\n{'='*70}")
+        print("CHANGESET SYNC BENCHMARK")
+        print(f"{'='*70}")
+        print(f"Products: {args.products:,}  Changes per side: {args.changes:,}")
+        print(f"Full-file sync:   {full_file_bytes * 2:>12,} bytes (download + upload)")
+        print(f"Changeset sync:   {pull_bytes + push_bytes:>12,} bytes "
+              f"(pull {pull_bytes:,} in {pull_s*1000:.0f} ms, push {push_bytes:,} in {push_s*1000:.0f} ms)")
+        print(f"Reduction:        {(1 - (pull_bytes + push_bytes) / (full_file_bytes * 2)) * 100:.1f}%")
+        print(f"Pull applied:     {pull_stats['applied']} ({pull_stats['skipped']} skipped)")
+        print(f"Push applied:     {push_stats['applied']} rows, {push_stats['deleted']} deletes")
+        print(f"Idle cycle:       {idle_pull + idle_push:,} bytes, {idle_stats['applied']} rows applied")
+        print('-' * 70)
+        print(f"Products converged:   {'✅' if converged else '❌'}")
+        print(f"Queue converged:      {'✅' if queue_converged else '❌'}")
+        print(f"Conflicts (LWW):      {winners}/{len(conflicts)} kept newer server assessment")
+
+        ok = converged and queue_converged and winners == len(conflicts)
+        return 0 if ok else 1
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
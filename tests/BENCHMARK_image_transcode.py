@@ -0,0 +1,191 @@
+"""
+Benchmark Image Transcode - Disk round-trip vs in-memory process-pool pipeline
+Measures per-product image CPU time, wall time and peak memory for preparing
+Shopify image attachments
+
+Legacy path (pre image_transcoder): write download to disk, PIL-open to check
+size, reopen to validate, convert/resize/encode into a temp file on the event
+loop thread, read it back, base64, delete both files.
+
+Pipeline path: header-only probe of the in-memory bytes, then decode /
+resize / encode / base64 in the shared ProcessPoolExecutor
+(Shared/image_transcoder.py), no files.
+
+Each mode runs in a fresh process so peak RSS is comparable. Images are
+synthetic JPEGs (no network).
+
+Usage:
+    python tests/BENCHMARK_image_transcode.py
+    python tests/BENCHMARK_image_transcode.py --products 10 --size 3000x4000
+"""
+import argparse
+import asyncio
+import base64
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Shared'))
+
+from PIL import Image
+
+IMAGES_PER_PRODUCT = 5
+
+
+def make_image(width: int, height: int, seed: int) -> bytes:
+    """Product-photo-like JPEG: gradient + noise"""
+    noise = Image.effect_noise((width // 4, height // 4), 40 + seed % 20).resize((width, height))
+    gradient = Image.linear_gradient('L').resize((width, height)).rotate(seed * 7 % 360)
+    img = Image.merge('RGB', (noise, gradient, Image.blend(noise, gradient, 0.5)))
+    output = BytesIO()
+    img.save(output, 'JPEG', quality=92)
+    return output.getvalue()
+
+
+def legacy_prepare(image_data: bytes, workdir: str, name: str) -> str:
+    """The old _download_single_image + _upload_images file round trip"""
+    path = os.path.join(workdir, f"{name}.jpg")
+
+    # _download_single_image: PIL size check, then save to disk
+    img = Image.open(BytesIO(image_data))
+    width, height = img.size
+    if width < 100 or height < 100:
+        raise ValueError("too small")
+    with open(path, 'wb') as f:
+        f.write(image_data)
+
+    # _validate_shopify_image_requirements
+    with Image.open(path) as img:
+        width, height = img.size
+        if os.path.getsize(path) > 20 * 1024 * 1024 or max(width, height) > 5760:
+            raise ValueError("requirements")
+
+    # _optimize_image_for_shopify
+    with Image.open(path) as img:
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGB')
+        if max(img.size) > 2048:
+            img.thumbnail((2048, 2048), Image.Resampling.LANCZOS)
+        optimized_path = path.replace('.jpg', '_optimized.jpg')
+        img.save(optimized_path, 'JPEG', quality=85, optimize=True)
+
+    with open(optimized_path, 'rb') as f:
+        attachment = base64.b64encode(f.read()).decode('utf-8')
+
+    os.remove(optimized_path)
+    os.remove(path)
+    return attachment
+
+
+async def run_legacy(products, workdir):
+    timings = []
+    for p, images in enumerate(products):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        for i, data in enumerate(images):
+            legacy_prepare(data, workdir, f"p{p}_{i}")
+            await asyncio.sleep(0)
+        cpu = time.process_time() - cpu_start
+        timings.append((time.perf_counter() - wall_start, cpu, cpu))
+    return timings
+
+
+async def run_pipeline(products, workdir):
+    from image_transcoder import ImageBuffer, get_image_transcoder, probe_image_size
+
+    transcoder = get_image_transcoder()
+    await transcoder.transcode(products[0][0])  # Warm up the pool
+
+    timings = []
+    for images in products:
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        buffers = []
+        for i, data in enumerate(images):
+            fmt, width, height = probe_image_size(data)
+            buffers.append(ImageBuffer(url=f"mem://{i}", data=data, width=width, height=height, format=fmt, index=i))
+
+        results = await transcoder.transcode_many([buffer.data for buffer in buffers])
+        worker_cpu = sum(r.cpu_seconds for r in results if not isinstance(r, Exception))
+        loop_cpu = time.process_time() - cpu_start
+        timings.append((time.perf_counter() - wall_start, loop_cpu + worker_cpu, loop_cpu))
+
+    transcoder.shutdown(wait=True)
+    return timings
+
+
+def run_mode(mode, products, queue):
+    workdir = tempfile.mkdtemp(prefix='bench_images_')
+    try:
+        runner = run_legacy if mode == 'legacy' else run_pipeline
+        timings = asyncio.run(runner(products, workdir))
+        leftover = len(os.listdir(workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    own_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    queue.put((timings, own_peak, child_peak, leftover))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Image transcode pipeline benchmark')
+    parser.add_argument('--products', type=int, default=6, help='Products (5 images each)')
+    parser.add_argument('--size', default='2400x3600', help='Source image size WxH')
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    print(f"Generating {args.products * IMAGES_PER_PRODUCT} synthetic {width}x{height} JPEGs...")
+    products = [
+        [make_image(width, height, p * IMAGES_PER_PRODUCT + i) for i in range(IMAGES_PER_PRODUCT)]
+        for p in range(args.products)
+    ]
+    source_mb = sum(len(d) for images in products for d in images) / args.products / 1024 / 1024
+
+    results = {}
+    ctx = multiprocessing.get_context('spawn')
+    for mode in ('legacy', 'pipeline'):
+        queue = ctx.Queue()
+        process = ctx.Process(target=run_mode, args=(mode, products, queue))
+        process.start()
+        results[mode] = queue.get()
+        process.join()
+
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss_unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+
+    print(f"\n{'='*70}")
+    print("IMAGE TRANSCODE BENCHMARK")
+    print(f"{'='*70}")
+    print(f"Products: {args.products}  Images/product: {IMAGES_PER_PRODUCT}  "
+          f"Source: {width}x{height} ({source_mb:.1f} MB/product)")
+    print(f"CPUs: {os.cpu_count()}")
+    print('-' * 70)
+    print(f"{'Mode':<10} {'wall/product':>13} {'CPU/product':>12} {'loop CPU':>10} "
+          f"{'peak RSS main':>14} {'peak RSS worker':>16} {'files left':>11}")
+    for mode, (timings, own_peak, child_peak, leftover) in results.items():
+        wall = sum(t[0] for t in timings) / len(timings)
+        cpu = sum(t[1] for t in timings) / len(timings)
+        loop_cpu = sum(t[2] for t in timings) / len(timings)
+        print(f"{mode:<10} {wall*1000:>10.0f} ms {cpu*1000:>9.0f} ms {loop_cpu*1000:>7.0f} ms "
+              f"{own_peak / rss_unit:>11.0f} MB {child_peak / rss_unit:>13.0f} MB {leftover:>11}")
+    print('-' * 70)
+    legacy_wall = sum(t[0] for t in results['legacy'][0])
+    pipeline_wall = sum(t[0] for t in results['pipeline'][0])
+    legacy_loop = sum(t[2] for t in results['legacy'][0])
+    pipeline_loop = sum(t[2] for t in results['pipeline'][0])
+    print(f"Event-loop CPU:    {legacy_loop * 1000:.0f} ms -> {pipeline_loop * 1000:.0f} ms "
+          f"(time the loop is blocked and cannot extract or upload)")
+    print(f"Wall-time ratio:   {legacy_wall / pipeline_wall:.2f}x "
+          f"(parallel transcode needs more than one CPU)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
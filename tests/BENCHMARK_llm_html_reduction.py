@@ -0,0 +1,218 @@
+"""
+Benchmark LLM HTML Reduction - Commercial API Tower
+Compares raw truncation vs structure-aware reduction (html_reducer.py)
+before the LLM fallback parser
+
+Fixtures: product pages from the Commercial API HTML cache (html_cache.db),
+or a directory laid out as <fixtures>/<retailer>/*.html
+
+Reports per page:
+- Tokens sent (before/after)
+- Reduction latency, and LLM latency with --llm
+- Field accuracy (title, price, images) with --llm, scored against the
+  BeautifulSoup/JavaScript extraction of the same page
+
+Usage:
+    python tests/BENCHMARK_llm_html_reduction.py
+    python tests/BENCHMARK_llm_html_reduction.py --fixtures path/to/html --llm --output results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bs4 import BeautifulSoup
+from Extraction.CommercialAPI.commercial_config import CommercialAPIConfig
+from Extraction.CommercialAPI.commercial_retailer_strategies import CommercialRetailerStrategies
+from Extraction.CommercialAPI.javascript_parser import JavaScriptDataParser
+from Extraction.CommercialAPI.llm_fallback_parser import LLMFallbackParser
+import logging
+
+logging.basicConfig(level=logging.WARNING, format='[%(levelname)s] %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def load_fixtures(fixtures_dir=None, limit=20):
+    """Load (retailer, url, html) fixtures from a directory or the HTML cache"""
+    fixtures = []
+
+    if fixtures_dir:
+        for path in sorted(Path(fixtures_dir).glob('*/*.html'))[:limit]:
+            fixtures.append((path.parent.name, path.name, path.read_text(errors='ignore')))
+        return fixtures
+
+    cache_path = CommercialAPIConfig.HTML_CACHE_DB_PATH
+    if not os.path.exists(cache_path):
+        return fixtures
+
+    conn = sqlite3.connect(cache_path)
+    try:
+        rows = conn.execute(
+            'SELECT retailer, url, html FROM html_cache ORDER BY cached_at DESC LIMIT ?',
+            (limit * 3,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    return [(retailer, url, html) for retailer, url, html in rows]
+
+
+def ground_truth(html, retailer):
+    """Fields from the deterministic parsers (same order as HTMLParser)"""
+    soup = BeautifulSoup(html, 'html.parser')
+    data = JavaScriptDataParser().extract_product_data(html, soup, retailer)
+    if not data or not data.get('title'):
+        try:
+            data = CommercialRetailerStrategies().extract_product(soup, retailer)
+        except ValueError:
+            return None
+
+    if data and data.get('title') and data.get('price'):
+        return data
+    return None
+
+
+def score_fields(expected, actual):
+    """Fraction of title / price / images the LLM got right"""
+    if not actual:
+        return 0.0
+
+    def norm(text):
+        return re.sub(r'\W+', ' ', str(text or '')).strip().lower()
+
+    title_ok = bool(actual.get('title')) and (
+        norm(expected['title']) in norm(actual['title'])
+        or norm(actual['title']) in norm(expected['title'])
+    )
+
+    try:
+        price_ok = abs(float(actual.get('price')) - float(expected['price'])) < 0.01
+    except (TypeError, ValueError):
+        price_ok = False
+
+    def image_keys(urls):
+        return {url.split('?')[0].rsplit('/', 1)[-1] for url in urls or [] if url}
+
+    expected_images = image_keys(expected.get('image_urls'))
+    images_ok = (not expected_images) or bool(expected_images & image_keys(actual.get('image_urls')))
+
+    return (title_ok + price_ok + images_ok) / 3
+
+
+async def run_llm(parser, prepared_html, retailer, url):
+    """Call the LLM once, returning (latency_seconds, parsed_product)"""
+    prompt = parser._create_product_prompt(prepared_html, retailer, url)
+    start = time.perf_counter()
+    response = await parser._call_llm(prompt)
+    latency = time.perf_counter() - start
+    return latency, (parser._parse_llm_response(response, 'product') if response else None)
+
+
+async def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark LLM HTML reduction')
+    arg_parser.add_argument('--fixtures', help='Directory of <retailer>/*.html fixtures')
+    arg_parser.add_argument('--limit', type=int, default=20, help='Maximum pages to benchmark')
+    arg_parser.add_argument('--llm', action='store_true', help='Also call the LLM (costs money)')
+    arg_parser.add_argument('--output', help='Write results as JSON to this path')
+    args = arg_parser.parse_args()
+
+    config = CommercialAPIConfig()
+    parser = LLMFallbackParser()
+    use_llm = args.llm and parser.llm_client is not None
+
+    results = []
+    for retailer, url, html in load_fixtures(args.fixtures, args.limit):
+        expected = ground_truth(html, retailer)
+        if not expected:
+            continue
+
+        budget = config.LLM_PRODUCT_TOKEN_BUDGET
+
+        start = time.perf_counter()
+        before = parser._truncate_html(html, max_tokens=budget)
+        before_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        after = parser.html_reducer.reduce(html, retailer, 'product', budget)
+        after_ms = (time.perf_counter() - start) * 1000
+
+        result = {
+            'retailer': retailer,
+            'url': url,
+            'html_chars': len(html),
+            'before_tokens': len(before) // 4,
+            'after_tokens': len(after) // 4,
+            'before_prepare_ms': round(before_ms, 2),
+            'after_prepare_ms': round(after_ms, 2),
+        }
+
+        if use_llm:
+            before_latency, before_product = await run_llm(parser, before, retailer, url)
+            after_latency, after_product = await run_llm(parser, after, retailer, url)
+            result.update({
+                'before_llm_seconds': round(before_latency, 2),
+                'after_llm_seconds': round(after_latency, 2),
+                'before_accuracy': round(score_fields(expected, before_product), 3),
+                'after_accuracy': round(score_fields(expected, after_product), 3),
+            })
+
+        results.append(result)
+        if len(results) >= args.limit:
+            break
+
+    if not results:
+        print("No product fixtures with ground truth found (HTML cache empty?)")
+        return
+
+    print(f"\n{'='*100}")
+    print("LLM HTML REDUCTION BENCHMARK")
+    print(f"{'='*100}")
+    header = f"{'Retailer':18s} {'HTML chars':>11s} {'Tokens before':>14s} {'Tokens after':>13s} {'Reduce ms':>10s}"
+    if use_llm:
+        header += f" {'LLM s (b/a)':>14s} {'Accuracy (b/a)':>15s}"
+    print(header)
+    print('-' * 100)
+
+    for r in results:
+        line = (
+            f"{r['retailer']:18s} {r['html_chars']:>11,} {r['before_tokens']:>14,} "
+            f"{r['after_tokens']:>13,} {r['after_prepare_ms']:>10.1f}"
+        )
+        if use_llm:
+            line += (
+                f" {r['before_llm_seconds']:>6.1f}/{r['after_llm_seconds']:<7.1f}"
+                f" {r['before_accuracy']:>7.2f}/{r['after_accuracy']:<7.2f}"
+            )
+        print(line)
+
+    total_before = sum(r['before_tokens'] for r in results)
+    total_after = sum(r['after_tokens'] for r in results)
+    print('-' * 100)
+    print(
+        f"Pages: {len(results)}  Tokens: {total_before:,} → {total_after:,} "
+        f"({(1 - total_after / max(total_before, 1)) * 100:.1f}% fewer)"
+    )
+    if use_llm:
+        n = len(results)
+        print(
+            f"Avg LLM latency: {sum(r['before_llm_seconds'] for r in results) / n:.2f}s → "
+            f"{sum(r['after_llm_seconds'] for r in results) / n:.2f}s  "
+            f"Avg accuracy: {sum(r['before_accuracy'] for r in results) / n:.2f} → "
+            f"{sum(r['after_accuracy'] for r in results) / n:.2f}"
+        )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
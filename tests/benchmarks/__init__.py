@@ -0,0 +1,23 @@
+"""
+Benchmarks - Offline record/replay harness and benchmark suite
+
+Everything here runs without network access or API keys:
+- fixtures.py: recorded service responses (ZenRows HTML, Jina Markdown,
+  DeepSeek completions, Shopify replies) stored as JSON under fixtures/
+- stand_ins.py: local aiohttp servers that replay fixtures (or record them
+  by proxying the real services); the towers are pointed at them through
+  ZENROWS_API_ENDPOINT / JINA_ENDPOINT / DEEPSEEK_BASE_URL /
+  SHOPIFY_API_BASE_URL
+- recorder.py: CLI that runs the stand-ins in record mode
+- synthetic.py: deterministic product pages, catalog responses and a seeded
+  products.db for the paths no recording covers
+- harness.py: pytest-benchmark-style `benchmark` fixture (sync and async
+  callables), JSON results and regression comparison
+- bench_*.py: the suite
+
+Usage:
+    python -m pytest tests/benchmarks
+    python -m pytest tests/benchmarks --bench-compare tests/benchmarks/results/baseline.json
+    python -m tests.benchmarks.recorder --port 8765
+    python -m tests.benchmarks.harness results/baseline.json results/<run>.json
+"""
@@ -0,0 +1,60 @@
+"""
+Database benchmarks - DatabaseManager.batch_update_products
+
+One batch in the shape ProductUpdater queues: mostly unchanged products
+(last_checked only), some price/sale changes and a few delistings.
+"""
+
+import os
+import shutil
+
+import pytest
+
+from .synthetic import build_products_db
+
+N_PRODUCTS = 5000
+
+
+@pytest.fixture(scope='module')
+def seeded_db(tmp_path_factory):
+    db_path = os.path.join(tmp_path_factory.mktemp('db'), 'seed.db')
+    records = build_products_db(db_path, 'revolve', N_PRODUCTS, n_catalog=0)
+    return db_path, records
+
+
+def _update_batch(records, size):
+    updates = []
+    for i, record in enumerate(records[:size]):
+        if i % 10 == 0:
+            updates.append({'url': record['url'], 'action': 'delisted', 'data': {}})
+        elif i % 3 == 0:
+            updates.append({'url': record['url'], 'action': 'updated', 'data': {
+                'title': record['title'],
+                'price': round(record['price'] * 0.8, 2),
+                'sale_status': 'on sale',
+                'stock_status': 'in stock'
+            }})
+        else:
+            updates.append({'url': record['url'], 'action': 'unchanged', 'data': {}})
+    return updates
+
+
+@pytest.mark.parametrize('batch_size', [30, 500])
+def bench_batch_update_products(benchmark, seeded_db, tmp_path, batch_size):
+    from db_manager import DatabaseManager
+
+    seed_path, records = seeded_db
+    db_path = str(tmp_path / 'products.db')
+    updates = _update_batch(records, batch_size)
+
+    def fresh_db():
+        shutil.copyfile(seed_path, db_path)
+        return (DatabaseManager(db_path), updates), {}
+
+    async def run(db_manager, batch):
+        return await db_manager.batch_update_products(batch)
+
+    committed = benchmark.pedantic(run, setup=fresh_db, rounds=benchmark.rounds, warmup_rounds=1)
+
+    assert committed
+    benchmark.extra_info.update({'batch_size': batch_size, 'table_rows': N_PRODUCTS})
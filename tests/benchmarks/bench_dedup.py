@@ -0,0 +1,51 @@
+"""
+Dedup benchmarks - CatalogMonitor._deduplicate_catalog_products
+
+Runs the multi-level matcher against a seeded products.db: a quarter of
+the scan matches by exact URL, a quarter by normalized URL, a quarter
+against the catalog baseline and a quarter is new (falls through every
+strategy, including the fuzzy title scan).
+"""
+
+import os
+
+import pytest
+
+from .synthetic import build_products_db, catalog_scan
+
+N_EXISTING = 500
+N_BASELINE = 250
+
+
+@pytest.fixture(scope='module')
+def catalog_monitor(tmp_path_factory):
+    from catalog_monitor import CatalogMonitor
+    from db_manager import DatabaseManager
+
+    db_path = os.path.join(tmp_path_factory.mktemp('dedup'), 'products.db')
+    build_products_db(db_path, 'revolve', N_EXISTING, N_BASELINE)
+
+    # Skip __init__: notifications, assessment queue and towers are not on this path
+    monitor = CatalogMonitor.__new__(CatalogMonitor)
+    monitor.db_manager = DatabaseManager(db_path)
+    monitor.fingerprint_index = None
+    monitor._image_processor = None
+    return monitor
+
+
+@pytest.mark.parametrize('scan_size', [20, 80])
+def bench_deduplicate_catalog_products(benchmark, catalog_monitor, scan_size):
+    listings = catalog_scan('revolve', N_EXISTING, N_BASELINE, n_new=scan_size, total=scan_size)
+
+    def fresh_listings():
+        # The matcher annotates suspected duplicates in place
+        return ([dict(listing) for listing in listings], 'revolve', 'dresses'), {}
+
+    results = benchmark.pedantic(
+        catalog_monitor._deduplicate_catalog_products, setup=fresh_listings,
+        rounds=min(benchmark.rounds, 3), warmup_rounds=1
+    )
+
+    assert sum(len(group) for group in results.values()) == scan_size
+    assert results['new']
+    benchmark.extra_info.update({group: len(products) for group, products in results.items()})
@@ -0,0 +1,75 @@
+"""
+Parsing benchmarks - HTMLParser.parse_product and catalog text parsing
+
+Pure CPU paths, no stand-in traffic. Recorded ZenRows pages under
+fixtures/zenrows/ are benchmarked alongside the synthetic ones.
+"""
+
+from urllib.parse import urlparse
+
+import pytest
+
+from .fixtures import FixtureStore
+from .synthetic import catalog_text_response, product_page_html
+
+RETAILER_DOMAINS = {
+    'nordstrom': 'nordstrom', 'anthropologie': 'anthropologie', 'abercrombie': 'abercrombie',
+    'urbanoutfitters': 'urban_outfitters', 'aritzia': 'aritzia', 'hm': 'hm', 'www2.hm': 'hm'
+}
+
+
+def _recorded_pages():
+    pages = []
+    for fixture in FixtureStore().iter_service('zenrows'):
+        url = fixture['request']['query'].get('url', '')
+        host = urlparse(url).netloc.replace('www.', '').split('.')[0]
+        if fixture['response']['status'] == 200 and host in RETAILER_DOMAINS:
+            pages.append(pytest.param(fixture['response']['body'], RETAILER_DOMAINS[host], url,
+                                      id=f"recorded-{host}-{len(pages)}"))
+    return pages
+
+
+@pytest.fixture(scope='module')
+def html_parser():
+    from html_parser import HTMLParser
+
+    parser = HTMLParser()
+    # Pattern learning writes to the shared pattern DB; keep the suite side-effect free
+    parser.pattern_learner = None
+    return parser
+
+
+@pytest.mark.parametrize('layout', ['css', 'json_ld'])
+def bench_parse_product_synthetic(benchmark, html_parser, layout):
+    html = product_page_html(1, layout=layout)
+    url = 'https://www.nordstrom.com/s/bench-1/7000001'
+
+    product, success = benchmark(html_parser.parse_product, html, 'nordstrom', url)
+
+    assert success, product
+    benchmark.extra_info.update({'html_bytes': len(html), 'images': len(product['image_urls'])})
+
+
+@pytest.mark.parametrize('html,retailer,url', _recorded_pages() or [
+    pytest.param(None, None, None, marks=pytest.mark.skip(reason='no recorded ZenRows pages'))
+])
+def bench_parse_product_recorded(benchmark, html_parser, html, retailer, url):
+    product, success = benchmark(html_parser.parse_product, html, retailer, url)
+    benchmark.extra_info.update({'html_bytes': len(html), 'success': success})
+
+
+@pytest.fixture(scope='module')
+def catalog_extractor():
+    from markdown_catalog_extractor import MarkdownCatalogExtractor
+
+    return MarkdownCatalogExtractor(config={})
+
+
+@pytest.mark.parametrize('n_products', [50, 500])
+def bench_parse_catalog_text_response(benchmark, catalog_extractor, n_products):
+    content = catalog_text_response(n_products)
+
+    result = benchmark(catalog_extractor._parse_catalog_text_response, content)
+
+    assert result and len(result['products']) == n_products
+    benchmark.extra_info.update({'response_bytes': len(content)})
@@ -0,0 +1,121 @@
+"""
+Workflow benchmark - ProductUpdater end to end against the stand-ins
+
+Markdown tower (Jina → DeepSeek) → change detection → ShopifyManager
+update → batched DB commit, for a batch of Revolve products. Half of the
+products come back with a new price, the rest are unchanged.
+
+Network waits are the stand-in's (loopback plus optional latency), so the
+numbers track the workflow's own overhead and concurrency, not the
+services'.
+"""
+
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from .synthetic import build_products_db, write_product_fixtures
+
+N_PRODUCTS = 24
+
+
+@pytest.fixture(scope='module')
+def seeded_updater_db(tmp_path_factory, synthetic_store):
+    db_path = os.path.join(tmp_path_factory.mktemp('updater'), 'seed.db')
+    records = build_products_db(db_path, 'revolve', N_PRODUCTS, n_catalog=0)
+    write_product_fixtures(synthetic_store, records)
+
+    # Every other product is stored at an old price, so extraction reports a change
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        'UPDATE products SET price = price + 10 WHERE url = ?',
+        [(record['url'],) for record in records[::2]]
+    )
+    conn.commit()
+    conn.close()
+    return db_path, records
+
+
+@pytest.fixture
+def product_updater(tmp_path):
+    from checkpoint_manager import CheckpointManager
+    from db_manager import DatabaseManager
+    from markdown_product_extractor import MarkdownProductExtractor
+    from product_updater import AdaptiveRateLimiter, ProductUpdater
+    from shopify_manager import ShopifyManager
+
+    # Skip __init__: the real one reads Shared/config.json and writes checkpoints/
+    updater = ProductUpdater.__new__(ProductUpdater)
+    updater.shopify_manager = ShopifyManager()
+    updater.checkpoint_manager = CheckpointManager(str(tmp_path / 'checkpoints'))
+    updater.db_manager = DatabaseManager(str(tmp_path / 'products.db'))
+    updater.notification_manager = None
+    updater.rate_limiter = AdaptiveRateLimiter(initial_concurrency=3, max_concurrency=5)
+    updater.patchright_tower = None
+    updater.commercial_tower = None
+    updater.db_write_queue = []
+
+    markdown_tower = MarkdownProductExtractor(config={})
+    markdown_tower.catalog_extractor.cache_file = str(tmp_path / 'markdown_cache.pkl')
+
+    async def not_delisted(url):
+        # The HEAD check goes to the retailer itself, which the stand-ins don't cover
+        return False
+
+    markdown_tower._check_if_delisted = not_delisted
+    updater.markdown_tower = markdown_tower
+    return updater
+
+
+def _new_results():
+    return {
+        'processed': 0, 'updated': 0, 'unchanged': 0, 'delisted': 0,
+        'failed': 0, 'not_found': 0, 'results': [], 'failures': []
+    }
+
+
+def bench_product_updater_markdown_batch(benchmark, stand_in, seeded_updater_db, product_updater):
+    from product_updater import AdaptiveRateLimiter
+
+    seed_path, records = seeded_updater_db
+    updater = product_updater
+
+    def fresh_state():
+        shutil.copyfile(seed_path, updater.db_manager.db_path)
+        if os.path.exists(updater.markdown_tower.catalog_extractor.cache_file):
+            os.remove(updater.markdown_tower.catalog_extractor.cache_file)
+        for record in records:
+            stand_in.shopify.seed_product(record['shopify_id'], {
+                'title': record['title'],
+                'body_html': record['description'],
+                'vendor': record['brand'],
+                'variants': [{'id': record['shopify_id'] + 1, 'price': f"{record['price'] + 10:.2f}"}]
+            })
+        updater.rate_limiter = AdaptiveRateLimiter(initial_concurrency=3, max_concurrency=5)
+        updater.checkpoint_manager.initialize_batch('bench', [r['url'] for r in records], 'update')
+        return ([{'url': r['url'], 'shopify_id': r['shopify_id']} for r in records], _new_results()), {}
+
+    async def run_batch(products, results):
+        # run_batch_update steps 5-6 without batch-file loading and notifications
+        await updater._process_products_parallel(products, 'markdown', results, updater.rate_limiter)
+        if updater.db_write_queue:
+            await updater._batch_commit_db_writes()
+        return results
+
+    requests_before = dict(stand_in.requests)
+    results = benchmark.pedantic(run_batch, setup=fresh_state, rounds=min(benchmark.rounds, 3))
+
+    assert results['failed'] == 0, results['failures'][:3]
+    assert results['updated'] == N_PRODUCTS // 2
+    assert results['unchanged'] == N_PRODUCTS - N_PRODUCTS // 2
+    benchmark.extra_info.update({
+        'products': N_PRODUCTS,
+        'updated': results['updated'],
+        'unchanged': results['unchanged'],
+        'stand_in_requests_all_rounds': {
+            service: count - requests_before.get(service, 0)
+            for service, count in stand_in.requests.items()
+        }
+    })
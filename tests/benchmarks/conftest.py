@@ -0,0 +1,140 @@
+"""
+Benchmark suite configuration
+
+Starts the stand-in server before any tower module is imported (the towers
+read ZENROWS_API_ENDPOINT / JINA_ENDPOINT / DEEPSEEK_BASE_URL /
+SHOPIFY_API_BASE_URL at import or construction time), provides the
+`benchmark` and `stand_in` fixtures, and writes a results file at the end
+of the session.
+
+Options:
+    --bench-json PATH       Results file (default results/<timestamp>.json)
+    --bench-compare PATH    Baseline results to compare against
+    --bench-threshold F     Mean slowdown reported as a regression (default 0.15)
+    --bench-rounds N        Timed rounds per benchmark (default 5)
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+for subdir in ('Shared', 'Workflows', 'Extraction/Markdown', 'Extraction/Patchright', 'Extraction/CommercialAPI', ''):
+    path = os.path.join(REPO_ROOT, subdir)
+    if path not in sys.path:
+        sys.path.append(path)
+
+from .fixtures import FIXTURES_DIR, FixtureStore
+from .harness import DEFAULT_ROUNDS, DEFAULT_THRESHOLD, Benchmark, compare_results, format_comparison, save_results
+from .stand_ins import StandInServer
+
+_session = {
+    'server': None,
+    'loop': None,
+    'synthetic_dir': None,
+    'benchmarks': []
+}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks')
+    group.addoption('--bench-json', default=None, help='Write results JSON to this path')
+    group.addoption('--bench-compare', default=None, help='Baseline results JSON to compare against')
+    group.addoption('--bench-threshold', type=float, default=DEFAULT_THRESHOLD,
+                    help='Mean slowdown reported as a regression')
+    group.addoption('--bench-rounds', type=int, default=DEFAULT_ROUNDS, help='Timed rounds per benchmark')
+
+
+def pytest_configure(config):
+    synthetic_dir = tempfile.mkdtemp(prefix='bench_fixtures_')
+    server = StandInServer(FixtureStore([FIXTURES_DIR, synthetic_dir])).start()
+    os.environ.update(server.env())
+    # Span JSONL from traced calls stays out of the repo's logs/
+    os.environ.setdefault('TRACE_DIR', os.path.join(synthetic_dir, 'traces'))
+
+    _session['server'] = server
+    _session['synthetic_dir'] = synthetic_dir
+    _session['loop'] = asyncio.new_event_loop()
+
+
+def pytest_unconfigure(config):
+    if _session['server']:
+        _session['server'].stop()
+    if _session['loop']:
+        _session['loop'].close()
+    if _session['synthetic_dir']:
+        shutil.rmtree(_session['synthetic_dir'], ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def stand_in() -> StandInServer:
+    return _session['server']
+
+
+@pytest.fixture(scope='session')
+def synthetic_store() -> FixtureStore:
+    """Writable store for generated fixtures (recorded fixtures still win)"""
+    return FixtureStore([_session['synthetic_dir']])
+
+
+@pytest.fixture(scope='session')
+def event_loop_runner():
+    """Run a coroutine on the session loop (for async setup outside benchmark())"""
+    return _session['loop'].run_until_complete
+
+
+@pytest.fixture
+def benchmark(request) -> Benchmark:
+    bench = Benchmark(
+        request.node.name,
+        _session['loop'],
+        rounds=request.config.getoption('--bench-rounds'),
+        group=request.node.module.__name__.rsplit('.', 1)[-1]
+    )
+    yield bench
+    if bench.stats is not None:
+        _session['benchmarks'].append(bench)
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    benchmarks = _session['benchmarks']
+    if not benchmarks:
+        return
+
+    server = _session['server']
+    path = save_results(
+        benchmarks,
+        config.getoption('--bench-json'),
+        extra={'stand_in': server.summary() if server else None}
+    )
+
+    write = terminalreporter.write_line
+    terminalreporter.section('benchmarks')
+    write(f"{'benchmark':<60} {'mean':>11} {'median':>11} {'stddev':>10} {'rounds':>6}")
+    for bench in benchmarks:
+        stats = bench.stats
+        write(
+            f"{bench.name[:60]:<60} {stats['mean'] * 1000:>9.2f}ms {stats['median'] * 1000:>9.2f}ms "
+            f"{stats['stddev'] * 1000:>8.2f}ms {stats['rounds']:>6}"
+        )
+    write(f"📄 Results: {path}")
+    if server and server.misses:
+        write(f"⚠️ {len(server.misses)} stand-in requests had no fixture (first: {server.misses[0]})")
+
+    baseline_path = config.getoption('--bench-compare')
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        with open(path) as f:
+            current = json.load(f)
+        rows = compare_results(baseline, current, config.getoption('--bench-threshold'))
+        write('')
+        write(format_comparison(rows))
+        regressions = [row['name'] for row in rows if row['regression']]
+        if regressions:
+            write(f"⚠️ {len(regressions)} regression(s): {', '.join(regressions)}")
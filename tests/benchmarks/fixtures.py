@@ -0,0 +1,132 @@
+"""
+Benchmark Fixtures - Recorded service responses on disk
+
+One JSON file per recorded exchange under fixtures/<service>/<key>.json:
+
+    {
+        "service": "jina",
+        "request": {"method": "GET", "path": "/https://www.revolve.com/...", "query": {}},
+        "match": "https://www.revolve.com/...",
+        "response": {"status": 200, "content_type": "text/plain", "body": "..."},
+        "recorded_at": "2026-10-18T12:00:00"
+    }
+
+Keys hash the parts of a request that identify it for that service (target
+URL for ZenRows/Jina, method + path for Shopify, the request body for LLM
+calls). Credentials are never written: apikey query parameters and auth
+headers are dropped before the request is stored.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+SERVICES = ('zenrows', 'jina', 'deepseek', 'shopify')
+
+# Query parameters that carry credentials
+SECRET_PARAMS = {'apikey', 'api_key', 'key', 'token', 'access_token'}
+
+
+def scrub_query(query: Dict[str, str]) -> Dict[str, str]:
+    return {k: v for k, v in sorted(query.items()) if k.lower() not in SECRET_PARAMS}
+
+
+def fixture_key(service: str, method: str, path: str, query: Dict[str, str], body: bytes = b'') -> str:
+    """Stable fixture key for a request to service"""
+    query = scrub_query(query)
+    if service == 'zenrows':
+        parts = [query.get('url', '')]
+    elif service == 'jina':
+        parts = [path.lstrip('/')]
+    elif service == 'shopify':
+        parts = [method.upper(), path.split('/admin/api/', 1)[-1].split('/', 1)[-1]]
+    else:
+        parts = [method.upper(), path, (body or b'').decode('utf-8', 'replace')]
+    digest = hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()[:16]
+    return f"{method.lower()}_{digest}"
+
+
+class FixtureStore:
+    """
+    Directory of recorded exchanges, with in-memory lookups
+
+    Stores can be layered: lookups try each directory in order, so recorded
+    fixtures take precedence over generated (synthetic) ones.
+
+    Usage:
+        store = FixtureStore([FIXTURES_DIR, synthetic_dir])
+        fixture = store.get('jina', key)
+    """
+
+    def __init__(self, directories: List[str] = None):
+        self.directories = directories or [FIXTURES_DIR]
+        self._cache: Dict[str, Dict[str, Dict]] = {}
+
+    @property
+    def write_dir(self) -> str:
+        return self.directories[0]
+
+    def _load_service(self, service: str) -> Dict[str, Dict]:
+        if service not in self._cache:
+            fixtures = {}
+            for directory in reversed(self.directories):
+                service_dir = os.path.join(directory, service)
+                if not os.path.isdir(service_dir):
+                    continue
+                for name in sorted(os.listdir(service_dir)):
+                    if name.endswith('.json'):
+                        with open(os.path.join(service_dir, name), 'r') as f:
+                            fixtures[name[:-5]] = json.load(f)
+            self._cache[service] = fixtures
+        return self._cache[service]
+
+    def get(self, service: str, key: str) -> Optional[Dict]:
+        return self._load_service(service).get(key)
+
+    def find_match(self, service: str, text: str) -> Optional[Dict]:
+        """First fixture whose 'match' string occurs in text (LLM prompts)"""
+        for fixture in self._load_service(service).values():
+            match = fixture.get('match')
+            if match and match in text:
+                return fixture
+        return None
+
+    def iter_service(self, service: str) -> Iterator[Dict]:
+        return iter(self._load_service(service).values())
+
+    def save(
+        self,
+        service: str,
+        key: str,
+        request: Dict,
+        status: int,
+        content_type: str,
+        body: str,
+        match: str = None
+    ) -> str:
+        """Write one exchange to the first directory; returns the file path"""
+        fixture = {
+            'service': service,
+            'request': {
+                'method': request['method'],
+                'path': request['path'],
+                'query': scrub_query(request.get('query', {}))
+            },
+            'match': match,
+            'response': {'status': status, 'content_type': content_type, 'body': body},
+            'recorded_at': datetime.now().isoformat(timespec='seconds')
+        }
+        service_dir = os.path.join(self.write_dir, service)
+        os.makedirs(service_dir, exist_ok=True)
+        path = os.path.join(service_dir, f"{key}.json")
+        with open(path, 'w') as f:
+            json.dump(fixture, f, indent=2)
+        self._cache.pop(service, None)
+        return path
+
+    def counts(self) -> Dict[str, int]:
+        return {service: len(self._load_service(service)) for service in SERVICES}
@@ -0,0 +1,230 @@
+"""
+Benchmark Harness - Timing, results files and regression comparison
+
+A small stand-in for pytest-benchmark (not a project dependency) with the
+same calling convention, so the suite can move to it without edits:
+
+    def bench_parse(benchmark):
+        result = benchmark(parser.parse, html)
+        benchmark.pedantic(coro_fn, args=(x,), setup=reset, rounds=5)
+
+Coroutine functions are awaited on one persistent event loop per session,
+so aiohttp/aiosqlite state created in setup survives between rounds.
+
+Results are written as JSON (one file per run) and can be compared against
+a saved baseline:
+
+    python -m tests.benchmarks.harness results/baseline.json results/latest.json
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+# Mean slowdown (fraction) reported as a regression
+DEFAULT_THRESHOLD = 0.15
+
+DEFAULT_ROUNDS = 5
+
+
+class Benchmark:
+    """
+    Times one callable per test
+
+    Features:
+    - Sync and async callables (async run on the shared session loop)
+    - Warmup round excluded from stats
+    - Per-round setup hook (pedantic mode)
+    - extra_info dict saved with the stats (counts, bytes, call totals)
+    """
+
+    def __init__(self, name: str, loop: asyncio.AbstractEventLoop, rounds: int = DEFAULT_ROUNDS, group: str = None):
+        self.name = name
+        self.group = group
+        self.loop = loop
+        self.rounds = rounds
+        self.extra_info: Dict[str, Any] = {}
+        self.stats: Optional[Dict[str, float]] = None
+
+    def __call__(self, fn: Callable, *args, **kwargs) -> Any:
+        return self.pedantic(fn, args=args, kwargs=kwargs, rounds=self.rounds, warmup_rounds=1)
+
+    def pedantic(
+        self,
+        fn: Callable,
+        args: tuple = (),
+        kwargs: Dict = None,
+        setup: Callable = None,
+        rounds: int = None,
+        iterations: int = 1,
+        warmup_rounds: int = 0
+    ) -> Any:
+        """Run fn rounds x iterations times; setup (sync or async) runs before each round"""
+        if self.stats is not None:
+            raise RuntimeError(f"{self.name}: benchmark fixture can only be used once per test")
+        kwargs = kwargs or {}
+        rounds = rounds or self.rounds
+
+        timings = []
+        result = None
+        for round_index in range(warmup_rounds + rounds):
+            call_args, call_kwargs = args, kwargs
+            if setup is not None:
+                prepared = self._run(setup)
+                if prepared is not None:
+                    call_args, call_kwargs = prepared
+
+            start = time.perf_counter()
+            for _ in range(iterations):
+                result = self._run(fn, *call_args, **call_kwargs)
+            elapsed = (time.perf_counter() - start) / iterations
+
+            if round_index >= warmup_rounds:
+                timings.append(elapsed)
+
+        self.stats = _summarize(timings, iterations)
+        return result
+
+    def _run(self, fn: Callable, *args, **kwargs) -> Any:
+        if inspect.iscoroutinefunction(fn):
+            return self.loop.run_until_complete(fn(*args, **kwargs))
+        result = fn(*args, **kwargs)
+        if inspect.isawaitable(result):
+            return self.loop.run_until_complete(result)
+        return result
+
+    def as_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'group': self.group,
+            'stats': self.stats,
+            'extra_info': self.extra_info
+        }
+
+
+def _summarize(timings: List[float], iterations: int) -> Dict[str, float]:
+    mean = statistics.mean(timings)
+    return {
+        'min': min(timings),
+        'max': max(timings),
+        'mean': mean,
+        'median': statistics.median(timings),
+        'stddev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'rounds': len(timings),
+        'iterations': iterations,
+        'ops': 1.0 / mean if mean else 0.0
+    }
+
+
+# =================== RESULTS FILES ===================
+
+def _commit_info() -> Dict[str, Any]:
+    repo_root = os.path.join(os.path.dirname(__file__), '..', '..')
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=repo_root, capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            cwd=repo_root, capture_output=True, text=True, timeout=10
+        ).stdout.strip())
+        return {'id': commit, 'dirty': dirty}
+    except Exception:
+        return {'id': None, 'dirty': None}
+
+
+def machine_info() -> Dict[str, Any]:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def save_results(benchmarks: List[Benchmark], path: str = None, extra: Dict = None) -> str:
+    """Write completed benchmarks to path (default results/<timestamp>.json)"""
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+
+    data = {
+        'datetime': datetime.now().isoformat(timespec='seconds'),
+        'machine_info': machine_info(),
+        'commit_info': _commit_info(),
+        'benchmarks': [b.as_dict() for b in benchmarks if b.stats is not None],
+        **(extra or {})
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+    return path
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """
+    Compare mean timings by benchmark name
+
+    Returns one row per benchmark present in both runs, with 'regression'
+    set when current is more than threshold slower than baseline.
+    """
+    baseline_by_name = {b['name']: b for b in baseline.get('benchmarks', [])}
+    rows = []
+    for bench in current.get('benchmarks', []):
+        before = baseline_by_name.get(bench['name'])
+        if not before:
+            continue
+        old_mean = before['stats']['mean']
+        new_mean = bench['stats']['mean']
+        change = (new_mean - old_mean) / old_mean if old_mean else 0.0
+        rows.append({
+            'name': bench['name'],
+            'baseline_mean': old_mean,
+            'current_mean': new_mean,
+            'change': change,
+            'regression': change > threshold
+        })
+    return rows
+
+
+def format_comparison(rows: List[Dict]) -> str:
+    lines = [f"{'benchmark':<60} {'baseline':>11} {'current':>11} {'change':>8}"]
+    for row in rows:
+        flag = '  ⚠️ REGRESSION' if row['regression'] else ''
+        lines.append(
+            f"{row['name'][:60]:<60} {row['baseline_mean'] * 1000:>9.2f}ms "
+            f"{row['current_mean'] * 1000:>9.2f}ms {row['change']:>+7.1%}{flag}"
+        )
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('baseline', help='Baseline results JSON')
+    parser.add_argument('current', help='Current results JSON')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Mean slowdown reported as a regression (default {DEFAULT_THRESHOLD})")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows = compare_results(baseline, current, args.threshold)
+    print(format_comparison(rows))
+    sys.exit(1 if any(row['regression'] for row in rows) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Fixture Recorder - Capture real service responses for offline replay
+
+Runs the stand-in server in record mode: every request is proxied to the
+real ZenRows / Jina / DeepSeek / Shopify endpoint with your credentials and
+the response is saved under tests/benchmarks/fixtures/. Point a workflow at
+it with the printed exports, run it once, and the benchmark suite can
+replay the same traffic offline.
+
+Recorded Shopify writes hit the real store; record against a dev store.
+
+Usage:
+    python -m tests.benchmarks.recorder --port 8765
+    # in another shell, paste the printed exports, then e.g.
+    python Workflows/product_updater.py --batch-file batches/sample.json
+"""
+
+import argparse
+import signal
+import threading
+
+from .fixtures import FIXTURES_DIR, FixtureStore
+from .stand_ins import StandInServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record service responses as benchmark fixtures')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fixtures-dir', default=FIXTURES_DIR,
+                        help=f"Where recordings are written (default {FIXTURES_DIR})")
+    args = parser.parse_args()
+
+    store = FixtureStore([args.fixtures_dir])
+    server = StandInServer(store, mode='record', host=args.host, port=args.port).start()
+
+    print(f"🎙️ Recording to {args.fixtures_dir} via {server.base_url}")
+    print("Export these in the shell that runs the workflow:\n")
+    for name, value in server.env().items():
+        print(f"    export {name}={value}")
+    print("\nCtrl+C to stop")
+
+    stopped = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    while not stopped.wait(1):
+        pass
+
+    server.stop()
+    summary = server.summary()
+    print(f"\n✅ Recorded requests: {summary['requests']}")
+    print(f"📦 Fixtures on disk: {FixtureStore([args.fixtures_dir]).counts()}")
+
+
+if __name__ == '__main__':
+    main()
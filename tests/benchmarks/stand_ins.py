@@ -0,0 +1,427 @@
+"""
+Stand-in Servers - Local aiohttp replacements for ZenRows, Jina, DeepSeek and Shopify
+
+One server, one path prefix per service:
+
+    /zenrows/v1/?url=...               ZenRows universal scraper API
+    /jina/<target url>                 Jina reader (Markdown)
+    /deepseek/chat/completions         DeepSeek (OpenAI-compatible)
+    /shopify/admin/api/<version>/...   Shopify Admin REST + GraphQL
+
+Replay mode serves fixtures (fixtures.py) and answers Shopify calls with no
+fixture from a small in-memory emulator, so workflows can create, read and
+update products. Record mode proxies each call to the real service and
+saves the response as a fixture.
+
+The towers read their endpoints from the environment when they are
+imported, so env() must be applied before importing them.
+
+Usage:
+    server = StandInServer(FixtureStore()).start()
+    os.environ.update(server.env())
+    ...
+    server.stop()
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+
+from aiohttp import ClientSession, ClientTimeout, web
+
+from .fixtures import FixtureStore, fixture_key
+
+UPSTREAMS = {
+    'zenrows': 'https://api.zenrows.com/v1/',
+    'jina': 'https://r.jina.ai/',
+    'deepseek': 'https://api.deepseek.com',
+}
+
+# Hop-by-hop / recomputed headers not forwarded to the real service
+DROP_HEADERS = {'host', 'content-length', 'transfer-encoding', 'connection', 'accept-encoding'}
+
+# "URL Source: https://..." line Jina puts at the top of its Markdown
+URL_SOURCE_RE = re.compile(r'URL Source: (\S+)')
+
+
+class ShopifyEmulator:
+    """
+    In-memory Shopify Admin API for replay mode
+
+    Covers what ShopifyManager calls: product create/get/update, product
+    metafields, image uploads by src/attachment and the GraphQL mutations
+    used for metafields and staged media.
+    """
+
+    def __init__(self):
+        self.products: Dict[int, Dict] = {}
+        self.metafields: Dict[int, List[Dict]] = {}
+        self._ids = itertools.count(9_000_000_000)
+        self.calls: Dict[str, int] = {}
+
+    def seed_product(self, product_id: int, product: Dict, metafields: List[Dict] = None):
+        product = dict(product, id=product_id)
+        product.setdefault('variants', [{'id': next(self._ids), 'price': '0.00'}])
+        product.setdefault('images', [])
+        self.products[product_id] = product
+        self.metafields[product_id] = [
+            dict(metafield, id=next(self._ids)) for metafield in (metafields or [])
+        ]
+
+    def _count(self, name: str):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    async def handle(self, request: web.Request, tail: str, raw_body: bytes = b'') -> web.Response:
+        # tail: "<version>/products/123.json" etc.
+        path = tail.split('/', 1)[1] if '/' in tail else tail
+        body = json.loads(raw_body) if raw_body else {}
+
+        if path == 'graphql.json':
+            origin = str(request.url.origin())
+            return web.json_response(self._graphql(body.get('query', ''), body.get('variables') or {}, origin))
+
+        match = re.fullmatch(r'products(?:/(\d+))?(?:/(metafields|images))?\.json', path)
+        if not match:
+            return web.json_response({'errors': f"Not emulated: {path}"}, status=404)
+
+        product_id = int(match.group(1)) if match.group(1) else None
+        sub_resource = match.group(2)
+
+        if product_id is None and request.method == 'POST':
+            self._count('product_create')
+            return web.json_response({'product': self._create_product(body['product'])}, status=201)
+
+        product = self.products.get(product_id)
+        if product is None:
+            return web.json_response({'errors': 'Not Found'}, status=404)
+
+        if sub_resource == 'metafields':
+            self._count('metafields_' + request.method.lower())
+            if request.method == 'POST':
+                self._upsert_metafields(product_id, [body['metafield']])
+                return web.json_response({'metafield': body['metafield']}, status=201)
+            return web.json_response({'metafields': self.metafields.get(product_id, [])})
+
+        if sub_resource == 'images':
+            self._count('image_upload')
+            image = self._add_image(product, body['image'])
+            return web.json_response({'image': image})
+
+        if request.method == 'GET':
+            self._count('product_get')
+            return web.json_response({'product': product})
+
+        if request.method == 'PUT':
+            self._count('product_update')
+            self._update_product(product, body['product'])
+            return web.json_response({'product': product})
+
+        return web.json_response({'errors': 'Method not emulated'}, status=405)
+
+    def _create_product(self, payload: Dict) -> Dict:
+        product_id = next(self._ids)
+        product = {
+            key: value for key, value in payload.items()
+            if key not in ('metafields', 'images', 'variants')
+        }
+        product['id'] = product_id
+        product['variants'] = [dict(variant, id=next(self._ids)) for variant in payload.get('variants', [])]
+        product['images'] = []
+        self.products[product_id] = product
+        for image in payload.get('images', []):
+            self._add_image(product, image)
+        self.metafields[product_id] = []
+        self._upsert_metafields(product_id, payload.get('metafields', []))
+        return product
+
+    def _update_product(self, product: Dict, changes: Dict):
+        for key, value in changes.items():
+            if key == 'variants':
+                by_id = {variant['id']: variant for variant in product['variants']}
+                for variant in value:
+                    by_id.get(variant.get('id'), {}).update(variant)
+            elif key != 'id':
+                product[key] = value
+
+    def _add_image(self, product: Dict, image: Dict) -> Dict:
+        image_id = next(self._ids)
+        entry = {
+            'id': image_id,
+            'position': image.get('position') or len(product['images']) + 1,
+            'alt': image.get('alt'),
+            'src': f"https://cdn.shopify.com/s/files/stand-in/{image_id}.jpg"
+        }
+        product['images'].append(entry)
+        return entry
+
+    def _upsert_metafields(self, product_id: int, metafields: List[Dict]):
+        stored = self.metafields.setdefault(product_id, [])
+        by_key = {(mf['namespace'], mf['key']): mf for mf in stored}
+        for metafield in metafields:
+            existing = by_key.get((metafield['namespace'], metafield['key']))
+            if existing:
+                existing['value'] = metafield['value']
+            else:
+                entry = {
+                    'id': next(self._ids),
+                    'namespace': metafield['namespace'],
+                    'key': metafield['key'],
+                    'value': metafield['value'],
+                    'type': metafield.get('type')
+                }
+                stored.append(entry)
+                by_key[(entry['namespace'], entry['key'])] = entry
+
+    def _graphql(self, query: str, variables: Dict, origin: str) -> Dict:
+        if 'metafieldsSet' in query:
+            self._count('metafields_set')
+            for metafield in variables['metafields']:
+                product_id = int(metafield['ownerId'].rsplit('/', 1)[-1])
+                self._upsert_metafields(product_id, [metafield])
+            return {'data': {'metafieldsSet': {'metafields': [], 'userErrors': []}}}
+
+        if 'stagedUploadsCreate' in query:
+            self._count('staged_uploads_create')
+            targets = [
+                {'url': f"{origin}/shopify/staged/{i}", 'resourceUrl': f"{origin}/shopify/staged/{i}", 'parameters': []}
+                for i, _ in enumerate(variables['input'])
+            ]
+            return {'data': {'stagedUploadsCreate': {'stagedTargets': targets, 'userErrors': []}}}
+
+        if 'productCreateMedia' in query:
+            self._count('product_create_media')
+            media = [{'id': f"gid://shopify/MediaImage/{next(self._ids)}", 'status': 'READY'}
+                     for _ in variables['media']]
+            return {'data': {'productCreateMedia': {'media': media, 'mediaUserErrors': []}}}
+
+        if 'nodes' in query:
+            nodes = [
+                {'id': media_id, 'status': 'READY',
+                 'image': {'url': f"https://cdn.shopify.com/s/files/stand-in/{media_id.rsplit('/', 1)[-1]}.jpg"}}
+                for media_id in variables['ids']
+            ]
+            return {'data': {'nodes': nodes}}
+
+        return {'errors': [{'message': 'Query not emulated'}]}
+
+
+class StandInServer:
+    """
+    Local server standing in for the external services
+
+    Features:
+    - replay: fixtures first, Shopify emulator for unrecorded Shopify calls
+    - record: proxy to the real services and save each response as a fixture
+    - Optional per-service latency to model network round trips
+    - Runs on its own event loop thread (the Jina and DeepSeek clients are
+      synchronous and called from executor threads)
+    """
+
+    def __init__(
+        self,
+        store: FixtureStore,
+        mode: str = 'replay',
+        host: str = '127.0.0.1',
+        port: int = 0,
+        latency: Dict[str, float] = None
+    ):
+        if mode not in ('replay', 'record'):
+            raise ValueError(f"Unknown stand-in mode: {mode}")
+        self.store = store
+        self.mode = mode
+        self.host = host
+        self.port = port
+        self.latency = latency or {}
+        self.shopify = ShopifyEmulator()
+        self.requests: Dict[str, int] = {}
+        self.misses: List[str] = []
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._upstream: Optional[ClientSession] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def env(self) -> Dict[str, str]:
+        """Environment that points the towers at this server"""
+        env = {
+            'ZENROWS_API_ENDPOINT': f"{self.base_url}/zenrows/v1/",
+            'JINA_ENDPOINT': f"{self.base_url}/jina/",
+            'DEEPSEEK_BASE_URL': f"{self.base_url}/deepseek",
+            'SHOPIFY_API_BASE_URL': f"{self.base_url}/shopify/admin/api",
+        }
+        if self.mode == 'replay':
+            # Credentials only have to look valid; nothing leaves the machine
+            for name, value in (
+                ('ZENROWS_API_KEY', 'stand-in'),
+                ('DEEPSEEK_API_KEY', 'stand-in'),
+                # Gemini is not redirected; the key only lets the extractors construct
+                ('GOOGLE_API_KEY', 'stand-in'),
+                ('SHOPIFY_ACCESS_TOKEN', 'stand-in-token'),
+                ('SHOPIFY_STORE_URL', 'stand-in.myshopify.com'),
+            ):
+                env[name] = os.environ.get(name) or value
+        return env
+
+    # =================== LIFECYCLE ===================
+
+    def _build_app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_route('*', '/zenrows/{tail:.*}', self._zenrows)
+        app.router.add_route('*', '/jina/{tail:.*}', self._jina)
+        app.router.add_route('*', '/deepseek/{tail:.*}', self._deepseek)
+        app.router.add_route('*', '/shopify/admin/api/{tail:.*}', self._shopify)
+        app.router.add_post('/shopify/staged/{index}', self._staged_upload)
+        return app
+
+    def start(self) -> 'StandInServer':
+        started = threading.Event()
+        errors = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self._start())
+            except Exception as e:
+                errors.append(e)
+                started.set()
+                return
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name='stand-in-server', daemon=True)
+        self._thread.start()
+        started.wait(timeout=10)
+        if errors:
+            raise errors[0]
+        return self
+
+    async def _start(self):
+        self._runner = web.AppRunner(self._build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        if self.mode == 'record':
+            self._upstream = ClientSession(timeout=ClientTimeout(total=180))
+
+    def stop(self):
+        if not self._loop:
+            return
+
+        async def shutdown():
+            if self._upstream:
+                await self._upstream.close()
+            await self._runner.cleanup()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(timeout=10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+        self._loop = None
+
+    # =================== HANDLERS ===================
+
+    async def _serve(self, service: str, request: web.Request, key: str, body: bytes,
+                     upstream_url: str = None, match_text: str = None) -> web.Response:
+        self.requests[service] = self.requests.get(service, 0) + 1
+        if self.latency.get(service):
+            await asyncio.sleep(self.latency[service])
+
+        if self.mode == 'record' and upstream_url:
+            return await self._record(service, request, key, body, upstream_url, match_text)
+
+        fixture = self.store.get(service, key)
+        if fixture is None and match_text is not None:
+            fixture = self.store.find_match(service, match_text)
+        if fixture is None:
+            self.misses.append(f"{service} {request.method} {request.path_qs[:120]}")
+            return web.json_response({'error': f"No {service} fixture for {key}"}, status=404)
+
+        response = fixture['response']
+        return web.Response(
+            status=response['status'],
+            text=response['body'],
+            content_type=response.get('content_type') or 'text/plain'
+        )
+
+    async def _record(self, service: str, request: web.Request, key: str, body: bytes,
+                      upstream_url: str, match_text: str = None) -> web.Response:
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in DROP_HEADERS}
+        async with self._upstream.request(request.method, upstream_url, headers=headers,
+                                          data=body or None) as upstream:
+            text = await upstream.text()
+            content_type = upstream.content_type
+
+        match = None
+        if match_text:
+            found = URL_SOURCE_RE.search(match_text)
+            match = found.group(1) if found else None
+
+        if upstream.status < 500:
+            self.store.save(
+                service, key,
+                {'method': request.method, 'path': request.path, 'query': dict(request.query)},
+                upstream.status, content_type, text, match=match
+            )
+        return web.Response(status=upstream.status, text=text, content_type=content_type)
+
+    async def _zenrows(self, request: web.Request) -> web.Response:
+        key = fixture_key('zenrows', request.method, request.path, dict(request.query))
+        upstream_url = f"{UPSTREAMS['zenrows']}?{urlencode(dict(request.query))}"
+        return await self._serve('zenrows', request, key, b'', upstream_url)
+
+    async def _jina(self, request: web.Request) -> web.Response:
+        target = request.path_qs[len('/jina/'):]
+        key = fixture_key('jina', request.method, '/' + target, {})
+        return await self._serve('jina', request, key, b'', UPSTREAMS['jina'] + target)
+
+    async def _deepseek(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        key = fixture_key('deepseek', request.method, request.path, {}, body)
+        upstream_url = f"{UPSTREAMS['deepseek']}/{request.match_info['tail']}"
+        return await self._serve('deepseek', request, key, body, upstream_url,
+                                 match_text=body.decode('utf-8', 'replace'))
+
+    async def _shopify(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        tail = request.match_info['tail']
+        key = fixture_key('shopify', request.method, request.path, dict(request.query))
+
+        if self.mode == 'record':
+            store_url = os.environ.get('SHOPIFY_STORE_URL', '')
+            upstream_url = f"https://{store_url}/admin/api/{tail}"
+            if request.query_string:
+                upstream_url += f"?{request.query_string}"
+            return await self._serve('shopify', request, key, body, upstream_url)
+
+        if self.store.get('shopify', key) is not None:
+            return await self._serve('shopify', request, key, body)
+
+        self.requests['shopify'] = self.requests.get('shopify', 0) + 1
+        if self.latency.get('shopify'):
+            await asyncio.sleep(self.latency['shopify'])
+        return await self.shopify.handle(request, tail, body)
+
+    async def _staged_upload(self, request: web.Request) -> web.Response:
+        await request.read()
+        self.shopify._count('staged_upload')
+        return web.Response(status=201)
+
+    # =================== REPORTING ===================
+
+    def summary(self) -> Dict:
+        return {
+            'mode': self.mode,
+            'requests': dict(self.requests),
+            'shopify_calls': dict(self.shopify.calls),
+            'fixture_misses': list(self.misses)
+        }
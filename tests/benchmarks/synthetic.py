@@ -0,0 +1,379 @@
+"""
+Synthetic Fixtures - Deterministic inputs for the benchmark suite
+
+Generates retailer-shaped inputs for paths that have no recording yet:
+- Product page HTML (CSS-selector layout and JSON-LD layout, padded with
+  navigation/script noise to a realistic size)
+- Jina Markdown for product pages and the matching DeepSeek completions
+- Pipe-separated catalog LLM responses
+- A products.db with products and catalog_products rows for dedup and
+  batch-update benchmarks
+
+Everything is seeded, so two runs on the same commit see identical inputs.
+Recorded fixtures (fixtures/) take precedence over these in replay.
+"""
+
+import json
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from .fixtures import FixtureStore, fixture_key
+
+ADJECTIVES = ['Floral', 'Pleated', 'Satin', 'Linen', 'Tiered', 'Wrap', 'Ribbed', 'Belted', 'Smocked', 'Draped']
+STYLES = ['Midi', 'Maxi', 'Long Sleeve', 'Puff Sleeve', 'High Neck', 'Button Front', 'A-Line', 'Relaxed']
+GARMENTS = ['Dress', 'Skirt', 'Blouse', 'Tunic', 'Cardigan', 'Trench Coat', 'Wide Leg Pant', 'Shirt Dress']
+
+# Columns DatabaseManager reads and writes
+PRODUCTS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        url TEXT UNIQUE NOT NULL,
+        retailer TEXT,
+        title TEXT,
+        price REAL,
+        original_price REAL,
+        brand TEXT,
+        description TEXT,
+        product_code TEXT,
+        images TEXT,
+        image_urls TEXT,
+        sale_status TEXT,
+        stock_status TEXT,
+        shopify_id INTEGER,
+        modesty_status TEXT,
+        shopify_status TEXT,
+        images_uploaded INTEGER DEFAULT 0,
+        images_uploaded_at TEXT,
+        images_failed_count INTEGER DEFAULT 0,
+        last_image_error TEXT,
+        source TEXT,
+        assessment_status TEXT,
+        lifecycle_stage TEXT,
+        data_completeness TEXT,
+        last_workflow TEXT,
+        extracted_at TEXT,
+        assessed_at TEXT,
+        first_seen TEXT,
+        last_updated TEXT,
+        last_checked TEXT
+    )
+'''
+
+CATALOG_PRODUCTS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS catalog_products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        catalog_url TEXT,
+        retailer TEXT,
+        category TEXT,
+        title TEXT,
+        price REAL,
+        product_code TEXT,
+        image_urls TEXT,
+        discovered_date TEXT,
+        review_status TEXT,
+        scan_type TEXT,
+        image_url_source TEXT,
+        updated_at TEXT
+    )
+'''
+
+
+def product_title(i: int) -> str:
+    rng = random.Random(i)
+    return f"{rng.choice(ADJECTIVES)} {rng.choice(STYLES)} {rng.choice(GARMENTS)} {i}"
+
+
+def product_url(retailer: str, i: int) -> str:
+    if retailer == 'revolve':
+        return f"https://www.revolve.com/bench-{i}/dp/BNCH-WD{i:05d}/"
+    return f"https://www.{retailer}.com/s/bench-{i}/{7000000 + i}"
+
+
+def product_record(retailer: str, i: int) -> Dict:
+    """Canonical product i of retailer (what a clean extraction returns)"""
+    rng = random.Random(i * 7919)
+    price = round(rng.uniform(29, 420), 2)
+    on_sale = i % 4 == 0
+    return {
+        'url': product_url(retailer, i),
+        'retailer': retailer,
+        'title': product_title(i),
+        'brand': rng.choice(['Line & Dot', 'Astr the Label', 'Song of Style', 'Bardot', 'Lovers and Friends']),
+        'price': round(price * 0.7, 2) if on_sale else price,
+        'original_price': price if on_sale else None,
+        'sale_status': 'on sale' if on_sale else 'not on sale',
+        'stock_status': 'in stock',
+        'description': (
+            f"{product_title(i)} in a lightweight woven fabric. Fully lined, hidden back zip, "
+            f"relaxed through the body with a flattering drape. Model is 5'10\" wearing size S. "
+        ) * 3,
+        'product_code': f"BNCH-WD{i:05d}",
+        'image_urls': [
+            f"https://is4.revolveassets.com/images/p4/n/z/BNCH-WD{i:05d}_V{view}.jpg"
+            for view in range(1, 6)
+        ],
+        'clothing_type': 'dress',
+    }
+
+
+# =================== HTML ===================
+
+def _page_noise(rng: random.Random, kilobytes: int) -> str:
+    """Navigation, footer and inline script padding typical of retailer pages"""
+    parts = ['<header><nav class="global-nav"><ul>']
+    for n in range(120):
+        parts.append(f'<li class="nav-item"><a href="/c/{n}" data-track="nav-{n}">Category {n}</a></li>')
+    parts.append('</ul></nav></header>')
+    while sum(len(p) for p in parts) < kilobytes * 1024:
+        blob = json.dumps({'experiments': [rng.randrange(10 ** 9) for _ in range(40)], 'flags': 'x' * 200})
+        parts.append(f'<script>window.__STATE_{rng.randrange(10 ** 6)} = {blob};</script>')
+        parts.append(
+            '<div class="recs"><div class="tile"><img src="/icons/heart.svg" alt="">'
+            '<span class="tile-title">Recommended</span><span class="price">$58</span></div></div>'
+        )
+    parts.append('<footer>' + '<p class="legal">Terms &amp; privacy</p>' * 40 + '</footer>')
+    return ''.join(parts)
+
+
+def product_page_html(i: int, layout: str = 'css', kilobytes: int = 250) -> str:
+    """
+    Product page HTML for Commercial API parsing
+
+    layout='css': nordstrom-style data-testid markup (CSS selector path)
+    layout='json_ld': schema.org Product JSON-LD (JavaScript parser path)
+    """
+    record = product_record('nordstrom', i)
+    rng = random.Random(i)
+    images = [url.replace('revolveassets', 'nordstrommedia') for url in record['image_urls']]
+
+    if layout == 'json_ld':
+        json_ld = {
+            '@context': 'https://schema.org',
+            '@type': 'Product',
+            'name': record['title'],
+            'description': record['description'],
+            'image': images,
+            'brand': {'@type': 'Brand', 'name': record['brand']},
+            'sku': record['product_code'],
+            'offers': {
+                '@type': 'Offer',
+                'price': str(record['price']),
+                'priceCurrency': 'USD',
+                'availability': 'https://schema.org/InStock'
+            }
+        }
+        main = f'<script type="application/ld+json">{json.dumps(json_ld)}</script><main><h1>{record["title"]}</h1></main>'
+    else:
+        image_tags = ''.join(
+            f'<img data-testid="product-image" src="{url}" alt="{record["title"]}">' for url in images
+        )
+        original = (
+            f'<span data-testid="original-price">${record["original_price"]:.2f}</span>'
+            if record['original_price'] else ''
+        )
+        main = (
+            '<main><section class="product">'
+            f'<h1 data-testid="product-title">{record["title"]}</h1>'
+            f'<span data-testid="product-price">${record["price"]:.2f}</span>{original}'
+            f'<div data-testid="product-description"><p>{record["description"]}</p></div>'
+            f'<div class="gallery">{image_tags}</div>'
+            '<span data-testid="availability">In Stock</span>'
+            '</section></main>'
+        )
+
+    return (
+        f'<!DOCTYPE html><html><head><title>{record["title"]} | Nordstrom</title></head>'
+        f'<body>{_page_noise(rng, kilobytes // 2)}{main}{_page_noise(rng, kilobytes // 2)}</body></html>'
+    )
+
+
+# =================== MARKDOWN / LLM ===================
+
+def product_markdown(record: Dict) -> str:
+    """Jina reader output for a product page"""
+    lines = [
+        f"Title: {record['title']} | REVOLVE",
+        '',
+        f"URL Source: {record['url']}",
+        '',
+        'Markdown Content:',
+        '[Skip to main content](#main)',
+        '',
+        '* [New](https://www.revolve.com/new/) * [Clothing](https://www.revolve.com/clothing/) * [Dresses](https://www.revolve.com/dresses/)',
+        '',
+        f"# {record['title']}",
+        '',
+        f"{record['brand']}",
+        '',
+    ]
+    if record['original_price']:
+        lines.append(f"~~${record['original_price']:.2f}~~ ${record['price']:.2f}")
+    else:
+        lines.append(f"${record['price']:.2f}")
+    lines += ['', record['description'], '']
+    lines += [f"![{record['title']}]({url})" for url in record['image_urls']]
+    lines += ['', '## You May Also Like', '']
+    # Recommendation links deliberately avoid product_url() so a product's
+    # prompt never contains another product's URL (DeepSeek fixtures match on it)
+    lines += [f"* [{product_title(n)}](https://www.revolve.com/rec-{n}/br/{n:04d}/) $98.00" for n in range(40)]
+    return '\n'.join(lines)
+
+
+def product_llm_json(record: Dict) -> str:
+    """What the extraction LLM returns for record"""
+    data = {key: record[key] for key in (
+        'title', 'brand', 'price', 'original_price', 'sale_status', 'stock_status',
+        'description', 'product_code', 'image_urls', 'clothing_type'
+    )}
+    data['price'] = f"{record['price']:.2f}"
+    return '```json\n' + json.dumps(data, indent=2) + '\n```'
+
+
+def chat_completion(content: str, prompt_tokens: int = 3000) -> str:
+    """OpenAI-compatible chat completion body"""
+    return json.dumps({
+        'id': 'chatcmpl-stand-in',
+        'object': 'chat.completion',
+        'created': 1760000000,
+        'model': 'deepseek-chat',
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': 'stop'
+        }],
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': len(content) // 4,
+            'total_tokens': prompt_tokens + len(content) // 4
+        }
+    })
+
+
+def catalog_text_response(n_products: int, retailer: str = 'revolve', seed: int = 0) -> str:
+    """Pipe-separated catalog extraction output (MarkdownCatalogExtractor format)"""
+    lines = ['Here are the products found on the page:', '']
+    for i in range(seed, seed + n_products):
+        record = product_record(retailer, i)
+        fields = [
+            f"URL={record['url']}",
+            f"TITLE={record['title']}",
+            f"PRICE=${record['price']:.2f}",
+        ]
+        if record['original_price']:
+            fields.append(f"ORIGINAL_PRICE=${record['original_price']:,.2f}")
+        fields.append(f"IMAGE={record['image_urls'][0]}")
+        lines.append('PRODUCT | ' + ' | '.join(fields))
+    lines += ['', f"Total: {n_products} products"]
+    return '\n'.join(lines)
+
+
+def write_product_fixtures(store: FixtureStore, records: List[Dict]) -> int:
+    """Jina + DeepSeek fixtures for each product record; returns fixtures written"""
+    written = 0
+    for record in records:
+        path = '/' + record['url']
+        store.save(
+            'jina', fixture_key('jina', 'GET', path, {}),
+            {'method': 'GET', 'path': '/jina' + path}, 200, 'text/plain', product_markdown(record)
+        )
+        store.save(
+            'deepseek', f"synthetic_{record['product_code'].lower()}",
+            {'method': 'POST', 'path': '/deepseek/chat/completions'}, 200, 'application/json',
+            chat_completion(product_llm_json(record)), match=record['url']
+        )
+        written += 2
+    return written
+
+
+# =================== DATABASE ===================
+
+def build_products_db(path: str, retailer: str, n_products: int, n_catalog: int = None) -> List[Dict]:
+    """
+    products.db with n_products uploaded products and n_catalog baseline rows
+
+    Returns the product records (url, shopify_id, ...) as stored.
+    """
+    n_catalog = n_products if n_catalog is None else n_catalog
+    conn = sqlite3.connect(path)
+    conn.execute(PRODUCTS_SCHEMA)
+    conn.execute(CATALOG_PRODUCTS_SCHEMA)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_products_retailer ON products(retailer)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_catalog_retailer_url ON catalog_products(retailer, catalog_url)')
+
+    base_time = datetime(2026, 1, 1)
+    records = []
+    rows = []
+    for i in range(n_products):
+        record = product_record(retailer, i)
+        record['shopify_id'] = 8_000_000_000 + i
+        records.append(record)
+        rows.append((
+            record['url'], retailer, record['title'], record['price'], record['original_price'],
+            record['brand'], record['description'], record['product_code'],
+            json.dumps(record['image_urls']), json.dumps(record['image_urls']),
+            record['sale_status'], record['stock_status'], record['shopify_id'],
+            'modest', 'published', 1, 'shopify_upload', 'assessed', 'assessed_approved',
+            (base_time + timedelta(minutes=i)).isoformat(), (base_time + timedelta(days=30)).isoformat()
+        ))
+    conn.executemany('''
+        INSERT INTO products (url, retailer, title, price, original_price, brand, description,
+            product_code, images, image_urls, sale_status, stock_status, shopify_id,
+            modesty_status, shopify_status, images_uploaded, source, assessment_status,
+            lifecycle_stage, first_seen, last_updated)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+
+    conn.executemany('''
+        INSERT INTO catalog_products (catalog_url, retailer, category, title, price, product_code,
+            image_urls, discovered_date, review_status, scan_type, image_url_source)
+        VALUES (?, ?, 'dresses', ?, ?, ?, ?, ?, 'baseline', 'baseline', 'catalog_extraction')
+    ''', [
+        (
+            product_url(retailer, n_products + i), retailer, product_title(n_products + i),
+            product_record(retailer, n_products + i)['price'], f"BNCH-WD{n_products + i:05d}",
+            json.dumps(product_record(retailer, n_products + i)['image_urls'][:1]),
+            base_time.isoformat()
+        )
+        for i in range(n_catalog)
+    ])
+    conn.commit()
+    conn.close()
+    return records
+
+
+def catalog_scan(retailer: str, n_existing: int, n_baseline: int, n_new: int, total: int) -> List[Dict]:
+    """
+    Catalog listings as a monitor scan returns them: a mix of products already
+    in products (exact URL / tracking params / retitled), baseline-only
+    products, and brand new products.
+    """
+    rng = random.Random(42)
+    listings = []
+    for n in range(total):
+        kind = n % 4
+        if kind == 0:
+            i = rng.randrange(n_existing)
+            record = product_record(retailer, i)
+            url = record['url']
+        elif kind == 1:
+            i = rng.randrange(n_existing)
+            record = product_record(retailer, i)
+            url = record['url'] + '?navsrc=main&color=black'
+        elif kind == 2:
+            i = n_existing + rng.randrange(n_baseline)
+            record = product_record(retailer, i)
+            url = record['url']
+        else:
+            i = n_existing + n_baseline + n_new + n
+            record = product_record(retailer, i)
+            url = record['url']
+        listings.append({
+            'url': url,
+            'title': record['title'],
+            'price': record['price'],
+            'image_urls': record['image_urls'][:1],
+            'retailer': retailer
+        })
+    return listings
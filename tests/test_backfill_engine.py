@@ -0,0 +1,111 @@
+"""
+Tests for BackfillEngine (chunked, resumable backfills)
+Offline: temporary SQLite database
+"""
+
+import sys
+import os
+import asyncio
+import sqlite3
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "Shared"))
+
+from backfill_engine import BackfillEngine
+from backfill_lifecycle_stages import LifecycleStageJob
+
+PRODUCTS = 23
+
+
+def _products_db(tmp_path) -> str:
+    db_path = str(tmp_path / "products.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE products (
+            url TEXT PRIMARY KEY,
+            source TEXT,
+            shopify_status TEXT,
+            modesty_status TEXT,
+            assessment_status TEXT,
+            lifecycle_stage TEXT,
+            data_completeness TEXT
+        )
+    ''')
+    rows = []
+    for i in range(PRODUCTS):
+        if i % 3 == 0:
+            rows.append((f"https://example.com/p/{i}", 'catalog_monitor', 'published', 'modest', None))
+        elif i % 3 == 1:
+            rows.append((f"https://example.com/p/{i}", 'catalog_monitor', 'draft', 'not_modest', None))
+        else:
+            rows.append((f"https://example.com/p/{i}", 'new_product_import', None, None, None))
+    conn.executemany('''
+        INSERT INTO products (url, source, shopify_status, modesty_status, assessment_status)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def _stages(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return dict(conn.execute('''
+            SELECT lifecycle_stage, COUNT(*) FROM products GROUP BY lifecycle_stage
+        ''').fetchall())
+    finally:
+        conn.close()
+
+
+class FailingLifecycleJob(LifecycleStageJob):
+    """Lifecycle job whose write fails on the Nth chunk"""
+
+    def __init__(self, fail_on_chunk: int):
+        self.fail_on_chunk = fail_on_chunk
+        self.chunks_written = 0
+
+    def write(self, conn, results):
+        self.chunks_written += 1
+        if self.chunks_written == self.fail_on_chunk:
+            raise RuntimeError("interrupted")
+        super().write(conn, results)
+
+
+def test_processes_all_rows_in_chunks(tmp_path):
+    db_path = _products_db(tmp_path)
+
+    summary = asyncio.run(BackfillEngine(db_path, LifecycleStageJob(), chunk_size=5, workers=1).run())
+
+    assert summary['rows_processed'] == PRODUCTS
+    assert summary['rows_written'] == PRODUCTS
+    assert summary['stats'] == {'assessed_approved': 8, 'assessed_rejected': 8, 'imported_direct': 7}
+    assert _stages(db_path) == summary['stats']
+
+
+def test_resumes_after_last_committed_chunk(tmp_path):
+    db_path = _products_db(tmp_path)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(BackfillEngine(db_path, FailingLifecycleJob(fail_on_chunk=3), chunk_size=5, workers=1).run())
+
+    # Two chunks committed with their cursor, the third rolled back
+    assert sum(count for stage, count in _stages(db_path).items() if stage) == 10
+
+    job = FailingLifecycleJob(fail_on_chunk=0)
+    summary = asyncio.run(BackfillEngine(db_path, job, chunk_size=5, workers=1).run())
+
+    assert summary['rows_this_run'] == PRODUCTS - 10
+    assert summary['rows_processed'] == PRODUCTS
+    assert job.chunks_written == 3
+    assert _stages(db_path) == {'assessed_approved': 8, 'assessed_rejected': 8, 'imported_direct': 7}
+
+
+def test_process_pool_matches_single_worker(tmp_path):
+    db_path = _products_db(tmp_path)
+
+    summary = asyncio.run(BackfillEngine(db_path, LifecycleStageJob(), chunk_size=4, workers=2).run())
+
+    assert summary['rows_processed'] == PRODUCTS
+    assert _stages(db_path) == {'assessed_approved': 8, 'assessed_rejected': 8, 'imported_direct': 7}
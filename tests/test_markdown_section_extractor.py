@@ -0,0 +1,80 @@
+"""
+Tests for MarkdownSectionExtractor (local product section extraction)
+Offline: synthetic markdown, no network or LLM calls
+"""
+
+import sys
+import os
+import itertools
+
+# Markdown tower modules import each other from their own directory
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "Extraction", "Markdown"))
+
+from markdown_section_extractor import MarkdownSectionExtractor
+
+URL = "https://www.nordstrom.com/s/ruched-satin-midi-dress/7000001"
+
+
+def _product_page(nav_lines: int = 200) -> str:
+    nav = [f"- [Category {i}](https://www.nordstrom.com/c/{i})" for i in range(nav_lines)]
+    product = [
+        "# Ruched Satin Midi Dress",
+        "$129.00",
+        "![front](https://n.nordstrommedia.com/id/sr3/front.jpeg)",
+        "![back](https://n.nordstrommedia.com/id/sr3/back.jpeg)",
+        "Color: Black",
+        "Select a size",
+        "Add to Bag",
+        "Details: Satin midi dress with a ruched bodice.",
+    ]
+    return "\n".join(nav + product + nav)
+
+
+def _brute_force_best(lines, scores, max_chars):
+    best = None
+    for start, end in itertools.combinations(range(len(lines) + 1), 2):
+        if sum(len(line) + 1 for line in lines[start:end]) <= max_chars:
+            total = sum(scores[start:end])
+            if best is None or total > best:
+                best = total
+    return best
+
+
+def test_extracts_product_section_without_navigation():
+    section = MarkdownSectionExtractor().extract(_product_page(), "nordstrom", URL, max_tokens=500)
+
+    assert section is not None
+    assert "# Ruched Satin Midi Dress" in section
+    assert "$129.00" in section
+    assert "front.jpeg" in section
+    assert "[Category" not in section
+
+
+def test_returns_none_without_price():
+    markdown = _product_page().replace("$129.00", "Price on request")
+
+    assert MarkdownSectionExtractor().extract(markdown, "nordstrom", URL, max_tokens=500) is None
+
+
+def test_best_window_is_optimal_with_negative_scores():
+    extractor = MarkdownSectionExtractor()
+    lines = ["aaaa", "bb", "cccccc", "d", "eeee", "ff", "g", "hhhhh"]
+    score_sets = [
+        [3, -1, 4, -5, 2, 6, -2, 1],
+        [-1, -2, -3, -1, -2, -1, -4, -1],
+        [0, 0, 5, -10, 5, 0, 0, 0],
+        [6, -0.5, -0.5, -0.5, 6, -8, 1, 1],
+    ]
+
+    for scores in score_sets:
+        for max_chars in range(2, 40):
+            window = extractor._best_window(lines, scores, max_chars)
+            expected = _brute_force_best(lines, scores, max_chars)
+
+            if expected is None:
+                assert window is None
+                continue
+            start, end, total = window
+            assert total == expected
+            assert sum(scores[start:end]) == total
+            assert sum(len(line) + 1 for line in lines[start:end]) <= max_chars